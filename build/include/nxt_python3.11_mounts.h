@@ -0,0 +1,6 @@
+static const nxt_fs_mount_t  nxt_python_mounts[] = {
+{(u_char *) "/root/.pyenv/versions/3.11.7/lib/python3.11", (u_char *) "/root/.pyenv/versions/3.11.7/lib/python3.11", NXT_FS_BIND, (u_char *) "bind", 0, NULL, 1, 1},
+{(u_char *) "/root/.pyenv/versions/3.11.7/lib/python311.zip", (u_char *) "/root/.pyenv/versions/3.11.7/lib/python311.zip", NXT_FS_BIND, (u_char *) "bind", 0, NULL, 1, 1},
+};
+
+
@@ -0,0 +1,2 @@
+#define NXT_VERSION "1.31.0"
+#define NXT_VERNUM  13100
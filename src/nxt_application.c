@@ -15,6 +15,9 @@
 #include <nxt_unit.h>
 #include <nxt_port_memory_int.h>
 #include <nxt_isolation.h>
+#if (NXT_HAVE_CPU_AFFINITY)
+#include <nxt_cpu_affinity.h>
+#endif
 
 #include <glob.h>
 
@@ -78,6 +81,10 @@ static uint32_t  compat[] = {
 
 static nxt_lvlhsh_t           nxt_proto_processes;
 static nxt_queue_t            nxt_proto_children;
+#if (NXT_HAVE_CPU_AFFINITY)
+static nxt_array_t            *nxt_proto_cpu_sets;
+static nxt_uint_t             nxt_proto_cpu_next;
+#endif
 static nxt_bool_t             nxt_proto_exiting;
 
 static nxt_app_module_t       *nxt_app;
@@ -547,6 +554,19 @@ nxt_proto_setup(nxt_task_t *task, nxt_process_t *process)
         }
     }
 
+#if (NXT_HAVE_CPU_AFFINITY)
+    /* NUMA topology is read from sysfs, so before changing root. */
+
+    if (app_conf->cpu_affinity != NULL) {
+        nxt_proto_cpu_sets = nxt_cpu_affinity_sets(process->mem_pool,
+                                                   app_conf->cpu_affinity);
+        if (nxt_slow_path(nxt_proto_cpu_sets == NULL)) {
+            nxt_alert(task, "failed to resolve application CPU affinity");
+            return NXT_ERROR;
+        }
+    }
+#endif
+
 #if (NXT_HAVE_ISOLATION_ROOTFS)
     if (process->isolation.rootfs != NULL) {
         if (process->isolation.mounts != NULL) {
@@ -654,6 +674,11 @@ nxt_proto_start_process_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
 
     nxt_proto_process_add(task, process);
 
+#if (NXT_HAVE_CPU_AFFINITY)
+    /* The child has inherited the current value as its CPU set index. */
+    nxt_proto_cpu_next++;
+#endif
+
     return;
 
 failed:
@@ -1013,6 +1038,17 @@ nxt_app_setup(nxt_task_t *task, nxt_process_t *process)
 {
     nxt_process_init_t  *init;
 
+#if (NXT_HAVE_CPU_AFFINITY)
+    nxt_cpu_affinity_t  *aff;
+
+    if (nxt_proto_cpu_sets != NULL) {
+        aff = nxt_proto_cpu_sets->elts;
+
+        (void) nxt_cpu_affinity_set(task,
+                        &aff[nxt_proto_cpu_next % nxt_proto_cpu_sets->nelts]);
+    }
+#endif
+
     process->state = NXT_PROCESS_STATE_CREATED;
 
     init = nxt_process_init(process);
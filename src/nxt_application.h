@@ -100,6 +100,7 @@ struct nxt_common_app_conf_s {
 
     nxt_conf_value_t           *isolation;
     nxt_conf_value_t           *limits;
+    nxt_conf_value_t           *cpu_affinity;
 
     size_t                     shm_limit;
     uint32_t                   request_limit;
@@ -16,6 +16,7 @@
 #include <openssl/x509.h>
 #include <openssl/x509v3.h>
 #include <openssl/rsa.h>
+#include <openssl/ocsp.h>
 #include <openssl/err.h>
 
 
@@ -39,6 +40,23 @@ typedef struct {
 } nxt_cert_item_t;
 
 
+/*
+ * A stapled OCSP response of a certificate.  The cache lives as long as
+ * the router process, so responses survive reconfigurations.
+ */
+
+typedef struct {
+    nxt_time_t        expire;
+    nxt_time_t        refresh;
+    uint8_t           updating;  /* 1 bit */
+
+    size_t            size;
+    u_char            *data;
+
+    nxt_str_t         key;
+} nxt_cert_ocsp_t;
+
+
 static nxt_cert_t *nxt_cert_fd(nxt_task_t *task, nxt_fd_t fd);
 static nxt_cert_t *nxt_cert_bio(nxt_task_t *task, BIO *bio);
 static int nxt_nxt_cert_pem_suffix(char *pem_str, const char *suffix);
@@ -48,10 +66,14 @@ static nxt_conf_value_t *nxt_cert_name_details(nxt_mp_t *mp, X509 *x509,
     nxt_bool_t issuer);
 static nxt_conf_value_t *nxt_cert_alt_names_details(nxt_mp_t *mp,
     STACK_OF(GENERAL_NAME) *alt_names);
+static nxt_cert_ocsp_t *nxt_cert_ocsp_find(nxt_str_t *key);
 static void nxt_cert_buf_completion(nxt_task_t *task, void *obj, void *data);
 
 
-static nxt_lvlhsh_t  nxt_cert_info;
+static nxt_lvlhsh_t           nxt_cert_info;
+
+static nxt_lvlhsh_t           nxt_cert_ocsp;
+static nxt_thread_spinlock_t  nxt_cert_ocsp_lock;
 
 
 nxt_cert_t *
@@ -97,19 +119,22 @@ nxt_cert_fd(nxt_task_t *task, nxt_fd_t fd)
 static nxt_cert_t *
 nxt_cert_bio(nxt_task_t *task, BIO *bio)
 {
-    int                         ret, suffix, key_id;
+    int                         ret, suffix, key_id, status;
     long                        length, reason;
     char                        *type, *header;
     X509                        *x509;
     EVP_PKEY                    *key;
-    nxt_uint_t                  nalloc;
+    nxt_bool_t                  ocsp;
+    nxt_uint_t                  nalloc, nocsp;
     nxt_cert_t                  *cert, *new_cert;
     u_char                      *data;
     const u_char                *data_copy;
+    OCSP_RESPONSE               *resp;
     PKCS8_PRIV_KEY_INFO         *p8inf;
     const EVP_PKEY_ASN1_METHOD  *ameth;
 
     nalloc = 4;
+    nocsp = 0;
 
     cert = nxt_zalloc(sizeof(nxt_cert_t) + nalloc * sizeof(X509 *));
     if (cert == NULL) {
@@ -135,6 +160,7 @@ nxt_cert_bio(nxt_task_t *task, BIO *bio)
 
         key = NULL;
         x509 = NULL;
+        ocsp = 0;
 /*
         EVP_CIPHER_INFO  cipher;
 
@@ -210,6 +236,30 @@ nxt_cert_bio(nxt_task_t *task, BIO *bio)
             goto done;
         }
 
+        if (nxt_strcmp(type, NXT_CERT_PEM_OCSP) == 0) {
+            data_copy = data;
+
+            resp = d2i_OCSP_RESPONSE(NULL, &data_copy, length);
+            if (resp == NULL) {
+                nxt_openssl_log_error(task, NXT_LOG_ALERT,
+                                      "d2i_OCSP_RESPONSE() failed");
+                goto done;
+            }
+
+            status = OCSP_response_status(resp);
+
+            OCSP_RESPONSE_free(resp);
+
+            if (status != OCSP_RESPONSE_STATUS_SUCCESSFUL) {
+                nxt_alert(task, "unsuccessful OCSP response status: \"%s\"",
+                          OCSP_response_status_str(status));
+                goto done;
+            }
+
+            ocsp = 1;
+            goto done;
+        }
+
         nxt_alert(task, "unsupported PEM type: \"%s\"", type);
 
     done:
@@ -248,6 +298,16 @@ nxt_cert_bio(nxt_task_t *task, BIO *bio)
             continue;
         }
 
+        if (ocsp) {
+            /* The response is stapled by the router, see nxt_openssl.c. */
+            if (++nocsp > 1) {
+                nxt_alert(task, "multiple OCSP responses in PEM");
+                goto fail;
+            }
+
+            continue;
+        }
+
         goto fail;
     }
 
@@ -809,6 +869,181 @@ nxt_cert_info_delete(nxt_str_t *name)
 }
 
 
+static nxt_int_t
+nxt_cert_ocsp_hash_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_cert_ocsp_t  *ocsp;
+
+    ocsp = data;
+
+    if (nxt_strstr_eq(&lhq->key, &ocsp->key)) {
+        return NXT_OK;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+static const nxt_lvlhsh_proto_t  nxt_cert_ocsp_hash_proto
+    nxt_aligned(64) =
+{
+    NXT_LVLHSH_DEFAULT,
+    nxt_cert_ocsp_hash_test,
+    nxt_lvlhsh_alloc,
+    nxt_lvlhsh_free,
+};
+
+
+/*
+ * Returns a copy of the valid OCSP response of the certificate identified
+ * by the DER-encoded OCSP_CERTID "key", the copy is allocated with
+ * OPENSSL_malloc() as SSL_set_tlsext_status_ocsp_resp() expects.  If
+ * "refresh" is not NULL, it is set when a new response should be fetched;
+ * the certificate is then marked as being updated until nxt_cert_ocsp_set()
+ * is called, so only one fetch is started at a time.
+ */
+
+u_char *
+nxt_cert_ocsp_get(nxt_str_t *key, nxt_time_t now, size_t *size,
+    nxt_bool_t *refresh)
+{
+    u_char           *p;
+    nxt_cert_ocsp_t  *ocsp;
+
+    p = NULL;
+
+    if (refresh != NULL) {
+        *refresh = 0;
+    }
+
+    nxt_thread_spin_lock(&nxt_cert_ocsp_lock);
+
+    ocsp = nxt_cert_ocsp_find(key);
+
+    if (ocsp == NULL) {
+        goto done;
+    }
+
+    if (ocsp->data != NULL && ocsp->expire > now) {
+        p = OPENSSL_malloc(ocsp->size);
+
+        if (nxt_fast_path(p != NULL)) {
+            nxt_memcpy(p, ocsp->data, ocsp->size);
+            *size = ocsp->size;
+        }
+    }
+
+    if (refresh != NULL && !ocsp->updating && ocsp->refresh <= now) {
+        ocsp->updating = 1;
+        *refresh = 1;
+    }
+
+done:
+
+    nxt_thread_spin_unlock(&nxt_cert_ocsp_lock);
+
+    return p;
+}
+
+
+/*
+ * Stores a verified OCSP response, or only schedules the next refresh
+ * if "data" is NULL, for example, after a failed fetch.
+ */
+
+nxt_int_t
+nxt_cert_ocsp_set(nxt_str_t *key, u_char *data, size_t size,
+    nxt_time_t expire, nxt_time_t refresh)
+{
+    u_char           *copy;
+    nxt_cert_ocsp_t  *ocsp;
+
+    copy = NULL;
+
+    if (data != NULL) {
+        copy = nxt_malloc(size);
+        if (nxt_slow_path(copy == NULL)) {
+            return NXT_ERROR;
+        }
+
+        nxt_memcpy(copy, data, size);
+    }
+
+    nxt_thread_spin_lock(&nxt_cert_ocsp_lock);
+
+    ocsp = nxt_cert_ocsp_find(key);
+
+    if (nxt_slow_path(ocsp == NULL)) {
+        nxt_thread_spin_unlock(&nxt_cert_ocsp_lock);
+
+        if (copy != NULL) {
+            nxt_free(copy);
+        }
+
+        return NXT_ERROR;
+    }
+
+    if (copy != NULL) {
+        if (ocsp->data != NULL) {
+            nxt_free(ocsp->data);
+        }
+
+        ocsp->data = copy;
+        ocsp->size = size;
+        ocsp->expire = expire;
+    }
+
+    ocsp->refresh = refresh;
+    ocsp->updating = 0;
+
+    nxt_thread_spin_unlock(&nxt_cert_ocsp_lock);
+
+    return NXT_OK;
+}
+
+
+/* Finds or adds a cache entry, must be called under the lock. */
+
+static nxt_cert_ocsp_t *
+nxt_cert_ocsp_find(nxt_str_t *key)
+{
+    nxt_int_t           ret;
+    nxt_cert_ocsp_t     *ocsp;
+    nxt_lvlhsh_query_t  lhq;
+
+    lhq.key_hash = nxt_murmur_hash2(key->start, key->length);
+    lhq.key = *key;
+    lhq.proto = &nxt_cert_ocsp_hash_proto;
+
+    if (nxt_lvlhsh_find(&nxt_cert_ocsp, &lhq) == NXT_OK) {
+        return lhq.value;
+    }
+
+    ocsp = nxt_zalloc(sizeof(nxt_cert_ocsp_t) + key->length);
+    if (nxt_slow_path(ocsp == NULL)) {
+        return NULL;
+    }
+
+    ocsp->key.length = key->length;
+    ocsp->key.start = (u_char *) ocsp + sizeof(nxt_cert_ocsp_t);
+    nxt_memcpy(ocsp->key.start, key->start, key->length);
+
+    lhq.key = ocsp->key;
+    lhq.replace = 0;
+    lhq.value = ocsp;
+    lhq.pool = NULL;
+
+    ret = nxt_lvlhsh_insert(&nxt_cert_ocsp, &lhq);
+
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_free(ocsp);
+        return NULL;
+    }
+
+    return ocsp;
+}
+
+
 
 nxt_array_t *
 nxt_cert_store_load(nxt_task_t *task, nxt_mp_t *mp)
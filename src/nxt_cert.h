@@ -8,6 +8,10 @@
 #define _NXT_CERT_INCLUDED_
 
 
+/* The PEM type of a stapled OCSP response in a certificate bundle. */
+#define NXT_CERT_PEM_OCSP  "OCSP RESPONSE"
+
+
 typedef struct nxt_cert_s  nxt_cert_t;
 
 nxt_cert_t *nxt_cert_mem(nxt_task_t *task, nxt_buf_mem_t *mbuf);
@@ -19,6 +23,11 @@ nxt_conf_value_t *nxt_cert_info_get(nxt_str_t *name);
 nxt_conf_value_t *nxt_cert_info_get_all(nxt_mp_t *mp);
 nxt_int_t nxt_cert_info_delete(nxt_str_t *name);
 
+u_char *nxt_cert_ocsp_get(nxt_str_t *key, nxt_time_t now, size_t *size,
+    nxt_bool_t *refresh);
+nxt_int_t nxt_cert_ocsp_set(nxt_str_t *key, u_char *data, size_t size,
+    nxt_time_t expire, nxt_time_t refresh);
+
 nxt_array_t *nxt_cert_store_load(nxt_task_t *task, nxt_mp_t *mem_pool);
 void nxt_cert_store_release(nxt_array_t *certs);
 
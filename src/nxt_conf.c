@@ -140,8 +140,6 @@ static size_t nxt_conf_json_object_length(nxt_conf_value_t *value,
 static u_char *nxt_conf_json_print_object(u_char *p, nxt_conf_value_t *value,
     nxt_conf_json_pretty_t *pretty);
 
-static size_t nxt_conf_json_escape_length(u_char *p, size_t size);
-static u_char *nxt_conf_json_escape(u_char *dst, u_char *src, size_t size);
 
 
 #define nxt_conf_json_newline(p)                                              \
@@ -2524,7 +2522,7 @@ nxt_conf_json_print_object(u_char *p, nxt_conf_value_t *value,
 }
 
 
-static size_t
+size_t
 nxt_conf_json_escape_length(u_char *p, size_t size)
 {
     u_char  ch;
@@ -2561,7 +2559,7 @@ nxt_conf_json_escape_length(u_char *p, size_t size)
 }
 
 
-static u_char *
+u_char *
 nxt_conf_json_escape(u_char *dst, u_char *src, size_t size)
 {
     u_char  ch;
@@ -112,6 +112,8 @@ u_char *nxt_conf_json_print(u_char *p, nxt_conf_value_t *value,
     nxt_conf_json_pretty_t *pretty);
 void nxt_conf_json_position(u_char *start, const u_char *pos, nxt_uint_t *line,
     nxt_uint_t *column);
+size_t nxt_conf_json_escape_length(u_char *p, size_t size);
+u_char *nxt_conf_json_escape(u_char *dst, u_char *src, size_t size);
 
 nxt_int_t nxt_conf_validate(nxt_conf_validation_t *vldt);
 
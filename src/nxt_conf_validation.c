@@ -13,6 +13,9 @@
 #include <nxt_sockaddr.h>
 #include <nxt_http_route_addr.h>
 #include <nxt_regex.h>
+#if (NXT_HAVE_CPU_AFFINITY)
+#include <nxt_cpu_affinity.h>
+#endif
 
 
 typedef enum {
@@ -102,6 +105,12 @@ static nxt_int_t nxt_conf_vldt_tls_cache_size(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
 static nxt_int_t nxt_conf_vldt_tls_timeout(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
+#if (NXT_HAVE_OPENSSL)
+static nxt_int_t nxt_conf_vldt_ocsp_responder(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_ocsp_refresh(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+#endif
 #if (NXT_HAVE_OPENSSL_TLSEXT)
 static nxt_int_t nxt_conf_vldt_ticket_key(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
@@ -205,8 +214,46 @@ static nxt_int_t nxt_conf_vldt_server(nxt_conf_validation_t *vldt,
     nxt_str_t *name, nxt_conf_value_t *value);
 static nxt_int_t nxt_conf_vldt_server_weight(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_upstream_method(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_server_max_fails(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_server_fail_timeout(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_keepalive_connections(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_keepalive_timeout(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_open_file_cache_max(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_open_file_cache_valid(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_cache_valid(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_cache_size(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_compressor(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value);
+static nxt_int_t nxt_conf_vldt_compressor_encoding(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_http2_max_concurrent_streams(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_http2_initial_window_size(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_compressor_min_length(
+    nxt_conf_validation_t *vldt, nxt_conf_value_t *value, void *data);
 static nxt_int_t nxt_conf_vldt_access_log(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_access_log_format(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_access_log_field(nxt_conf_validation_t *vldt,
+    nxt_str_t *name, nxt_conf_value_t *value);
+static nxt_int_t nxt_conf_vldt_access_log_if(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_access_log_sample(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_access_log_sample_class(
+    nxt_conf_validation_t *vldt, nxt_str_t *name, nxt_conf_value_t *value);
 
 static nxt_int_t nxt_conf_vldt_isolation(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data);
@@ -234,16 +281,29 @@ static nxt_int_t nxt_conf_vldt_js_module_element(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value);
 #endif
 
+#if (NXT_HAVE_CPU_AFFINITY)
+static nxt_int_t nxt_conf_vldt_cpu_affinity(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data);
+static nxt_int_t nxt_conf_vldt_cpu_set(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value);
+#endif
+
 
 static nxt_conf_vldt_object_t  nxt_conf_vldt_setting_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_http_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_websocket_members[];
+static nxt_conf_vldt_object_t  nxt_conf_vldt_http2_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_static_members[];
+static nxt_conf_vldt_object_t  nxt_conf_vldt_compression_members[];
+static nxt_conf_vldt_object_t  nxt_conf_vldt_compressor_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_forwarded_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_client_ip_members[];
 #if (NXT_TLS)
 static nxt_conf_vldt_object_t  nxt_conf_vldt_tls_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_session_members[];
+#if (NXT_HAVE_OPENSSL)
+static nxt_conf_vldt_object_t  nxt_conf_vldt_ocsp_members[];
+#endif
 #endif
 static nxt_conf_vldt_object_t  nxt_conf_vldt_match_members[];
 static nxt_conf_vldt_object_t  nxt_conf_vldt_python_target_members[];
@@ -310,6 +370,13 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_setting_members[] = {
         .name       = nxt_string("js_module"),
         .type       = NXT_CONF_VLDT_STRING | NXT_CONF_VLDT_ARRAY,
         .validator  = nxt_conf_vldt_js_module,
+#endif
+#if (NXT_HAVE_CPU_AFFINITY)
+    }, {
+        .name       = nxt_string("cpu_affinity"),
+        .type       = NXT_CONF_VLDT_INTEGER | NXT_CONF_VLDT_STRING
+                      | NXT_CONF_VLDT_ARRAY,
+        .validator  = nxt_conf_vldt_cpu_affinity,
 #endif
     },
 
@@ -353,14 +420,27 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_http_members[] = {
         .type       = NXT_CONF_VLDT_OBJECT,
         .validator  = nxt_conf_vldt_object,
         .u.members  = nxt_conf_vldt_websocket_members,
+    }, {
+        .name       = nxt_string("http2"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_http2_members,
     }, {
         .name       = nxt_string("static"),
         .type       = NXT_CONF_VLDT_OBJECT,
         .validator  = nxt_conf_vldt_object,
         .u.members  = nxt_conf_vldt_static_members,
+    }, {
+        .name       = nxt_string("compression"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_compression_members,
     }, {
         .name       = nxt_string("log_route"),
         .type       = NXT_CONF_VLDT_BOOLEAN,
+    }, {
+        .name       = nxt_string("route_memo"),
+        .type       = NXT_CONF_VLDT_BOOLEAN,
     }, {
         .name       = nxt_string("server_version"),
         .type       = NXT_CONF_VLDT_BOOLEAN,
@@ -387,6 +467,21 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_websocket_members[] = {
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_http2_members[] = {
+    {
+        .name       = nxt_string("max_concurrent_streams"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_http2_max_concurrent_streams,
+    }, {
+        .name       = nxt_string("initial_window_size"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_http2_initial_window_size,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_static_members[] = {
     {
         .name       = nxt_string("mime_types"),
@@ -398,6 +493,42 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_static_members[] = {
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_compression_members[] = {
+    {
+        .name       = nxt_string("types"),
+        .type       = NXT_CONF_VLDT_STRING | NXT_CONF_VLDT_ARRAY,
+        .validator  = nxt_conf_vldt_match_patterns,
+    }, {
+        .name       = nxt_string("compressors"),
+        .type       = NXT_CONF_VLDT_ARRAY,
+        .validator  = nxt_conf_vldt_array_iterator,
+        .u.array    = nxt_conf_vldt_compressor,
+        .flags      = NXT_CONF_VLDT_REQUIRED,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
+static nxt_conf_vldt_object_t  nxt_conf_vldt_compressor_members[] = {
+    {
+        .name       = nxt_string("encoding"),
+        .type       = NXT_CONF_VLDT_STRING,
+        .validator  = nxt_conf_vldt_compressor_encoding,
+        .flags      = NXT_CONF_VLDT_REQUIRED,
+    }, {
+        .name       = nxt_string("level"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+    }, {
+        .name       = nxt_string("min_length"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_compressor_min_length,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_listener_members[] = {
     {
         .name       = nxt_string("pass"),
@@ -417,6 +548,9 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_listener_members[] = {
         .type       = NXT_CONF_VLDT_OBJECT,
         .validator  = nxt_conf_vldt_object,
         .u.members  = nxt_conf_vldt_client_ip_members
+    }, {
+        .name       = nxt_string("http2"),
+        .type       = NXT_CONF_VLDT_BOOLEAN,
     },
 
 #if (NXT_TLS)
@@ -494,6 +628,23 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_tls_members[] = {
         .type       = NXT_CONF_VLDT_OBJECT,
         .validator  = nxt_conf_vldt_object,
         .u.members  = nxt_conf_vldt_session_members,
+    }, {
+        .name       = nxt_string("ktls"),
+        .type       = NXT_CONF_VLDT_BOOLEAN,
+#if !(NXT_HAVE_OPENSSL_KTLS)
+        .validator  = nxt_conf_vldt_unsupported,
+        .u.string   = "ktls",
+#endif
+    }, {
+        .name       = nxt_string("ocsp"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+#if (NXT_HAVE_OPENSSL)
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_ocsp_members,
+#else
+        .validator  = nxt_conf_vldt_unsupported,
+        .u.string   = "ocsp",
+#endif
     },
 
     NXT_CONF_VLDT_END
@@ -509,6 +660,13 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_session_members[] = {
         .name       = nxt_string("timeout"),
         .type       = NXT_CONF_VLDT_INTEGER,
         .validator  = nxt_conf_vldt_tls_timeout,
+    }, {
+        .name       = nxt_string("shared"),
+        .type       = NXT_CONF_VLDT_BOOLEAN,
+#if !(NXT_HAVE_OPENSSL)
+        .validator  = nxt_conf_vldt_unsupported,
+        .u.string   = "shared",
+#endif
     }, {
         .name       = nxt_string("tickets"),
         .type       = NXT_CONF_VLDT_STRING
@@ -526,6 +684,25 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_session_members[] = {
 };
 
 
+#if (NXT_HAVE_OPENSSL)
+
+static nxt_conf_vldt_object_t  nxt_conf_vldt_ocsp_members[] = {
+    {
+        .name       = nxt_string("responder"),
+        .type       = NXT_CONF_VLDT_STRING,
+        .validator  = nxt_conf_vldt_ocsp_responder,
+    }, {
+        .name       = nxt_string("refresh"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_ocsp_refresh,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+#endif
+
+
 static nxt_int_t
 nxt_conf_vldt_tls_cache_size(nxt_conf_validation_t *vldt,
     nxt_conf_value_t *value, void *data)
@@ -559,6 +736,56 @@ nxt_conf_vldt_tls_timeout(nxt_conf_validation_t *vldt, nxt_conf_value_t *value,
     return NXT_OK;
 }
 
+
+#if (NXT_HAVE_OPENSSL)
+
+static nxt_int_t
+nxt_conf_vldt_ocsp_responder(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    u_char          *p;
+    nxt_str_t       name;
+    nxt_sockaddr_t  *sa;
+
+    nxt_conf_get_string(value, &name);
+
+    if (nxt_str_start(&name, "http://", 7)) {
+        name.length -= 7;
+        name.start += 7;
+
+        p = memchr(name.start, '/', name.length);
+
+        if (p != NULL) {
+            name.length = p - name.start;
+        }
+
+        if (name.length != 0) {
+            sa = nxt_sockaddr_parse_optport(vldt->pool, &name);
+            if (sa != NULL) {
+                return NXT_OK;
+            }
+        }
+    }
+
+    return nxt_conf_vldt_error(vldt, "The \"responder\" must be an "
+                               "\"http://\" URL with an IP address.");
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_ocsp_refresh(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    if (nxt_conf_get_number(value) <= 0) {
+        return nxt_conf_vldt_error(vldt, "The \"refresh\" number must be "
+                                         "greater than zero.");
+    }
+
+    return NXT_OK;
+}
+
+#endif
+
 #endif
 
 #if (NXT_HAVE_OPENSSL_TLSEXT)
@@ -693,12 +920,20 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_action_common_members[] = {
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_cache_members[];
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_pass_action_members[] = {
     {
         .name       = nxt_string("pass"),
         .type       = NXT_CONF_VLDT_STRING,
         .validator  = nxt_conf_vldt_pass,
         .flags      = NXT_CONF_VLDT_TSTR,
+    }, {
+        .name       = nxt_string("cache"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_cache_members,
     },
 
     NXT_CONF_VLDT_NEXT(nxt_conf_vldt_action_common_members)
@@ -720,6 +955,9 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_return_action_members[] = {
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_open_file_cache_members[];
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_share_action_members[] = {
     {
         .name       = nxt_string("share"),
@@ -758,23 +996,84 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_share_action_members[] = {
         .validator  = nxt_conf_vldt_unsupported,
         .u.string   = "traverse_mounts",
 #endif
+    }, {
+        .name       = nxt_string("open_file_cache"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_open_file_cache_members,
+    }, {
+        .name       = nxt_string("precompressed"),
+        .type       = NXT_CONF_VLDT_BOOLEAN,
     },
 
     NXT_CONF_VLDT_NEXT(nxt_conf_vldt_action_common_members)
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_open_file_cache_members[] = {
+    {
+        .name       = nxt_string("max"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_open_file_cache_max,
+    }, {
+        .name       = nxt_string("valid"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_open_file_cache_valid,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
+static nxt_conf_vldt_object_t  nxt_conf_vldt_upstream_keepalive_members[];
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_proxy_action_members[] = {
     {
         .name       = nxt_string("proxy"),
         .type       = NXT_CONF_VLDT_STRING,
         .validator  = nxt_conf_vldt_proxy,
+    }, {
+        .name       = nxt_string("keepalive"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_upstream_keepalive_members,
+    }, {
+        .name       = nxt_string("cache"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_cache_members,
     },
 
     NXT_CONF_VLDT_NEXT(nxt_conf_vldt_action_common_members)
 };
 
 
+static nxt_conf_vldt_object_t  nxt_conf_vldt_cache_members[] = {
+    {
+        .name       = nxt_string("key"),
+        .type       = NXT_CONF_VLDT_STRING,
+        .flags      = NXT_CONF_VLDT_TSTR,
+    }, {
+        .name       = nxt_string("valid"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_cache_valid,
+    }, {
+        .name       = nxt_string("max_size"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_cache_size,
+        .u.string   = "max_size",
+    }, {
+        .name       = nxt_string("max_entry_size"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_cache_size,
+        .u.string   = "max_entry_size",
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
 static nxt_conf_vldt_object_t  nxt_conf_vldt_external_members[] = {
     {
         .name       = nxt_string("executable"),
@@ -1080,6 +1379,13 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_common_members[] = {
     }, {
         .name       = nxt_string("stderr"),
         .type       = NXT_CONF_VLDT_STRING,
+#if (NXT_HAVE_CPU_AFFINITY)
+    }, {
+        .name       = nxt_string("cpu_affinity"),
+        .type       = NXT_CONF_VLDT_INTEGER | NXT_CONF_VLDT_STRING
+                      | NXT_CONF_VLDT_ARRAY,
+        .validator  = nxt_conf_vldt_cpu_affinity,
+#endif
     },
 
     NXT_CONF_VLDT_END
@@ -1282,6 +1588,30 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_upstream_members[] = {
         .type       = NXT_CONF_VLDT_OBJECT,
         .validator  = nxt_conf_vldt_object_iterator,
         .u.object   = nxt_conf_vldt_server,
+    }, {
+        .name       = nxt_string("method"),
+        .type       = NXT_CONF_VLDT_STRING,
+        .validator  = nxt_conf_vldt_upstream_method,
+    }, {
+        .name       = nxt_string("keepalive"),
+        .type       = NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_object,
+        .u.members  = nxt_conf_vldt_upstream_keepalive_members,
+    },
+
+    NXT_CONF_VLDT_END
+};
+
+
+static nxt_conf_vldt_object_t  nxt_conf_vldt_upstream_keepalive_members[] = {
+    {
+        .name       = nxt_string("connections"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_keepalive_connections,
+    }, {
+        .name       = nxt_string("idle_timeout"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_keepalive_timeout,
     },
 
     NXT_CONF_VLDT_END
@@ -1293,6 +1623,14 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_upstream_server_members[] = {
         .name       = nxt_string("weight"),
         .type       = NXT_CONF_VLDT_NUMBER,
         .validator  = nxt_conf_vldt_server_weight,
+    }, {
+        .name       = nxt_string("max_fails"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_server_max_fails,
+    }, {
+        .name       = nxt_string("fail_timeout"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+        .validator  = nxt_conf_vldt_server_fail_timeout,
     },
 
     NXT_CONF_VLDT_END
@@ -1305,7 +1643,29 @@ static nxt_conf_vldt_object_t  nxt_conf_vldt_access_log_members[] = {
         .type       = NXT_CONF_VLDT_STRING,
     }, {
         .name       = nxt_string("format"),
+        .type       = NXT_CONF_VLDT_STRING | NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_access_log_format,
+    }, {
+        .name       = nxt_string("if"),
         .type       = NXT_CONF_VLDT_STRING,
+        .validator  = nxt_conf_vldt_access_log_if,
+    }, {
+        .name       = nxt_string("sample"),
+        .type       = NXT_CONF_VLDT_NUMBER | NXT_CONF_VLDT_OBJECT,
+        .validator  = nxt_conf_vldt_access_log_sample,
+    }, {
+        .name       = nxt_string("buffer"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+    }, {
+        .name       = nxt_string("flush"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+    }, {
+        .name       = nxt_string("gzip"),
+        .type       = NXT_CONF_VLDT_INTEGER,
+#if !(NXT_HAVE_ZLIB)
+        .validator  = nxt_conf_vldt_unsupported,
+        .u.string   = "gzip",
+#endif
     },
 
     NXT_CONF_VLDT_END
@@ -3246,52 +3606,377 @@ nxt_conf_vldt_server_weight(nxt_conf_validation_t *vldt,
 }
 
 
-#if (NXT_HAVE_NJS)
-
 static nxt_int_t
-nxt_conf_vldt_js_module(nxt_conf_validation_t *vldt, nxt_conf_value_t *value,
-    void *data)
+nxt_conf_vldt_server_max_fails(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
 {
-    if (nxt_conf_type(value) == NXT_CONF_ARRAY) {
-        return nxt_conf_vldt_array_iterator(vldt, value,
-                                            &nxt_conf_vldt_js_module_element);
+    int64_t  max_fails;
+
+    max_fails = nxt_conf_get_number(value);
+
+    if (max_fails < 0) {
+        return nxt_conf_vldt_error(vldt, "The \"max_fails\" number must not "
+                                   "be negative.");
     }
 
-    /* NXT_CONF_STRING */
+    if (max_fails > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"max_fails\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX);
+    }
 
-    return nxt_conf_vldt_js_module_element(vldt, value);
+    return NXT_OK;
 }
 
 
 static nxt_int_t
-nxt_conf_vldt_js_module_element(nxt_conf_validation_t *vldt,
-    nxt_conf_value_t *value)
+nxt_conf_vldt_server_fail_timeout(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
 {
-    nxt_str_t         name;
-    nxt_conf_value_t  *module;
+    int64_t  timeout;
 
-    if (nxt_conf_type(value) != NXT_CONF_STRING) {
-        return nxt_conf_vldt_error(vldt, "The \"js_module\" array must "
-                                   "contain only string values.");
-    }
+    timeout = nxt_conf_get_number(value);
 
-    nxt_conf_get_string(value, &name);
+    if (timeout <= 0) {
+        return nxt_conf_vldt_error(vldt, "The \"fail_timeout\" number must "
+                                   "be greater than zero.");
+    }
 
-    module = nxt_script_info_get(&name);
-    if (module == NULL) {
-        return nxt_conf_vldt_error(vldt, "JS module \"%V\" is not found.",
-                                   &name);
+    if (timeout > NXT_INT32_T_MAX / 1000) {
+        return nxt_conf_vldt_error(vldt, "The \"fail_timeout\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX / 1000);
     }
 
     return NXT_OK;
 }
 
-#endif
-
 
-typedef struct {
+static nxt_int_t
+nxt_conf_vldt_upstream_method(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    nxt_str_t   method;
+    nxt_uint_t  i;
+
+    static nxt_str_t  methods[] = {
+        nxt_string("round_robin"),
+        nxt_string("least_conn"),
+        nxt_string("peak_ewma"),
+    };
+
+    nxt_conf_get_string(value, &method);
+
+    for (i = 0; i < nxt_nitems(methods); i++) {
+        if (nxt_strstr_eq(&method, &methods[i])) {
+            return NXT_OK;
+        }
+    }
+
+    return nxt_conf_vldt_error(vldt, "The \"method\" must be one of "
+                               "\"round_robin\", \"least_conn\", or "
+                               "\"peak_ewma\".");
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_keepalive_connections(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  connections;
+
+    connections = nxt_conf_get_number(value);
+
+    if (connections < 1) {
+        return nxt_conf_vldt_error(vldt, "The \"connections\" number must be "
+                                   "equal to or greater than 1.");
+    }
+
+    if (connections > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"connections\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_keepalive_timeout(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  timeout;
+
+    timeout = nxt_conf_get_number(value);
+
+    if (timeout <= 0) {
+        return nxt_conf_vldt_error(vldt, "The \"idle_timeout\" number must "
+                                   "be greater than zero.");
+    }
+
+    if (timeout > NXT_INT32_T_MAX / 1000) {
+        return nxt_conf_vldt_error(vldt, "The \"idle_timeout\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX / 1000);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_open_file_cache_max(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  max;
+
+    max = nxt_conf_get_number(value);
+
+    if (max < 1) {
+        return nxt_conf_vldt_error(vldt, "The \"max\" number must be "
+                                   "equal to or greater than 1.");
+    }
+
+    if (max > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"max\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_open_file_cache_valid(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  valid;
+
+    valid = nxt_conf_get_number(value);
+
+    if (valid <= 0) {
+        return nxt_conf_vldt_error(vldt, "The \"valid\" number must "
+                                   "be greater than zero.");
+    }
+
+    if (valid > NXT_INT32_T_MAX / 1000) {
+        return nxt_conf_vldt_error(vldt, "The \"valid\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX / 1000);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_cache_valid(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  valid;
+
+    valid = nxt_conf_get_number(value);
+
+    if (valid < 0) {
+        return nxt_conf_vldt_error(vldt, "The \"valid\" number must not "
+                                   "be negative.");
+    }
+
+    if (valid > NXT_INT32_T_MAX / 1000) {
+        return nxt_conf_vldt_error(vldt, "The \"valid\" number must "
+                                   "not exceed %d.", NXT_INT32_T_MAX / 1000);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_cache_size(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  size;
+
+    size = nxt_conf_get_number(value);
+
+    if (size < 1) {
+        return nxt_conf_vldt_error(vldt, "The \"%s\" number must be "
+                                   "equal to or greater than 1.", data);
+    }
+
+    if (size > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"%s\" number must "
+                                   "not exceed %d.", data, NXT_INT32_T_MAX);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_compressor(nxt_conf_validation_t *vldt, nxt_conf_value_t *value)
+{
+    int64_t           level, max;
+    nxt_str_t         encoding;
+    nxt_int_t         ret;
+    nxt_conf_value_t  *conf;
+
+    static nxt_str_t  encoding_str = nxt_string("encoding");
+    static nxt_str_t  level_str = nxt_string("level");
+
+    if (nxt_conf_type(value) != NXT_CONF_OBJECT) {
+        return nxt_conf_vldt_error(vldt, "The \"compressors\" array "
+                                   "must contain only object values.");
+    }
+
+    ret = nxt_conf_vldt_object(vldt, value, nxt_conf_vldt_compressor_members);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        return ret;
+    }
+
+    conf = nxt_conf_get_object_member(value, &level_str, NULL);
+    if (conf == NULL) {
+        return NXT_OK;
+    }
+
+    level = nxt_conf_get_number(conf);
+
+    conf = nxt_conf_get_object_member(value, &encoding_str, NULL);
+    nxt_conf_get_string(conf, &encoding);
+
+    max = nxt_str_eq(&encoding, "br", 2) ? 11 : 9;
+
+    if (level < 1 || level > max) {
+        return nxt_conf_vldt_error(vldt, "The \"level\" number for "
+                                   "the \"%V\" encoding must be "
+                                   "between 1 and %L.", &encoding, max);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_compressor_encoding(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    nxt_str_t  encoding;
+
+    nxt_conf_get_string(value, &encoding);
+
+#if (NXT_HAVE_ZLIB)
+    if (nxt_str_eq(&encoding, "gzip", 4)
+        || nxt_str_eq(&encoding, "deflate", 7))
+    {
+        return NXT_OK;
+    }
+#endif
+
+#if (NXT_HAVE_BROTLI)
+    if (nxt_str_eq(&encoding, "br", 2)) {
+        return NXT_OK;
+    }
+#endif
+
+    return nxt_conf_vldt_error(vldt, "The \"%V\" encoding is not supported.",
+                               &encoding);
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_http2_max_concurrent_streams(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  streams;
+
+    streams = nxt_conf_get_number(value);
+
+    if (streams < 1 || streams > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"max_concurrent_streams\" "
+                                   "number must be between 1 and %d.",
+                                   NXT_INT32_T_MAX);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_http2_initial_window_size(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    int64_t  size;
+
+    size = nxt_conf_get_number(value);
+
+    if (size < 1 || size > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"initial_window_size\" "
+                                   "number must be between 1 and %d.",
+                                   NXT_INT32_T_MAX);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_compressor_min_length(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    if (nxt_conf_get_number(value) < 0) {
+        return nxt_conf_vldt_error(vldt, "The \"min_length\" number must "
+                                   "not be negative.");
+    }
+
+    return NXT_OK;
+}
+
+
+#if (NXT_HAVE_NJS)
+
+static nxt_int_t
+nxt_conf_vldt_js_module(nxt_conf_validation_t *vldt, nxt_conf_value_t *value,
+    void *data)
+{
+    if (nxt_conf_type(value) == NXT_CONF_ARRAY) {
+        return nxt_conf_vldt_array_iterator(vldt, value,
+                                            &nxt_conf_vldt_js_module_element);
+    }
+
+    /* NXT_CONF_STRING */
+
+    return nxt_conf_vldt_js_module_element(vldt, value);
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_js_module_element(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value)
+{
+    nxt_str_t         name;
+    nxt_conf_value_t  *module;
+
+    if (nxt_conf_type(value) != NXT_CONF_STRING) {
+        return nxt_conf_vldt_error(vldt, "The \"js_module\" array must "
+                                   "contain only string values.");
+    }
+
+    nxt_conf_get_string(value, &name);
+
+    module = nxt_script_info_get(&name);
+    if (module == NULL) {
+        return nxt_conf_vldt_error(vldt, "JS module \"%V\" is not found.",
+                                   &name);
+    }
+
+    return NXT_OK;
+}
+
+#endif
+
+
+typedef struct {
     nxt_str_t  path;
     nxt_str_t  format;
+    int64_t    buffer;
+    int64_t    flush;
+    int64_t    gzip;
 } nxt_conf_vldt_access_log_conf_t;
 
 
@@ -3307,6 +3992,24 @@ static nxt_conf_map_t  nxt_conf_vldt_access_log_map[] = {
         NXT_CONF_MAP_STR,
         offsetof(nxt_conf_vldt_access_log_conf_t, format),
     },
+
+    {
+        nxt_string("buffer"),
+        NXT_CONF_MAP_INT64,
+        offsetof(nxt_conf_vldt_access_log_conf_t, buffer),
+    },
+
+    {
+        nxt_string("flush"),
+        NXT_CONF_MAP_INT64,
+        offsetof(nxt_conf_vldt_access_log_conf_t, flush),
+    },
+
+    {
+        nxt_string("gzip"),
+        NXT_CONF_MAP_INT64,
+        offsetof(nxt_conf_vldt_access_log_conf_t, gzip),
+    },
 };
 
 
@@ -3330,6 +4033,10 @@ nxt_conf_vldt_access_log(nxt_conf_validation_t *vldt, nxt_conf_value_t *value,
 
     nxt_memzero(&conf, sizeof(nxt_conf_vldt_access_log_conf_t));
 
+    conf.buffer = 1;
+    conf.flush = 1;
+    conf.gzip = 1;
+
     ret = nxt_conf_map_object(vldt->pool, value,
                               nxt_conf_vldt_access_log_map,
                               nxt_nitems(nxt_conf_vldt_access_log_map),
@@ -3343,9 +4050,208 @@ nxt_conf_vldt_access_log(nxt_conf_validation_t *vldt, nxt_conf_value_t *value,
                                    "The \"path\" string must not be empty.");
     }
 
+    if (conf.buffer < 1 || conf.buffer > NXT_INT32_T_MAX) {
+        return nxt_conf_vldt_error(vldt, "The \"buffer\" number must be "
+                                   "between 1 and %d.", NXT_INT32_T_MAX);
+    }
+
+    if (conf.flush < 1 || conf.flush > NXT_INT32_T_MAX / 1000) {
+        return nxt_conf_vldt_error(vldt, "The \"flush\" number must be "
+                                   "between 1 and %d.",
+                                   NXT_INT32_T_MAX / 1000);
+    }
+
+    if (conf.gzip < 1 || conf.gzip > 9) {
+        return nxt_conf_vldt_error(vldt, "The \"gzip\" number must be "
+                                   "between 1 and 9.");
+    }
+
     if (nxt_is_tstr(&conf.format)) {
         return nxt_conf_vldt_var(vldt, &format_str, &conf.format);
     }
 
     return NXT_OK;
 }
+
+
+static nxt_int_t
+nxt_conf_vldt_access_log_format(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    if (nxt_conf_type(value) == NXT_CONF_STRING) {
+        return NXT_OK;
+    }
+
+    if (nxt_conf_object_members_count(value) == 0) {
+        return nxt_conf_vldt_error(vldt, "The \"format\" object must contain "
+                                   "at least one field.");
+    }
+
+    return nxt_conf_vldt_object_iterator(vldt, value,
+                                         &nxt_conf_vldt_access_log_field);
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_access_log_field(nxt_conf_validation_t *vldt, nxt_str_t *name,
+    nxt_conf_value_t *value)
+{
+    nxt_str_t  str;
+
+    if (nxt_conf_type(value) != NXT_CONF_STRING) {
+        return nxt_conf_vldt_error(vldt, "The \"%V\" field of the \"format\" "
+                                   "object must be a string.", name);
+    }
+
+    nxt_conf_get_string(value, &str);
+
+    if (nxt_is_tstr(&str)) {
+        return nxt_conf_vldt_var(vldt, name, &str);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_access_log_if(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    nxt_str_t  str;
+
+    static nxt_str_t  if_str = nxt_string("if");
+
+    nxt_conf_get_string(value, &str);
+
+    if (str.length != 0 && str.start[0] == '!') {
+        str.start++;
+        str.length--;
+    }
+
+    if (str.length == 0) {
+        return nxt_conf_vldt_error(vldt, "The \"if\" expression must not "
+                                   "be empty.");
+    }
+
+    if (nxt_is_tstr(&str)) {
+        return nxt_conf_vldt_var(vldt, &if_str, &str);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_access_log_sample(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    double  sample;
+
+    if (nxt_conf_type(value) == NXT_CONF_OBJECT) {
+        return nxt_conf_vldt_object_iterator(vldt, value,
+                                     &nxt_conf_vldt_access_log_sample_class);
+    }
+
+    sample = nxt_conf_get_number(value);
+
+    if (sample < 0 || sample > 1) {
+        return nxt_conf_vldt_error(vldt, "The \"sample\" number must be "
+                                   "between 0 and 1.");
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_access_log_sample_class(nxt_conf_validation_t *vldt,
+    nxt_str_t *name, nxt_conf_value_t *value)
+{
+    if (name->length != 3
+        || name->start[0] < '1' || name->start[0] > '5'
+        || name->start[1] != 'x' || name->start[2] != 'x')
+    {
+        return nxt_conf_vldt_error(vldt, "The \"sample\" object keys must "
+                                   "be status classes from \"1xx\" "
+                                   "to \"5xx\".");
+    }
+
+    if (nxt_conf_type(value) != NXT_CONF_NUMBER
+        && nxt_conf_type(value) != NXT_CONF_INTEGER)
+    {
+        return nxt_conf_vldt_error(vldt, "The \"%V\" sample rate must be "
+                                   "a number.", name);
+    }
+
+    return nxt_conf_vldt_access_log_sample(vldt, value, NULL);
+}
+
+
+#if (NXT_HAVE_CPU_AFFINITY)
+
+static nxt_int_t
+nxt_conf_vldt_cpu_affinity(nxt_conf_validation_t *vldt,
+    nxt_conf_value_t *value, void *data)
+{
+    nxt_str_t  str;
+
+    if (nxt_conf_type(value) == NXT_CONF_ARRAY) {
+        if (nxt_conf_array_elements_count(value) == 0) {
+            return nxt_conf_vldt_error(vldt, "The \"cpu_affinity\" array "
+                                       "must contain at least one CPU set.");
+        }
+
+        return nxt_conf_vldt_array_iterator(vldt, value,
+                                            &nxt_conf_vldt_cpu_set);
+    }
+
+    if (nxt_conf_type(value) == NXT_CONF_STRING) {
+        nxt_conf_get_string(value, &str);
+
+        if (nxt_str_eq(&str, "auto", 4) || nxt_str_eq(&str, "numa", 4)) {
+            return NXT_OK;
+        }
+    }
+
+    return nxt_conf_vldt_cpu_set(vldt, value);
+}
+
+
+static nxt_int_t
+nxt_conf_vldt_cpu_set(nxt_conf_validation_t *vldt, nxt_conf_value_t *value)
+{
+    int64_t    cpu;
+    nxt_str_t  str;
+    cpu_set_t  set;
+
+    switch (nxt_conf_type(value)) {
+
+    case NXT_CONF_INTEGER:
+        cpu = nxt_conf_get_number(value);
+
+        if (cpu < 0 || cpu >= CPU_SETSIZE) {
+            return nxt_conf_vldt_error(vldt, "The \"cpu_affinity\" CPU "
+                                       "number must be between 0 and %d.",
+                                       CPU_SETSIZE - 1);
+        }
+
+        return NXT_OK;
+
+    case NXT_CONF_STRING:
+        nxt_conf_get_string(value, &str);
+
+        if (nxt_cpu_affinity_parse(&str, &set) != NXT_OK) {
+            return nxt_conf_vldt_error(vldt, "The \"cpu_affinity\" CPU set "
+                                       "\"%V\" is invalid.", &str);
+        }
+
+        return NXT_OK;
+
+    default:
+        return nxt_conf_vldt_error(vldt, "The \"cpu_affinity\" array must "
+                                   "contain only CPU numbers or CPU list "
+                                   "strings.");
+    }
+}
+
+#endif
@@ -168,6 +168,7 @@ struct nxt_conn_s {
 
     uint8_t                       sendfile;     /* 2 bits */
     uint8_t                       tcp_nodelay;  /* 1 bit */
+    uint8_t                       alpn_h2;      /* 1 bit */
 
     nxt_queue_link_t              link;
 };
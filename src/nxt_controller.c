@@ -33,6 +33,10 @@ typedef struct {
     nxt_uint_t        status;
     nxt_conf_value_t  *conf;
 
+    /* A preformatted body used instead of conf. */
+    nxt_buf_t         *body;
+    nxt_str_t         type;
+
     u_char            *title;
     nxt_str_t         detail;
     ssize_t           offset;
@@ -93,6 +97,10 @@ static void nxt_controller_status_handler(nxt_task_t *task,
     nxt_port_recv_msg_t *msg, void *data);
 static void nxt_controller_status_response(nxt_task_t *task,
     nxt_controller_request_t *req, nxt_str_t *path);
+static nxt_int_t nxt_controller_status_format(nxt_str_t *args,
+    nxt_str_t *format);
+static nxt_conf_value_t *nxt_controller_status_get(
+    nxt_controller_request_t *req);
 #if (NXT_TLS)
 static void nxt_controller_process_cert(nxt_task_t *task,
     nxt_controller_request_t *req, nxt_str_t *path);
@@ -138,6 +146,7 @@ static nxt_controller_conf_t   nxt_controller_conf;
 static nxt_queue_t             nxt_controller_waiting_requests;
 static nxt_bool_t              nxt_controller_waiting_init_conf;
 static nxt_conf_value_t        *nxt_controller_status;
+static nxt_status_report_t     *nxt_controller_status_report;
 
 
 static const nxt_event_conn_state_t  nxt_controller_conn_read_state;
@@ -1067,7 +1076,7 @@ nxt_controller_process_request(nxt_task_t *task, nxt_controller_request_t *req)
     uint32_t                   i, count;
     nxt_str_t                  path;
     nxt_conn_t                 *c;
-    nxt_conf_value_t           *value;
+    nxt_conf_value_t           *value, *status_value;
     nxt_controller_response_t  resp;
 #if (NXT_TLS)
     nxt_conf_value_t           *certs;
@@ -1118,7 +1127,7 @@ nxt_controller_process_request(nxt_task_t *task, nxt_controller_request_t *req)
             goto invalid_method;
         }
 
-        if (nxt_controller_status == NULL) {
+        if (nxt_controller_status_report == NULL) {
             nxt_controller_process_status(task, req);
             return;
         }
@@ -1187,11 +1196,16 @@ nxt_controller_process_request(nxt_task_t *task, nxt_controller_request_t *req)
             goto invalid_method;
         }
 
-        if (nxt_controller_status == NULL) {
+        if (nxt_controller_status_report == NULL) {
             nxt_controller_process_status(task, req);
             return;
         }
 
+        status_value = nxt_controller_status_get(req);
+        if (nxt_slow_path(status_value == NULL)) {
+            goto alloc_fail;
+        }
+
         count = 2;
 #if (NXT_TLS)
         count++;
@@ -1226,7 +1240,7 @@ nxt_controller_process_request(nxt_task_t *task, nxt_controller_request_t *req)
 #endif
 
         nxt_conf_set_member(value, &config, nxt_controller_conf.root, i++);
-        nxt_conf_set_member(value, &status, nxt_controller_status, i);
+        nxt_conf_set_member(value, &status, status_value, i);
 
         resp.status = 200;
         resp.conf = value;
@@ -1623,7 +1637,8 @@ static void
 nxt_controller_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg,
     void *data)
 {
-    nxt_conf_value_t           *status;
+    u_char                     *p, *report;
+    nxt_buf_t                  *b;
     nxt_controller_request_t   *req;
     nxt_controller_response_t  resp;
 
@@ -1631,30 +1646,67 @@ nxt_controller_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg,
 
     req = data;
 
-    if (msg->port_msg.type == NXT_PORT_MSG_RPC_READY) {
-        status = nxt_status_get((nxt_status_report_t *) msg->buf->mem.pos,
-                                req->conn->mem_pool);
-    } else {
-        status = NULL;
+    if (msg->port_msg.type != NXT_PORT_MSG_RPC_READY) {
+        goto fail;
     }
 
-    if (status == NULL) {
-        nxt_queue_remove(&req->link);
+    /*
+     * The report is only valid in this handler, so all the requests
+     * waiting for it are processed here, and its JSON representation
+     * is created once on the first demand.
+     */
 
-        nxt_memzero(&resp, sizeof(nxt_controller_response_t));
+    b = msg->buf;
+    report = NULL;
 
-        resp.status = 500;
-        resp.title = (u_char *) "Failed to get status.";
-        resp.offset = -1;
+    if (b->next == NULL) {
+        nxt_controller_status_report = (nxt_status_report_t *) b->mem.pos;
 
-        nxt_controller_response(task, req, &resp);
-    }
+    } else {
+        /* A large report comes in fragments. */
+
+        report = nxt_malloc(nxt_buf_chain_length(b));
+        if (nxt_slow_path(report == NULL)) {
+            goto fail;
+        }
+
+        p = report;
+
+        do {
+            if (!nxt_buf_is_sync(b)) {
+                p = nxt_cpymem(p, b->mem.pos, b->mem.free - b->mem.pos);
+            }
 
-    nxt_controller_status = status;
+            b = b->next;
+        } while (b != NULL);
+
+        nxt_controller_status_report = (nxt_status_report_t *) report;
+    }
 
     nxt_controller_flush_requests(task);
 
+    nxt_controller_status_report = NULL;
     nxt_controller_status = NULL;
+
+    if (report != NULL) {
+        nxt_free(report);
+    }
+
+    return;
+
+fail:
+
+    nxt_queue_remove(&req->link);
+
+    nxt_memzero(&resp, sizeof(nxt_controller_response_t));
+
+    resp.status = 500;
+    resp.title = (u_char *) "Failed to get status.";
+    resp.offset = -1;
+
+    nxt_controller_response(task, req, &resp);
+
+    nxt_controller_flush_requests(task);
 }
 
 
@@ -1662,13 +1714,55 @@ static void
 nxt_controller_status_response(nxt_task_t *task, nxt_controller_request_t *req,
     nxt_str_t *path)
 {
+    nxt_str_t                  format;
     nxt_conf_value_t           *status;
     nxt_controller_response_t  resp;
 
-    status = nxt_conf_get_path(nxt_controller_status, path);
-
     nxt_memzero(&resp, sizeof(nxt_controller_response_t));
 
+    if (nxt_controller_status_format(&req->parser.args, &format) == NXT_OK
+        && !nxt_str_eq(&format, "json", 4))
+    {
+        if (!nxt_str_eq(&format, "prometheus", 10)) {
+            resp.status = 400;
+            resp.title = (u_char *) "Invalid status format.";
+            resp.offset = -1;
+
+            nxt_controller_response(task, req, &resp);
+            return;
+        }
+
+        if (path->length != 1) {
+            resp.status = 400;
+            resp.title = (u_char *) "The \"prometheus\" format is only "
+                                    "supported for the whole status.";
+            resp.offset = -1;
+
+            nxt_controller_response(task, req, &resp);
+            return;
+        }
+
+        resp.body = nxt_status_metrics(nxt_controller_status_report,
+                                       req->conn->mem_pool);
+        if (nxt_slow_path(resp.body == NULL)) {
+            goto alloc_fail;
+        }
+
+        resp.status = 200;
+        nxt_str_set(&resp.type, "application/openmetrics-text; "
+                                "version=1.0.0; charset=utf-8");
+
+        nxt_controller_response(task, req, &resp);
+        return;
+    }
+
+    status = nxt_controller_status_get(req);
+    if (nxt_slow_path(status == NULL)) {
+        goto alloc_fail;
+    }
+
+    status = nxt_conf_get_path(status, path);
+
     if (status == NULL) {
         resp.status = 404;
         resp.title = (u_char *) "Invalid path.";
@@ -1682,6 +1776,55 @@ nxt_controller_status_response(nxt_task_t *task, nxt_controller_request_t *req,
     resp.conf = status;
 
     nxt_controller_response(task, req, &resp);
+    return;
+
+alloc_fail:
+
+    resp.status = 500;
+    resp.title = (u_char *) "Memory allocation failed.";
+    resp.offset = -1;
+
+    nxt_controller_response(task, req, &resp);
+}
+
+
+static nxt_int_t
+nxt_controller_status_format(nxt_str_t *args, nxt_str_t *format)
+{
+    u_char  *p, *end, *next;
+
+    p = args->start;
+    end = p + args->length;
+
+    while (p < end) {
+        next = memchr(p, '&', end - p);
+        if (next == NULL) {
+            next = end;
+        }
+
+        if (next - p >= 7 && nxt_strncmp(p, "format=", 7) == 0) {
+            format->start = p + 7;
+            format->length = next - format->start;
+
+            return NXT_OK;
+        }
+
+        p = next + 1;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+static nxt_conf_value_t *
+nxt_controller_status_get(nxt_controller_request_t *req)
+{
+    if (nxt_controller_status == NULL) {
+        nxt_controller_status = nxt_status_get(nxt_controller_status_report,
+                                               req->conn->mem_pool);
+    }
+
+    return nxt_controller_status;
 }
 
 
@@ -2528,6 +2671,11 @@ nxt_controller_response(nxt_task_t *task, nxt_controller_request_t *req,
     c = req->conn;
     value = resp->conf;
 
+    if (resp->body != NULL) {
+        body = resp->body;
+        goto header;
+    }
+
     if (value == NULL) {
         n = 1
             + (resp->detail.length != 0)
@@ -2594,10 +2742,14 @@ nxt_controller_response(nxt_task_t *task, nxt_controller_request_t *req,
 
     body->mem.free = nxt_cpymem(body->mem.free, "\r\n", 2);
 
+    nxt_str_set(&resp->type, "application/json");
+
+header:
+
     size = nxt_length("HTTP/1.1 " "\r\n") + status_line.length
            + nxt_length("Server: " NXT_SERVER "\r\n")
            + nxt_length("Date: Wed, 31 Dec 1986 16:40:00 GMT\r\n")
-           + nxt_length("Content-Type: application/json\r\n")
+           + nxt_length("Content-Type: " "\r\n") + resp->type.length
            + nxt_length("Content-Length: " "\r\n") + NXT_SIZE_T_LEN
            + nxt_length("Connection: close\r\n")
            + nxt_length("\r\n");
@@ -2626,7 +2778,12 @@ nxt_controller_response(nxt_task_t *task, nxt_controller_request_t *req,
                                          b->mem.free);
 
     nxt_str_set(&str, "\r\n"
-                      "Content-Type: application/json\r\n"
+                      "Content-Type: ");
+
+    b->mem.free = nxt_cpymem(b->mem.free, str.start, str.length);
+    b->mem.free = nxt_cpymem(b->mem.free, resp->type.start, resp->type.length);
+
+    nxt_str_set(&str, "\r\n"
                       "Content-Length: ");
 
     b->mem.free = nxt_cpymem(b->mem.free, str.start, str.length);
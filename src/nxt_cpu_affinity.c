@@ -0,0 +1,346 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_main.h>
+#include <nxt_conf.h>
+#include <nxt_cpu_affinity.h>
+
+#if (NXT_HAVE_SET_MEMPOLICY)
+#include <linux/mempolicy.h>
+#endif
+
+
+/*
+ * The "cpu_affinity" option value is a CPU set, an array of CPU sets,
+ * or one of the "auto" and "numa" keywords.  A CPU set is either a CPU
+ * number or a string in the cpulist format, e.g. "0-3,8,10-11".
+ *
+ * The value is resolved into a list of CPU sets: the sets of an array,
+ * each allowed CPU in the "auto" mode, or the CPUs of each NUMA node in
+ * the "numa" mode.  The n-th thread or process is bound to the
+ * (n % count)-th set of the list.  In the "numa" mode the thread or
+ * process also gets the preferred memory policy for its node, so its
+ * memory, including the pages of shared memory segments it touches
+ * first, is allocated on that node while the node has free memory.
+ */
+
+
+#define NXT_CPU_AFFINITY_MAX_NODES  1024
+
+
+static nxt_int_t nxt_cpu_affinity_add(nxt_array_t *sets,
+    nxt_conf_value_t *value);
+static nxt_int_t nxt_cpu_affinity_add_cpus(nxt_array_t *sets);
+static nxt_int_t nxt_cpu_affinity_add_nodes(nxt_array_t *sets);
+static nxt_int_t nxt_cpu_affinity_read_node(nxt_uint_t node, cpu_set_t *set);
+static nxt_int_t nxt_cpu_affinity_mempolicy(nxt_task_t *task, nxt_int_t node);
+
+
+nxt_int_t
+nxt_cpu_affinity_parse(nxt_str_t *str, cpu_set_t *set)
+{
+    u_char     *p, *end, *start;
+    nxt_int_t  cpu, first, last;
+
+    CPU_ZERO(set);
+
+    p = str->start;
+    end = p + str->length;
+
+    for ( ;; ) {
+        start = p;
+
+        while (p < end && nxt_isdigit(*p)) {
+            p++;
+        }
+
+        first = nxt_int_parse(start, p - start);
+        last = first;
+
+        if (p < end && *p == '-') {
+            start = ++p;
+
+            while (p < end && nxt_isdigit(*p)) {
+                p++;
+            }
+
+            last = nxt_int_parse(start, p - start);
+        }
+
+        if (first < 0 || last < first || last >= CPU_SETSIZE) {
+            return NXT_ERROR;
+        }
+
+        for (cpu = first; cpu <= last; cpu++) {
+            CPU_SET(cpu, set);
+        }
+
+        if (p == end) {
+            return NXT_OK;
+        }
+
+        if (*p++ != ',') {
+            return NXT_ERROR;
+        }
+    }
+}
+
+
+nxt_array_t *
+nxt_cpu_affinity_sets(nxt_mp_t *mp, nxt_conf_value_t *value)
+{
+    uint32_t     i;
+    nxt_int_t    ret;
+    nxt_str_t    str;
+    nxt_array_t  *sets;
+
+    static nxt_str_t  auto_str = nxt_string("auto");
+    static nxt_str_t  numa_str = nxt_string("numa");
+
+    sets = nxt_array_create(mp, 4, sizeof(nxt_cpu_affinity_t));
+    if (nxt_slow_path(sets == NULL)) {
+        return NULL;
+    }
+
+    if (nxt_conf_type(value) == NXT_CONF_ARRAY) {
+        for (i = 0; i < nxt_conf_array_elements_count(value); i++) {
+            ret = nxt_cpu_affinity_add(sets,
+                                       nxt_conf_get_array_element(value, i));
+            if (nxt_slow_path(ret != NXT_OK)) {
+                return NULL;
+            }
+        }
+
+    } else {
+        nxt_conf_get_string(value, &str);
+
+        if (nxt_strstr_eq(&str, &auto_str)) {
+            ret = nxt_cpu_affinity_add_cpus(sets);
+
+        } else if (nxt_strstr_eq(&str, &numa_str)) {
+            ret = nxt_cpu_affinity_add_nodes(sets);
+
+        } else {
+            ret = nxt_cpu_affinity_add(sets, value);
+        }
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
+    }
+
+    return (sets->nelts != 0) ? sets : NULL;
+}
+
+
+static nxt_int_t
+nxt_cpu_affinity_add(nxt_array_t *sets, nxt_conf_value_t *value)
+{
+    double              cpu;
+    nxt_str_t           str;
+    nxt_cpu_affinity_t  *aff;
+
+    aff = nxt_array_add(sets);
+    if (nxt_slow_path(aff == NULL)) {
+        return NXT_ERROR;
+    }
+
+    aff->node = -1;
+
+    if (nxt_conf_type(value) == NXT_CONF_INTEGER) {
+        cpu = nxt_conf_get_number(value);
+
+        if (nxt_slow_path(cpu < 0 || cpu >= CPU_SETSIZE)) {
+            return NXT_ERROR;
+        }
+
+        CPU_ZERO(&aff->cpus);
+        CPU_SET((int) cpu, &aff->cpus);
+
+        return NXT_OK;
+    }
+
+    nxt_conf_get_string(value, &str);
+
+    return nxt_cpu_affinity_parse(&str, &aff->cpus);
+}
+
+
+static nxt_int_t
+nxt_cpu_affinity_add_cpus(nxt_array_t *sets)
+{
+    int                 cpu;
+    cpu_set_t           allowed;
+    nxt_cpu_affinity_t  *aff;
+
+    if (nxt_slow_path(sched_getaffinity(0, sizeof(cpu_set_t), &allowed) != 0))
+    {
+        return NXT_ERROR;
+    }
+
+    for (cpu = 0; cpu < CPU_SETSIZE; cpu++) {
+
+        if (!CPU_ISSET(cpu, &allowed)) {
+            continue;
+        }
+
+        aff = nxt_array_add(sets);
+        if (nxt_slow_path(aff == NULL)) {
+            return NXT_ERROR;
+        }
+
+        CPU_ZERO(&aff->cpus);
+        CPU_SET(cpu, &aff->cpus);
+        aff->node = -1;
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_cpu_affinity_add_nodes(nxt_array_t *sets)
+{
+    nxt_uint_t          node;
+    cpu_set_t           allowed, cpus;
+    nxt_cpu_affinity_t  *aff;
+
+    if (nxt_slow_path(sched_getaffinity(0, sizeof(cpu_set_t), &allowed) != 0))
+    {
+        return NXT_ERROR;
+    }
+
+    for (node = 0; node < NXT_CPU_AFFINITY_MAX_NODES; node++) {
+
+        if (nxt_cpu_affinity_read_node(node, &cpus) != NXT_OK) {
+            break;
+        }
+
+        /* Memory-only nodes and nodes with no allowed CPUs are skipped. */
+
+        CPU_AND(&cpus, &cpus, &allowed);
+
+        if (CPU_COUNT(&cpus) == 0) {
+            continue;
+        }
+
+        aff = nxt_array_add(sets);
+        if (nxt_slow_path(aff == NULL)) {
+            return NXT_ERROR;
+        }
+
+        aff->cpus = cpus;
+        aff->node = node;
+    }
+
+    if (sets->nelts == 0) {
+        /* No NUMA information, all allowed CPUs form a single node. */
+
+        aff = nxt_array_add(sets);
+        if (nxt_slow_path(aff == NULL)) {
+            return NXT_ERROR;
+        }
+
+        aff->cpus = allowed;
+        aff->node = -1;
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_cpu_affinity_read_node(nxt_uint_t node, cpu_set_t *set)
+{
+    int        fd;
+    ssize_t    n;
+    nxt_str_t  str;
+    u_char     buf[4096];
+    char       path[64];
+
+    nxt_sprintf((u_char *) path, (u_char *) path + sizeof(path),
+                "/sys/devices/system/node/node%ui/cpulist%Z", node);
+
+    fd = open(path, O_RDONLY);
+    if (fd == -1) {
+        return NXT_DECLINED;
+    }
+
+    n = read(fd, buf, sizeof(buf));
+
+    (void) close(fd);
+
+    if (nxt_slow_path(n < 0)) {
+        return NXT_ERROR;
+    }
+
+    while (n > 0 && (buf[n - 1] == '\n' || buf[n - 1] == ' ')) {
+        n--;
+    }
+
+    if (n == 0) {
+        CPU_ZERO(set);
+        return NXT_OK;
+    }
+
+    str.start = buf;
+    str.length = n;
+
+    return nxt_cpu_affinity_parse(&str, set);
+}
+
+
+nxt_int_t
+nxt_cpu_affinity_set(nxt_task_t *task, nxt_cpu_affinity_t *aff)
+{
+    if (nxt_slow_path(sched_setaffinity(0, sizeof(cpu_set_t), &aff->cpus)
+                      != 0))
+    {
+        nxt_alert(task, "sched_setaffinity() failed %E", nxt_errno);
+        return NXT_ERROR;
+    }
+
+    nxt_debug(task, "cpu affinity: %d CPUs, node %i",
+              CPU_COUNT(&aff->cpus), aff->node);
+
+    return nxt_cpu_affinity_mempolicy(task, aff->node);
+}
+
+
+/*
+ * The preferred policy falls back to other nodes when the node is out
+ * of memory, unlike the strict binding.  The policy is per thread, and
+ * a negative node restores the default policy.
+ */
+
+static nxt_int_t
+nxt_cpu_affinity_mempolicy(nxt_task_t *task, nxt_int_t node)
+{
+#if (NXT_HAVE_SET_MEMPOLICY)
+    long           ret;
+    unsigned long  mask[NXT_CPU_AFFINITY_MAX_NODES / (8 * sizeof(long))];
+
+    if (node < 0) {
+        ret = syscall(SYS_set_mempolicy, MPOL_DEFAULT, NULL, 0);
+
+    } else {
+        nxt_memzero(mask, sizeof(mask));
+
+        mask[node / (8 * sizeof(long))] |= 1UL << (node % (8 * sizeof(long)));
+
+        /* The kernel expects the number of mask bits plus one. */
+
+        ret = syscall(SYS_set_mempolicy, MPOL_PREFERRED, mask,
+                      NXT_CPU_AFFINITY_MAX_NODES + 1);
+    }
+
+    if (nxt_slow_path(ret != 0)) {
+        nxt_alert(task, "set_mempolicy() failed %E", nxt_errno);
+        return NXT_ERROR;
+    }
+#endif
+
+    return NXT_OK;
+}
@@ -0,0 +1,22 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#ifndef _NXT_CPU_AFFINITY_H_INCLUDED_
+#define _NXT_CPU_AFFINITY_H_INCLUDED_
+
+
+typedef struct {
+    cpu_set_t  cpus;
+    /* The NUMA node to allocate memory from, or -1. */
+    nxt_int_t  node;
+} nxt_cpu_affinity_t;
+
+
+nxt_int_t nxt_cpu_affinity_parse(nxt_str_t *str, cpu_set_t *set);
+nxt_array_t *nxt_cpu_affinity_sets(nxt_mp_t *mp, nxt_conf_value_t *value);
+nxt_int_t nxt_cpu_affinity_set(nxt_task_t *task, nxt_cpu_affinity_t *aff);
+
+
+#endif /* _NXT_CPU_AFFINITY_H_INCLUDED_ */
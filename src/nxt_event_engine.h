@@ -488,6 +488,46 @@ struct nxt_event_engine_s {
     nxt_atomic_uint_t          closed_conns_cnt;
     nxt_atomic_uint_t          requests_cnt;
 
+    /* Idle upstream connection pools. */
+    nxt_lvlhsh_t               upstream_pools;
+    nxt_atomic_uint_t          upstream_idle_cnt;
+    nxt_atomic_uint_t          upstream_hits_cnt;
+    nxt_atomic_uint_t          upstream_misses_cnt;
+
+    /* Open file cache of static files. */
+    nxt_lvlhsh_t               static_cache;
+    nxt_queue_t                static_cache_lru;
+    nxt_timer_t                static_cache_timer;
+    nxt_atomic_uint_t          static_cache_cnt;
+    nxt_atomic_uint_t          static_negative_cnt;
+    nxt_atomic_uint_t          static_hits_cnt;
+    nxt_atomic_uint_t          static_misses_cnt;
+
+    /* HTTP response cache. */
+    nxt_lvlhsh_t               http_cache;
+    nxt_queue_t                http_cache_lru;
+    nxt_timer_t                http_cache_timer;
+    nxt_atomic_uint_t          http_cache_size;
+    nxt_atomic_uint_t          http_cache_hits_cnt;
+    nxt_atomic_uint_t          http_cache_misses_cnt;
+
+    /* TLS handshakes. */
+    nxt_atomic_uint_t          tls_full_cnt;
+    nxt_atomic_uint_t          tls_resumed_cnt;
+
+    /* Per-connection route match memoization. */
+    nxt_atomic_uint_t          route_memo_hits_cnt;
+    nxt_atomic_uint_t          route_memo_misses_cnt;
+
+    /* Buffered access log lines. */
+    void                       *access_log;
+    nxt_buf_mem_t              access_log_buf;
+    nxt_timer_t                access_log_timer;
+    uint8_t                    access_log_gzip;
+
+    /* Match data shared by regular expressions tested in the thread. */
+    void                       *regex_match;
+
     nxt_queue_link_t           link;
     // STUB: router link
     nxt_queue_link_t           link0;
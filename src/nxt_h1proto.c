@@ -8,6 +8,7 @@
 #include <nxt_http.h>
 #include <nxt_upstream.h>
 #include <nxt_h1proto.h>
+#include <nxt_h2proto.h>
 #include <nxt_websocket.h>
 #include <nxt_websocket_header.h>
 
@@ -16,8 +17,27 @@
  * nxt_http_conn_ and nxt_h1p_conn_ prefixes are used for connection handlers.
  * nxt_h1p_idle_ prefix is used for idle connection handlers.
  * nxt_h1p_request_ prefix is used for HTTP/1 protocol request methods.
+ * nxt_h1p_peer_ prefix is used for upstream connection handlers.
  */
 
+
+/*
+ * Idle keepalive upstream connections are kept in per-engine pools,
+ * one pool for each upstream and server address.  The keepalive limits
+ * are a part of the key as well, so proxy actions to the same address
+ * and upstreams changed by reconfiguration never share a pool with
+ * different limits.
+ */
+typedef struct {
+    nxt_queue_t               connections;  /* of nxt_conn_t */
+    uint32_t                  count;
+    nxt_upstream_keepalive_t  keepalive;
+
+    nxt_str_t                 upstream;
+    socklen_t                 socklen;
+    u_char                    sockaddr[];
+} nxt_h1p_peer_pool_t;
+
 #if (NXT_TLS)
 static ssize_t nxt_http_idle_io_read_handler(nxt_task_t *task, nxt_conn_t *c);
 static void nxt_http_conn_test(nxt_task_t *task, void *obj, void *data);
@@ -109,6 +129,22 @@ static void nxt_h1p_peer_close(nxt_task_t *task, nxt_http_peer_t *peer);
 static void nxt_h1p_peer_free(nxt_task_t *task, void *obj, void *data);
 static nxt_int_t nxt_h1p_peer_transfer_encoding(void *ctx,
     nxt_http_field_t *field, uintptr_t data);
+static nxt_int_t nxt_h1p_peer_connection(void *ctx, nxt_http_field_t *field,
+    uintptr_t data);
+static nxt_conn_t *nxt_h1p_peer_keepalive_get(nxt_task_t *task,
+    nxt_http_peer_t *peer);
+static void nxt_h1p_peer_keepalive(nxt_task_t *task, nxt_http_peer_t *peer,
+    nxt_conn_t *c);
+static nxt_h1p_peer_pool_t *nxt_h1p_peer_pool_find(nxt_event_engine_t *engine,
+    nxt_upstream_server_t *us, nxt_bool_t create);
+static nxt_int_t nxt_h1p_peer_pool_test(nxt_lvlhsh_query_t *lhq, void *data);
+static ssize_t nxt_h1p_peer_idle_io_read_handler(nxt_task_t *task,
+    nxt_conn_t *c);
+static void nxt_h1p_peer_idle_close(nxt_task_t *task, void *obj, void *data);
+static void nxt_h1p_peer_idle_timeout(nxt_task_t *task, void *obj,
+    void *data);
+static nxt_msec_t nxt_h1p_peer_idle_timer_value(nxt_conn_t *c, uintptr_t data);
+static void nxt_h1p_peer_conn_close(nxt_task_t *task, nxt_conn_t *c);
 
 #if (NXT_TLS)
 static const nxt_conn_state_t  nxt_http_idle_state;
@@ -128,6 +164,7 @@ static const nxt_conn_state_t  nxt_h1p_peer_header_read_state;
 static const nxt_conn_state_t  nxt_h1p_peer_header_read_timer_state;
 static const nxt_conn_state_t  nxt_h1p_peer_read_state;
 static const nxt_conn_state_t  nxt_h1p_peer_close_state;
+static const nxt_conn_state_t  nxt_h1p_peer_idle_state;
 
 
 const nxt_http_proto_table_t  nxt_http_proto[3] = {
@@ -149,7 +186,16 @@ const nxt_http_proto_table_t  nxt_http_proto[3] = {
 
         .ws_frame_start   = nxt_h1p_websocket_frame_start,
     },
-    /* NXT_HTTP_PROTO_H2      */
+    /* NXT_HTTP_PROTO_H2 */
+    {
+        .body_read        = nxt_h2p_request_body_read,
+        .local_addr       = nxt_h2p_request_local_addr,
+        .header_send      = nxt_h2p_request_header_send,
+        .send             = nxt_h2p_request_send,
+        .body_bytes_sent  = nxt_h2p_request_body_bytes_sent,
+        .discard          = nxt_h2p_request_discard,
+        .close            = nxt_h2p_request_close,
+    },
     /* NXT_HTTP_PROTO_DEVNULL */
 };
 
@@ -176,13 +222,19 @@ static nxt_http_field_proc_t           nxt_h1p_fields[] = {
     { nxt_string("Content-Length"),    &nxt_http_request_content_length, 0 },
     { nxt_string("Authorization"),     &nxt_http_request_field,
         offsetof(nxt_http_request_t, authorization) },
+    { nxt_string("Range"),             &nxt_http_request_field,
+        offsetof(nxt_http_request_t, range) },
+    { nxt_string("If-Range"),          &nxt_http_request_field,
+        offsetof(nxt_http_request_t, if_range) },
+    { nxt_string("Accept-Encoding"),   &nxt_http_request_field,
+        offsetof(nxt_http_request_t, accept_encoding) },
 };
 
 
 static nxt_lvlhsh_t                    nxt_h1p_peer_fields_hash;
 
 static nxt_http_field_proc_t           nxt_h1p_peer_fields[] = {
-    { nxt_string("Connection"),        &nxt_http_proxy_skip, 0 },
+    { nxt_string("Connection"),        &nxt_h1p_peer_connection, 0 },
     { nxt_string("Transfer-Encoding"), &nxt_h1p_peer_transfer_encoding, 0 },
     { nxt_string("Server"),            &nxt_http_proxy_skip, 0 },
     { nxt_string("Date"),              &nxt_http_proxy_date, 0 },
@@ -443,13 +495,37 @@ nxt_h1p_idle_io_read_handler(nxt_task_t *task, nxt_conn_t *c)
 static void
 nxt_h1p_conn_proto_init(nxt_task_t *task, void *obj, void *data)
 {
-    nxt_conn_t     *c;
-    nxt_h1proto_t  *h1p;
+    nxt_conn_t               *c;
+    nxt_h1proto_t            *h1p;
+    nxt_socket_conf_t        *skcf;
+    nxt_socket_conf_joint_t  *joint;
 
     c = obj;
 
     nxt_debug(task, "h1p conn proto init");
 
+    joint = c->listen->socket.data;
+    skcf = joint->socket_conf;
+
+    /*
+     * HTTP/2 is negotiated with ALPN on TLS connections and is started
+     * with the connection preface ("prior knowledge") on plain ones.
+     */
+
+    if (skcf->http2
+        && (c->alpn_h2 || nxt_h2p_preface(&c->read->mem))
+#if (NXT_TLS)
+        && (c->u.tls != NULL || skcf->tls == NULL)
+#endif
+       )
+    {
+        if (nxt_slow_path(nxt_h2p_conn_init(task, c) != NXT_OK)) {
+            nxt_h1p_closing(task, c);
+        }
+
+        return;
+    }
+
     h1p = nxt_mp_zget(c->mem_pool, sizeof(nxt_h1proto_t));
     if (nxt_slow_path(h1p == NULL)) {
         nxt_h1p_closing(task, c);
@@ -493,6 +569,8 @@ nxt_h1p_conn_request_init(nxt_task_t *task, void *obj, void *data)
         r->tls = (c->u.tls != NULL);
 #endif
 
+        r->sendfile = (c->sendfile == NXT_CONN_SENDFILE_ON);
+
         r->task = c->task;
         task = &r->task;
         c->socket.task = task;
@@ -509,6 +587,15 @@ nxt_h1p_conn_request_init(nxt_task_t *task, void *obj, void *data)
             skcf = joint->socket_conf;
             r->log_route = skcf->log_route;
 
+            if (skcf->route_memo) {
+                if (h1p->route_memo == NULL) {
+                    h1p->route_memo = nxt_mp_zget(c->mem_pool,
+                                                sizeof(nxt_http_route_memo_t));
+                }
+
+                r->route_memo = h1p->route_memo;
+            }
+
             if (c->local == NULL) {
                 c->local = skcf->sockaddr;
             }
@@ -2150,10 +2237,17 @@ nxt_h1p_peer_connect(nxt_task_t *task, nxt_http_peer_t *peer)
     peer->status = NXT_HTTP_UNSET;
     r = peer->request;
 
-    mp = nxt_mp_create(1024, 128, 256, 32);
+    c = nxt_h1p_peer_keepalive_get(task, peer);
 
-    if (nxt_slow_path(mp == NULL)) {
-        goto fail;
+    if (c != NULL) {
+        mp = c->mem_pool;
+
+    } else {
+        mp = nxt_mp_create(1024, 128, 256, 32);
+
+        if (nxt_slow_path(mp == NULL)) {
+            goto fail;
+        }
     }
 
     h1p = nxt_mp_zalloc(mp, sizeof(nxt_h1proto_t));
@@ -2166,12 +2260,15 @@ nxt_h1p_peer_connect(nxt_task_t *task, nxt_http_peer_t *peer)
         goto fail;
     }
 
-    c = nxt_conn_create(mp, task);
-    if (nxt_slow_path(c == NULL)) {
-        goto fail;
+    if (c == NULL) {
+        c = nxt_conn_create(mp, task);
+        if (nxt_slow_path(c == NULL)) {
+            goto fail;
+        }
+
+        c->mem_pool = mp;
     }
 
-    c->mem_pool = mp;
     h1p->conn = c;
 
     peer->proto.h1 = h1p;
@@ -2180,13 +2277,11 @@ nxt_h1p_peer_connect(nxt_task_t *task, nxt_http_peer_t *peer)
     c->socket.data = peer;
     c->remote = peer->server->sockaddr;
 
-    c->socket.write_ready = 1;
-    c->write_state = &nxt_h1p_peer_connect_state;
-
     /*
      * TODO: queues should be implemented via client proto interface.
      */
-    client = r->proto.h1->conn;
+    client = (r->protocol == NXT_HTTP_PROTO_H2) ? r->proto.h2->h2p->conn
+                                                : r->proto.h1->conn;
 
     socket = &client->socket;
     wq = socket->read_work_queue;
@@ -2200,12 +2295,26 @@ nxt_h1p_peer_connect(nxt_task_t *task, nxt_http_peer_t *peer)
     c->write_timer.work_queue = wq;
     /* TODO END */
 
+    if (peer->retry) {
+        /* The connection has been taken from a keepalive pool. */
+        nxt_h1p_peer_connected(task, c, peer);
+        return;
+    }
+
+    c->socket.write_ready = 1;
+    c->write_state = &nxt_h1p_peer_connect_state;
+
     nxt_conn_connect(task->thread->engine, c);
 
     return;
 
 fail:
 
+    if (c != NULL) {
+        peer->retry = 0;
+        nxt_h1p_peer_conn_close(task, c);
+    }
+
     peer->status = NXT_HTTP_INTERNAL_SERVER_ERROR;
 
     r->state->error_handler(task, r, peer);
@@ -2263,6 +2372,7 @@ nxt_h1p_peer_header_send(nxt_task_t *task, nxt_http_peer_t *peer)
 {
     u_char              *p;
     size_t              size;
+    nxt_bool_t          keepalive;
     nxt_buf_t           *header, *body;
     nxt_conn_t          *c;
     nxt_http_field_t    *field;
@@ -2271,6 +2381,7 @@ nxt_h1p_peer_header_send(nxt_task_t *task, nxt_http_peer_t *peer)
     nxt_debug(task, "h1p peer header send");
 
     r = peer->request;
+    keepalive = (peer->server->upstream->keepalive != NULL);
 
     size = r->method->length + sizeof(" ") + r->target.length
            + sizeof(" HTTP/1.1\r\n")
@@ -2298,7 +2409,10 @@ nxt_h1p_peer_header_send(nxt_task_t *task, nxt_http_peer_t *peer)
     *p++ = ' ';
     p = nxt_cpymem(p, r->target.start, r->target.length);
     p = nxt_cpymem(p, " HTTP/1.1\r\n", 11);
-    p = nxt_cpymem(p, "Connection: close\r\n", 19);
+
+    if (!keepalive) {
+        p = nxt_cpymem(p, "Connection: close\r\n", 19);
+    }
 
     nxt_list_each(field, r->fields) {
 
@@ -2416,6 +2530,7 @@ nxt_h1p_peer_header_read(nxt_task_t *task, nxt_http_peer_t *peer)
     nxt_debug(task, "h1p peer header read");
 
     c = peer->proto.h1->conn;
+    c->block_read = 0;
 
     if (c->write_timer.enabled) {
         c->read_state = &nxt_h1p_peer_header_read_state;
@@ -2487,6 +2602,7 @@ nxt_h1p_peer_io_read_handler(nxt_task_t *task, nxt_conn_t *c)
 
     if (n > 0) {
         c->read = b;
+        peer->retry = 0;
 
     } else {
         c->read = NULL;
@@ -2557,6 +2673,36 @@ nxt_h1p_peer_header_read_done(nxt_task_t *task, void *obj, void *data)
             h1p->remainder = r->resp.content_length_n;
         }
 
+        if (peer->server->upstream->keepalive != NULL) {
+            /*
+             * The server does not close the connection after the response,
+             * so the response end is found by its framing.
+             */
+            if (peer->status < NXT_HTTP_OK) {
+                h1p->keepalive = 0;
+
+            } else if (peer->status == NXT_HTTP_NO_CONTENT
+                       || peer->status == NXT_HTTP_NOT_MODIFIED
+                       || nxt_str_eq(r->method, "HEAD", 4)
+                       || (!h1p->chunked && r->resp.content_length_n == 0))
+            {
+                if (nxt_buf_mem_used_size(&b->mem) != 0) {
+                    h1p->keepalive = 0;
+                }
+
+                nxt_http_proxy_buf_mem_free(task, r, b);
+
+                peer->body = nxt_http_buf_last(r);
+                peer->closed = 1;
+
+                r->state->ready_handler(task, r, peer);
+                return;
+
+            } else if (!h1p->chunked && r->resp.content_length_n < 0) {
+                h1p->keepalive = 0;
+            }
+        }
+
         if (nxt_buf_mem_used_size(&b->mem) != 0) {
             nxt_h1p_peer_body_process(task, peer, b);
             return;
@@ -2610,6 +2756,9 @@ nxt_h1p_peer_header_parse(nxt_http_peer_t *peer, nxt_buf_mem_t *bm)
             return NXT_ERROR;
         }
 
+        /* HTTP/1.0 connections are not reused. */
+        peer->proto.h1->keepalive = (p[7] == '1');
+
         status = nxt_int_parse(&p[9], 3);
 
         if (nxt_slow_path(status < 0)) {
@@ -2705,11 +2854,27 @@ nxt_h1p_peer_body_process(nxt_task_t *task, nxt_http_peer_t *peer,
         if (h1p->chunked_parse.last) {
             nxt_buf_chain_add(&out, nxt_http_buf_last(peer->request));
             peer->closed = 1;
+
+            h1p->keepalive &= h1p->chunked_parse.complete;
         }
 
     } else if (h1p->remainder > 0) {
         length = nxt_buf_chain_length(out);
         h1p->remainder -= length;
+
+        if (h1p->remainder <= 0
+            && peer->server->upstream->keepalive != NULL)
+        {
+            r = peer->request;
+
+            if (h1p->remainder < 0) {
+                h1p->keepalive = 0;
+                r->inconsistent = 1;
+            }
+
+            nxt_buf_chain_add(&out, nxt_http_buf_last(r));
+            peer->closed = 1;
+        }
     }
 
     peer->body = out;
@@ -2729,6 +2894,8 @@ nxt_h1p_peer_closed(nxt_task_t *task, void *obj, void *data)
 
     nxt_debug(task, "h1p peer closed");
 
+    peer->proto.h1->keepalive = 0;
+
     r = peer->request;
 
     if (peer->header_received) {
@@ -2781,6 +2948,7 @@ nxt_h1p_peer_send_timeout(nxt_task_t *task, void *obj, void *data)
 
     peer = c->socket.data;
     peer->status = NXT_HTTP_GATEWAY_TIMEOUT;
+    peer->retry = 0;
 
     r = peer->request;
     r->state->error_handler(task, r, peer);
@@ -2805,6 +2973,7 @@ nxt_h1p_peer_read_timeout(nxt_task_t *task, void *obj, void *data)
 
     peer = c->socket.data;
     peer->status = NXT_HTTP_GATEWAY_TIMEOUT;
+    peer->retry = 0;
 
     r = peer->request;
     r->state->error_handler(task, r, peer);
@@ -2829,14 +2998,22 @@ nxt_h1p_peer_close(nxt_task_t *task, nxt_http_peer_t *peer)
 
     nxt_debug(task, "h1p peer close");
 
-    peer->closed = 1;
-
     c = peer->proto.h1->conn;
     task = &c->task;
     c->socket.task = task;
     c->read_timer.task = task;
     c->write_timer.task = task;
 
+    if (peer->closed && peer->proto.h1->keepalive
+        && peer->server->upstream->keepalive != NULL)
+    {
+        /* The response has been read completely. */
+        nxt_h1p_peer_keepalive(task, peer, c);
+        return;
+    }
+
+    peer->closed = 1;
+
     if (c->socket.fd != -1) {
         c->write_state = &nxt_h1p_peer_close_state;
 
@@ -2885,3 +3062,338 @@ nxt_h1p_peer_transfer_encoding(void *ctx, nxt_http_field_t *field,
 
     return NXT_OK;
 }
+
+
+static nxt_int_t
+nxt_h1p_peer_connection(void *ctx, nxt_http_field_t *field, uintptr_t data)
+{
+    nxt_http_request_t  *r;
+
+    r = ctx;
+    field->skip = 1;
+
+    if (field->value_length == 5
+        && nxt_memcasecmp(field->value, "close", 5) == 0)
+    {
+        r->peer->proto.h1->keepalive = 0;
+    }
+
+    return NXT_OK;
+}
+
+
+static const nxt_lvlhsh_proto_t  nxt_h1p_peer_pool_proto  nxt_aligned(64) = {
+    NXT_LVLHSH_DEFAULT,
+    nxt_h1p_peer_pool_test,
+    nxt_lvlhsh_alloc,
+    nxt_lvlhsh_free,
+};
+
+
+static nxt_conn_t *
+nxt_h1p_peer_keepalive_get(nxt_task_t *task, nxt_http_peer_t *peer)
+{
+    nxt_conn_t           *c;
+    nxt_queue_link_t     *link;
+    nxt_event_engine_t   *engine;
+    nxt_h1p_peer_pool_t  *pool;
+
+    if (peer->retry) {
+        /* The request is resent over a new connection. */
+        peer->retry = 0;
+        return NULL;
+    }
+
+    if (peer->server->upstream->keepalive == NULL) {
+        return NULL;
+    }
+
+    engine = task->thread->engine;
+
+    pool = nxt_h1p_peer_pool_find(engine, peer->server, 0);
+
+    if (pool == NULL || nxt_queue_is_empty(&pool->connections)) {
+        engine->upstream_misses_cnt++;
+        return NULL;
+    }
+
+    link = nxt_queue_first(&pool->connections);
+    nxt_queue_remove(link);
+
+    pool->count--;
+    engine->upstream_idle_cnt--;
+    engine->upstream_hits_cnt++;
+
+    c = nxt_queue_link_data(link, nxt_conn_t, link);
+
+    nxt_debug(task, "h1p peer keepalive get fd:%d", c->socket.fd);
+
+    nxt_timer_disable(engine, &c->read_timer);
+    nxt_fd_event_block_read(engine, &c->socket);
+
+    /*
+     * Possibly pending idle read events are ignored
+     * until the response is read.
+     */
+    c->block_read = 1;
+
+    peer->retry = 1;
+
+    return c;
+}
+
+
+static void
+nxt_h1p_peer_keepalive(nxt_task_t *task, nxt_http_peer_t *peer, nxt_conn_t *c)
+{
+    nxt_event_engine_t        *engine;
+    nxt_h1p_peer_pool_t       *pool;
+    nxt_upstream_keepalive_t  *ka;
+
+    engine = task->thread->engine;
+    ka = peer->server->upstream->keepalive;
+
+    pool = nxt_h1p_peer_pool_find(engine, peer->server, 1);
+
+    if (pool == NULL || pool->count >= ka->connections || engine->shutdown) {
+        nxt_h1p_peer_conn_close(task, c);
+        return;
+    }
+
+    nxt_debug(task, "h1p peer keepalive fd:%d", c->socket.fd);
+
+    nxt_timer_disable(engine, &c->read_timer);
+    nxt_timer_disable(engine, &c->write_timer);
+
+    nxt_mp_free(c->mem_pool, peer->proto.h1);
+
+    /* The request sockaddr can be freed with the configuration. */
+    c->remote = NULL;
+    c->socket.data = pool;
+    c->read = NULL;
+    c->block_read = 0;
+    c->sent = 0;
+
+    nxt_queue_insert_head(&pool->connections, &c->link);
+
+    pool->count++;
+    engine->upstream_idle_cnt++;
+
+    c->read_state = &nxt_h1p_peer_idle_state;
+
+    nxt_conn_read(engine, c);
+}
+
+
+static const nxt_conn_state_t  nxt_h1p_peer_idle_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_h1p_peer_idle_close,
+    .close_handler = nxt_h1p_peer_idle_close,
+    .error_handler = nxt_h1p_peer_idle_close,
+
+    .io_read_handler = nxt_h1p_peer_idle_io_read_handler,
+
+    .timer_handler = nxt_h1p_peer_idle_timeout,
+    .timer_value = nxt_h1p_peer_idle_timer_value,
+};
+
+
+static nxt_h1p_peer_pool_t *
+nxt_h1p_peer_pool_find(nxt_event_engine_t *engine, nxt_upstream_server_t *us,
+    nxt_bool_t create)
+{
+    nxt_int_t                 ret;
+    nxt_sockaddr_t            *sa;
+    nxt_upstream_t            *upstream;
+    nxt_h1p_peer_pool_t       *pool;
+    nxt_lvlhsh_query_t        lhq;
+    nxt_upstream_keepalive_t  *ka;
+
+    sa = us->sockaddr;
+    upstream = us->upstream;
+    ka = upstream->keepalive;
+
+    lhq.key_hash = nxt_murmur_hash2(&sa->u, sa->socklen)
+                   ^ nxt_murmur_hash2(upstream->name.start,
+                                      upstream->name.length)
+                   ^ ka->connections ^ ka->idle_timeout;
+    lhq.key.length = sa->socklen;
+    lhq.key.start = (u_char *) &sa->u;
+    lhq.proto = &nxt_h1p_peer_pool_proto;
+    lhq.data = upstream;
+
+    if (nxt_lvlhsh_find(&engine->upstream_pools, &lhq) == NXT_OK) {
+        return lhq.value;
+    }
+
+    if (!create) {
+        return NULL;
+    }
+
+    /* Pools are never freed, their number is limited by configuration. */
+
+    pool = nxt_mp_zalloc(engine->mem_pool, sizeof(nxt_h1p_peer_pool_t)
+                                           + sa->socklen
+                                           + upstream->name.length);
+    if (nxt_slow_path(pool == NULL)) {
+        return NULL;
+    }
+
+    nxt_queue_init(&pool->connections);
+
+    pool->keepalive = *ka;
+
+    pool->socklen = sa->socklen;
+    nxt_memcpy(pool->sockaddr, &sa->u, sa->socklen);
+
+    pool->upstream.length = upstream->name.length;
+    pool->upstream.start = pool->sockaddr + sa->socklen;
+    nxt_memcpy(pool->upstream.start, upstream->name.start,
+               upstream->name.length);
+
+    lhq.replace = 0;
+    lhq.value = pool;
+    lhq.pool = NULL;
+
+    ret = nxt_lvlhsh_insert(&engine->upstream_pools, &lhq);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_mp_free(engine->mem_pool, pool);
+        return NULL;
+    }
+
+    return pool;
+}
+
+
+static nxt_int_t
+nxt_h1p_peer_pool_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_upstream_t            *upstream;
+    nxt_h1p_peer_pool_t       *pool;
+    nxt_upstream_keepalive_t  *ka;
+
+    pool = data;
+    upstream = lhq->data;
+    ka = upstream->keepalive;
+
+    if (lhq->key.length == pool->socklen
+        && memcmp(lhq->key.start, pool->sockaddr, pool->socklen) == 0
+        && nxt_strstr_eq(&upstream->name, &pool->upstream)
+        && ka->connections == pool->keepalive.connections
+        && ka->idle_timeout == pool->keepalive.idle_timeout)
+    {
+        return NXT_OK;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+static ssize_t
+nxt_h1p_peer_idle_io_read_handler(nxt_task_t *task, nxt_conn_t *c)
+{
+    u_char  buf[1];
+
+    /* Any data or EOF on an idle connection makes it unusable. */
+
+    return c->io->recv(c, buf, sizeof(buf), 0);
+}
+
+
+static void
+nxt_h1p_peer_idle_close(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t           *c;
+    nxt_h1p_peer_pool_t  *pool;
+
+    c = obj;
+    pool = data;
+
+    if (c->socket.data != pool) {
+        /* The connection has been reused. */
+        return;
+    }
+
+    nxt_debug(task, "h1p peer idle close fd:%d", c->socket.fd);
+
+    nxt_queue_remove(&c->link);
+
+    pool->count--;
+    task->thread->engine->upstream_idle_cnt--;
+
+    nxt_h1p_peer_conn_close(task, c);
+}
+
+
+static void
+nxt_h1p_peer_idle_timeout(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t   *c;
+    nxt_timer_t  *timer;
+
+    timer = obj;
+
+    nxt_debug(task, "h1p peer idle timeout");
+
+    c = nxt_read_timer_conn(timer);
+    c->block_read = 1;
+
+    nxt_h1p_peer_idle_close(task, c, c->socket.data);
+}
+
+
+static nxt_msec_t
+nxt_h1p_peer_idle_timer_value(nxt_conn_t *c, uintptr_t data)
+{
+    nxt_h1p_peer_pool_t  *pool;
+
+    pool = c->socket.data;
+
+    return pool->keepalive.idle_timeout;
+}
+
+
+static void
+nxt_h1p_peer_conn_close(nxt_task_t *task, nxt_conn_t *c)
+{
+    c->socket.data = NULL;
+
+    if (c->socket.fd != -1) {
+        c->write_state = &nxt_h1p_peer_close_state;
+
+        nxt_conn_close(task->thread->engine, c);
+
+    } else {
+        nxt_h1p_peer_free(task, c, NULL);
+    }
+}
+
+
+void
+nxt_h1p_peer_pools_close(nxt_task_t *task)
+{
+    nxt_conn_t           *c;
+    nxt_queue_link_t     *link;
+    nxt_lvlhsh_each_t    lhe;
+    nxt_event_engine_t   *engine;
+    nxt_h1p_peer_pool_t  *pool;
+
+    engine = task->thread->engine;
+
+    nxt_lvlhsh_each_init(&lhe, &nxt_h1p_peer_pool_proto);
+
+    for ( ;; ) {
+        pool = nxt_lvlhsh_each(&engine->upstream_pools, &lhe);
+        if (pool == NULL) {
+            break;
+        }
+
+        while (!nxt_queue_is_empty(&pool->connections)) {
+            link = nxt_queue_first(&pool->connections);
+            c = nxt_queue_link_data(link, nxt_conn_t, link);
+
+            nxt_h1p_peer_idle_close(&c->task, c, pool);
+        }
+    }
+}
@@ -49,6 +49,8 @@ struct nxt_h1proto_s {
      * be zeroed in a keep-alive connection.
      */
     nxt_conn_t                *conn;
+
+    nxt_http_route_memo_t     *route_memo;
 };
 
 #endif  /* _NXT_H1PROTO_H_INCLUDED_ */
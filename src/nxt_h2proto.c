@@ -0,0 +1,2937 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_router.h>
+#include <nxt_http.h>
+#include <nxt_h2proto.h>
+
+
+/*
+ * HTTP/2, RFC 9113.
+ *
+ * nxt_h2p_conn_ prefix is used for connection handlers.
+ * nxt_h2p_frame_ prefix is used for received frame handlers.
+ * nxt_h2p_stream_ prefix is used for stream functions.
+ * nxt_h2p_request_ prefix is used for HTTP/2 protocol request methods.
+ */
+
+
+#define NXT_H2P_PREFACE           "PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+#define NXT_H2P_READ_BUFFER_SIZE                                              \
+    (2 * (NXT_H2P_FRAME_HEADER_SIZE + NXT_H2P_DEFAULT_FRAME_SIZE))
+
+#define NXT_H2P_DATA              0x0
+#define NXT_H2P_HEADERS           0x1
+#define NXT_H2P_PRIORITY          0x2
+#define NXT_H2P_RST_STREAM        0x3
+#define NXT_H2P_SETTINGS          0x4
+#define NXT_H2P_PUSH_PROMISE      0x5
+#define NXT_H2P_PING              0x6
+#define NXT_H2P_GOAWAY            0x7
+#define NXT_H2P_WINDOW_UPDATE     0x8
+#define NXT_H2P_CONTINUATION      0x9
+
+#define NXT_H2P_FLAG_ACK          0x01
+#define NXT_H2P_FLAG_END_STREAM   0x01
+#define NXT_H2P_FLAG_END_HEADERS  0x04
+#define NXT_H2P_FLAG_PADDED       0x08
+#define NXT_H2P_FLAG_PRIORITY     0x20
+
+#define NXT_H2P_HEADER_TABLE_SIZE       0x1
+#define NXT_H2P_ENABLE_PUSH             0x2
+#define NXT_H2P_MAX_CONCURRENT_STREAMS  0x3
+#define NXT_H2P_INITIAL_WINDOW_SIZE     0x4
+#define NXT_H2P_MAX_FRAME_SIZE          0x5
+#define NXT_H2P_MAX_HEADER_LIST_SIZE    0x6
+
+#define NXT_H2P_SETTINGS_SIZE     6
+#define NXT_H2P_MAX_FRAME_SIZE_LIMIT    0xffffff
+
+
+typedef enum {
+    NXT_H2P_NO_ERROR = 0,
+    NXT_H2P_PROTOCOL_ERROR,
+    NXT_H2P_INTERNAL_ERROR,
+    NXT_H2P_FLOW_CONTROL_ERROR,
+    NXT_H2P_SETTINGS_TIMEOUT,
+    NXT_H2P_STREAM_CLOSED,
+    NXT_H2P_FRAME_SIZE_ERROR,
+    NXT_H2P_REFUSED_STREAM,
+    NXT_H2P_CANCEL,
+    NXT_H2P_COMPRESSION_ERROR,
+    NXT_H2P_CONNECT_ERROR,
+    NXT_H2P_ENHANCE_YOUR_CALM,
+} nxt_h2p_error_t;
+
+
+typedef struct {
+    u_char                    *payload;
+    uint32_t                  length;
+    uint32_t                  stream_id;
+    uint8_t                   type;
+    uint8_t                   flags;
+} nxt_h2p_frame_t;
+
+
+typedef nxt_h2p_error_t (*nxt_h2p_frame_handler_t)(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+
+
+/* The request header block decoding context. */
+
+typedef struct {
+    nxt_h2p_stream_t          *stream;
+
+    nxt_str_t                 method;
+    nxt_str_t                 scheme;
+    nxt_str_t                 authority;
+    nxt_str_t                 path;
+
+    nxt_http_field_t          *cookie;
+
+    size_t                    size;
+    size_t                    limit;
+
+    nxt_http_status_t         status:16;
+
+    uint8_t                   regular;    /* 1 bit */
+    uint8_t                   host;       /* 1 bit */
+    uint8_t                   malformed;  /* 1 bit */
+} nxt_h2p_header_ctx_t;
+
+
+#define nxt_h2p_get16(p)                                                      \
+    (((uint32_t) (p)[0] << 8) | (p)[1])
+
+#define nxt_h2p_get32(p)                                                      \
+    (((uint32_t) (p)[0] << 24) | ((uint32_t) (p)[1] << 16)                    \
+     | ((uint32_t) (p)[2] << 8) | (p)[3])
+
+
+static void nxt_h2p_conn_read_handler(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_h2p_conn_read(nxt_task_t *task, nxt_h2proto_t *h2p);
+static nxt_h2p_error_t nxt_h2p_frames_process(nxt_task_t *task,
+    nxt_h2proto_t *h2p);
+static nxt_h2p_error_t nxt_h2p_frame_data(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_headers(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_priority(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_rst_stream(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_settings(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_push_promise(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_ping(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_goaway(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_window_update(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_frame_continuation(nxt_task_t *task,
+    nxt_h2proto_t *h2p, nxt_h2p_frame_t *frame);
+static nxt_h2p_error_t nxt_h2p_header_block(nxt_task_t *task,
+    nxt_h2proto_t *h2p, uint32_t id, nxt_uint_t flags, u_char *pos,
+    u_char *end);
+static nxt_int_t nxt_h2p_header_skip(nxt_h2proto_t *h2p, u_char *pos,
+    u_char *end);
+static nxt_int_t nxt_h2p_field_skip(void *ctx, nxt_str_t *name,
+    nxt_str_t *value);
+static nxt_h2p_error_t nxt_h2p_stream_create(nxt_task_t *task,
+    nxt_h2proto_t *h2p, uint32_t id, nxt_uint_t flags, u_char *pos,
+    u_char *end);
+static nxt_int_t nxt_h2p_field(void *ctx, nxt_str_t *name, nxt_str_t *value);
+static nxt_http_field_t *nxt_h2p_field_add(nxt_http_request_t *r, const char *name,
+    size_t name_length, u_char *value, size_t value_length);
+static nxt_h2p_stream_t *nxt_h2p_stream_find(nxt_h2proto_t *h2p,
+    uint32_t id);
+static void nxt_h2p_stream_body(nxt_task_t *task, nxt_h2p_stream_t *st,
+    u_char *pos, size_t size);
+static nxt_buf_t *nxt_h2p_body_file(nxt_task_t *task, nxt_http_request_t *r);
+static void nxt_h2p_stream_end(nxt_task_t *task, nxt_h2p_stream_t *st);
+static void nxt_h2p_body_done(nxt_task_t *task, nxt_h2p_stream_t *st);
+static void nxt_h2p_stream_write(nxt_task_t *task, nxt_h2p_stream_t *st,
+    nxt_buf_t *b);
+static void nxt_h2p_stream_flush(nxt_task_t *task, nxt_h2p_stream_t *st);
+static void nxt_h2p_stream_drop(nxt_task_t *task, nxt_h2p_stream_t *st);
+static void nxt_h2p_stream_reset(nxt_task_t *task, nxt_h2p_stream_t *st,
+    nxt_h2p_error_t error);
+static void nxt_h2p_stream_abort(nxt_task_t *task, nxt_h2p_stream_t *st);
+static void nxt_h2p_streams_unblock(nxt_task_t *task, nxt_h2proto_t *h2p);
+static nxt_bool_t nxt_h2p_response_field_skip(nxt_http_field_t *field);
+static nxt_buf_t *nxt_h2p_header_split(nxt_h2proto_t *h2p, nxt_buf_t *b,
+    size_t size, nxt_uint_t flags, uint32_t id);
+static void nxt_h2p_buf_release(nxt_task_t *task, void *obj, void *data);
+static nxt_buf_t *nxt_h2p_frame_alloc(nxt_h2proto_t *h2p, size_t size);
+static u_char *nxt_h2p_frame_header(u_char *p, size_t length, nxt_uint_t type,
+    nxt_uint_t flags, uint32_t id);
+static nxt_int_t nxt_h2p_settings_send(nxt_task_t *task, nxt_h2proto_t *h2p);
+static nxt_int_t nxt_h2p_control_send(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_uint_t type, nxt_uint_t flags, uint32_t id, u_char *payload,
+    size_t length);
+static nxt_int_t nxt_h2p_window_update(nxt_task_t *task, nxt_h2proto_t *h2p,
+    uint32_t id, uint32_t increment);
+static nxt_int_t nxt_h2p_rst_stream(nxt_task_t *task, nxt_h2proto_t *h2p,
+    uint32_t id, nxt_h2p_error_t error);
+static nxt_int_t nxt_h2p_goaway(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_error_t error);
+static void nxt_h2p_conn_write(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_buf_t *b);
+static void nxt_h2p_bufs_complete(nxt_task_t *task, nxt_buf_t *b);
+static void nxt_h2p_conn_sent(nxt_task_t *task, void *obj, void *data);
+static void nxt_h2p_conn_close(nxt_task_t *task, void *obj, void *data);
+static void nxt_h2p_conn_error(nxt_task_t *task, void *obj, void *data);
+static void nxt_h2p_conn_write_error(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_h2p_conn_read_timeout(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_h2p_conn_send_timeout(nxt_task_t *task, void *obj,
+    void *data);
+static nxt_msec_t nxt_h2p_conn_read_timer_value(nxt_conn_t *c,
+    uintptr_t data);
+static nxt_msec_t nxt_h2p_conn_timer_value(nxt_conn_t *c, uintptr_t data);
+static void nxt_h2p_conn_fail(nxt_task_t *task, nxt_h2proto_t *h2p);
+static void nxt_h2p_conn_protocol_error(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_error_t error);
+static void nxt_h2p_conn_shutdown(nxt_task_t *task, nxt_h2proto_t *h2p);
+static void nxt_h2p_conn_close_test(nxt_task_t *task, nxt_h2proto_t *h2p);
+static void nxt_h2p_conn_finalize(nxt_task_t *task, void *obj, void *data);
+static void nxt_h2p_conn_closing(nxt_task_t *task, void *obj, void *data);
+static void nxt_h2p_conn_free(nxt_task_t *task, void *obj, void *data);
+
+#if (NXT_TLS)
+static const nxt_conn_state_t  nxt_h2p_shutdown_state;
+#endif
+static const nxt_conn_state_t  nxt_h2p_read_state;
+static const nxt_conn_state_t  nxt_h2p_write_state;
+static const nxt_conn_state_t  nxt_h2p_close_state;
+
+
+static const nxt_h2p_frame_handler_t  nxt_h2p_frame_handlers[] = {
+    nxt_h2p_frame_data,
+    nxt_h2p_frame_headers,
+    nxt_h2p_frame_priority,
+    nxt_h2p_frame_rst_stream,
+    nxt_h2p_frame_settings,
+    nxt_h2p_frame_push_promise,
+    nxt_h2p_frame_ping,
+    nxt_h2p_frame_goaway,
+    nxt_h2p_frame_window_update,
+    nxt_h2p_frame_continuation,
+};
+
+
+static nxt_lvlhsh_t                    nxt_h2p_fields_hash;
+
+static nxt_http_field_proc_t           nxt_h2p_fields[] = {
+    { nxt_string("Host"),              &nxt_http_request_host, 0 },
+    { nxt_string("Cookie"),            &nxt_http_request_field,
+        offsetof(nxt_http_request_t, cookie) },
+    { nxt_string("Referer"),           &nxt_http_request_field,
+        offsetof(nxt_http_request_t, referer) },
+    { nxt_string("User-Agent"),        &nxt_http_request_field,
+        offsetof(nxt_http_request_t, user_agent) },
+    { nxt_string("Content-Type"),      &nxt_http_request_field,
+        offsetof(nxt_http_request_t, content_type) },
+    { nxt_string("Content-Length"),    &nxt_http_request_content_length, 0 },
+    { nxt_string("Authorization"),     &nxt_http_request_field,
+        offsetof(nxt_http_request_t, authorization) },
+    { nxt_string("Range"),             &nxt_http_request_field,
+        offsetof(nxt_http_request_t, range) },
+    { nxt_string("If-Range"),          &nxt_http_request_field,
+        offsetof(nxt_http_request_t, if_range) },
+    { nxt_string("Accept-Encoding"),   &nxt_http_request_field,
+        offsetof(nxt_http_request_t, accept_encoding) },
+};
+
+
+/*
+ * The field name characters as in nxt_http_parse_field_name(), except
+ * that uppercase letters are not allowed in HTTP/2 field names.
+ */
+
+static const u_char  nxt_h2p_field_chars[256]  nxt_aligned(64) =
+    "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
+/*   \s ! " # $ % & ' ( ) * + ,        . /                 : ; < = > ?   */
+    "\0\1\0\1\1\1\1\1\0\0\1\1\0" "-" "\1\0" "0123456789" "\0\0\0\0\0\0"
+
+/*    @                                 [ \ ] ^ _                        */
+    "\0" "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0" "\0\0\0\1\1"
+/*    `                                 { | } ~                          */
+    "\1" "abcdefghijklmnopqrstuvwxyz" "\0\1\0\1\0"
+
+    "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
+    "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
+    "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0"
+    "\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0\0";
+
+
+static const nxt_str_t  nxt_h2p_version = nxt_string("HTTP/2.0");
+
+
+nxt_int_t
+nxt_h2p_init(nxt_task_t *task)
+{
+    return nxt_http_fields_hash(&nxt_h2p_fields_hash,
+                                nxt_h2p_fields, nxt_nitems(nxt_h2p_fields));
+}
+
+
+/*
+ * The client connection preface starts with a string that is not
+ * a valid HTTP/1 request, so a prefix is enough to tell them apart.
+ */
+
+nxt_bool_t
+nxt_h2p_preface(nxt_buf_mem_t *bm)
+{
+    size_t  size;
+
+    size = nxt_min((size_t) nxt_buf_mem_used_size(bm),
+                   nxt_length(NXT_H2P_PREFACE));
+
+    return (size >= nxt_length("PRI *")
+            && memcmp(bm->pos, NXT_H2P_PREFACE, size) == 0);
+}
+
+
+nxt_int_t
+nxt_h2p_conn_init(nxt_task_t *task, nxt_conn_t *c)
+{
+    size_t                   size;
+    nxt_buf_t                *b, *in;
+    nxt_h2proto_t            *h2p;
+    nxt_socket_conf_t        *skcf;
+    nxt_event_engine_t       *engine;
+    nxt_socket_conf_joint_t  *joint;
+
+    nxt_debug(task, "h2p conn init");
+
+    h2p = nxt_mp_zget(c->mem_pool, sizeof(nxt_h2proto_t));
+    if (nxt_slow_path(h2p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    in = c->read;
+    size = (in != NULL) ? nxt_buf_mem_used_size(&in->mem) : 0;
+
+    b = nxt_buf_mem_alloc(c->mem_pool,
+                          nxt_max(size, NXT_H2P_READ_BUFFER_SIZE), 0);
+    if (nxt_slow_path(b == NULL)) {
+        return NXT_ERROR;
+    }
+
+    engine = task->thread->engine;
+
+    if (in != NULL) {
+        b->mem.free = nxt_cpymem(b->mem.free, in->mem.pos, size);
+        nxt_event_engine_buf_mem_free(engine, in);
+    }
+
+    c->read = b;
+
+    joint = c->listen->socket.data;
+    skcf = joint->socket_conf;
+
+    h2p->conn = c;
+
+    h2p->hpack.mem_pool = c->mem_pool;
+    h2p->hpack.max_size = NXT_H2P_HPACK_TABLE_SIZE;
+
+    nxt_queue_init(&h2p->streams);
+    nxt_queue_init(&h2p->blocked);
+
+    h2p->write_tail = &c->write;
+
+    h2p->max_streams = skcf->http2_conf.max_concurrent_streams;
+    h2p->init_recv_window = skcf->http2_conf.initial_window_size;
+    h2p->init_send_window = NXT_H2P_DEFAULT_WINDOW_SIZE;
+    h2p->send_window = NXT_H2P_DEFAULT_WINDOW_SIZE;
+    h2p->recv_window = NXT_H2P_MAX_WINDOW_SIZE;
+    h2p->frame_size = NXT_H2P_DEFAULT_FRAME_SIZE;
+
+    h2p->idle_timeout = skcf->idle_timeout;
+    h2p->body_read_timeout = skcf->body_read_timeout;
+    h2p->send_timeout = skcf->send_timeout;
+    h2p->header_limit = skcf->large_header_buffer_size
+                        * skcf->large_header_buffers;
+
+    /* The connection is idle since it has been accepted. */
+    h2p->idle = 1;
+
+    c->socket.data = h2p;
+    c->read_state = &nxt_h2p_read_state;
+    c->write_state = &nxt_h2p_write_state;
+
+    if (!c->tcp_nodelay) {
+        nxt_conn_tcp_nodelay_on(task, c);
+    }
+
+    if (nxt_slow_path(nxt_h2p_settings_send(task, h2p) != NXT_OK)) {
+        return NXT_ERROR;
+    }
+
+    nxt_h2p_conn_read_handler(task, c, h2p);
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_settings_send(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    u_char     *p;
+    nxt_buf_t  *b;
+
+    b = nxt_h2p_frame_alloc(h2p, 3 * NXT_H2P_SETTINGS_SIZE
+                                 + NXT_H2P_FRAME_HEADER_SIZE + 4);
+    if (nxt_slow_path(b == NULL)) {
+        return NXT_ERROR;
+    }
+
+    p = b->mem.free + NXT_H2P_FRAME_HEADER_SIZE;
+
+    *p++ = 0;
+    *p++ = NXT_H2P_MAX_CONCURRENT_STREAMS;
+    p = nxt_h2p_put32(p, h2p->max_streams);
+
+    *p++ = 0;
+    *p++ = NXT_H2P_MAX_HEADER_LIST_SIZE;
+    p = nxt_h2p_put32(p, h2p->header_limit);
+
+    if (h2p->init_recv_window != NXT_H2P_DEFAULT_WINDOW_SIZE) {
+        *p++ = 0;
+        *p++ = NXT_H2P_INITIAL_WINDOW_SIZE;
+        p = nxt_h2p_put32(p, h2p->init_recv_window);
+    }
+
+    (void) nxt_h2p_frame_header(b->mem.free,
+                                p - b->mem.free - NXT_H2P_FRAME_HEADER_SIZE,
+                                NXT_H2P_SETTINGS, 0, 0);
+
+    /* The connection window is opened to its maximum at once. */
+
+    p = nxt_h2p_frame_header(p, 4, NXT_H2P_WINDOW_UPDATE, 0, 0);
+    p = nxt_h2p_put32(p, NXT_H2P_MAX_WINDOW_SIZE
+                         - NXT_H2P_DEFAULT_WINDOW_SIZE);
+
+    b->mem.free = p;
+
+    nxt_h2p_conn_write(task, h2p, b);
+
+    return NXT_OK;
+}
+
+
+static const nxt_conn_state_t  nxt_h2p_read_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_h2p_conn_read_handler,
+    .close_handler = nxt_h2p_conn_close,
+    .error_handler = nxt_h2p_conn_error,
+
+    .timer_handler = nxt_h2p_conn_read_timeout,
+    .timer_value = nxt_h2p_conn_read_timer_value,
+    .timer_autoreset = 1,
+};
+
+
+static void
+nxt_h2p_conn_read_handler(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_h2proto_t    *h2p;
+    nxt_h2p_error_t  error;
+
+    h2p = data;
+
+    nxt_debug(task, "h2p conn read");
+
+    if (nxt_slow_path(h2p->closing)) {
+        return;
+    }
+
+    error = nxt_h2p_frames_process(task, h2p);
+
+    if (nxt_slow_path(error != NXT_H2P_NO_ERROR)) {
+        nxt_h2p_conn_protocol_error(task, h2p, error);
+        return;
+    }
+
+    if (nxt_fast_path(!h2p->closing)) {
+        nxt_h2p_conn_read(task, h2p);
+    }
+}
+
+
+static void
+nxt_h2p_conn_read(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    size_t      size;
+    nxt_buf_t   *b;
+    nxt_conn_t  *c;
+
+    c = h2p->conn;
+    b = c->read;
+
+    size = nxt_buf_mem_used_size(&b->mem);
+
+    if (b->mem.pos != b->mem.start) {
+        nxt_memmove(b->mem.start, b->mem.pos, size);
+
+        b->mem.pos = b->mem.start;
+        b->mem.free = b->mem.start + size;
+    }
+
+    nxt_conn_read(task->thread->engine, c);
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frames_process(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    u_char           *p;
+    size_t           size;
+    nxt_buf_mem_t    *bm;
+    nxt_h2p_error_t  error;
+    nxt_h2p_frame_t  frame;
+
+    bm = &h2p->conn->read->mem;
+
+    if (!h2p->preface) {
+        size = nxt_min((size_t) nxt_buf_mem_used_size(bm),
+                       nxt_length(NXT_H2P_PREFACE));
+
+        if (memcmp(bm->pos, NXT_H2P_PREFACE, size) != 0) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        if (size < nxt_length(NXT_H2P_PREFACE)) {
+            return NXT_H2P_NO_ERROR;
+        }
+
+        bm->pos += size;
+        h2p->preface = 1;
+    }
+
+    while (!h2p->closing) {
+        p = bm->pos;
+        size = nxt_buf_mem_used_size(bm);
+
+        if (size < NXT_H2P_FRAME_HEADER_SIZE) {
+            break;
+        }
+
+        frame.length = (p[0] << 16) | (p[1] << 8) | p[2];
+
+        if (nxt_slow_path(frame.length > NXT_H2P_DEFAULT_FRAME_SIZE)) {
+            return NXT_H2P_FRAME_SIZE_ERROR;
+        }
+
+        if (size < NXT_H2P_FRAME_HEADER_SIZE + frame.length) {
+            break;
+        }
+
+        frame.type = p[3];
+        frame.flags = p[4];
+        frame.stream_id = nxt_h2p_get32(&p[5]) & 0x7fffffff;
+        frame.payload = p + NXT_H2P_FRAME_HEADER_SIZE;
+
+        bm->pos = frame.payload + frame.length;
+
+        nxt_debug(task, "h2p frame type:%d flags:%d stream:%uD length:%uD",
+                  frame.type, frame.flags, frame.stream_id, frame.length);
+
+        if (nxt_slow_path(!h2p->settings
+                          && (frame.type != NXT_H2P_SETTINGS
+                              || (frame.flags & NXT_H2P_FLAG_ACK))))
+        {
+            /* The first frame of the client preface must be SETTINGS. */
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        if (nxt_slow_path(h2p->header_block != NULL
+                          && (frame.type != NXT_H2P_CONTINUATION
+                              || frame.stream_id != h2p->header_stream_id)))
+        {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        if (frame.type >= nxt_nitems(nxt_h2p_frame_handlers)) {
+            /* Unknown frame types must be ignored. */
+            continue;
+        }
+
+        error = nxt_h2p_frame_handlers[frame.type](task, h2p, &frame);
+
+        if (nxt_slow_path(error != NXT_H2P_NO_ERROR)) {
+            return error;
+        }
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_data(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    u_char            *pos, *end;
+    nxt_uint_t        padding;
+    nxt_h2p_stream_t  *st;
+
+    if (nxt_slow_path(frame->stream_id == 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    pos = frame->payload;
+    end = pos + frame->length;
+
+    if (frame->flags & NXT_H2P_FLAG_PADDED) {
+        if (nxt_slow_path(pos == end)) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        padding = *pos++;
+
+        if (nxt_slow_path(padding > (size_t) (end - pos))) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        end -= padding;
+    }
+
+    /* Flow control accounts for the whole frame payload with padding. */
+
+    h2p->recv_window -= frame->length;
+
+    if (nxt_slow_path(h2p->recv_window < 0)) {
+        return NXT_H2P_FLOW_CONTROL_ERROR;
+    }
+
+    if (h2p->recv_window < NXT_H2P_MAX_WINDOW_SIZE / 2) {
+        if (nxt_slow_path(nxt_h2p_window_update(task, h2p, 0,
+                                                NXT_H2P_MAX_WINDOW_SIZE
+                                                - h2p->recv_window)
+                          != NXT_OK))
+        {
+            return NXT_H2P_INTERNAL_ERROR;
+        }
+
+        h2p->recv_window = NXT_H2P_MAX_WINDOW_SIZE;
+    }
+
+    st = nxt_h2p_stream_find(h2p, frame->stream_id);
+
+    if (st == NULL) {
+        /* A frame for a closed stream is ignored, for an idle one is not. */
+        return (frame->stream_id > h2p->last_stream_id)
+               ? NXT_H2P_PROTOCOL_ERROR : NXT_H2P_NO_ERROR;
+    }
+
+    if (nxt_slow_path(st->in_closed)) {
+        return NXT_H2P_STREAM_CLOSED;
+    }
+
+    st->recv_window -= frame->length;
+
+    if (nxt_slow_path(st->recv_window < 0)) {
+        return NXT_H2P_FLOW_CONTROL_ERROR;
+    }
+
+    if (st->reset) {
+        return NXT_H2P_NO_ERROR;
+    }
+
+    nxt_h2p_stream_body(task, st, pos, end - pos);
+
+    if (frame->flags & NXT_H2P_FLAG_END_STREAM) {
+        nxt_h2p_stream_end(task, st);
+        return NXT_H2P_NO_ERROR;
+    }
+
+    if (st->body_status != 0 && st->body_wait) {
+        nxt_h2p_body_done(task, st);
+        return NXT_H2P_NO_ERROR;
+    }
+
+    if (st->recv_window <= h2p->init_recv_window / 2) {
+        if (nxt_slow_path(nxt_h2p_window_update(task, h2p, st->id,
+                                                h2p->init_recv_window
+                                                - st->recv_window)
+                          != NXT_OK))
+        {
+            return NXT_H2P_INTERNAL_ERROR;
+        }
+
+        st->recv_window = h2p->init_recv_window;
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_headers(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    u_char      *pos, *end;
+    size_t      size;
+    uint32_t    id;
+    nxt_buf_t   *b;
+    nxt_uint_t  padding;
+
+    id = frame->stream_id;
+
+    if (nxt_slow_path(id == 0 || (id & 1) == 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    pos = frame->payload;
+    end = pos + frame->length;
+
+    if (frame->flags & NXT_H2P_FLAG_PADDED) {
+        if (nxt_slow_path(pos == end)) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        padding = *pos++;
+
+        if (nxt_slow_path(padding > (size_t) (end - pos))) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        end -= padding;
+    }
+
+    if (frame->flags & NXT_H2P_FLAG_PRIORITY) {
+        /* Stream priorities are ignored. */
+
+        if (nxt_slow_path(end - pos < 5)) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        pos += 5;
+    }
+
+    if (frame->flags & NXT_H2P_FLAG_END_HEADERS) {
+        return nxt_h2p_header_block(task, h2p, id, frame->flags, pos, end);
+    }
+
+    /* The header block continues in CONTINUATION frames. */
+
+    size = end - pos;
+
+    if (nxt_slow_path(size > h2p->header_limit)) {
+        return NXT_H2P_ENHANCE_YOUR_CALM;
+    }
+
+    b = nxt_buf_mem_alloc(h2p->conn->mem_pool, h2p->header_limit, 0);
+    if (nxt_slow_path(b == NULL)) {
+        return NXT_H2P_INTERNAL_ERROR;
+    }
+
+    b->mem.free = nxt_cpymem(b->mem.free, pos, size);
+
+    h2p->header_block = b;
+    h2p->header_stream_id = id;
+    h2p->header_flags = frame->flags;
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_continuation(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    nxt_buf_t        *b;
+    nxt_h2p_error_t  error;
+
+    b = h2p->header_block;
+
+    if (nxt_slow_path(b == NULL)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length > nxt_buf_mem_free_size(&b->mem))) {
+        return NXT_H2P_ENHANCE_YOUR_CALM;
+    }
+
+    b->mem.free = nxt_cpymem(b->mem.free, frame->payload, frame->length);
+
+    if (!(frame->flags & NXT_H2P_FLAG_END_HEADERS)) {
+        return NXT_H2P_NO_ERROR;
+    }
+
+    h2p->header_block = NULL;
+
+    error = nxt_h2p_header_block(task, h2p, h2p->header_stream_id,
+                                 h2p->header_flags, b->mem.pos, b->mem.free);
+
+    nxt_mp_free(h2p->conn->mem_pool, b);
+
+    return error;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_header_block(nxt_task_t *task, nxt_h2proto_t *h2p, uint32_t id,
+    nxt_uint_t flags, u_char *pos, u_char *end)
+{
+    nxt_int_t         ret;
+    nxt_h2p_stream_t  *st;
+
+    st = nxt_h2p_stream_find(h2p, id);
+
+    if (st != NULL || id <= h2p->last_stream_id) {
+        /*
+         * Trailer fields or a header block for a closed stream: the block
+         * is decoded only to keep the dynamic table in sync.
+         */
+
+        ret = nxt_h2p_header_skip(h2p, pos, end);
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return (ret == NXT_DECLINED) ? NXT_H2P_COMPRESSION_ERROR
+                                         : NXT_H2P_INTERNAL_ERROR;
+        }
+
+        if (st == NULL) {
+            return NXT_H2P_NO_ERROR;
+        }
+
+        if (nxt_slow_path(st->in_closed)) {
+            return NXT_H2P_STREAM_CLOSED;
+        }
+
+        if (nxt_slow_path(!(flags & NXT_H2P_FLAG_END_STREAM))) {
+            return NXT_H2P_PROTOCOL_ERROR;
+        }
+
+        nxt_h2p_stream_end(task, st);
+
+        return NXT_H2P_NO_ERROR;
+    }
+
+    h2p->last_stream_id = id;
+
+    if (h2p->goaway
+        || h2p->nstreams >= h2p->max_streams
+        || h2p->conn->listen->socket.data == NULL)
+    {
+        ret = nxt_h2p_header_skip(h2p, pos, end);
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return (ret == NXT_DECLINED) ? NXT_H2P_COMPRESSION_ERROR
+                                         : NXT_H2P_INTERNAL_ERROR;
+        }
+
+        nxt_debug(task, "h2p stream %uD refused", id);
+
+        if (nxt_slow_path(nxt_h2p_rst_stream(task, h2p, id,
+                                             NXT_H2P_REFUSED_STREAM)
+                          != NXT_OK))
+        {
+            return NXT_H2P_INTERNAL_ERROR;
+        }
+
+        if (h2p->conn->listen->socket.data == NULL && !h2p->goaway) {
+            /* The listening socket has been closed. */
+
+            if (nxt_slow_path(nxt_h2p_goaway(task, h2p, NXT_H2P_NO_ERROR)
+                              != NXT_OK))
+            {
+                return NXT_H2P_INTERNAL_ERROR;
+            }
+
+            if (h2p->nstreams == 0) {
+                nxt_h2p_conn_shutdown(task, h2p);
+            }
+        }
+
+        return NXT_H2P_NO_ERROR;
+    }
+
+    return nxt_h2p_stream_create(task, h2p, id, flags, pos, end);
+}
+
+
+static nxt_int_t
+nxt_h2p_header_skip(nxt_h2proto_t *h2p, u_char *pos, u_char *end)
+{
+    nxt_mp_t   *mp;
+    nxt_int_t  ret;
+
+    mp = nxt_mp_create(1024, 128, 256, 32);
+    if (nxt_slow_path(mp == NULL)) {
+        return NXT_ERROR;
+    }
+
+    ret = nxt_h2p_hpack_decode(&h2p->hpack, mp, pos, end, nxt_h2p_field_skip,
+                               NULL);
+
+    nxt_mp_destroy(mp);
+
+    return ret;
+}
+
+
+static nxt_int_t
+nxt_h2p_field_skip(void *ctx, nxt_str_t *name, nxt_str_t *value)
+{
+    return NXT_OK;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_stream_create(nxt_task_t *task, nxt_h2proto_t *h2p, uint32_t id,
+    nxt_uint_t flags, u_char *pos, u_char *end)
+{
+    u_char                   *p, ch;
+    size_t                   size;
+    nxt_int_t                ret;
+    nxt_conn_t               *c;
+    nxt_h2p_stream_t         *st;
+    nxt_http_field_t         *field;
+    nxt_socket_conf_t        *skcf;
+    nxt_http_request_t       *r;
+    nxt_h2p_header_ctx_t     ctx;
+    nxt_socket_conf_joint_t  *joint;
+
+    nxt_debug(task, "h2p stream %uD create", id);
+
+    c = h2p->conn;
+
+    r = nxt_http_request_create(task);
+    if (nxt_slow_path(r == NULL)) {
+        return NXT_H2P_INTERNAL_ERROR;
+    }
+
+    st = nxt_mp_zget(r->mem_pool, sizeof(nxt_h2p_stream_t));
+    if (nxt_slow_path(st == NULL)) {
+        goto fail;
+    }
+
+    ret = nxt_http_parse_request_init(&st->parser, r->mem_pool);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        goto fail;
+    }
+
+    joint = c->listen->socket.data;
+    skcf = joint->socket_conf;
+
+    st->parser.discard_unsafe_fields = skcf->discard_unsafe_fields;
+
+    nxt_memzero(&ctx, sizeof(nxt_h2p_header_ctx_t));
+
+    ctx.stream = st;
+    ctx.limit = h2p->header_limit;
+
+    ret = nxt_h2p_hpack_decode(&h2p->hpack, r->mem_pool, pos, end,
+                               nxt_h2p_field, &ctx);
+
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_mp_release(r->mem_pool);
+
+        return (ret == NXT_DECLINED) ? NXT_H2P_COMPRESSION_ERROR
+                                     : NXT_H2P_INTERNAL_ERROR;
+    }
+
+    if (nxt_slow_path(ctx.malformed
+                      || ctx.method.length == 0
+                      || (ctx.status == 0
+                          && (ctx.scheme.length == 0
+                              || ctx.path.length == 0))))
+    {
+        nxt_log(task, NXT_LOG_INFO, "h2p stream %uD: malformed request", id);
+
+        nxt_mp_release(r->mem_pool);
+
+        if (nxt_slow_path(nxt_h2p_rst_stream(task, h2p, id,
+                                             NXT_H2P_PROTOCOL_ERROR)
+                          != NXT_OK))
+        {
+            return NXT_H2P_INTERNAL_ERROR;
+        }
+
+        return NXT_H2P_NO_ERROR;
+    }
+
+    st->request = r;
+    st->h2p = h2p;
+    st->id = id;
+    st->send_window = h2p->init_send_window;
+    st->recv_window = h2p->init_recv_window;
+
+    nxt_queue_insert_tail(&h2p->streams, &st->link);
+    nxt_queue_self(&st->blocked_link);
+    h2p->nstreams++;
+
+    if (h2p->idle) {
+        nxt_conn_active(task->thread->engine, c);
+        h2p->idle = 0;
+    }
+
+    r->proto.h2 = st;
+    r->protocol = NXT_HTTP_PROTO_H2;
+    r->remote = c->remote;
+
+#if (NXT_TLS)
+    r->tls = (c->u.tls != NULL);
+#endif
+
+    /*
+     * r->sendfile is not set, so the response body is always passed
+     * in memory buffers that can be split into DATA frames.
+     */
+
+    r->task = c->task;
+    task = &r->task;
+
+    joint->count++;
+
+    r->conf = joint;
+    r->log_route = skcf->log_route;
+
+    if (skcf->route_memo) {
+        if (h2p->route_memo == NULL) {
+            h2p->route_memo = nxt_mp_zget(c->mem_pool,
+                                          sizeof(nxt_http_route_memo_t));
+        }
+
+        r->route_memo = h2p->route_memo;
+    }
+
+    if (c->local == NULL) {
+        c->local = skcf->sockaddr;
+    }
+
+    st->parser.method = ctx.method;
+
+    r->method = &st->parser.method;
+    r->path = &st->parser.path;
+    r->args = &st->parser.args;
+    r->fields = st->parser.fields;
+
+    r->target = ctx.path;
+    r->version = nxt_h2p_version;
+
+    size = ctx.method.length + ctx.path.length + nxt_h2p_version.length + 2;
+
+    p = nxt_mp_nget(r->mem_pool, size);
+    if (nxt_slow_path(p == NULL)) {
+        ctx.status = NXT_HTTP_INTERNAL_SERVER_ERROR;
+        goto error;
+    }
+
+    r->request_line.start = p;
+    r->request_line.length = size;
+
+    p = nxt_cpymem(p, ctx.method.start, ctx.method.length);
+    *p++ = ' ';
+    p = nxt_cpymem(p, ctx.path.start, ctx.path.length);
+    *p++ = ' ';
+    nxt_memcpy(p, nxt_h2p_version.start, nxt_h2p_version.length);
+
+    if (nxt_slow_path(r->log_route)) {
+        nxt_log(task, NXT_LOG_NOTICE, "http request line \"%V\"",
+                &r->request_line);
+    }
+
+    if (ctx.status != 0) {
+        goto error;
+    }
+
+    if (nxt_slow_path(ctx.path.start[0] != '/')) {
+        ctx.status = NXT_HTTP_BAD_REQUEST;
+        goto error;
+    }
+
+    for (p = ctx.path.start; p < ctx.path.start + ctx.path.length; p++) {
+        ch = *p;
+
+        if (nxt_slow_path(ch <= ' ' || ch == 0x7f)) {
+            ctx.status = NXT_HTTP_BAD_REQUEST;
+            goto error;
+        }
+    }
+
+    st->parser.target_start = ctx.path.start;
+    st->parser.target_end = ctx.path.start + ctx.path.length;
+
+    ret = nxt_http_parse_complex_target(&st->parser);
+
+    if (nxt_slow_path(ret != NXT_OK)) {
+        ctx.status = (ret == NXT_HTTP_PARSE_INVALID)
+                     ? NXT_HTTP_BAD_REQUEST : NXT_HTTP_INTERNAL_SERVER_ERROR;
+        goto error;
+    }
+
+    if (!ctx.host && ctx.authority.length != 0) {
+        field = nxt_h2p_field_add(r, "host", 4, ctx.authority.start,
+                                  ctx.authority.length);
+
+        if (nxt_slow_path(field == NULL)) {
+            ctx.status = NXT_HTTP_INTERNAL_SERVER_ERROR;
+            goto error;
+        }
+    }
+
+    ret = nxt_http_fields_process(r->fields, &nxt_h2p_fields_hash, r);
+
+    if (nxt_slow_path(ret != NXT_OK)) {
+        ctx.status = ret;
+        goto error;
+    }
+
+    if (flags & NXT_H2P_FLAG_END_STREAM) {
+        nxt_h2p_stream_end(task, st);
+    }
+
+    r->state->ready_handler(task, r, NULL);
+
+    return NXT_H2P_NO_ERROR;
+
+error:
+
+    if (flags & NXT_H2P_FLAG_END_STREAM) {
+        st->in_closed = 1;
+    }
+
+    nxt_http_request_error(task, r, ctx.status);
+
+    return NXT_H2P_NO_ERROR;
+
+fail:
+
+    nxt_mp_release(r->mem_pool);
+
+    return NXT_H2P_INTERNAL_ERROR;
+}
+
+
+static nxt_int_t
+nxt_h2p_field(void *data, nxt_str_t *name, nxt_str_t *value)
+{
+    u_char                *p, *end, c, ch;
+    size_t                size;
+    uint32_t              hash;
+    nxt_bool_t            skip;
+    nxt_http_field_t      *field;
+    nxt_h2p_stream_t      *st;
+    nxt_h2p_header_ctx_t  *ctx;
+
+    ctx = data;
+    st = ctx->stream;
+
+    ctx->size += name->length + value->length + 32;
+
+    if (nxt_slow_path(ctx->size > ctx->limit)) {
+        ctx->status = NXT_HTTP_REQUEST_HEADER_FIELDS_TOO_LARGE;
+        return NXT_OK;
+    }
+
+    if (nxt_slow_path(ctx->malformed || name->length == 0)) {
+        ctx->malformed = 1;
+        return NXT_OK;
+    }
+
+    end = value->start + value->length;
+
+    for (p = value->start; p < end; p++) {
+        ch = *p;
+
+        if (nxt_slow_path(ch == '\0' || ch == '\r' || ch == '\n')) {
+            ctx->malformed = 1;
+            return NXT_OK;
+        }
+    }
+
+    if (name->start[0] == ':') {
+        /* Pseudo-header fields precede regular ones and cannot repeat. */
+
+        if (nxt_slow_path(ctx->regular)) {
+            ctx->malformed = 1;
+
+        } else if (nxt_str_eq(name, ":method", 7)
+                   && ctx->method.length == 0 && value->length != 0)
+        {
+            ctx->method = *value;
+
+        } else if (nxt_str_eq(name, ":scheme", 7)
+                   && ctx->scheme.length == 0 && value->length != 0)
+        {
+            ctx->scheme = *value;
+
+        } else if (nxt_str_eq(name, ":authority", 10)
+                   && ctx->authority.start == NULL)
+        {
+            ctx->authority = *value;
+
+        } else if (nxt_str_eq(name, ":path", 5)
+                   && ctx->path.length == 0 && value->length != 0)
+        {
+            ctx->path = *value;
+
+        } else {
+            ctx->malformed = 1;
+        }
+
+        return NXT_OK;
+    }
+
+    ctx->regular = 1;
+
+    if (ctx->status != 0) {
+        return NXT_OK;
+    }
+
+    if (nxt_slow_path(name->length > 0xff)) {
+        ctx->status = NXT_HTTP_REQUEST_HEADER_FIELDS_TOO_LARGE;
+        return NXT_OK;
+    }
+
+    hash = NXT_HTTP_FIELD_HASH_INIT;
+    skip = 0;
+
+    end = name->start + name->length;
+
+    for (p = name->start; p < end; p++) {
+        ch = *p;
+        c = nxt_h2p_field_chars[ch];
+
+        if (nxt_slow_path(c <= '\1')) {
+            if (c == '\0') {
+                ctx->malformed = 1;
+                return NXT_OK;
+            }
+
+            skip = st->parser.discard_unsafe_fields;
+            c = ch;
+        }
+
+        hash = nxt_http_field_hash_char(hash, c);
+    }
+
+    if (skip) {
+        return NXT_OK;
+    }
+
+    /* Connection-specific fields are not allowed in HTTP/2. */
+
+    if (nxt_str_eq(name, "connection", 10)
+        || nxt_str_eq(name, "keep-alive", 10)
+        || nxt_str_eq(name, "proxy-connection", 16)
+        || nxt_str_eq(name, "transfer-encoding", 17)
+        || nxt_str_eq(name, "upgrade", 7)
+        || (nxt_str_eq(name, "te", 2) && !nxt_str_eq(value, "trailers", 8)))
+    {
+        ctx->malformed = 1;
+        return NXT_OK;
+    }
+
+    if (nxt_str_eq(name, "cookie", 6) && ctx->cookie != NULL) {
+        /* Cookie fields can be split and are joined back. */
+
+        field = ctx->cookie;
+
+        size = field->value_length + 2 + value->length;
+
+        p = nxt_mp_nget(st->parser.mem_pool, size);
+        if (nxt_slow_path(p == NULL)) {
+            return NXT_ERROR;
+        }
+
+        end = nxt_cpymem(p, field->value, field->value_length);
+        *end++ = ';'; *end++ = ' ';
+        nxt_memcpy(end, value->start, value->length);
+
+        field->value = p;
+        field->value_length = size;
+
+        return NXT_OK;
+    }
+
+    field = nxt_list_add(st->parser.fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NXT_ERROR;
+    }
+
+    field->hash = nxt_http_field_hash_end(hash) & 0xFFFF;
+    field->skip = 0;
+    field->hopbyhop = 0;
+
+    field->name_length = name->length;
+    field->value_length = value->length;
+    field->name = name->start;
+    field->value = value->start;
+
+    if (nxt_str_eq(name, "cookie", 6)) {
+        ctx->cookie = field;
+
+    } else if (nxt_str_eq(name, "host", 4)) {
+        ctx->host = 1;
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_http_field_t *
+nxt_h2p_field_add(nxt_http_request_t *r, const char *name, size_t name_length,
+    u_char *value, size_t value_length)
+{
+    size_t            i;
+    uint32_t          hash;
+    nxt_http_field_t  *field;
+
+    field = nxt_list_add(r->fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NULL;
+    }
+
+    hash = NXT_HTTP_FIELD_HASH_INIT;
+
+    for (i = 0; i < name_length; i++) {
+        hash = nxt_http_field_hash_char(hash, name[i]);
+    }
+
+    field->hash = nxt_http_field_hash_end(hash) & 0xFFFF;
+    field->skip = 0;
+    field->hopbyhop = 0;
+
+    field->name_length = name_length;
+    field->value_length = value_length;
+    field->name = (u_char *) name;
+    field->value = value;
+
+    return field;
+}
+
+
+static nxt_h2p_stream_t *
+nxt_h2p_stream_find(nxt_h2proto_t *h2p, uint32_t id)
+{
+    nxt_h2p_stream_t  *st;
+
+    nxt_queue_each(st, &h2p->streams, nxt_h2p_stream_t, link) {
+
+        if (st->id == id) {
+            return st;
+        }
+
+    } nxt_queue_loop;
+
+    return NULL;
+}
+
+
+static void
+nxt_h2p_stream_body(nxt_task_t *task, nxt_h2p_stream_t *st, u_char *pos,
+    size_t size)
+{
+    size_t              n;
+    ssize_t             res;
+    nxt_buf_t           *b, *fb;
+    nxt_socket_conf_t   *skcf;
+    nxt_http_request_t  *r;
+
+    r = st->request;
+
+    st->received += size;
+
+    if (st->body_status != 0) {
+        return;
+    }
+
+    skcf = r->conf->socket_conf;
+
+    if (nxt_slow_path(r->content_length_n >= 0
+                      && st->received > r->content_length_n))
+    {
+        st->body_status = NXT_HTTP_BAD_REQUEST;
+        return;
+    }
+
+    if (nxt_slow_path(st->received > (nxt_off_t) skcf->max_body_size)) {
+        st->body_status = NXT_HTTP_PAYLOAD_TOO_LARGE;
+        return;
+    }
+
+    if (size == 0) {
+        return;
+    }
+
+    b = r->body;
+
+    if (b == NULL) {
+        if (r->content_length_n > (nxt_off_t) skcf->body_buffer_size) {
+            b = nxt_h2p_body_file(task, r);
+
+        } else {
+            n = (r->content_length_n > 0) ? (size_t) r->content_length_n
+                                          : skcf->body_buffer_size;
+
+            b = nxt_buf_mem_alloc(r->mem_pool, n, 0);
+        }
+
+        if (nxt_slow_path(b == NULL)) {
+            goto fail;
+        }
+
+        r->body = b;
+    }
+
+    if (!nxt_buf_is_file(b)
+        && (size_t) nxt_buf_mem_free_size(&b->mem) < size) {
+        /* The body without Content-Length has outgrown the buffer. */
+
+        fb = nxt_h2p_body_file(task, r);
+        if (nxt_slow_path(fb == NULL)) {
+            goto fail;
+        }
+
+        n = nxt_buf_mem_used_size(&b->mem);
+
+        if (n != 0) {
+            res = nxt_fd_write(fb->file->fd, b->mem.pos, n);
+
+            if (nxt_slow_path(res < (ssize_t) n)) {
+                nxt_fd_close(fb->file->fd);
+                goto fail;
+            }
+
+            fb->file_end = n;
+        }
+
+        nxt_mp_free(r->mem_pool, b);
+
+        r->body = fb;
+        b = fb;
+    }
+
+    if (nxt_buf_is_file(b)) {
+        res = nxt_fd_write(b->file->fd, pos, size);
+
+        if (nxt_slow_path(res < (ssize_t) size)) {
+            goto fail;
+        }
+
+        b->file_end += size;
+
+    } else {
+        b->mem.free = nxt_cpymem(b->mem.free, pos, size);
+    }
+
+    return;
+
+fail:
+
+    st->body_status = NXT_HTTP_INTERNAL_SERVER_ERROR;
+}
+
+
+static nxt_buf_t *
+nxt_h2p_body_file(nxt_task_t *task, nxt_http_request_t *r)
+{
+    nxt_str_t  *tmp_path, tmp_name;
+    nxt_buf_t  *b;
+
+    static const nxt_str_t tmp_name_pattern = nxt_string("/req-XXXXXXXX");
+
+    tmp_path = &r->conf->socket_conf->body_temp_path;
+
+    tmp_name.length = tmp_path->length + tmp_name_pattern.length;
+
+    b = nxt_buf_file_alloc(r->mem_pool,
+                           sizeof(nxt_file_t) + tmp_name.length + 1, 0);
+    if (nxt_slow_path(b == NULL)) {
+        return NULL;
+    }
+
+    tmp_name.start = nxt_pointer_to(b->mem.start, sizeof(nxt_file_t));
+
+    memcpy(tmp_name.start, tmp_path->start, tmp_path->length);
+    memcpy(tmp_name.start + tmp_path->length, tmp_name_pattern.start,
+           tmp_name_pattern.length);
+    tmp_name.start[tmp_name.length] = '\0';
+
+    b->file = (nxt_file_t *) b->mem.start;
+    nxt_memzero(b->file, sizeof(nxt_file_t));
+
+    b->file->fd = mkstemp((char *) tmp_name.start);
+    if (nxt_slow_path(b->file->fd == -1)) {
+        nxt_alert(task, "mkstemp(%s) failed %E", tmp_name.start, nxt_errno);
+        return NULL;
+    }
+
+    nxt_debug(task, "create body tmp file \"%V\", %d",
+              &tmp_name, b->file->fd);
+
+    unlink((char *) tmp_name.start);
+
+    b->mem.start = NULL;
+    b->mem.end = NULL;
+    b->mem.pos = NULL;
+    b->mem.free = NULL;
+
+    return b;
+}
+
+
+static void
+nxt_h2p_stream_end(nxt_task_t *task, nxt_h2p_stream_t *st)
+{
+    nxt_http_request_t  *r;
+
+    nxt_debug(task, "h2p stream %uD end", st->id);
+
+    st->in_closed = 1;
+
+    r = st->request;
+
+    if (st->body_status == 0
+        && r->content_length_n >= 0
+        && st->received != r->content_length_n)
+    {
+        st->body_status = NXT_HTTP_BAD_REQUEST;
+    }
+
+    if (st->body_wait) {
+        nxt_h2p_body_done(task, st);
+    }
+}
+
+
+void
+nxt_h2p_request_body_read(nxt_task_t *task, nxt_http_request_t *r)
+{
+    nxt_h2p_stream_t  *st;
+
+    st = r->proto.h2;
+
+    nxt_debug(task, "h2p request body read");
+
+    if (!st->in_closed && st->body_status == 0) {
+        st->body_wait = 1;
+        return;
+    }
+
+    nxt_h2p_body_done(task, st);
+}
+
+
+static void
+nxt_h2p_body_done(nxt_task_t *task, nxt_h2p_stream_t *st)
+{
+    u_char              *p;
+    nxt_buf_t           *b;
+    nxt_http_field_t    *field;
+    nxt_http_request_t  *r;
+
+    st->body_wait = 0;
+    r = st->request;
+    task = &r->task;
+
+    if (st->body_status != 0) {
+        nxt_http_request_error(task, r, st->body_status);
+        return;
+    }
+
+    b = r->body;
+
+    if (b != NULL && nxt_buf_is_file(b)) {
+        b->file->size = b->file_end;
+    }
+
+    if (r->content_length == NULL && st->received != 0) {
+        /* Applications expect the body length in Content-Length. */
+
+        p = nxt_mp_nget(r->mem_pool, NXT_OFF_T_LEN);
+        if (nxt_slow_path(p == NULL)) {
+            goto fail;
+        }
+
+        field = nxt_h2p_field_add(r, "content-length", 14, p,
+                                  nxt_sprintf(p, p + NXT_OFF_T_LEN, "%O",
+                                              st->received) - p);
+        if (nxt_slow_path(field == NULL)) {
+            goto fail;
+        }
+
+        r->content_length = field;
+        r->content_length_n = st->received;
+    }
+
+    r->state->ready_handler(task, r, NULL);
+
+    return;
+
+fail:
+
+    nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
+}
+
+
+void
+nxt_h2p_request_local_addr(nxt_task_t *task, nxt_http_request_t *r)
+{
+    r->local = nxt_conn_local_addr(task, r->proto.h2->h2p->conn);
+}
+
+
+void
+nxt_h2p_request_header_send(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_work_handler_t body_handler, void *data)
+{
+    u_char            *p, *start;
+    size_t            size;
+    nxt_buf_t         *b, *header;
+    nxt_uint_t        n, flags;
+    nxt_h2proto_t     *h2p;
+    nxt_h2p_stream_t  *st;
+    nxt_http_field_t  *field;
+
+    nxt_debug(task, "h2p request header send");
+
+    r->header_sent = 1;
+
+    st = r->proto.h2;
+    h2p = st->h2p;
+
+    n = r->status;
+
+    if (n < NXT_HTTP_OK || n > NXT_HTTP_STATUS_MAX) {
+        n = NXT_HTTP_INTERNAL_SERVER_ERROR;
+    }
+
+    /* An indexed or a literal ":status" field. */
+    size = 5;
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (!nxt_h2p_response_field_skip(field)) {
+            size += nxt_h2p_hpack_field_size(field->name_length,
+                                             field->value_length);
+        }
+
+    } nxt_list_loop;
+
+    b = nxt_h2p_frame_alloc(h2p, size);
+    if (nxt_slow_path(b == NULL)) {
+        goto fail;
+    }
+
+    start = b->mem.free + NXT_H2P_FRAME_HEADER_SIZE;
+
+    p = nxt_h2p_hpack_status(start, n);
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (!nxt_h2p_response_field_skip(field)) {
+            p = nxt_h2p_hpack_field(p, field->name, field->name_length,
+                                    field->value, field->value_length);
+        }
+
+    } nxt_list_loop;
+
+    size = p - start;
+
+    flags = (body_handler == NULL) ? NXT_H2P_FLAG_END_STREAM : 0;
+
+    if (size <= h2p->frame_size) {
+        (void) nxt_h2p_frame_header(b->mem.free, size, NXT_H2P_HEADERS,
+                                    flags | NXT_H2P_FLAG_END_HEADERS, st->id);
+        b->mem.free = p;
+        header = b;
+
+    } else {
+        header = nxt_h2p_header_split(h2p, b, size, flags, st->id);
+
+        nxt_mp_free(h2p->conn->mem_pool, b);
+
+        if (nxt_slow_path(header == NULL)) {
+            goto fail;
+        }
+    }
+
+    if (body_handler != NULL) {
+        nxt_h2p_stream_write(task, st, header);
+
+        nxt_work_queue_add(&task->thread->engine->fast_work_queue,
+                           body_handler, task, r, data);
+        return;
+    }
+
+    st->out_closed = 1;
+
+    header->next = nxt_http_buf_last(r);
+
+    nxt_h2p_stream_write(task, st, header);
+
+    return;
+
+fail:
+
+    r->state->error_handler(task, r, st);
+}
+
+
+static nxt_bool_t
+nxt_h2p_response_field_skip(nxt_http_field_t *field)
+{
+    nxt_str_t  name;
+
+    if (field->skip || field->hopbyhop) {
+        return 1;
+    }
+
+    name.length = field->name_length;
+    name.start = field->name;
+
+    return (nxt_strcasestr_eq(&name, &(nxt_str_t) nxt_string("Connection"))
+            || nxt_strcasestr_eq(&name,
+                                 &(nxt_str_t) nxt_string("Keep-Alive"))
+            || nxt_strcasestr_eq(&name,
+                                 &(nxt_str_t) nxt_string("Proxy-Connection"))
+            || nxt_strcasestr_eq(&name,
+                                 &(nxt_str_t) nxt_string("Transfer-Encoding"))
+            || nxt_strcasestr_eq(&name, &(nxt_str_t) nxt_string("Upgrade")));
+}
+
+
+static nxt_buf_t *
+nxt_h2p_header_split(nxt_h2proto_t *h2p, nxt_buf_t *b, size_t size,
+    nxt_uint_t flags, uint32_t id)
+{
+    u_char      *p, *src;
+    size_t      n;
+    nxt_buf_t   *header;
+    nxt_uint_t  type, nframes;
+
+    nframes = (size + h2p->frame_size - 1) / h2p->frame_size;
+
+    header = nxt_h2p_frame_alloc(h2p, size + (nframes - 1)
+                                             * NXT_H2P_FRAME_HEADER_SIZE);
+    if (nxt_slow_path(header == NULL)) {
+        return NULL;
+    }
+
+    p = header->mem.free;
+    src = b->mem.free + NXT_H2P_FRAME_HEADER_SIZE;
+    type = NXT_H2P_HEADERS;
+
+    while (size != 0) {
+        n = nxt_min(size, h2p->frame_size);
+        size -= n;
+
+        if (size == 0) {
+            flags |= NXT_H2P_FLAG_END_HEADERS;
+        }
+
+        p = nxt_h2p_frame_header(p, n, type, flags, id);
+        p = nxt_cpymem(p, src, n);
+
+        src += n;
+        type = NXT_H2P_CONTINUATION;
+        flags = 0;
+    }
+
+    header->mem.free = p;
+
+    return header;
+}
+
+
+void
+nxt_h2p_request_send(nxt_task_t *task, nxt_http_request_t *r, nxt_buf_t *out)
+{
+    nxt_buf_t         *b, **next;
+    nxt_h2p_stream_t  *st;
+
+    nxt_debug(task, "h2p request send");
+
+    st = r->proto.h2;
+
+    next = &st->out;
+
+    while (*next != NULL) {
+        next = &(*next)->next;
+    }
+
+    *next = out;
+
+    /*
+     * Buffers are kept until they are split into DATA frames,
+     * the frames refer to them as to parent buffers.
+     */
+
+    for (b = out; b != NULL; b = b->next) {
+        if (!nxt_buf_is_sync(b)) {
+            b->retain++;
+        }
+    }
+
+    nxt_h2p_stream_flush(task, st);
+}
+
+
+static void
+nxt_h2p_stream_flush(nxt_task_t *task, nxt_h2p_stream_t *st)
+{
+    size_t            size, n;
+    nxt_buf_t         *b, *frame, *slice, *out, **tail;
+    nxt_uint_t        flags;
+    nxt_h2proto_t     *h2p;
+    nxt_work_queue_t  *wq;
+
+    h2p = st->h2p;
+
+    if (st->reset || h2p->write_error) {
+        nxt_h2p_stream_drop(task, st);
+        return;
+    }
+
+    wq = &task->thread->engine->fast_work_queue;
+
+    out = NULL;
+    tail = &out;
+
+    while (st->out != NULL) {
+        b = st->out;
+
+        if (nxt_buf_is_sync(b)) {
+
+            if (nxt_buf_is_last(b)) {
+                if (!st->out_closed) {
+                    frame = nxt_h2p_frame_alloc(h2p, 0);
+                    if (nxt_slow_path(frame == NULL)) {
+                        goto fail;
+                    }
+
+                    frame->mem.free = nxt_h2p_frame_header(frame->mem.free, 0,
+                                                      NXT_H2P_DATA,
+                                                      NXT_H2P_FLAG_END_STREAM,
+                                                      st->id);
+                    st->out_closed = 1;
+
+                    *tail = frame;
+                    tail = &frame->next;
+                }
+
+                st->out = b->next;
+                b->next = NULL;
+
+                *tail = b;
+                tail = &b->next;
+
+            } else {
+                st->out = b->next;
+                b->next = NULL;
+
+                nxt_work_queue_add(wq, b->completion_handler, task, b,
+                                   b->parent);
+            }
+
+            continue;
+        }
+
+        size = nxt_buf_mem_used_size(&b->mem);
+
+        if (size == 0) {
+            st->out = b->next;
+            b->next = NULL;
+
+            nxt_work_queue_add(wq, nxt_h2p_buf_release, task, b, NULL);
+            continue;
+        }
+
+        if (st->send_window <= 0 || h2p->send_window <= 0) {
+            if (!st->blocked) {
+                nxt_debug(task, "h2p stream %uD blocked", st->id);
+
+                st->blocked = 1;
+                nxt_queue_insert_tail(&h2p->blocked, &st->blocked_link);
+            }
+
+            break;
+        }
+
+        frame = nxt_h2p_frame_alloc(h2p, 0);
+        if (nxt_slow_path(frame == NULL)) {
+            goto fail;
+        }
+
+        slice = nxt_buf_mem_alloc(h2p->conn->mem_pool, 0, 0);
+        if (nxt_slow_path(slice == NULL)) {
+            nxt_mp_free(h2p->conn->mem_pool, frame);
+            goto fail;
+        }
+
+        n = nxt_min(size, (size_t) st->send_window);
+        n = nxt_min(n, (size_t) h2p->send_window);
+        n = nxt_min(n, h2p->frame_size);
+
+        flags = 0;
+
+        if (n == size && b->next != NULL && nxt_buf_is_last(b->next)) {
+            flags = NXT_H2P_FLAG_END_STREAM;
+            st->out_closed = 1;
+        }
+
+        frame->mem.free = nxt_h2p_frame_header(frame->mem.free, n,
+                                               NXT_H2P_DATA, flags, st->id);
+
+        slice->mem.start = b->mem.pos;
+        slice->mem.pos = b->mem.pos;
+        slice->mem.free = b->mem.pos + n;
+        slice->mem.end = slice->mem.free;
+
+        slice->parent = b;
+        b->retain++;
+
+        b->mem.pos += n;
+
+        st->send_window -= n;
+        h2p->send_window -= n;
+        st->sent += n;
+
+        frame->next = slice;
+        *tail = frame;
+        tail = &slice->next;
+    }
+
+    if (out != NULL) {
+        nxt_h2p_conn_write(task, h2p, out);
+    }
+
+    return;
+
+fail:
+
+    if (out != NULL) {
+        nxt_h2p_conn_write(task, h2p, out);
+    }
+
+    nxt_h2p_stream_reset(task, st, NXT_H2P_INTERNAL_ERROR);
+}
+
+
+static void
+nxt_h2p_buf_release(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_buf_parent_completion(task, obj);
+}
+
+
+/*
+ * Passes frames of a stream to the connection.  The "last" buffer is
+ * passed even for a reset stream to close the request only after the
+ * stream frames queued before have been sent.
+ */
+
+static void
+nxt_h2p_stream_write(nxt_task_t *task, nxt_h2p_stream_t *st, nxt_buf_t *b)
+{
+    nxt_buf_t         *next;
+    nxt_work_queue_t  *wq;
+
+    if (!st->reset) {
+        nxt_h2p_conn_write(task, st->h2p, b);
+        return;
+    }
+
+    wq = &task->thread->engine->fast_work_queue;
+
+    while (b != NULL) {
+        next = b->next;
+        b->next = NULL;
+
+        if (nxt_buf_is_last(b)) {
+            nxt_h2p_conn_write(task, st->h2p, b);
+
+        } else {
+            nxt_work_queue_add(wq, b->completion_handler, task, b, b->parent);
+        }
+
+        b = next;
+    }
+}
+
+
+static void
+nxt_h2p_stream_drop(nxt_task_t *task, nxt_h2p_stream_t *st)
+{
+    nxt_buf_t         *b, *next;
+    nxt_work_queue_t  *wq;
+
+    wq = &task->thread->engine->fast_work_queue;
+
+    b = st->out;
+    st->out = NULL;
+
+    while (b != NULL) {
+        next = b->next;
+        b->next = NULL;
+
+        if (!nxt_buf_is_sync(b)) {
+            nxt_work_queue_add(wq, nxt_h2p_buf_release, task, b, NULL);
+
+        } else if (nxt_buf_is_last(b)) {
+            nxt_h2p_conn_write(task, st->h2p, b);
+
+        } else {
+            nxt_work_queue_add(wq, b->completion_handler, task, b, b->parent);
+        }
+
+        b = next;
+    }
+
+    if (st->blocked) {
+        nxt_queue_remove(&st->blocked_link);
+        nxt_queue_self(&st->blocked_link);
+        st->blocked = 0;
+    }
+}
+
+
+static void
+nxt_h2p_stream_reset(nxt_task_t *task, nxt_h2p_stream_t *st,
+    nxt_h2p_error_t error)
+{
+    nxt_h2proto_t  *h2p;
+
+    h2p = st->h2p;
+
+    if (!st->reset && !h2p->closing) {
+        (void) nxt_h2p_rst_stream(task, h2p, st->id, error);
+    }
+
+    st->reset = 1;
+    st->out_closed = 1;
+
+    nxt_h2p_stream_drop(task, st);
+}
+
+
+static void
+nxt_h2p_stream_abort(nxt_task_t *task, nxt_h2p_stream_t *st)
+{
+    nxt_http_request_t  *r;
+
+    if (st->aborted) {
+        return;
+    }
+
+    st->aborted = 1;
+
+    r = st->request;
+
+    r->state->error_handler(&r->task, r, st);
+}
+
+
+static void
+nxt_h2p_streams_unblock(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    nxt_queue_link_t  *lnk, *next, *last;
+    nxt_h2p_stream_t  *st;
+
+    if (nxt_queue_is_empty(&h2p->blocked)) {
+        return;
+    }
+
+    lnk = nxt_queue_first(&h2p->blocked);
+    last = nxt_queue_last(&h2p->blocked);
+
+    for ( ;; ) {
+        if (h2p->send_window <= 0) {
+            return;
+        }
+
+        next = nxt_queue_next(lnk);
+
+        st = nxt_queue_link_data(lnk, nxt_h2p_stream_t, blocked_link);
+
+        if (st->send_window > 0) {
+            nxt_queue_remove(lnk);
+            nxt_queue_self(lnk);
+            st->blocked = 0;
+
+            nxt_h2p_stream_flush(task, st);
+        }
+
+        if (lnk == last) {
+            return;
+        }
+
+        lnk = next;
+    }
+}
+
+
+nxt_off_t
+nxt_h2p_request_body_bytes_sent(nxt_task_t *task, nxt_http_proto_t proto)
+{
+    return proto.h2->sent;
+}
+
+
+void
+nxt_h2p_request_discard(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_buf_t *last)
+{
+    nxt_h2p_stream_t  *st;
+
+    nxt_debug(task, "h2p request discard");
+
+    st = r->proto.h2;
+
+    if (!st->out_closed) {
+        nxt_h2p_stream_reset(task, st, NXT_H2P_INTERNAL_ERROR);
+
+    } else {
+        nxt_h2p_stream_drop(task, st);
+    }
+
+    if (last != NULL) {
+        nxt_h2p_conn_write(task, st->h2p, last);
+    }
+}
+
+
+void
+nxt_h2p_request_close(nxt_task_t *task, nxt_http_proto_t proto,
+    nxt_socket_conf_joint_t *joint)
+{
+    nxt_conn_t          *c;
+    nxt_h2proto_t       *h2p;
+    nxt_h2p_stream_t    *st;
+    nxt_event_engine_t  *engine;
+
+    st = proto.h2;
+    h2p = st->h2p;
+    c = h2p->conn;
+
+    nxt_debug(task, "h2p stream %uD close", st->id);
+
+    nxt_router_conf_release(task, joint);
+
+    nxt_h2p_stream_drop(task, st);
+
+    if (!st->reset && !h2p->closing) {
+        if (!st->out_closed) {
+            (void) nxt_h2p_rst_stream(task, h2p, st->id,
+                                      NXT_H2P_INTERNAL_ERROR);
+
+        } else if (!st->in_closed) {
+            /* The response is complete, the rest of request is not needed. */
+            (void) nxt_h2p_rst_stream(task, h2p, st->id, NXT_H2P_NO_ERROR);
+        }
+    }
+
+    nxt_queue_remove(&st->link);
+    h2p->nstreams--;
+
+    task = &c->task;
+
+    if (h2p->nstreams == 0 && !h2p->closing) {
+        if (h2p->goaway) {
+            nxt_h2p_conn_shutdown(task, h2p);
+            return;
+        }
+
+        engine = task->thread->engine;
+
+        nxt_conn_idle(engine, c);
+        h2p->idle = 1;
+
+        nxt_conn_timer(engine, c, c->read_state, &c->read_timer);
+    }
+
+    nxt_h2p_conn_close_test(task, h2p);
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_priority(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    if (nxt_slow_path(frame->stream_id == 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length != 5)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_rst_stream(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    nxt_h2p_stream_t  *st;
+
+    if (nxt_slow_path(frame->stream_id == 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length != 4)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    st = nxt_h2p_stream_find(h2p, frame->stream_id);
+
+    if (st == NULL) {
+        return (frame->stream_id > h2p->last_stream_id)
+               ? NXT_H2P_PROTOCOL_ERROR : NXT_H2P_NO_ERROR;
+    }
+
+    nxt_debug(task, "h2p stream %uD reset by client: %uD",
+              st->id, nxt_h2p_get32(frame->payload));
+
+    st->reset = 1;
+    st->in_closed = 1;
+    st->out_closed = 1;
+
+    nxt_h2p_stream_drop(task, st);
+    nxt_h2p_stream_abort(task, st);
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_settings(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    u_char            *p, *end;
+    int64_t           window;
+    uint32_t          value;
+    nxt_uint_t        id;
+    nxt_h2p_stream_t  *st;
+
+    if (nxt_slow_path(frame->stream_id != 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (frame->flags & NXT_H2P_FLAG_ACK) {
+        return (frame->length == 0) ? NXT_H2P_NO_ERROR
+                                    : NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length % NXT_H2P_SETTINGS_SIZE != 0)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    p = frame->payload;
+    end = p + frame->length;
+
+    while (p < end) {
+        id = nxt_h2p_get16(p);
+        value = nxt_h2p_get32(&p[2]);
+
+        p += NXT_H2P_SETTINGS_SIZE;
+
+        switch (id) {
+
+        case NXT_H2P_ENABLE_PUSH:
+            if (nxt_slow_path(value > 1)) {
+                return NXT_H2P_PROTOCOL_ERROR;
+            }
+
+            break;
+
+        case NXT_H2P_INITIAL_WINDOW_SIZE:
+            if (nxt_slow_path(value > NXT_H2P_MAX_WINDOW_SIZE)) {
+                return NXT_H2P_FLOW_CONTROL_ERROR;
+            }
+
+            /* The difference applies to all open streams. */
+
+            nxt_queue_each(st, &h2p->streams, nxt_h2p_stream_t, link) {
+
+                window = (int64_t) st->send_window + value
+                         - h2p->init_send_window;
+
+                if (nxt_slow_path(window > NXT_H2P_MAX_WINDOW_SIZE)) {
+                    return NXT_H2P_FLOW_CONTROL_ERROR;
+                }
+
+                st->send_window = window;
+
+            } nxt_queue_loop;
+
+            h2p->init_send_window = value;
+            break;
+
+        case NXT_H2P_MAX_FRAME_SIZE:
+            if (nxt_slow_path(value < NXT_H2P_DEFAULT_FRAME_SIZE
+                              || value > NXT_H2P_MAX_FRAME_SIZE_LIMIT))
+            {
+                return NXT_H2P_PROTOCOL_ERROR;
+            }
+
+            h2p->frame_size = value;
+            break;
+
+        default:
+            /*
+             * The dynamic table is not used for responses and server push
+             * is not supported, so other settings do not matter.
+             */
+            break;
+        }
+    }
+
+    if (nxt_slow_path(nxt_h2p_control_send(task, h2p, NXT_H2P_SETTINGS,
+                                           NXT_H2P_FLAG_ACK, 0, NULL, 0)
+                      != NXT_OK))
+    {
+        return NXT_H2P_INTERNAL_ERROR;
+    }
+
+    h2p->settings = 1;
+
+    nxt_h2p_streams_unblock(task, h2p);
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_push_promise(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    /* Clients cannot push. */
+    return NXT_H2P_PROTOCOL_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_ping(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    if (nxt_slow_path(frame->stream_id != 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length != 8)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    if (frame->flags & NXT_H2P_FLAG_ACK) {
+        return NXT_H2P_NO_ERROR;
+    }
+
+    if (nxt_slow_path(nxt_h2p_control_send(task, h2p, NXT_H2P_PING,
+                                           NXT_H2P_FLAG_ACK, 0,
+                                           frame->payload, 8)
+                      != NXT_OK))
+    {
+        return NXT_H2P_INTERNAL_ERROR;
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_goaway(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    if (nxt_slow_path(frame->stream_id != 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (nxt_slow_path(frame->length < 8)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    nxt_debug(task, "h2p goaway: last stream %uD, error %uD",
+              nxt_h2p_get32(frame->payload) & 0x7fffffff,
+              nxt_h2p_get32(&frame->payload[4]));
+
+    /* The open streams are completed, new ones are not accepted. */
+
+    h2p->goaway = 1;
+
+    if (h2p->nstreams == 0) {
+        nxt_h2p_conn_shutdown(task, h2p);
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_h2p_error_t
+nxt_h2p_frame_window_update(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_frame_t *frame)
+{
+    uint32_t          increment;
+    nxt_h2p_stream_t  *st;
+
+    if (nxt_slow_path(frame->length != 4)) {
+        return NXT_H2P_FRAME_SIZE_ERROR;
+    }
+
+    increment = nxt_h2p_get32(frame->payload) & 0x7fffffff;
+
+    if (nxt_slow_path(increment == 0)) {
+        return NXT_H2P_PROTOCOL_ERROR;
+    }
+
+    if (frame->stream_id == 0) {
+        if (nxt_slow_path(h2p->send_window
+                          > (int32_t) (NXT_H2P_MAX_WINDOW_SIZE - increment)))
+        {
+            return NXT_H2P_FLOW_CONTROL_ERROR;
+        }
+
+        h2p->send_window += increment;
+
+        nxt_h2p_streams_unblock(task, h2p);
+
+        return NXT_H2P_NO_ERROR;
+    }
+
+    st = nxt_h2p_stream_find(h2p, frame->stream_id);
+
+    if (st == NULL) {
+        return (frame->stream_id > h2p->last_stream_id)
+               ? NXT_H2P_PROTOCOL_ERROR : NXT_H2P_NO_ERROR;
+    }
+
+    if (nxt_slow_path(st->send_window
+                      > (int32_t) (NXT_H2P_MAX_WINDOW_SIZE - increment)))
+    {
+        return NXT_H2P_FLOW_CONTROL_ERROR;
+    }
+
+    st->send_window += increment;
+
+    if (st->blocked && st->send_window > 0 && h2p->send_window > 0) {
+        nxt_queue_remove(&st->blocked_link);
+        nxt_queue_self(&st->blocked_link);
+        st->blocked = 0;
+
+        nxt_h2p_stream_flush(task, st);
+    }
+
+    return NXT_H2P_NO_ERROR;
+}
+
+
+static nxt_buf_t *
+nxt_h2p_frame_alloc(nxt_h2proto_t *h2p, size_t size)
+{
+    return nxt_buf_mem_alloc(h2p->conn->mem_pool,
+                             NXT_H2P_FRAME_HEADER_SIZE + size, 0);
+}
+
+
+static u_char *
+nxt_h2p_frame_header(u_char *p, size_t length, nxt_uint_t type,
+    nxt_uint_t flags, uint32_t id)
+{
+    *p++ = (u_char) (length >> 16);
+    *p++ = (u_char) (length >> 8);
+    *p++ = (u_char) length;
+    *p++ = (u_char) type;
+    *p++ = (u_char) flags;
+
+    return nxt_h2p_put32(p, id);
+}
+
+
+static nxt_int_t
+nxt_h2p_control_send(nxt_task_t *task, nxt_h2proto_t *h2p, nxt_uint_t type,
+    nxt_uint_t flags, uint32_t id, u_char *payload, size_t length)
+{
+    u_char     *p;
+    nxt_buf_t  *b;
+
+    b = nxt_h2p_frame_alloc(h2p, length);
+    if (nxt_slow_path(b == NULL)) {
+        return NXT_ERROR;
+    }
+
+    p = nxt_h2p_frame_header(b->mem.free, length, type, flags, id);
+
+    if (length != 0) {
+        p = nxt_cpymem(p, payload, length);
+    }
+
+    b->mem.free = p;
+
+    nxt_h2p_conn_write(task, h2p, b);
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_window_update(nxt_task_t *task, nxt_h2proto_t *h2p, uint32_t id,
+    uint32_t increment)
+{
+    u_char  payload[4];
+
+    (void) nxt_h2p_put32(payload, increment);
+
+    return nxt_h2p_control_send(task, h2p, NXT_H2P_WINDOW_UPDATE, 0, id,
+                                payload, 4);
+}
+
+
+static nxt_int_t
+nxt_h2p_rst_stream(nxt_task_t *task, nxt_h2proto_t *h2p, uint32_t id,
+    nxt_h2p_error_t error)
+{
+    u_char  payload[4];
+
+    nxt_debug(task, "h2p stream %uD rst: %d", id, error);
+
+    (void) nxt_h2p_put32(payload, error);
+
+    return nxt_h2p_control_send(task, h2p, NXT_H2P_RST_STREAM, 0, id,
+                                payload, 4);
+}
+
+
+static nxt_int_t
+nxt_h2p_goaway(nxt_task_t *task, nxt_h2proto_t *h2p, nxt_h2p_error_t error)
+{
+    u_char  payload[8];
+
+    nxt_debug(task, "h2p goaway: %d", error);
+
+    h2p->goaway = 1;
+
+    (void) nxt_h2p_put32(payload, h2p->last_stream_id);
+    (void) nxt_h2p_put32(&payload[4], error);
+
+    return nxt_h2p_control_send(task, h2p, NXT_H2P_GOAWAY, 0, 0, payload, 8);
+}
+
+
+static const nxt_conn_state_t  nxt_h2p_write_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_h2p_conn_sent,
+    .error_handler = nxt_h2p_conn_write_error,
+
+    .timer_handler = nxt_h2p_conn_send_timeout,
+    .timer_value = nxt_h2p_conn_timer_value,
+    .timer_data = offsetof(nxt_h2proto_t, send_timeout),
+    .timer_autoreset = 1,
+};
+
+
+static void
+nxt_h2p_conn_write(nxt_task_t *task, nxt_h2proto_t *h2p, nxt_buf_t *b)
+{
+    nxt_conn_t  *c;
+    nxt_bool_t  empty;
+
+    if (nxt_slow_path(h2p->write_error)) {
+        nxt_h2p_bufs_complete(task, b);
+        return;
+    }
+
+    c = h2p->conn;
+    empty = (c->write == NULL);
+
+    *h2p->write_tail = b;
+
+    while (b->next != NULL) {
+        b = b->next;
+    }
+
+    h2p->write_tail = &b->next;
+
+    if (empty) {
+        nxt_conn_write(task->thread->engine, c);
+    }
+}
+
+
+/*
+ * Buffers are completed one by one, because adjacent buffers
+ * with the same completion handler may belong to different streams.
+ */
+
+static void
+nxt_h2p_bufs_complete(nxt_task_t *task, nxt_buf_t *b)
+{
+    nxt_buf_t         *next;
+    nxt_work_queue_t  *wq;
+
+    wq = &task->thread->engine->fast_work_queue;
+
+    while (b != NULL) {
+        next = b->next;
+        b->next = NULL;
+
+        nxt_work_queue_add(wq, b->completion_handler, task, b, b->parent);
+
+        b = next;
+    }
+}
+
+
+static void
+nxt_h2p_conn_sent(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_buf_t         *b, *next;
+    nxt_conn_t        *c;
+    nxt_h2proto_t     *h2p;
+    nxt_work_queue_t  *wq;
+
+    c = obj;
+    h2p = data;
+
+    nxt_debug(task, "h2p conn sent");
+
+    wq = &task->thread->engine->fast_work_queue;
+
+    b = c->write;
+
+    while (b != NULL) {
+        if (!nxt_buf_is_sync(b) && nxt_buf_used_size(b) != 0) {
+            break;
+        }
+
+        next = b->next;
+        b->next = NULL;
+
+        nxt_work_queue_add(wq, b->completion_handler, task, b, b->parent);
+
+        b = next;
+    }
+
+    c->write = b;
+
+    if (b != NULL) {
+        nxt_conn_write(task->thread->engine, c);
+        return;
+    }
+
+    h2p->write_tail = &c->write;
+
+    nxt_h2p_conn_close_test(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_close(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_h2proto_t  *h2p;
+
+    h2p = data;
+
+    nxt_debug(task, "h2p conn close");
+
+    nxt_h2p_conn_shutdown(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_error(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_h2proto_t  *h2p;
+
+    h2p = data;
+
+    nxt_debug(task, "h2p conn error");
+
+    nxt_h2p_conn_fail(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_write_error(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_h2proto_t  *h2p;
+
+    h2p = data;
+
+    nxt_debug(task, "h2p conn write error");
+
+    nxt_h2p_conn_fail(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_read_timeout(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t          *c;
+    nxt_timer_t         *timer;
+    nxt_h2proto_t       *h2p;
+    nxt_h2p_stream_t    *st;
+    nxt_http_request_t  *r;
+
+    timer = obj;
+
+    nxt_debug(task, "h2p conn read timeout");
+
+    c = nxt_read_timer_conn(timer);
+    h2p = c->socket.data;
+
+    if (h2p->nstreams == 0) {
+        if (!h2p->goaway) {
+            (void) nxt_h2p_goaway(task, h2p, NXT_H2P_NO_ERROR);
+        }
+
+        nxt_h2p_conn_shutdown(task, h2p);
+        return;
+    }
+
+    nxt_queue_each(st, &h2p->streams, nxt_h2p_stream_t, link) {
+
+        if (st->body_wait) {
+            st->body_wait = 0;
+            st->body_status = NXT_HTTP_REQUEST_TIMEOUT;
+
+            r = st->request;
+
+            nxt_http_request_error(&r->task, r, NXT_HTTP_REQUEST_TIMEOUT);
+        }
+
+    } nxt_queue_loop;
+
+    if (!h2p->closing) {
+        nxt_conn_timer(task->thread->engine, c, c->read_state,
+                       &c->read_timer);
+    }
+}
+
+
+static void
+nxt_h2p_conn_send_timeout(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t   *c;
+    nxt_timer_t  *timer;
+
+    timer = obj;
+
+    nxt_debug(task, "h2p conn send timeout");
+
+    c = nxt_write_timer_conn(timer);
+
+    nxt_h2p_conn_fail(task, c->socket.data);
+}
+
+
+static nxt_msec_t
+nxt_h2p_conn_read_timer_value(nxt_conn_t *c, uintptr_t data)
+{
+    nxt_h2proto_t  *h2p;
+
+    h2p = c->socket.data;
+
+    return (h2p->nstreams == 0) ? h2p->idle_timeout : h2p->body_read_timeout;
+}
+
+
+static nxt_msec_t
+nxt_h2p_conn_timer_value(nxt_conn_t *c, uintptr_t data)
+{
+    return nxt_value_at(nxt_msec_t, c->socket.data, data);
+}
+
+
+/* The connection cannot be written anymore. */
+
+static void
+nxt_h2p_conn_fail(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    nxt_buf_t   *b;
+    nxt_conn_t  *c;
+
+    c = h2p->conn;
+
+    h2p->write_error = 1;
+    c->block_write = 1;
+
+    b = c->write;
+    c->write = NULL;
+    h2p->write_tail = &c->write;
+
+    nxt_h2p_bufs_complete(task, b);
+
+    nxt_h2p_conn_shutdown(task, h2p);
+
+    nxt_h2p_conn_close_test(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_protocol_error(nxt_task_t *task, nxt_h2proto_t *h2p,
+    nxt_h2p_error_t error)
+{
+    nxt_log(task, NXT_LOG_INFO, "h2p connection error: %d", error);
+
+    if (!h2p->write_error) {
+        (void) nxt_h2p_goaway(task, h2p, error);
+    }
+
+    nxt_h2p_conn_shutdown(task, h2p);
+}
+
+
+/*
+ * Stops reading and aborts the open streams, the connection is closed
+ * once the streams are closed and the queued frames are sent.
+ */
+
+static void
+nxt_h2p_conn_shutdown(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    nxt_conn_t          *c;
+    nxt_h2p_stream_t    *st;
+    nxt_event_engine_t  *engine;
+
+    if (h2p->closing) {
+        return;
+    }
+
+    nxt_debug(task, "h2p conn shutdown");
+
+    h2p->closing = 1;
+
+    c = h2p->conn;
+    engine = task->thread->engine;
+
+    if (h2p->idle) {
+        nxt_conn_active(engine, c);
+        h2p->idle = 0;
+    }
+
+    c->block_read = 1;
+    nxt_timer_disable(engine, &c->read_timer);
+
+    nxt_queue_each(st, &h2p->streams, nxt_h2p_stream_t, link) {
+
+        nxt_h2p_stream_drop(task, st);
+        nxt_h2p_stream_abort(task, st);
+
+    } nxt_queue_loop;
+
+    nxt_h2p_conn_close_test(task, h2p);
+}
+
+
+static void
+nxt_h2p_conn_close_test(nxt_task_t *task, nxt_h2proto_t *h2p)
+{
+    nxt_conn_t  *c;
+
+    c = h2p->conn;
+
+    if (!h2p->closing || h2p->closed || h2p->nstreams != 0
+        || c->write != NULL)
+    {
+        return;
+    }
+
+    h2p->closed = 1;
+
+    /* The connection is freed out of the current frame processing. */
+
+    nxt_work_queue_add(&task->thread->engine->fast_work_queue,
+                       nxt_h2p_conn_finalize, &c->task, c, h2p);
+}
+
+
+static void
+nxt_h2p_conn_finalize(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = obj;
+
+    nxt_debug(task, "h2p conn finalize");
+
+    c->socket.data = NULL;
+
+#if (NXT_TLS)
+
+    if (c->u.tls != NULL) {
+        c->write_state = &nxt_h2p_shutdown_state;
+
+        c->io->shutdown(task, c, NULL);
+        return;
+    }
+
+#endif
+
+    nxt_h2p_conn_closing(task, c, NULL);
+}
+
+
+#if (NXT_TLS)
+
+static const nxt_conn_state_t  nxt_h2p_shutdown_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_h2p_conn_closing,
+    .close_handler = nxt_h2p_conn_closing,
+    .error_handler = nxt_h2p_conn_closing,
+};
+
+#endif
+
+
+static void
+nxt_h2p_conn_closing(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = obj;
+
+    nxt_debug(task, "h2p conn closing");
+
+    c->write_state = &nxt_h2p_close_state;
+
+    nxt_conn_close(task->thread->engine, c);
+}
+
+
+static const nxt_conn_state_t  nxt_h2p_close_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_h2p_conn_free,
+};
+
+
+static void
+nxt_h2p_conn_free(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t          *c;
+    nxt_listen_event_t  *lev;
+    nxt_event_engine_t  *engine;
+
+    c = obj;
+
+    nxt_debug(task, "h2p conn free");
+
+    engine = task->thread->engine;
+
+    nxt_sockaddr_cache_free(engine, c);
+
+    lev = c->listen;
+
+    nxt_conn_free(task, c);
+
+    nxt_router_listen_event_release(&engine->task, lev, NULL);
+}
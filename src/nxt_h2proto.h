@@ -0,0 +1,151 @@
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#ifndef _NXT_H2PROTO_H_INCLUDED_
+#define _NXT_H2PROTO_H_INCLUDED_
+
+
+#include <nxt_main.h>
+#include <nxt_http_parse.h>
+#include <nxt_http.h>
+#include <nxt_router.h>
+
+
+#define NXT_H2P_FRAME_HEADER_SIZE    9
+#define NXT_H2P_DEFAULT_FRAME_SIZE   16384
+#define NXT_H2P_DEFAULT_WINDOW_SIZE  65535
+#define NXT_H2P_MAX_WINDOW_SIZE      0x7fffffff
+#define NXT_H2P_HPACK_TABLE_SIZE     4096
+#define NXT_H2P_HPACK_ENTRIES        128
+
+
+typedef struct {
+    nxt_str_t                 name;
+    nxt_str_t                 value;
+} nxt_h2p_hpack_entry_t;
+
+
+/*
+ * The HPACK decoder dynamic table.  Entries are kept in a ring, the newest
+ * entry is at the "next - 1" position and has the smallest index.
+ */
+
+typedef struct {
+    nxt_mp_t                  *mem_pool;
+    nxt_h2p_hpack_entry_t     entries[NXT_H2P_HPACK_ENTRIES];
+    uint32_t                  next;
+    uint32_t                  count;
+    uint32_t                  size;
+    uint32_t                  max_size;
+} nxt_h2p_hpack_t;
+
+
+typedef nxt_int_t (*nxt_h2p_hpack_handler_t)(void *ctx, nxt_str_t *name,
+    nxt_str_t *value);
+
+
+struct nxt_h2p_stream_s {
+    nxt_http_request_parse_t  parser;
+
+    nxt_http_request_t        *request;
+    nxt_h2proto_t             *h2p;
+
+    nxt_queue_link_t          link;          /* nxt_h2proto_t.streams */
+    nxt_queue_link_t          blocked_link;  /* nxt_h2proto_t.blocked */
+
+    nxt_buf_t                 *out;
+
+    nxt_off_t                 received;
+    nxt_off_t                 sent;
+
+    uint32_t                  id;
+    int32_t                   send_window;
+    int32_t                   recv_window;
+
+    nxt_http_status_t         body_status:16;
+
+    uint8_t                   in_closed;     /* 1 bit */
+    uint8_t                   out_closed;    /* 1 bit */
+    uint8_t                   reset;         /* 1 bit */
+    uint8_t                   body_wait;     /* 1 bit */
+    uint8_t                   blocked;       /* 1 bit */
+    uint8_t                   aborted;       /* 1 bit */
+};
+
+
+struct nxt_h2proto_s {
+    nxt_h2p_hpack_t           hpack;
+
+    nxt_queue_t               streams;       /* of nxt_h2p_stream_t */
+    nxt_queue_t               blocked;       /* of nxt_h2p_stream_t */
+
+    nxt_buf_t                 **write_tail;
+
+    /* A header block split into HEADERS and CONTINUATION frames. */
+    nxt_buf_t                 *header_block;
+    uint32_t                  header_stream_id;
+    uint8_t                   header_flags;
+
+    uint32_t                  last_stream_id;
+    uint32_t                  nstreams;
+    uint32_t                  max_streams;
+
+    int32_t                   send_window;
+    int32_t                   recv_window;
+    int32_t                   init_send_window;
+    int32_t                   init_recv_window;
+    uint32_t                  frame_size;
+
+    nxt_msec_t                idle_timeout;
+    nxt_msec_t                body_read_timeout;
+    nxt_msec_t                send_timeout;
+    uint32_t                  header_limit;
+
+    uint8_t                   preface;       /* 1 bit */
+    uint8_t                   settings;      /* 1 bit */
+    uint8_t                   idle;          /* 1 bit */
+    uint8_t                   goaway;        /* 1 bit */
+    uint8_t                   closing;       /* 1 bit */
+    uint8_t                   write_error;   /* 1 bit */
+    uint8_t                   closed;        /* 1 bit */
+
+    nxt_conn_t                *conn;
+
+    nxt_http_route_memo_t     *route_memo;
+};
+
+
+nxt_inline u_char *
+nxt_h2p_put32(u_char *p, uint32_t n)
+{
+    *p++ = (u_char) (n >> 24);
+    *p++ = (u_char) (n >> 16);
+    *p++ = (u_char) (n >> 8);
+    *p++ = (u_char) n;
+
+    return p;
+}
+
+
+void nxt_h2p_request_body_read(nxt_task_t *task, nxt_http_request_t *r);
+void nxt_h2p_request_local_addr(nxt_task_t *task, nxt_http_request_t *r);
+void nxt_h2p_request_header_send(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_work_handler_t body_handler, void *data);
+void nxt_h2p_request_send(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_buf_t *out);
+nxt_off_t nxt_h2p_request_body_bytes_sent(nxt_task_t *task,
+    nxt_http_proto_t proto);
+void nxt_h2p_request_discard(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_buf_t *last);
+void nxt_h2p_request_close(nxt_task_t *task, nxt_http_proto_t proto,
+    nxt_socket_conf_joint_t *joint);
+
+nxt_int_t nxt_h2p_hpack_decode(nxt_h2p_hpack_t *hpack, nxt_mp_t *mp,
+    u_char *pos, u_char *end, nxt_h2p_hpack_handler_t handler, void *ctx);
+size_t nxt_h2p_hpack_field_size(size_t name_length, size_t value_length);
+u_char *nxt_h2p_hpack_status(u_char *p, nxt_uint_t status);
+u_char *nxt_h2p_hpack_field(u_char *p, u_char *name, size_t name_length,
+    u_char *value, size_t value_length);
+
+#endif  /* _NXT_H2PROTO_H_INCLUDED_ */
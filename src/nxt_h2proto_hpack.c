@@ -0,0 +1,633 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_router.h>
+#include <nxt_http.h>
+#include <nxt_h2proto.h>
+
+
+/*
+ * HPACK header compression, RFC 7541.  Responses are encoded with
+ * literal fields without indexing, so only the decoder maintains
+ * a dynamic table.
+ */
+
+
+#define NXT_H2P_HPACK_STATIC_ENTRIES  61
+#define NXT_H2P_HPACK_ENTRY_OVERHEAD  32
+#define NXT_H2P_HUFFMAN_MAX_BITS      30
+
+
+static nxt_int_t nxt_h2p_hpack_int(u_char **pos, u_char *end,
+    nxt_uint_t prefix, uint32_t *value);
+static nxt_int_t nxt_h2p_hpack_string(nxt_mp_t *mp, u_char **pos, u_char *end,
+    nxt_str_t *str);
+static nxt_int_t nxt_h2p_huffman_decode(u_char *src, size_t length,
+    u_char *dst, size_t *size);
+static nxt_int_t nxt_h2p_hpack_get(nxt_h2p_hpack_t *hpack, nxt_mp_t *mp,
+    uint32_t index, nxt_str_t *name, nxt_str_t *value);
+static nxt_int_t nxt_h2p_hpack_add(nxt_h2p_hpack_t *hpack, nxt_str_t *name,
+    nxt_str_t *value);
+static void nxt_h2p_hpack_evict(nxt_h2p_hpack_t *hpack, size_t size);
+static u_char *nxt_h2p_hpack_int_encode(u_char *p, u_char first,
+    nxt_uint_t prefix, size_t value);
+
+
+static const nxt_h2p_hpack_entry_t  nxt_h2p_hpack_static[] = {
+    { nxt_string(":authority"),                  nxt_null_string },
+    { nxt_string(":method"),                     nxt_string("GET") },
+    { nxt_string(":method"),                     nxt_string("POST") },
+    { nxt_string(":path"),                       nxt_string("/") },
+    { nxt_string(":path"),                       nxt_string("/index.html") },
+    { nxt_string(":scheme"),                     nxt_string("http") },
+    { nxt_string(":scheme"),                     nxt_string("https") },
+    { nxt_string(":status"),                     nxt_string("200") },
+    { nxt_string(":status"),                     nxt_string("204") },
+    { nxt_string(":status"),                     nxt_string("206") },
+    { nxt_string(":status"),                     nxt_string("304") },
+    { nxt_string(":status"),                     nxt_string("400") },
+    { nxt_string(":status"),                     nxt_string("404") },
+    { nxt_string(":status"),                     nxt_string("500") },
+    { nxt_string("accept-charset"),              nxt_null_string },
+    { nxt_string("accept-encoding"),             nxt_string("gzip, deflate") },
+    { nxt_string("accept-language"),             nxt_null_string },
+    { nxt_string("accept-ranges"),               nxt_null_string },
+    { nxt_string("accept"),                      nxt_null_string },
+    { nxt_string("access-control-allow-origin"), nxt_null_string },
+    { nxt_string("age"),                         nxt_null_string },
+    { nxt_string("allow"),                       nxt_null_string },
+    { nxt_string("authorization"),               nxt_null_string },
+    { nxt_string("cache-control"),               nxt_null_string },
+    { nxt_string("content-disposition"),         nxt_null_string },
+    { nxt_string("content-encoding"),            nxt_null_string },
+    { nxt_string("content-language"),            nxt_null_string },
+    { nxt_string("content-length"),              nxt_null_string },
+    { nxt_string("content-location"),            nxt_null_string },
+    { nxt_string("content-range"),               nxt_null_string },
+    { nxt_string("content-type"),                nxt_null_string },
+    { nxt_string("cookie"),                      nxt_null_string },
+    { nxt_string("date"),                        nxt_null_string },
+    { nxt_string("etag"),                        nxt_null_string },
+    { nxt_string("expect"),                      nxt_null_string },
+    { nxt_string("expires"),                     nxt_null_string },
+    { nxt_string("from"),                        nxt_null_string },
+    { nxt_string("host"),                        nxt_null_string },
+    { nxt_string("if-match"),                    nxt_null_string },
+    { nxt_string("if-modified-since"),           nxt_null_string },
+    { nxt_string("if-none-match"),               nxt_null_string },
+    { nxt_string("if-range"),                    nxt_null_string },
+    { nxt_string("if-unmodified-since"),         nxt_null_string },
+    { nxt_string("last-modified"),               nxt_null_string },
+    { nxt_string("link"),                        nxt_null_string },
+    { nxt_string("location"),                    nxt_null_string },
+    { nxt_string("max-forwards"),                nxt_null_string },
+    { nxt_string("proxy-authenticate"),          nxt_null_string },
+    { nxt_string("proxy-authorization"),         nxt_null_string },
+    { nxt_string("range"),                       nxt_null_string },
+    { nxt_string("referer"),                     nxt_null_string },
+    { nxt_string("refresh"),                     nxt_null_string },
+    { nxt_string("retry-after"),                 nxt_null_string },
+    { nxt_string("server"),                      nxt_null_string },
+    { nxt_string("set-cookie"),                  nxt_null_string },
+    { nxt_string("strict-transport-security"),   nxt_null_string },
+    { nxt_string("transfer-encoding"),           nxt_null_string },
+    { nxt_string("user-agent"),                  nxt_null_string },
+    { nxt_string("vary"),                        nxt_null_string },
+    { nxt_string("via"),                         nxt_null_string },
+    { nxt_string("www-authenticate"),            nxt_null_string },
+};
+
+
+/*
+ * The canonical Huffman code of RFC 7541 Appendix B: the number of codes
+ * of each bit length and the symbols ordered by their codes.  The EOS
+ * symbol is the last code and is not stored.
+ */
+
+static const uint8_t  nxt_h2p_huffman_counts[] = {
+    0, 0, 0, 0, 0, 10, 26, 32, 6, 0, 5, 3, 2, 6, 2, 3, 0, 0, 0, 3, 8, 13, 26,
+    29, 12, 4, 15, 19, 29, 0, 4,
+};
+
+
+static const u_char  nxt_h2p_huffman_symbols[] = {
+    48, 49, 50, 97, 99, 101, 105, 111, 115, 116, 32, 37, 45, 46, 47, 51, 52,
+    53, 54, 55, 56, 57, 61, 65, 95, 98, 100, 102, 103, 104, 108, 109, 110,
+    112, 114, 117, 58, 66, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79,
+    80, 81, 82, 83, 84, 85, 86, 87, 89, 106, 107, 113, 118, 119, 120, 121,
+    122, 38, 42, 44, 59, 88, 90, 33, 34, 40, 41, 63, 39, 43, 124, 35, 62, 0,
+    36, 64, 91, 93, 126, 94, 125, 60, 96, 123, 92, 195, 208, 128, 130, 131,
+    162, 184, 194, 224, 226, 153, 161, 167, 172, 176, 177, 179, 209, 216, 217,
+    227, 229, 230, 129, 132, 133, 134, 136, 146, 154, 156, 160, 163, 164, 169,
+    170, 173, 178, 181, 185, 186, 187, 189, 190, 196, 198, 228, 232, 233, 1,
+    135, 137, 138, 139, 140, 141, 143, 147, 149, 150, 151, 152, 155, 157, 158,
+    165, 166, 168, 174, 175, 180, 182, 183, 188, 191, 197, 231, 239, 9, 142,
+    144, 145, 148, 159, 171, 206, 215, 225, 236, 237, 199, 207, 234, 235, 192,
+    193, 200, 201, 202, 205, 210, 213, 218, 219, 238, 240, 242, 243, 255, 203,
+    204, 211, 212, 214, 221, 222, 223, 241, 244, 245, 246, 247, 248, 250, 251,
+    252, 253, 254, 2, 3, 4, 5, 6, 7, 8, 11, 12, 14, 15, 16, 17, 18, 19, 20,
+    21, 23, 24, 25, 26, 27, 28, 29, 30, 31, 127, 220, 249, 10, 13, 22,
+};
+
+
+nxt_int_t
+nxt_h2p_hpack_decode(nxt_h2p_hpack_t *hpack, nxt_mp_t *mp, u_char *pos,
+    u_char *end, nxt_h2p_hpack_handler_t handler, void *ctx)
+{
+    u_char      ch;
+    uint32_t    index;
+    nxt_int_t   ret;
+    nxt_str_t   name, value;
+    nxt_bool_t  fields, indexing;
+
+    fields = 0;
+
+    while (pos < end) {
+        ch = *pos;
+
+        if (ch & 0x80) {
+            /* An indexed header field. */
+
+            ret = nxt_h2p_hpack_int(&pos, end, 7, &index);
+            if (nxt_slow_path(ret != NXT_OK)) {
+                return ret;
+            }
+
+            ret = nxt_h2p_hpack_get(hpack, mp, index, &name, &value);
+            if (nxt_slow_path(ret != NXT_OK)) {
+                return ret;
+            }
+
+            goto field;
+        }
+
+        if ((ch & 0xe0) == 0x20) {
+            /* A dynamic table size update. */
+
+            if (nxt_slow_path(fields)) {
+                return NXT_DECLINED;
+            }
+
+            ret = nxt_h2p_hpack_int(&pos, end, 5, &index);
+            if (nxt_slow_path(ret != NXT_OK)) {
+                return ret;
+            }
+
+            if (nxt_slow_path(index > NXT_H2P_HPACK_TABLE_SIZE)) {
+                return NXT_DECLINED;
+            }
+
+            hpack->max_size = index;
+            nxt_h2p_hpack_evict(hpack, 0);
+
+            continue;
+        }
+
+        if (ch & 0x40) {
+            /* A literal header field with incremental indexing. */
+            indexing = 1;
+            ret = nxt_h2p_hpack_int(&pos, end, 6, &index);
+
+        } else {
+            /* A literal header field without indexing or never indexed. */
+            indexing = 0;
+            ret = nxt_h2p_hpack_int(&pos, end, 4, &index);
+        }
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return ret;
+        }
+
+        if (index != 0) {
+            ret = nxt_h2p_hpack_get(hpack, mp, index, &name, NULL);
+
+        } else {
+            ret = nxt_h2p_hpack_string(mp, &pos, end, &name);
+        }
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return ret;
+        }
+
+        ret = nxt_h2p_hpack_string(mp, &pos, end, &value);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return ret;
+        }
+
+        if (indexing) {
+            ret = nxt_h2p_hpack_add(hpack, &name, &value);
+            if (nxt_slow_path(ret != NXT_OK)) {
+                return ret;
+            }
+        }
+
+    field:
+
+        fields = 1;
+
+        ret = handler(ctx, &name, &value);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return ret;
+        }
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_hpack_int(u_char **pos, u_char *end, nxt_uint_t prefix,
+    uint32_t *value)
+{
+    u_char      *p;
+    uint32_t    v, mask;
+    nxt_uint_t  shift;
+
+    p = *pos;
+    mask = (1 << prefix) - 1;
+
+    v = *p++ & mask;
+
+    if (v == mask) {
+        shift = 0;
+
+        do {
+            /* The 28-bit limit is more than enough for any field. */
+
+            if (nxt_slow_path(p == end || shift > 21)) {
+                return NXT_DECLINED;
+            }
+
+            v += (uint32_t) (*p & 0x7f) << shift;
+            shift += 7;
+
+        } while (*p++ & 0x80);
+    }
+
+    *pos = p;
+    *value = v;
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_hpack_string(nxt_mp_t *mp, u_char **pos, u_char *end, nxt_str_t *str)
+{
+    u_char      *p;
+    uint32_t    length;
+    nxt_int_t   ret;
+    nxt_bool_t  huffman;
+
+    if (nxt_slow_path(*pos == end)) {
+        return NXT_DECLINED;
+    }
+
+    huffman = ((**pos & 0x80) != 0);
+
+    ret = nxt_h2p_hpack_int(pos, end, 7, &length);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        return ret;
+    }
+
+    p = *pos;
+
+    if (nxt_slow_path(length > (size_t) (end - p))) {
+        return NXT_DECLINED;
+    }
+
+    *pos = p + length;
+
+    if (huffman) {
+        /* The shortest Huffman code is 5 bits long. */
+
+        str->start = nxt_mp_nget(mp, length * 8 / 5 + 1);
+        if (nxt_slow_path(str->start == NULL)) {
+            return NXT_ERROR;
+        }
+
+        return nxt_h2p_huffman_decode(p, length, str->start, &str->length);
+    }
+
+    /*
+     * The string is copied since the read buffer is reused
+     * while the request fields are still in use.
+     */
+
+    str->start = nxt_mp_nget(mp, length + 1);
+    if (nxt_slow_path(str->start == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_memcpy(str->start, p, length);
+    str->length = length;
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_huffman_decode(u_char *src, size_t length, u_char *dst, size_t *size)
+{
+    u_char      *p, *end, *d;
+    nxt_uint_t  bit, code, first, index, count, len;
+
+    d = dst;
+
+    code = 0;
+    first = 0;
+    index = 0;
+    len = 0;
+
+    end = src + length;
+
+    for (p = src; p < end; p++) {
+
+        for (bit = 0x80; bit != 0; bit >>= 1) {
+            code |= ((*p & bit) != 0);
+            len++;
+
+            count = nxt_h2p_huffman_counts[len];
+
+            if (code < first + count) {
+                index += code - first;
+
+                if (nxt_slow_path(index >= nxt_nitems(nxt_h2p_huffman_symbols)))
+                {
+                    /* EOS. */
+                    return NXT_DECLINED;
+                }
+
+                *d++ = nxt_h2p_huffman_symbols[index];
+
+                code = 0;
+                first = 0;
+                index = 0;
+                len = 0;
+
+                continue;
+            }
+
+            if (nxt_slow_path(len == NXT_H2P_HUFFMAN_MAX_BITS)) {
+                return NXT_DECLINED;
+            }
+
+            index += count;
+            first = (first + count) << 1;
+            code <<= 1;
+        }
+    }
+
+    /* The padding is the most significant bits of EOS, that is ones. */
+
+    if (nxt_slow_path(len > 7 || (code >> 1) != ((nxt_uint_t) 1 << len) - 1))
+    {
+        return NXT_DECLINED;
+    }
+
+    *size = d - dst;
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_hpack_get(nxt_h2p_hpack_t *hpack, nxt_mp_t *mp, uint32_t index,
+    nxt_str_t *name, nxt_str_t *value)
+{
+    u_char                       *p;
+    const nxt_h2p_hpack_entry_t  *entry;
+
+    if (nxt_slow_path(index == 0)) {
+        return NXT_DECLINED;
+    }
+
+    if (index <= NXT_H2P_HPACK_STATIC_ENTRIES) {
+        entry = &nxt_h2p_hpack_static[index - 1];
+
+    } else {
+        index -= NXT_H2P_HPACK_STATIC_ENTRIES + 1;
+
+        if (nxt_slow_path(index >= hpack->count)) {
+            return NXT_DECLINED;
+        }
+
+        index = (hpack->next + NXT_H2P_HPACK_ENTRIES - 1 - index)
+                % NXT_H2P_HPACK_ENTRIES;
+
+        entry = &hpack->entries[index];
+    }
+
+    /*
+     * Dynamic table entries can be evicted while the request is still
+     * in use, so the name and value are copied to the request pool.
+     */
+
+    p = nxt_mp_nget(mp, entry->name.length + entry->value.length + 1);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    name->start = p;
+    name->length = entry->name.length;
+
+    p = nxt_cpymem(p, entry->name.start, entry->name.length);
+
+    if (value != NULL) {
+        value->start = p;
+        value->length = entry->value.length;
+
+        nxt_memcpy(p, entry->value.start, entry->value.length);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_h2p_hpack_add(nxt_h2p_hpack_t *hpack, nxt_str_t *name, nxt_str_t *value)
+{
+    u_char                 *p;
+    size_t                 size;
+    nxt_h2p_hpack_entry_t  *entry;
+
+    size = name->length + value->length + NXT_H2P_HPACK_ENTRY_OVERHEAD;
+
+    if (size > hpack->max_size) {
+        /* An entry larger than the table empties the table. */
+        nxt_h2p_hpack_evict(hpack, hpack->max_size);
+        return NXT_OK;
+    }
+
+    nxt_h2p_hpack_evict(hpack, size);
+
+    p = nxt_mp_alloc(hpack->mem_pool, name->length + value->length + 1);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    entry = &hpack->entries[hpack->next];
+
+    entry->name.start = p;
+    entry->name.length = name->length;
+    p = nxt_cpymem(p, name->start, name->length);
+
+    entry->value.start = p;
+    entry->value.length = value->length;
+    nxt_memcpy(p, value->start, value->length);
+
+    hpack->next = (hpack->next + 1) % NXT_H2P_HPACK_ENTRIES;
+    hpack->count++;
+    hpack->size += size;
+
+    return NXT_OK;
+}
+
+
+/* Evicts the oldest entries until a new entry of the size fits. */
+
+static void
+nxt_h2p_hpack_evict(nxt_h2p_hpack_t *hpack, size_t size)
+{
+    nxt_uint_t             index;
+    nxt_h2p_hpack_entry_t  *entry;
+
+    while (hpack->count != 0
+           && (hpack->size + size > hpack->max_size
+               || hpack->count == NXT_H2P_HPACK_ENTRIES))
+    {
+        index = (hpack->next + NXT_H2P_HPACK_ENTRIES - hpack->count)
+                % NXT_H2P_HPACK_ENTRIES;
+
+        entry = &hpack->entries[index];
+
+        hpack->size -= entry->name.length + entry->value.length
+                       + NXT_H2P_HPACK_ENTRY_OVERHEAD;
+        hpack->count--;
+
+        nxt_mp_free(hpack->mem_pool, entry->name.start);
+    }
+}
+
+
+size_t
+nxt_h2p_hpack_field_size(size_t name_length, size_t value_length)
+{
+    /* An index or a name literal, and a value literal. */
+    return 2 * NXT_INT64_T_LEN + name_length + value_length;
+}
+
+
+static u_char *
+nxt_h2p_hpack_int_encode(u_char *p, u_char first, nxt_uint_t prefix,
+    size_t value)
+{
+    size_t  mask;
+
+    mask = (1 << prefix) - 1;
+
+    if (value < mask) {
+        *p++ = first | value;
+        return p;
+    }
+
+    *p++ = first | mask;
+    value -= mask;
+
+    while (value >= 0x80) {
+        *p++ = (u_char) (value | 0x80);
+        value >>= 7;
+    }
+
+    *p++ = (u_char) value;
+
+    return p;
+}
+
+
+u_char *
+nxt_h2p_hpack_status(u_char *p, nxt_uint_t status)
+{
+    nxt_uint_t  index;
+
+    switch (status) {
+
+    case 200:
+        index = 8;
+        break;
+
+    case 204:
+        index = 9;
+        break;
+
+    case 206:
+        index = 10;
+        break;
+
+    case 304:
+        index = 11;
+        break;
+
+    case 400:
+        index = 12;
+        break;
+
+    case 404:
+        index = 13;
+        break;
+
+    case 500:
+        index = 14;
+        break;
+
+    default:
+        /* A literal field without indexing with the ":status" name. */
+        *p++ = 0x08;
+        *p++ = 3;
+
+        return nxt_sprintf(p, p + 3, "%03ui", status);
+    }
+
+    *p++ = 0x80 | index;
+
+    return p;
+}
+
+
+u_char *
+nxt_h2p_hpack_field(u_char *p, u_char *name, size_t name_length,
+    u_char *value, size_t value_length)
+{
+    nxt_uint_t                   i;
+    const nxt_h2p_hpack_entry_t  *entry;
+
+    /* The regular field names follow the pseudo-header ones. */
+
+    for (i = 14; i < NXT_H2P_HPACK_STATIC_ENTRIES; i++) {
+        entry = &nxt_h2p_hpack_static[i];
+
+        if (entry->name.length == name_length
+            && nxt_memcasecmp(entry->name.start, name, name_length) == 0)
+        {
+            p = nxt_h2p_hpack_int_encode(p, 0, 4, i + 1);
+            goto value;
+        }
+    }
+
+    *p++ = 0;
+    p = nxt_h2p_hpack_int_encode(p, 0, 7, name_length);
+
+    /* Field names must be lowercase in HTTP/2. */
+
+    for (i = 0; i < name_length; i++) {
+        *p++ = nxt_lowcase(name[i]);
+    }
+
+value:
+
+    p = nxt_h2p_hpack_int_encode(p, 0, 7, value_length);
+
+    return nxt_cpymem(p, value, value_length);
+}
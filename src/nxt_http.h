@@ -19,6 +19,7 @@ typedef enum {
 
     NXT_HTTP_OK = 200,
     NXT_HTTP_NO_CONTENT = 204,
+    NXT_HTTP_PARTIAL_CONTENT = 206,
 
     NXT_HTTP_MULTIPLE_CHOICES = 300,
     NXT_HTTP_MOVED_PERMANENTLY = 301,
@@ -36,6 +37,7 @@ typedef enum {
     NXT_HTTP_LENGTH_REQUIRED = 411,
     NXT_HTTP_PAYLOAD_TOO_LARGE = 413,
     NXT_HTTP_URI_TOO_LONG = 414,
+    NXT_HTTP_RANGE_NOT_SATISFIABLE = 416,
     NXT_HTTP_UPGRADE_REQUIRED = 426,
     NXT_HTTP_REQUEST_HEADER_FIELDS_TOO_LARGE = 431,
 
@@ -74,6 +76,8 @@ typedef struct {
 
 
 typedef struct nxt_h1proto_s        nxt_h1proto_t;
+typedef struct nxt_h2proto_s        nxt_h2proto_t;
+typedef struct nxt_h2p_stream_s     nxt_h2p_stream_t;
 
 struct nxt_h1p_websocket_timer_s {
     nxt_timer_t                     timer;
@@ -85,6 +89,7 @@ struct nxt_h1p_websocket_timer_s {
 typedef union {
     void                            *any;
     nxt_h1proto_t                   *h1;
+    nxt_h2p_stream_t                *h2;
 } nxt_http_proto_t;
 
 
@@ -114,6 +119,10 @@ typedef struct {
 
 
 typedef struct nxt_upstream_server_s  nxt_upstream_server_t;
+typedef struct nxt_http_compress_s    nxt_http_compress_t;
+typedef struct nxt_http_cache_s       nxt_http_cache_t;
+typedef struct nxt_http_cache_conf_s  nxt_http_cache_conf_t;
+typedef struct nxt_http_route_memo_s  nxt_http_route_memo_t;
 
 typedef struct {
     nxt_http_proto_t                proto;
@@ -126,6 +135,12 @@ typedef struct {
     nxt_http_protocol_t             protocol:8;       /* 2 bits */
     uint8_t                         header_received;  /* 1 bit  */
     uint8_t                         closed;           /* 1 bit  */
+    /*
+     * The request has been sent over a reused keepalive connection and
+     * no response data has been received yet, so it can be resent over
+     * a new connection if the server has closed the idle connection.
+     */
+    uint8_t                         retry;            /* 1 bit  */
 } nxt_http_peer_t;
 
 
@@ -142,6 +157,12 @@ struct nxt_http_request_s {
 
     nxt_nsec_t                      start_time;
 
+    /* Application request lifecycle timestamps. */
+    nxt_nsec_t                      app_send_time;
+    nxt_nsec_t                      app_ack_time;
+    nxt_nsec_t                      app_resp_time;
+    nxt_nsec_t                      app_done_time;
+
     nxt_str_t                       host;
     nxt_str_t                       server_name;
     nxt_str_t                       request_line;
@@ -161,6 +182,9 @@ struct nxt_http_request_s {
     nxt_http_field_t                *referer;
     nxt_http_field_t                *user_agent;
     nxt_http_field_t                *authorization;
+    nxt_http_field_t                *range;
+    nxt_http_field_t                *if_range;
+    nxt_http_field_t                *accept_encoding;
     nxt_off_t                       content_length_n;
 
     nxt_sockaddr_t                  *remote;
@@ -175,13 +199,15 @@ struct nxt_http_request_s {
 
     void                            *req_rpc_data;
 
-#if (NXT_HAVE_REGEX)
-    nxt_regex_match_t               *regex_match;
-#endif
-
     nxt_http_peer_t                 *peer;
     nxt_buf_t                       *last;
 
+    nxt_http_compress_t             *compress;
+    nxt_http_cache_t                *cache;
+    nxt_http_route_memo_t           *route_memo;
+    nxt_router_stats_t              *route_stats;
+    nxt_router_stats_t              *app_stats;
+
     nxt_queue_link_t                app_link;   /* nxt_app_t.ack_waiting_req */
     nxt_event_engine_t              *engine;
     nxt_work_t                      err_work;
@@ -190,12 +216,16 @@ struct nxt_http_request_s {
 
     nxt_http_status_t               status:16;
 
+    /* The number of route steps evaluated, exposed as $route_steps. */
+    uint32_t                        route_steps;
+
     uint8_t                         log_route;    /* 1 bit */
 
     uint8_t                         pass_count;   /* 8 bits */
     uint8_t                         app_target;
     nxt_http_protocol_t             protocol:8;   /* 2 bits */
     uint8_t                         tls;          /* 1 bit  */
+    uint8_t                         sendfile;     /* 1 bit  */
     uint8_t                         logged;       /* 1 bit  */
     uint8_t                         header_sent;  /* 1 bit  */
     uint8_t                         inconsistent; /* 1 bit  */
@@ -225,6 +255,22 @@ typedef struct nxt_http_route_rule_s       nxt_http_route_rule_t;
 typedef struct nxt_http_route_addr_rule_s  nxt_http_route_addr_rule_t;
 
 
+#define NXT_HTTP_ROUTE_MEMO_KEY_SIZE  256
+
+/*
+ * The last route step matched on a connection and the request values
+ * the steps up to it depend on.
+ */
+
+struct nxt_http_route_memo_s {
+    nxt_http_route_t                *route;
+    uint32_t                        generation;
+    uint32_t                        step;
+    uint32_t                        length;
+    u_char                          key[NXT_HTTP_ROUTE_MEMO_KEY_SIZE];
+};
+
+
 typedef struct {
     nxt_conf_value_t                *rewrite;
     nxt_conf_value_t                *pass;
@@ -237,7 +283,11 @@ typedef struct {
     nxt_conf_value_t                *follow_symlinks;
     nxt_conf_value_t                *traverse_mounts;
     nxt_conf_value_t                *types;
+    nxt_conf_value_t                *open_file_cache;
+    nxt_conf_value_t                *precompressed;
     nxt_conf_value_t                *fallback;
+    nxt_conf_value_t                *keepalive;
+    nxt_conf_value_t                *cache;
 } nxt_http_action_conf_t;
 
 
@@ -255,6 +305,7 @@ struct nxt_http_action_s {
     } u;
 
     nxt_tstr_t                      *rewrite;
+    nxt_http_cache_conf_t           *cache;
     nxt_http_action_t               *fallback;
 };
 
@@ -316,6 +367,9 @@ nxt_http_date(u_char *buf, struct tm *tm)
 
 nxt_int_t nxt_http_init(nxt_task_t *task);
 nxt_int_t nxt_h1p_init(nxt_task_t *task);
+nxt_int_t nxt_h2p_init(nxt_task_t *task);
+nxt_bool_t nxt_h2p_preface(nxt_buf_mem_t *bm);
+nxt_int_t nxt_h2p_conn_init(nxt_task_t *task, nxt_conn_t *c);
 nxt_int_t nxt_http_response_hash_init(nxt_task_t *task);
 
 void nxt_http_conn_init(nxt_task_t *task, void *obj, void *data);
@@ -357,6 +411,8 @@ nxt_http_action_t *nxt_http_action_create(nxt_task_t *task,
     nxt_router_temp_conf_t *tmcf, nxt_str_t *pass);
 nxt_int_t nxt_http_routes_resolve(nxt_task_t *task,
     nxt_router_temp_conf_t *tmcf);
+nxt_router_stats_t *nxt_http_route_stats(nxt_http_routes_t *routes,
+    nxt_uint_t n);
 nxt_int_t nxt_http_pass_segments(nxt_mp_t *mp, nxt_str_t *pass,
     nxt_str_t *segments, nxt_uint_t n);
 nxt_http_action_t *nxt_http_pass_application(nxt_task_t *task,
@@ -395,6 +451,26 @@ nxt_int_t nxt_http_static_mtypes_hash_add(nxt_mp_t *mp, nxt_lvlhsh_t *hash,
     const nxt_str_t *exten, nxt_str_t *type);
 nxt_str_t *nxt_http_static_mtype_get(nxt_lvlhsh_t *hash,
     const nxt_str_t *exten);
+void nxt_http_static_cache_close(nxt_task_t *task);
+
+nxt_http_compression_t *nxt_http_compression_init(nxt_task_t *task,
+    nxt_mp_t *mp, nxt_conf_value_t *conf);
+nxt_bool_t nxt_http_accept_encoding(nxt_http_request_t *r,
+    const char *encoding, size_t length);
+nxt_int_t nxt_http_compress_init(nxt_task_t *task, nxt_http_request_t *r);
+uint32_t nxt_http_compress_accepted(nxt_http_request_t *r);
+nxt_buf_t *nxt_http_compress(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_buf_t *in);
+
+nxt_int_t nxt_http_cache_init(nxt_router_conf_t *rtcf,
+    nxt_http_action_t *action, nxt_http_action_conf_t *acf);
+nxt_int_t nxt_http_cache(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_action_t *action);
+nxt_int_t nxt_http_cache_store_init(nxt_task_t *task, nxt_http_request_t *r);
+void nxt_http_cache_store(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_buf_t *out);
+void nxt_http_cache_release(nxt_task_t *task, nxt_http_request_t *r);
+void nxt_http_cache_close(nxt_task_t *task);
 
 nxt_http_action_t *nxt_http_application_handler(nxt_task_t *task,
     nxt_http_request_t *r, nxt_http_action_t *action);
@@ -429,6 +505,7 @@ void nxt_h1p_websocket_frame_start(nxt_task_t *task, nxt_http_request_t *r,
 void nxt_h1p_complete_buffers(nxt_task_t *task, nxt_h1proto_t *h1p,
     nxt_bool_t all);
 nxt_msec_t nxt_h1p_conn_request_timer_value(nxt_conn_t *c, uintptr_t data);
+void nxt_h1p_peer_pools_close(nxt_task_t *task);
 
 extern const nxt_conn_state_t  nxt_h1p_idle_close_state;
 
@@ -0,0 +1,1326 @@
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_router.h>
+#include <nxt_http.h>
+
+
+/*
+ * The response cache keeps application and proxied responses in memory
+ * of each router thread, so the cache requires no locking.  A request
+ * to an action with the "cache" option looks up an entry by the key and
+ * fresh entries are sent at once.  On a miss the request becomes the
+ * updater of the entry: nxt_http_cache_store_init() checks whether its
+ * response can be cached and nxt_http_cache_store() captures the response
+ * header and body, while concurrent requests with the same key wait until
+ * the updater completes.  An entry within its "stale-while-revalidate"
+ * period is sent to all requests except the updater that refreshes it.
+ * As the entries are per thread, only concurrent misses within one router
+ * thread are coalesced; each thread fetches a response on its own miss.
+ *
+ * The response is stored as sent, after the compression filter, so each
+ * set of accepted encodings has its own entry and cached responses are
+ * never compressed again.
+ */
+
+
+#define NXT_HTTP_CACHE_LOCK_TIMEOUT  5000
+#define NXT_HTTP_CACHE_MAX_AGE       (NXT_INT32_T_MAX / 1000)
+
+
+typedef enum {
+    NXT_HTTP_CACHE_BYPASS = 0,
+    NXT_HTTP_CACHE_WAITING,
+    NXT_HTTP_CACHE_WOKEN,
+    NXT_HTTP_CACHE_UPDATING,
+    NXT_HTTP_CACHE_ACCEPTED,
+    NXT_HTTP_CACHE_STORING,
+    NXT_HTTP_CACHE_SENDING,
+} nxt_http_cache_state_t;
+
+
+struct nxt_http_cache_conf_s {
+    uint32_t                    id;
+    nxt_tstr_t                  *key;
+    nxt_msec_t                  valid;
+    size_t                      max_size;
+    size_t                      max_entry_size;
+};
+
+
+typedef struct {
+    uint32_t                    count;
+    nxt_http_status_t           status;
+    uint32_t                    nfields;
+    nxt_http_field_t            *fields;
+    u_char                      *body;
+    size_t                      body_length;
+    size_t                      size;
+    nxt_msec_t                  date;
+} nxt_http_cache_response_t;
+
+
+typedef struct {
+    nxt_queue_link_t            link;
+    nxt_queue_t                 waiters;
+    nxt_http_cache_response_t   *resp;
+    nxt_msec_t                  expires;
+    nxt_msec_t                  stale;
+    uint32_t                    count;
+    uint32_t                    key_hash;
+    uint32_t                    key_length;
+    uint8_t                     updating;  /* 1 bit */
+    uint8_t                     deleted;   /* 1 bit */
+    u_char                      key[];
+} nxt_http_cache_entry_t;
+
+
+struct nxt_http_cache_s {
+    nxt_http_request_t          *request;
+    nxt_http_action_t           *action;
+    nxt_http_cache_entry_t      *entry;
+    nxt_http_cache_response_t   *resp;
+    nxt_queue_link_t            link;
+
+    nxt_http_field_t            *fields;
+    uint32_t                    nfields;
+    size_t                      fields_size;
+
+    u_char                      *body;
+    size_t                      size;
+    size_t                      capacity;
+
+    nxt_msec_t                  valid;
+    nxt_msec_t                  stale;
+
+    nxt_http_cache_state_t      state;
+};
+
+
+static nxt_int_t nxt_http_cache_key(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_conf_t *conf, nxt_str_t *key);
+static nxt_int_t nxt_http_cache_control(nxt_http_field_t *field,
+    nxt_msec_t *valid, nxt_msec_t *stale);
+static nxt_bool_t nxt_http_cache_request_bypass(nxt_http_request_t *r);
+static nxt_bool_t nxt_http_cache_field_stored(nxt_http_field_t *field);
+static nxt_int_t nxt_http_cache_header(nxt_http_request_t *r,
+    nxt_http_cache_t *ctx);
+static nxt_int_t nxt_http_cache_send(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx, nxt_http_cache_response_t *resp);
+static void nxt_http_cache_send_body(nxt_task_t *task, void *obj, void *data);
+static void nxt_http_cache_wait(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx, nxt_http_cache_entry_t *entry);
+static void nxt_http_cache_wakeup(nxt_task_t *task, void *obj, void *data);
+static nxt_int_t nxt_http_cache_body_add(nxt_http_request_t *r,
+    nxt_http_cache_t *ctx, nxt_buf_t *b);
+static void nxt_http_cache_finish(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx);
+static void nxt_http_cache_unlock(nxt_task_t *task, nxt_http_cache_t *ctx);
+static nxt_http_cache_entry_t *nxt_http_cache_entry_get(
+    nxt_event_engine_t *engine, nxt_str_t *key);
+static nxt_http_cache_entry_t *nxt_http_cache_entry_create(
+    nxt_event_engine_t *engine, nxt_str_t *key);
+static void nxt_http_cache_entry_release(nxt_event_engine_t *engine,
+    nxt_http_cache_entry_t *entry);
+static void nxt_http_cache_entry_delete(nxt_event_engine_t *engine,
+    nxt_http_cache_entry_t *entry);
+static void nxt_http_cache_evict(nxt_event_engine_t *engine,
+    nxt_http_cache_entry_t *entry);
+static void nxt_http_cache_response_release(nxt_event_engine_t *engine,
+    nxt_http_cache_response_t *resp);
+static void nxt_http_cache_expire(nxt_task_t *task, void *obj, void *data);
+static nxt_int_t nxt_http_cache_test(nxt_lvlhsh_query_t *lhq, void *data);
+
+
+static const nxt_http_request_state_t  nxt_http_cache_send_state;
+
+static nxt_atomic_t  nxt_http_cache_ids;
+
+
+static nxt_conf_map_t  nxt_http_cache_conf[] = {
+    {
+        nxt_string("valid"),
+        NXT_CONF_MAP_MSEC,
+        offsetof(nxt_http_cache_conf_t, valid),
+    },
+
+    {
+        nxt_string("max_size"),
+        NXT_CONF_MAP_SIZE,
+        offsetof(nxt_http_cache_conf_t, max_size),
+    },
+
+    {
+        nxt_string("max_entry_size"),
+        NXT_CONF_MAP_SIZE,
+        offsetof(nxt_http_cache_conf_t, max_entry_size),
+    },
+};
+
+
+static const nxt_lvlhsh_proto_t  nxt_http_cache_proto
+    nxt_aligned(64) =
+{
+    NXT_LVLHSH_DEFAULT,
+    nxt_http_cache_test,
+    nxt_lvlhsh_alloc,
+    nxt_lvlhsh_free,
+};
+
+
+nxt_int_t
+nxt_http_cache_init(nxt_router_conf_t *rtcf, nxt_http_action_t *action,
+    nxt_http_action_conf_t *acf)
+{
+    nxt_str_t              str;
+    nxt_conf_value_t       *cv;
+    nxt_http_cache_conf_t  *conf;
+
+    static nxt_str_t  key_path = nxt_string("/key");
+
+    conf = nxt_mp_zalloc(rtcf->mem_pool, sizeof(nxt_http_cache_conf_t));
+    if (nxt_slow_path(conf == NULL)) {
+        return NXT_ERROR;
+    }
+
+    /*
+     * Each configured cache has its own entries, so responses cached
+     * by an action are not sent by another action or after the action
+     * has been reconfigured.
+     */
+    conf->id = nxt_atomic_fetch_add(&nxt_http_cache_ids, 1);
+
+    conf->max_size = 16 * 1024 * 1024;
+    conf->max_entry_size = 1024 * 1024;
+
+    if (nxt_conf_map_object(rtcf->mem_pool, acf->cache, nxt_http_cache_conf,
+                            nxt_nitems(nxt_http_cache_conf), conf)
+        != NXT_OK)
+    {
+        return NXT_ERROR;
+    }
+
+    cv = nxt_conf_get_path(acf->cache, &key_path);
+
+    if (cv != NULL) {
+        nxt_conf_get_string(cv, &str);
+
+    } else {
+        nxt_str_set(&str, "$host$request_uri");
+    }
+
+    conf->key = nxt_tstr_compile(rtcf->tstr_state, &str, 0);
+    if (nxt_slow_path(conf->key == NULL)) {
+        return NXT_ERROR;
+    }
+
+    action->cache = conf;
+
+    return NXT_OK;
+}
+
+
+nxt_int_t
+nxt_http_cache(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_action_t *action)
+{
+    nxt_int_t               ret;
+    nxt_str_t               key;
+    nxt_bool_t              head, updating;
+    nxt_http_cache_t        *ctx;
+    nxt_event_engine_t      *engine;
+    nxt_http_cache_entry_t  *entry;
+
+    if (nxt_str_eq(r->method, "HEAD", 4)) {
+        head = 1;
+
+    } else if (nxt_str_eq(r->method, "GET", 3)) {
+        head = 0;
+
+    } else {
+        return NXT_OK;
+    }
+
+    if (r->authorization != NULL || nxt_http_cache_request_bypass(r)) {
+        return NXT_OK;
+    }
+
+    ret = nxt_http_cache_key(task, r, action->cache, &key);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        return NXT_ERROR;
+    }
+
+    ctx = nxt_mp_zget(r->mem_pool, sizeof(nxt_http_cache_t));
+    if (nxt_slow_path(ctx == NULL)) {
+        return NXT_ERROR;
+    }
+
+    ctx->request = r;
+    ctx->action = action;
+
+    r->cache = ctx;
+
+    engine = task->thread->engine;
+
+    entry = nxt_http_cache_entry_get(engine, &key);
+
+    if (entry != NULL && entry->resp != NULL) {
+
+        if (nxt_msec_diff(entry->expires, engine->timers.now) > 0
+            || (nxt_msec_diff(entry->stale, engine->timers.now) > 0
+                && (entry->updating || head)))
+        {
+            nxt_debug(task, "http cache hit");
+
+            ret = nxt_http_cache_send(task, r, ctx, entry->resp);
+
+            return (ret == NXT_OK) ? NXT_DONE : NXT_ERROR;
+        }
+
+        if (nxt_msec_diff(entry->stale, engine->timers.now) <= 0) {
+            updating = entry->updating;
+
+            nxt_http_cache_evict(engine, entry);
+
+            if (!updating) {
+                entry = NULL;
+            }
+        }
+    }
+
+    if (entry != NULL && entry->updating) {
+        nxt_debug(task, "http cache wait");
+
+        nxt_http_cache_wait(task, r, ctx, entry);
+
+        return NXT_DONE;
+    }
+
+    nxt_debug(task, "http cache miss");
+
+    engine->http_cache_misses_cnt++;
+
+    if (head) {
+        return NXT_OK;
+    }
+
+    if (entry == NULL) {
+        entry = nxt_http_cache_entry_create(engine, &key);
+        if (nxt_slow_path(entry == NULL)) {
+            return NXT_OK;
+        }
+    }
+
+    entry->updating = 1;
+    entry->count++;
+
+    ctx->entry = entry;
+    ctx->state = NXT_HTTP_CACHE_UPDATING;
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_http_cache_key(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_conf_t *conf, nxt_str_t *key)
+{
+    u_char             *p;
+    uint32_t           encodings;
+    nxt_int_t          ret;
+    nxt_str_t          str;
+    nxt_router_conf_t  *rtcf;
+
+    if (nxt_tstr_is_const(conf->key)) {
+        nxt_tstr_str(conf->key, &str);
+
+    } else {
+        rtcf = r->conf->socket_conf->router_conf;
+
+        ret = nxt_tstr_query_init(&r->tstr_query, rtcf->tstr_state,
+                                  &r->tstr_cache, r, r->mem_pool);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
+
+        nxt_tstr_query(task, r->tstr_query, conf->key, &str);
+
+        if (nxt_slow_path(nxt_tstr_query_failed(r->tstr_query))) {
+            return NXT_ERROR;
+        }
+    }
+
+    encodings = nxt_http_compress_accepted(r);
+
+    /*
+     * The key is the cache id and the accepted encodings
+     * followed by the key value.
+     */
+
+    key->length = 2 * sizeof(uint32_t) + str.length;
+
+    key->start = nxt_mp_nget(r->mem_pool, key->length);
+    if (nxt_slow_path(key->start == NULL)) {
+        return NXT_ERROR;
+    }
+
+    p = nxt_cpymem(key->start, &conf->id, sizeof(uint32_t));
+    p = nxt_cpymem(p, &encodings, sizeof(uint32_t));
+    nxt_memcpy(p, str.start, str.length);
+
+    return NXT_OK;
+}
+
+
+/*
+ * Returns NXT_DECLINED if the "Cache-Control" field prohibits caching,
+ * otherwise sets the freshness and the stale periods if they are present.
+ */
+
+static nxt_int_t
+nxt_http_cache_control(nxt_http_field_t *field, nxt_msec_t *valid,
+    nxt_msec_t *stale)
+{
+    u_char      *p, *end, *name, *value;
+    size_t      name_length, value_length;
+    nxt_int_t   n;
+    nxt_bool_t  shared;
+
+    shared = 0;
+
+    p = field->value;
+    end = p + field->value_length;
+
+    while (p < end) {
+
+        while (p < end && (*p == ' ' || *p == '\t' || *p == ',')) {
+            p++;
+        }
+
+        name = p;
+
+        while (p < end && *p != '=' && *p != ',' && *p != ' ') {
+            p++;
+        }
+
+        name_length = p - name;
+
+        value = p;
+        value_length = 0;
+
+        if (p < end && *p == '=') {
+            p++;
+
+            if (p < end && *p == '"') {
+                p++;
+            }
+
+            value = p;
+
+            while (p < end && *p != ',' && *p != '"' && *p != ' ') {
+                p++;
+            }
+
+            value_length = p - value;
+
+            while (p < end && *p != ',') {
+                p++;
+            }
+        }
+
+        if (name_length == 0) {
+            continue;
+        }
+
+        if ((name_length == nxt_length("no-store")
+             && nxt_memcasecmp(name, "no-store", name_length) == 0)
+            || (name_length == nxt_length("no-cache")
+                && nxt_memcasecmp(name, "no-cache", name_length) == 0)
+            || (name_length == nxt_length("private")
+                && nxt_memcasecmp(name, "private", name_length) == 0))
+        {
+            return NXT_DECLINED;
+        }
+
+        if (valid == NULL) {
+            continue;
+        }
+
+        n = nxt_int_parse(value, value_length);
+
+        if (n < 0) {
+            continue;
+        }
+
+        n = nxt_min(n, NXT_HTTP_CACHE_MAX_AGE) * 1000;
+
+        if (name_length == nxt_length("s-maxage")
+            && nxt_memcasecmp(name, "s-maxage", name_length) == 0)
+        {
+            *valid = n;
+            shared = 1;
+
+        } else if (name_length == nxt_length("max-age")
+                   && nxt_memcasecmp(name, "max-age", name_length) == 0)
+        {
+            if (!shared) {
+                *valid = n;
+            }
+
+        } else if (name_length == nxt_length("stale-while-revalidate")
+                   && nxt_memcasecmp(name, "stale-while-revalidate",
+                                     name_length)
+                      == 0)
+        {
+            *stale = n;
+        }
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_bool_t
+nxt_http_cache_request_bypass(nxt_http_request_t *r)
+{
+    nxt_http_field_t  *field;
+
+    nxt_list_each(field, r->fields) {
+
+        if (field->name_length == nxt_length("Cache-Control")
+            && nxt_memcasecmp(field->name, "Cache-Control",
+                              field->name_length)
+               == 0
+            && nxt_http_cache_control(field, NULL, NULL) == NXT_DECLINED)
+        {
+            return 1;
+        }
+
+    } nxt_list_loop;
+
+    return 0;
+}
+
+
+static nxt_int_t
+nxt_http_cache_send(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx, nxt_http_cache_response_t *resp)
+{
+    u_char              *p;
+    nxt_uint_t          i;
+    nxt_msec_t          age;
+    nxt_http_field_t    *field;
+    nxt_event_engine_t  *engine;
+
+    engine = task->thread->engine;
+
+    resp->count++;
+
+    ctx->resp = resp;
+    ctx->state = NXT_HTTP_CACHE_SENDING;
+
+    engine->http_cache_hits_cnt++;
+
+    r->status = resp->status;
+
+    for (i = 0; i < resp->nfields; i++) {
+        field = nxt_list_add(r->resp.fields);
+        if (nxt_slow_path(field == NULL)) {
+            return NXT_ERROR;
+        }
+
+        *field = resp->fields[i];
+    }
+
+    field = nxt_list_zero_add(r->resp.fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_http_field_name_set(field, "Age");
+
+    p = nxt_mp_nget(r->mem_pool, NXT_INT32_T_LEN);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    age = (engine->timers.now - resp->date) / 1000;
+
+    field->value = p;
+    field->value_length = nxt_sprintf(p, p + NXT_INT32_T_LEN, "%M", age) - p;
+
+    /* The stored response has already passed the compression filter. */
+
+    r->resp.content_length = NULL;
+    r->resp.content_length_n = resp->body_length;
+
+    r->state = &nxt_http_cache_send_state;
+
+    nxt_http_request_header_send(task, r, nxt_http_cache_send_body, ctx);
+
+    return NXT_OK;
+}
+
+
+static void
+nxt_http_cache_send_body(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_buf_t                  *b, *out;
+    nxt_http_cache_t           *ctx;
+    nxt_http_request_t         *r;
+    nxt_http_cache_response_t  *resp;
+
+    r = obj;
+    ctx = data;
+    resp = ctx->resp;
+
+    out = NULL;
+
+    if (resp->body_length != 0 && !nxt_str_eq(r->method, "HEAD", 4)) {
+        out = nxt_http_buf_mem(task, r, 0);
+        if (nxt_slow_path(out == NULL)) {
+            return;
+        }
+
+        b = out;
+
+        b->mem.start = resp->body;
+        b->mem.pos = resp->body;
+        b->mem.free = resp->body + resp->body_length;
+        b->mem.end = b->mem.free;
+    }
+
+    nxt_buf_chain_add(&out, nxt_http_buf_last(r));
+
+    nxt_http_request_send(task, r, out);
+}
+
+
+static const nxt_http_request_state_t  nxt_http_cache_send_state
+    nxt_aligned(64) =
+{
+    .error_handler = nxt_http_request_error_handler,
+};
+
+
+static void
+nxt_http_cache_wait(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx, nxt_http_cache_entry_t *entry)
+{
+    nxt_event_engine_t  *engine;
+
+    engine = task->thread->engine;
+
+    entry->count++;
+
+    ctx->entry = entry;
+    ctx->state = NXT_HTTP_CACHE_WAITING;
+
+    nxt_queue_insert_tail(&entry->waiters, &ctx->link);
+
+    r->timer.task = &engine->task;
+    r->timer.work_queue = &engine->fast_work_queue;
+    r->timer.log = engine->task.log;
+    r->timer.bias = NXT_TIMER_DEFAULT_BIAS;
+    r->timer.handler = nxt_http_cache_wakeup;
+
+    nxt_timer_add(engine, &r->timer, NXT_HTTP_CACHE_LOCK_TIMEOUT);
+}
+
+
+static void
+nxt_http_cache_wakeup(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_int_t               ret;
+    nxt_http_cache_t        *ctx;
+    nxt_http_action_t       *action;
+    nxt_event_engine_t      *engine;
+    nxt_http_request_t      *r;
+    nxt_http_cache_entry_t  *entry;
+
+    r = nxt_timer_data(obj, nxt_http_request_t, timer);
+    ctx = r->cache;
+
+    nxt_debug(task, "http cache wakeup");
+
+    if (ctx->state == NXT_HTTP_CACHE_WAITING) {
+        nxt_queue_remove(&ctx->link);
+    }
+
+    engine = task->thread->engine;
+
+    entry = ctx->entry;
+    ctx->entry = NULL;
+    ctx->state = NXT_HTTP_CACHE_BYPASS;
+
+    if (!entry->deleted
+        && entry->resp != NULL
+        && nxt_msec_diff(entry->stale, engine->timers.now) > 0)
+    {
+        ret = nxt_http_cache_send(task, r, ctx, entry->resp);
+
+        nxt_http_cache_entry_release(engine, entry);
+
+        if (nxt_slow_path(ret != NXT_OK)) {
+            nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
+        }
+
+        return;
+    }
+
+    nxt_http_cache_entry_release(engine, entry);
+
+    engine->http_cache_misses_cnt++;
+
+    action = ctx->action->handler(task, r, ctx->action);
+
+    if (action == NULL) {
+        return;
+    }
+
+    if (action == NXT_HTTP_ACTION_ERROR) {
+        nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
+        return;
+    }
+
+    nxt_http_request_action(task, r, action);
+}
+
+
+nxt_int_t
+nxt_http_cache_store_init(nxt_task_t *task, nxt_http_request_t *r)
+{
+    nxt_msec_t        valid, stale;
+    nxt_http_cache_t  *ctx;
+    nxt_http_field_t  *field;
+
+    ctx = r->cache;
+
+    if (ctx == NULL || ctx->state != NXT_HTTP_CACHE_UPDATING) {
+        return NXT_OK;
+    }
+
+    if (r->status != NXT_HTTP_OK) {
+        goto unlock;
+    }
+
+    valid = ctx->action->cache->valid;
+    stale = 0;
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (field->skip) {
+            continue;
+        }
+
+        switch (field->name_length) {
+
+        case nxt_length("Cache-Control"):
+            if (nxt_memcasecmp(field->name, "Cache-Control", 13) == 0
+                && nxt_http_cache_control(field, &valid, &stale)
+                   == NXT_DECLINED)
+            {
+                goto unlock;
+            }
+
+            break;
+
+        case nxt_length("Set-Cookie"):
+            if (nxt_memcasecmp(field->name, "Set-Cookie", 10) == 0) {
+                goto unlock;
+            }
+
+            break;
+
+        case nxt_length("Vary"):
+            if (nxt_memcasecmp(field->name, "Vary", 4) == 0) {
+                goto unlock;
+            }
+
+            break;
+        }
+
+    } nxt_list_loop;
+
+    if (valid == 0
+        || r->resp.content_length_n
+           > (nxt_off_t) ctx->action->cache->max_entry_size)
+    {
+        goto unlock;
+    }
+
+    ctx->valid = valid;
+    ctx->stale = stale;
+    ctx->state = NXT_HTTP_CACHE_ACCEPTED;
+
+    return NXT_OK;
+
+unlock:
+
+    nxt_debug(task, "http cache response is not cacheable");
+
+    nxt_http_cache_unlock(task, ctx);
+
+    return NXT_OK;
+}
+
+
+/*
+ * The "Content-Length", "Date", and "Server" fields are set again when
+ * a cached response is sent, and the hop-by-hop fields are not stored.
+ */
+
+static nxt_bool_t
+nxt_http_cache_field_stored(nxt_http_field_t *field)
+{
+    switch (field->name_length) {
+
+    case nxt_length("Date"):
+        return nxt_memcasecmp(field->name, "Date", 4) != 0;
+
+    case nxt_length("Server"):
+        return nxt_memcasecmp(field->name, "Server", 6) != 0;
+
+    case nxt_length("Connection"):
+        return nxt_memcasecmp(field->name, "Connection", 10) != 0
+               && nxt_memcasecmp(field->name, "Keep-Alive", 10) != 0;
+
+    case nxt_length("Content-Length"):
+        return nxt_memcasecmp(field->name, "Content-Length", 14) != 0;
+
+    case nxt_length("Transfer-Encoding"):
+        return nxt_memcasecmp(field->name, "Transfer-Encoding", 17) != 0;
+    }
+
+    return 1;
+}
+
+
+/*
+ * The response header is captured with the first body buffers, when
+ * the compression filter has already set the encoding fields.
+ */
+
+static nxt_int_t
+nxt_http_cache_header(nxt_http_request_t *r, nxt_http_cache_t *ctx)
+{
+    u_char            *p;
+    size_t            size;
+    uint32_t          n;
+    nxt_http_field_t  *field, *f;
+
+    n = 0;
+    size = 0;
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (!field->skip && nxt_http_cache_field_stored(field)) {
+            n++;
+            size += field->name_length + field->value_length;
+        }
+
+    } nxt_list_loop;
+
+    ctx->fields = nxt_mp_get(r->mem_pool, n * sizeof(nxt_http_field_t));
+    if (nxt_slow_path(ctx->fields == NULL && n != 0)) {
+        return NXT_ERROR;
+    }
+
+    p = nxt_mp_nget(r->mem_pool, size);
+    if (nxt_slow_path(p == NULL && size != 0)) {
+        return NXT_ERROR;
+    }
+
+    f = ctx->fields;
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (field->skip || !nxt_http_cache_field_stored(field)) {
+            continue;
+        }
+
+        *f = *field;
+
+        f->name = p;
+        p = nxt_cpymem(p, field->name, field->name_length);
+
+        f->value = p;
+        p = nxt_cpymem(p, field->value, field->value_length);
+
+        f++;
+
+    } nxt_list_loop;
+
+    ctx->nfields = n;
+    ctx->fields_size = size;
+
+    return NXT_OK;
+}
+
+
+void
+nxt_http_cache_store(nxt_task_t *task, nxt_http_request_t *r, nxt_buf_t *out)
+{
+    nxt_buf_t         *b;
+    nxt_http_cache_t  *ctx;
+
+    ctx = r->cache;
+
+    if (ctx->state == NXT_HTTP_CACHE_ACCEPTED) {
+
+        if (nxt_http_cache_header(r, ctx) != NXT_OK) {
+            nxt_http_cache_unlock(task, ctx);
+            return;
+        }
+
+        ctx->state = NXT_HTTP_CACHE_STORING;
+    }
+
+    if (ctx->state != NXT_HTTP_CACHE_STORING) {
+        return;
+    }
+
+    for (b = out; b != NULL; b = b->next) {
+
+        if (!nxt_buf_is_sync(b)) {
+            if (nxt_buf_is_file(b)
+                || nxt_http_cache_body_add(r, ctx, b) != NXT_OK)
+            {
+                nxt_http_cache_unlock(task, ctx);
+                return;
+            }
+        }
+
+        if (nxt_buf_is_last(b)) {
+            nxt_http_cache_finish(task, r, ctx);
+            return;
+        }
+    }
+}
+
+
+static nxt_int_t
+nxt_http_cache_body_add(nxt_http_request_t *r, nxt_http_cache_t *ctx,
+    nxt_buf_t *b)
+{
+    u_char  *p;
+    size_t  size, capacity, max;
+
+    size = b->mem.free - b->mem.pos;
+
+    if (size == 0) {
+        return NXT_OK;
+    }
+
+    max = ctx->action->cache->max_entry_size;
+
+    if (ctx->size + size > max) {
+        return NXT_DECLINED;
+    }
+
+    if (ctx->size + size > ctx->capacity) {
+        capacity = nxt_max(ctx->capacity * 2, ctx->size + size);
+
+        if (r->resp.content_length_n > 0) {
+            capacity = nxt_max(capacity, (size_t) r->resp.content_length_n);
+        }
+
+        capacity = nxt_min(capacity, max);
+
+        p = nxt_mp_alloc(r->mem_pool, capacity);
+        if (nxt_slow_path(p == NULL)) {
+            return NXT_ERROR;
+        }
+
+        if (ctx->body != NULL) {
+            nxt_memcpy(p, ctx->body, ctx->size);
+            nxt_mp_free(r->mem_pool, ctx->body);
+        }
+
+        ctx->body = p;
+        ctx->capacity = capacity;
+    }
+
+    nxt_memcpy(ctx->body + ctx->size, b->mem.pos, size);
+    ctx->size += size;
+
+    return NXT_OK;
+}
+
+
+static void
+nxt_http_cache_finish(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_cache_t *ctx)
+{
+    u_char                     *p;
+    size_t                     size;
+    uint32_t                   i;
+    nxt_timer_t                *timer;
+    nxt_queue_link_t           *link;
+    nxt_event_engine_t         *engine;
+    nxt_http_cache_conf_t      *conf;
+    nxt_http_cache_entry_t     *entry, *e;
+    nxt_http_cache_response_t  *resp;
+
+    engine = task->thread->engine;
+    conf = ctx->action->cache;
+    entry = ctx->entry;
+
+    size = sizeof(nxt_http_cache_response_t)
+           + ctx->nfields * sizeof(nxt_http_field_t)
+           + ctx->fields_size + ctx->size;
+
+    if (r->inconsistent || engine->shutdown || size > conf->max_size) {
+        goto done;
+    }
+
+    if (entry->resp != NULL) {
+        nxt_queue_remove(&entry->link);
+        engine->http_cache_size -= entry->resp->size;
+
+        nxt_http_cache_response_release(engine, entry->resp);
+        entry->resp = NULL;
+    }
+
+    while (engine->http_cache_size + size > conf->max_size) {
+        link = nxt_queue_last(&engine->http_cache_lru);
+        e = nxt_queue_link_data(link, nxt_http_cache_entry_t, link);
+
+        nxt_http_cache_evict(engine, e);
+    }
+
+    resp = nxt_mp_alloc(engine->mem_pool, size);
+    if (nxt_slow_path(resp == NULL)) {
+        goto done;
+    }
+
+    resp->count = 1;
+    resp->status = r->status;
+    resp->nfields = ctx->nfields;
+    resp->fields = (nxt_http_field_t *) (resp + 1);
+    resp->size = size;
+    resp->date = engine->timers.now;
+
+    p = (u_char *) (resp->fields + resp->nfields);
+
+    for (i = 0; i < resp->nfields; i++) {
+        resp->fields[i] = ctx->fields[i];
+
+        resp->fields[i].name = p;
+        p = nxt_cpymem(p, ctx->fields[i].name, ctx->fields[i].name_length);
+
+        resp->fields[i].value = p;
+        p = nxt_cpymem(p, ctx->fields[i].value, ctx->fields[i].value_length);
+    }
+
+    resp->body = p;
+    resp->body_length = ctx->size;
+
+    if (ctx->size != 0) {
+        nxt_memcpy(p, ctx->body, ctx->size);
+    }
+
+    entry->resp = resp;
+    entry->expires = engine->timers.now + ctx->valid;
+    entry->stale = entry->expires + ctx->stale;
+
+    nxt_queue_insert_head(&engine->http_cache_lru, &entry->link);
+    engine->http_cache_size += size;
+
+    nxt_debug(task, "http cache store %uz", size);
+
+    timer = &engine->http_cache_timer;
+
+    if (!timer->enabled || nxt_msec_diff(entry->stale, timer->time) < 0) {
+        timer->handler = nxt_http_cache_expire;
+        timer->task = &engine->task;
+        timer->log = &nxt_main_log;
+        timer->work_queue = &engine->fast_work_queue;
+        timer->bias = NXT_TIMER_DEFAULT_BIAS;
+
+        nxt_timer_add(engine, timer, ctx->valid + ctx->stale);
+    }
+
+done:
+
+    nxt_http_cache_unlock(task, ctx);
+}
+
+
+static void
+nxt_http_cache_unlock(nxt_task_t *task, nxt_http_cache_t *ctx)
+{
+    nxt_http_cache_t        *waiter;
+    nxt_queue_link_t        *link;
+    nxt_event_engine_t      *engine;
+    nxt_http_cache_entry_t  *entry;
+
+    engine = task->thread->engine;
+
+    entry = ctx->entry;
+    ctx->entry = NULL;
+    ctx->state = NXT_HTTP_CACHE_BYPASS;
+
+    entry->updating = 0;
+
+    while (!nxt_queue_is_empty(&entry->waiters)) {
+        link = nxt_queue_first(&entry->waiters);
+        waiter = nxt_queue_link_data(link, nxt_http_cache_t, link);
+
+        nxt_queue_remove(link);
+
+        waiter->state = NXT_HTTP_CACHE_WOKEN;
+
+        nxt_timer_add(engine, &waiter->request->timer, 0);
+    }
+
+    if (entry->resp == NULL && !entry->deleted) {
+        nxt_http_cache_entry_delete(engine, entry);
+    }
+
+    nxt_http_cache_entry_release(engine, entry);
+}
+
+
+void
+nxt_http_cache_release(nxt_task_t *task, nxt_http_request_t *r)
+{
+    nxt_http_cache_t        *ctx;
+    nxt_event_engine_t      *engine;
+    nxt_http_cache_entry_t  *entry;
+
+    ctx = r->cache;
+    engine = task->thread->engine;
+
+    switch (ctx->state) {
+
+    case NXT_HTTP_CACHE_WAITING:
+        nxt_queue_remove(&ctx->link);
+
+        /* Fall through. */
+
+    case NXT_HTTP_CACHE_WOKEN:
+        (void) nxt_timer_delete(engine, &r->timer);
+
+        entry = ctx->entry;
+        ctx->entry = NULL;
+
+        nxt_http_cache_entry_release(engine, entry);
+        break;
+
+    case NXT_HTTP_CACHE_UPDATING:
+    case NXT_HTTP_CACHE_ACCEPTED:
+    case NXT_HTTP_CACHE_STORING:
+        nxt_http_cache_unlock(task, ctx);
+        break;
+
+    case NXT_HTTP_CACHE_SENDING:
+        nxt_http_cache_response_release(engine, ctx->resp);
+        ctx->resp = NULL;
+        break;
+
+    default:
+        break;
+    }
+
+    ctx->state = NXT_HTTP_CACHE_BYPASS;
+}
+
+
+static nxt_http_cache_entry_t *
+nxt_http_cache_entry_get(nxt_event_engine_t *engine, nxt_str_t *key)
+{
+    nxt_lvlhsh_query_t  lhq;
+
+    lhq.key_hash = nxt_djb_hash(key->start, key->length);
+    lhq.key = *key;
+    lhq.proto = &nxt_http_cache_proto;
+
+    if (nxt_lvlhsh_find(&engine->http_cache, &lhq) != NXT_OK) {
+        return NULL;
+    }
+
+    return lhq.value;
+}
+
+
+static nxt_http_cache_entry_t *
+nxt_http_cache_entry_create(nxt_event_engine_t *engine, nxt_str_t *key)
+{
+    nxt_int_t               ret;
+    nxt_lvlhsh_query_t      lhq;
+    nxt_http_cache_entry_t  *entry;
+
+    if (engine->shutdown) {
+        return NULL;
+    }
+
+    entry = nxt_mp_zalloc(engine->mem_pool,
+                          sizeof(nxt_http_cache_entry_t) + key->length);
+    if (nxt_slow_path(entry == NULL)) {
+        return NULL;
+    }
+
+    entry->key_hash = nxt_djb_hash(key->start, key->length);
+    entry->key_length = key->length;
+    nxt_memcpy(entry->key, key->start, key->length);
+
+    nxt_queue_init(&entry->waiters);
+
+    lhq.key_hash = entry->key_hash;
+    lhq.key = *key;
+    lhq.replace = 0;
+    lhq.value = entry;
+    lhq.proto = &nxt_http_cache_proto;
+    lhq.pool = NULL;
+
+    ret = nxt_lvlhsh_insert(&engine->http_cache, &lhq);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_mp_free(engine->mem_pool, entry);
+        return NULL;
+    }
+
+    return entry;
+}
+
+
+static void
+nxt_http_cache_entry_release(nxt_event_engine_t *engine,
+    nxt_http_cache_entry_t *entry)
+{
+    entry->count--;
+
+    if (entry->count == 0 && entry->deleted) {
+        nxt_mp_free(engine->mem_pool, entry);
+    }
+}
+
+
+static void
+nxt_http_cache_entry_delete(nxt_event_engine_t *engine,
+    nxt_http_cache_entry_t *entry)
+{
+    nxt_lvlhsh_query_t  lhq;
+
+    lhq.key_hash = entry->key_hash;
+    lhq.key.length = entry->key_length;
+    lhq.key.start = entry->key;
+    lhq.proto = &nxt_http_cache_proto;
+    lhq.pool = NULL;
+
+    (void) nxt_lvlhsh_delete(&engine->http_cache, &lhq);
+
+    entry->deleted = 1;
+
+    if (entry->count == 0) {
+        nxt_mp_free(engine->mem_pool, entry);
+    }
+}
+
+
+static void
+nxt_http_cache_evict(nxt_event_engine_t *engine, nxt_http_cache_entry_t *entry)
+{
+    nxt_queue_remove(&entry->link);
+    engine->http_cache_size -= entry->resp->size;
+
+    nxt_http_cache_response_release(engine, entry->resp);
+    entry->resp = NULL;
+
+    /* The entry being updated remains to be completed by its updater. */
+
+    if (!entry->updating) {
+        nxt_http_cache_entry_delete(engine, entry);
+    }
+}
+
+
+static void
+nxt_http_cache_response_release(nxt_event_engine_t *engine,
+    nxt_http_cache_response_t *resp)
+{
+    resp->count--;
+
+    if (resp->count == 0) {
+        nxt_mp_free(engine->mem_pool, resp);
+    }
+}
+
+
+static void
+nxt_http_cache_expire(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_int_t               diff;
+    nxt_msec_t              timeout;
+    nxt_timer_t             *timer;
+    nxt_queue_link_t        *link;
+    nxt_event_engine_t      *engine;
+    nxt_http_cache_entry_t  *entry;
+
+    timer = obj;
+    engine = nxt_timer_data(timer, nxt_event_engine_t, http_cache_timer);
+
+    timeout = 0;
+
+    link = nxt_queue_first(&engine->http_cache_lru);
+
+    while (link != nxt_queue_tail(&engine->http_cache_lru)) {
+        entry = nxt_queue_link_data(link, nxt_http_cache_entry_t, link);
+        link = nxt_queue_next(link);
+
+        diff = nxt_msec_diff(entry->stale, engine->timers.now);
+
+        if (diff <= 0) {
+            nxt_http_cache_evict(engine, entry);
+            continue;
+        }
+
+        if (timeout == 0 || (nxt_msec_t) diff < timeout) {
+            timeout = diff;
+        }
+    }
+
+    if (timeout != 0) {
+        nxt_timer_add(engine, timer, timeout);
+    }
+}
+
+
+static nxt_int_t
+nxt_http_cache_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_http_cache_entry_t  *entry;
+
+    entry = data;
+
+    if (lhq->key.length == entry->key_length
+        && memcmp(lhq->key.start, entry->key, entry->key_length) == 0)
+    {
+        return NXT_OK;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+void
+nxt_http_cache_close(nxt_task_t *task)
+{
+    nxt_queue_link_t        *link;
+    nxt_event_engine_t      *engine;
+    nxt_http_cache_entry_t  *entry;
+
+    engine = task->thread->engine;
+
+    while (!nxt_queue_is_empty(&engine->http_cache_lru)) {
+        link = nxt_queue_first(&engine->http_cache_lru);
+        entry = nxt_queue_link_data(link, nxt_http_cache_entry_t, link);
+
+        nxt_http_cache_evict(engine, entry);
+    }
+
+    if (engine->http_cache_timer.enabled) {
+        (void) nxt_timer_delete(engine, &engine->http_cache_timer);
+    }
+}
@@ -156,6 +156,16 @@ nxt_http_chunk_parse(nxt_task_t *task, nxt_http_chunk_parse_t *hcp,
                         continue;
                     }
 
+                    /* No data follows the terminating chunk. */
+                    hcp->complete = (hcp->pos == b->mem.free
+                                     && b->next == NULL);
+
+                    if (b->retain == 0) {
+                        nxt_work_queue_add(
+                                     &task->thread->engine->fast_work_queue,
+                                     b->completion_handler, task, b, b->parent);
+                    }
+
                     return out;
                 }
 
@@ -0,0 +1,890 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_router.h>
+#include <nxt_http.h>
+
+#if (NXT_HAVE_ZLIB)
+#include <zlib.h>
+#endif
+
+#if (NXT_HAVE_BROTLI)
+#include <brotli/encode.h>
+#endif
+
+
+/*
+ * The compression filter encodes application and proxied responses on
+ * the fly.  It is set up by nxt_http_compress_init() just before the
+ * response header is sent, and then nxt_http_request_send() passes all
+ * response body buffers through nxt_http_compress().  The data of the
+ * buffers is copied to the encoder and the buffers are completed at once,
+ * the encoded data is sent in buffers of NXT_HTTP_COMPRESS_BUF_SIZE bytes
+ * as soon as they are filled, while flush and last buffers flush the
+ * encoder.
+ */
+
+
+typedef enum {
+    NXT_HTTP_COMPRESS_PROCESS = 0,
+    NXT_HTTP_COMPRESS_FLUSH,
+    NXT_HTTP_COMPRESS_FINISH,
+} nxt_http_compress_op_t;
+
+
+typedef struct {
+    nxt_str_t                        encoding;
+    int32_t                          level;
+    nxt_int_t                        (*init)(nxt_http_request_t *r,
+                                         nxt_http_compress_t *cmp);
+    nxt_int_t                        (*compress)(nxt_task_t *task,
+                                         nxt_http_request_t *r,
+                                         nxt_http_compress_t *cmp,
+                                         u_char *data, size_t size,
+                                         nxt_http_compress_op_t op);
+    void                             (*free)(nxt_http_compress_t *cmp);
+} nxt_http_compressor_ops_t;
+
+
+typedef struct {
+    nxt_str_t                        encoding;
+    int32_t                          level;
+    nxt_off_t                        min_length;
+    const nxt_http_compressor_ops_t  *ops;
+} nxt_http_compressor_t;
+
+
+struct nxt_http_compression_s {
+    nxt_http_route_rule_t            *types;
+    nxt_uint_t                       ncompressors;
+    nxt_http_compressor_t            compressors[];
+};
+
+
+struct nxt_http_compress_s {
+    nxt_http_compressor_t            *compressor;
+
+    /* The buffer being filled and the chain of filled buffers. */
+    nxt_buf_t                        *buf;
+    nxt_buf_t                        *out;
+    nxt_buf_t                        **last;
+
+#if (NXT_HAVE_ZLIB)
+    z_stream                         zlib;
+#endif
+#if (NXT_HAVE_BROTLI)
+    BrotliEncoderState               *brotli;
+#endif
+
+    uint8_t                          finished;  /* 1 bit */
+};
+
+
+#define NXT_HTTP_COMPRESS_BUF_SIZE  (16 * 1024)
+
+
+static nxt_bool_t nxt_http_accept_encoding_quality(u_char **pos, u_char *end);
+static nxt_buf_t *nxt_http_compress_buf(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_http_compress_t *cmp);
+static void nxt_http_compress_buf_done(nxt_http_compress_t *cmp,
+    nxt_http_compress_op_t op);
+#if (NXT_HAVE_ZLIB)
+static nxt_int_t nxt_http_compress_gzip_init(nxt_http_request_t *r,
+    nxt_http_compress_t *cmp);
+static nxt_int_t nxt_http_compress_deflate_init(nxt_http_request_t *r,
+    nxt_http_compress_t *cmp);
+static nxt_int_t nxt_http_compress_zlib_init(nxt_http_request_t *r,
+    nxt_http_compress_t *cmp, int bits);
+static voidpf nxt_http_compress_zlib_alloc(voidpf opaque, uInt items,
+    uInt size);
+static void nxt_http_compress_zlib_free(voidpf opaque, voidpf address);
+static nxt_int_t nxt_http_compress_zlib(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_http_compress_t *cmp, u_char *data,
+    size_t size, nxt_http_compress_op_t op);
+static void nxt_http_compress_zlib_end(nxt_http_compress_t *cmp);
+#endif
+#if (NXT_HAVE_BROTLI)
+static nxt_int_t nxt_http_compress_brotli_init(nxt_http_request_t *r,
+    nxt_http_compress_t *cmp);
+static void *nxt_http_compress_brotli_alloc(void *opaque, size_t size);
+static void nxt_http_compress_brotli_free(void *opaque, void *address);
+static nxt_int_t nxt_http_compress_brotli(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_http_compress_t *cmp, u_char *data,
+    size_t size, nxt_http_compress_op_t op);
+static void nxt_http_compress_brotli_end(nxt_http_compress_t *cmp);
+#endif
+
+
+static const nxt_http_compressor_ops_t  nxt_http_compressors[] = {
+#if (NXT_HAVE_ZLIB)
+    {
+        nxt_string("gzip"),
+        6,
+        nxt_http_compress_gzip_init,
+        nxt_http_compress_zlib,
+        nxt_http_compress_zlib_end,
+    },
+
+    {
+        nxt_string("deflate"),
+        6,
+        nxt_http_compress_deflate_init,
+        nxt_http_compress_zlib,
+        nxt_http_compress_zlib_end,
+    },
+#endif
+
+#if (NXT_HAVE_BROTLI)
+    {
+        nxt_string("br"),
+        4,
+        nxt_http_compress_brotli_init,
+        nxt_http_compress_brotli,
+        nxt_http_compress_brotli_end,
+    },
+#endif
+
+    { nxt_null_string, 0, NULL, NULL, NULL },
+};
+
+
+static nxt_conf_map_t  nxt_http_compressor_conf[] = {
+    {
+        nxt_string("encoding"),
+        NXT_CONF_MAP_STR_COPY,
+        offsetof(nxt_http_compressor_t, encoding),
+    },
+
+    {
+        nxt_string("level"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_http_compressor_t, level),
+    },
+
+    {
+        nxt_string("min_length"),
+        NXT_CONF_MAP_OFF,
+        offsetof(nxt_http_compressor_t, min_length),
+    },
+};
+
+
+nxt_http_compression_t *
+nxt_http_compression_init(nxt_task_t *task, nxt_mp_t *mp,
+    nxt_conf_value_t *conf)
+{
+    nxt_int_t                        ret;
+    nxt_uint_t                       i, n;
+    nxt_conf_value_t                 *types, *compressors, *cv;
+    nxt_http_compressor_t            *c;
+    nxt_http_compression_t           *compression;
+    const nxt_http_compressor_ops_t  *ops;
+
+    static nxt_str_t  types_path = nxt_string("/types");
+    static nxt_str_t  compressors_path = nxt_string("/compressors");
+    static nxt_str_t  default_types = nxt_string(
+        "[\"text/*\", \"application/javascript\", \"application/json\","
+        " \"application/xml\", \"image/svg+xml\"]");
+
+    compressors = nxt_conf_get_path(conf, &compressors_path);
+    n = nxt_conf_array_elements_count(compressors);
+
+    compression = nxt_mp_zget(mp, sizeof(nxt_http_compression_t)
+                                  + n * sizeof(nxt_http_compressor_t));
+    if (nxt_slow_path(compression == NULL)) {
+        return NULL;
+    }
+
+    types = nxt_conf_get_path(conf, &types_path);
+
+    if (types == NULL) {
+        types = nxt_conf_json_parse_str(mp, &default_types);
+        if (nxt_slow_path(types == NULL)) {
+            return NULL;
+        }
+    }
+
+    compression->types = nxt_http_route_types_rule_create(task, mp, types);
+    if (nxt_slow_path(compression->types == NULL)) {
+        return NULL;
+    }
+
+    compression->ncompressors = n;
+
+    for (i = 0; i < n; i++) {
+        cv = nxt_conf_get_array_element(compressors, i);
+        c = &compression->compressors[i];
+
+        c->level = -1;
+        c->min_length = 20;
+
+        ret = nxt_conf_map_object(mp, cv, nxt_http_compressor_conf,
+                                  nxt_nitems(nxt_http_compressor_conf), c);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
+
+        for (ops = nxt_http_compressors; ops->init != NULL; ops++) {
+            if (nxt_strstr_eq(&c->encoding, &ops->encoding)) {
+                break;
+            }
+        }
+
+        if (nxt_slow_path(ops->init == NULL)) {
+            nxt_alert(task, "unsupported compression encoding \"%V\"",
+                      &c->encoding);
+            return NULL;
+        }
+
+        c->ops = ops;
+
+        if (c->level == -1) {
+            c->level = ops->level;
+        }
+    }
+
+    return compression;
+}
+
+
+nxt_bool_t
+nxt_http_accept_encoding(nxt_http_request_t *r, const char *encoding,
+    size_t length)
+{
+    u_char            *p, *end, *name;
+    size_t            len;
+    nxt_int_t         any;
+    nxt_bool_t        accepted;
+    nxt_http_field_t  *field;
+
+    field = r->accept_encoding;
+
+    if (field == NULL) {
+        return 0;
+    }
+
+    any = -1;
+
+    p = field->value;
+    end = p + field->value_length;
+
+    while (p < end) {
+
+        if (*p == ',' || *p == ' ' || *p == '\t') {
+            p++;
+            continue;
+        }
+
+        name = p;
+
+        while (p < end && *p != ',' && *p != ';' && *p != ' ' && *p != '\t') {
+            p++;
+        }
+
+        len = p - name;
+
+        accepted = nxt_http_accept_encoding_quality(&p, end);
+
+        if (len == length && nxt_memcasecmp(name, encoding, length) == 0) {
+            return accepted;
+        }
+
+        if (len == 1 && name[0] == '*') {
+            any = accepted;
+        }
+    }
+
+    return (any == 1);
+}
+
+
+/*
+ * Skips the parameters of an Accept-Encoding list element and returns
+ * whether its quality value is not zero.
+ */
+
+static nxt_bool_t
+nxt_http_accept_encoding_quality(u_char **pos, u_char *end)
+{
+    u_char      *p;
+    nxt_bool_t  zero;
+
+    p = *pos;
+    zero = 0;
+
+    while (p < end && *p != ',') {
+
+        if (*p++ != ';') {
+            continue;
+        }
+
+        while (p < end && (*p == ' ' || *p == '\t')) {
+            p++;
+        }
+
+        if (end - p < 2 || (p[0] != 'q' && p[0] != 'Q') || p[1] != '=') {
+            continue;
+        }
+
+        p += 2;
+
+        zero = (p < end && *p == '0');
+
+        while (p < end && *p != ',' && *p != ';' && *p != ' ' && *p != '\t') {
+            if (*p != '0' && *p != '.') {
+                zero = 0;
+            }
+
+            p++;
+        }
+    }
+
+    *pos = p;
+
+    return !zero;
+}
+
+
+nxt_int_t
+nxt_http_compress_init(nxt_task_t *task, nxt_http_request_t *r)
+{
+    u_char                  *p;
+    size_t                  length;
+    nxt_int_t               ret;
+    nxt_off_t               n;
+    nxt_uint_t              i;
+    nxt_http_field_t        *field, *content_type, *content_length, *etag;
+    nxt_router_conf_t       *rtcf;
+    nxt_http_compress_t     *cmp;
+    nxt_http_compressor_t   *c;
+    nxt_http_compression_t  *compression;
+
+    rtcf = r->conf->socket_conf->router_conf;
+    compression = rtcf->compression;
+
+    if (compression == NULL
+        || r->status != NXT_HTTP_OK
+        || nxt_str_eq(r->method, "HEAD", 4))
+    {
+        return NXT_OK;
+    }
+
+    content_type = NULL;
+    content_length = NULL;
+    etag = NULL;
+
+    nxt_list_each(field, r->resp.fields) {
+
+        if (field->skip) {
+            continue;
+        }
+
+        switch (field->name_length) {
+
+        case nxt_length("ETag"):
+            if (nxt_memcasecmp(field->name, "ETag", 4) == 0) {
+                etag = field;
+            }
+
+            break;
+
+        case nxt_length("Content-Type"):
+            if (nxt_memcasecmp(field->name, "Content-Type", 12) == 0) {
+                content_type = field;
+            }
+
+            break;
+
+        case nxt_length("Cache-Control"):
+            if (nxt_memcasecmp(field->name, "Cache-Control", 13) == 0
+                && nxt_memcasestrn(field->value,
+                                   field->value + field->value_length,
+                                   "no-transform", 12)
+                   != NULL)
+            {
+                return NXT_OK;
+            }
+
+            break;
+
+        case nxt_length("Content-Length"):
+            if (nxt_memcasecmp(field->name, "Content-Length", 14) == 0) {
+                content_length = field;
+            }
+
+            break;
+
+        case nxt_length("Content-Encoding"):
+            if (nxt_memcasecmp(field->name, "Content-Encoding", 16) == 0) {
+                return NXT_OK;
+            }
+
+            break;
+        }
+
+    } nxt_list_loop;
+
+    if (content_type == NULL) {
+        return NXT_OK;
+    }
+
+    p = memchr(content_type->value, ';', content_type->value_length);
+
+    length = (p != NULL) ? (size_t) (p - content_type->value)
+                         : content_type->value_length;
+
+    while (length > 0 && content_type->value[length - 1] == ' ') {
+        length--;
+    }
+
+    ret = nxt_http_route_test_rule(r, compression->types, content_type->value,
+                                   length);
+    if (nxt_slow_path(ret == NXT_ERROR)) {
+        return NXT_ERROR;
+    }
+
+    if (ret == 0) {
+        return NXT_OK;
+    }
+
+    n = r->resp.content_length_n;
+
+    if (n < 0 && content_length != NULL) {
+        n = nxt_off_t_parse(content_length->value,
+                            content_length->value_length);
+    }
+
+    if (n == 0) {
+        return NXT_OK;
+    }
+
+    field = nxt_list_zero_add(r->resp.fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_http_field_set(field, "Vary", "Accept-Encoding");
+
+    for (i = 0; i < compression->ncompressors; i++) {
+        c = &compression->compressors[i];
+
+        if ((n < 0 || n >= c->min_length)
+            && nxt_http_accept_encoding(r, (char *) c->encoding.start,
+                                        c->encoding.length))
+        {
+            goto found;
+        }
+    }
+
+    return NXT_OK;
+
+found:
+
+    cmp = nxt_mp_zget(r->mem_pool, sizeof(nxt_http_compress_t));
+    if (nxt_slow_path(cmp == NULL)) {
+        return NXT_ERROR;
+    }
+
+    cmp->compressor = c;
+    cmp->last = &cmp->out;
+
+    ret = c->ops->init(r, cmp);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_alert(task, "%V compression init failed", &c->encoding);
+        return NXT_ERROR;
+    }
+
+    field = nxt_list_zero_add(r->resp.fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_http_field_name_set(field, "Content-Encoding");
+    field->value = c->encoding.start;
+    field->value_length = c->encoding.length;
+
+    if (content_length != NULL) {
+        content_length->skip = 1;
+    }
+
+    r->resp.content_length = NULL;
+    r->resp.content_length_n = -1;
+
+    /* The encoded representation is not byte-for-byte identical. */
+
+    if (etag != NULL && etag->value_length > 0 && etag->value[0] == '"') {
+        p = nxt_mp_nget(r->mem_pool, etag->value_length + 2);
+        if (nxt_slow_path(p == NULL)) {
+            return NXT_ERROR;
+        }
+
+        p[0] = 'W';
+        p[1] = '/';
+        nxt_memcpy(p + 2, etag->value, etag->value_length);
+
+        etag->value = p;
+        etag->value_length += 2;
+    }
+
+    r->compress = cmp;
+
+    return NXT_OK;
+}
+
+
+/*
+ * Returns the set of configured encodings that the request accepts.
+ * The compression filter chooses the encoding of a response by this set,
+ * so the response cache keeps separate entries for different sets.
+ */
+
+uint32_t
+nxt_http_compress_accepted(nxt_http_request_t *r)
+{
+    uint32_t                encodings;
+    nxt_uint_t              i;
+    nxt_http_compressor_t   *c;
+    nxt_http_compression_t  *compression;
+
+    compression = r->conf->socket_conf->router_conf->compression;
+
+    if (compression == NULL) {
+        return 0;
+    }
+
+    encodings = 0;
+
+    for (i = 0; i < compression->ncompressors; i++) {
+        c = &compression->compressors[i];
+
+        if (nxt_http_accept_encoding(r, (char *) c->encoding.start,
+                                     c->encoding.length))
+        {
+            encodings |= 1 << (c->ops - nxt_http_compressors);
+        }
+    }
+
+    return encodings;
+}
+
+
+nxt_buf_t *
+nxt_http_compress(nxt_task_t *task, nxt_http_request_t *r, nxt_buf_t *in)
+{
+    size_t                  size;
+    nxt_int_t               ret;
+    nxt_buf_t               *b, *next, *out, *done, **last_done, *sync;
+    nxt_buf_t               **last_sync;
+    nxt_http_compress_t     *cmp;
+    nxt_http_compress_op_t  op;
+    nxt_http_compressor_t   *c;
+
+    cmp = r->compress;
+    c = cmp->compressor;
+
+    done = NULL;
+    last_done = &done;
+    sync = NULL;
+    last_sync = &sync;
+
+    ret = NXT_OK;
+
+    for (b = in; b != NULL; b = next) {
+        next = b->next;
+        b->next = NULL;
+
+        if (!nxt_buf_is_sync(b) && nxt_buf_is_mem(b)) {
+            size = nxt_buf_mem_used_size(&b->mem);
+
+            if (size != 0 && !cmp->finished && ret == NXT_OK) {
+                ret = c->ops->compress(task, r, cmp, b->mem.pos, size,
+                                       NXT_HTTP_COMPRESS_PROCESS);
+            }
+
+            b->mem.pos = b->mem.free;
+        }
+
+        if (nxt_buf_is_last(b)) {
+            op = NXT_HTTP_COMPRESS_FINISH;
+
+        } else if (nxt_buf_is_flush(b)) {
+            op = NXT_HTTP_COMPRESS_FLUSH;
+
+        } else {
+            op = NXT_HTTP_COMPRESS_PROCESS;
+        }
+
+        if (op != NXT_HTTP_COMPRESS_PROCESS && !cmp->finished
+            && ret == NXT_OK)
+        {
+            ret = c->ops->compress(task, r, cmp, NULL, 0, op);
+
+            if (op == NXT_HTTP_COMPRESS_FINISH) {
+                c->ops->free(cmp);
+                cmp->finished = 1;
+            }
+        }
+
+        if (nxt_buf_is_sync(b) || nxt_buf_is_last(b)) {
+            *last_sync = b;
+            last_sync = &b->next;
+
+        } else {
+            *last_done = b;
+            last_done = &b->next;
+        }
+    }
+
+    if (done != NULL) {
+        nxt_sendbuf_drain(task, &task->thread->engine->fast_work_queue, done);
+    }
+
+    if (nxt_slow_path(ret != NXT_OK)) {
+        /* The request error has already been set. */
+        return NULL;
+    }
+
+    out = cmp->out;
+
+    *cmp->last = sync;
+
+    cmp->out = NULL;
+    cmp->last = &cmp->out;
+
+    return (out != NULL) ? out : sync;
+}
+
+
+static nxt_buf_t *
+nxt_http_compress_buf(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_compress_t *cmp)
+{
+    if (cmp->buf == NULL) {
+        cmp->buf = nxt_http_buf_mem(task, r, NXT_HTTP_COMPRESS_BUF_SIZE);
+    }
+
+    return cmp->buf;
+}
+
+
+static void
+nxt_http_compress_buf_done(nxt_http_compress_t *cmp, nxt_http_compress_op_t op)
+{
+    nxt_buf_t  *b;
+
+    b = cmp->buf;
+
+    if (nxt_buf_mem_free_size(&b->mem) == 0
+        || (op != NXT_HTTP_COMPRESS_PROCESS
+            && nxt_buf_mem_used_size(&b->mem) != 0))
+    {
+        *cmp->last = b;
+        cmp->last = &b->next;
+
+        cmp->buf = NULL;
+    }
+}
+
+
+#if (NXT_HAVE_ZLIB)
+
+static nxt_int_t
+nxt_http_compress_gzip_init(nxt_http_request_t *r, nxt_http_compress_t *cmp)
+{
+    /* The gzip wrapper. */
+    return nxt_http_compress_zlib_init(r, cmp, MAX_WBITS + 16);
+}
+
+
+static nxt_int_t
+nxt_http_compress_deflate_init(nxt_http_request_t *r, nxt_http_compress_t *cmp)
+{
+    /* The zlib wrapper. */
+    return nxt_http_compress_zlib_init(r, cmp, MAX_WBITS);
+}
+
+
+static nxt_int_t
+nxt_http_compress_zlib_init(nxt_http_request_t *r, nxt_http_compress_t *cmp,
+    int bits)
+{
+    int  rc;
+
+    cmp->zlib.zalloc = nxt_http_compress_zlib_alloc;
+    cmp->zlib.zfree = nxt_http_compress_zlib_free;
+    cmp->zlib.opaque = r->mem_pool;
+
+    rc = deflateInit2(&cmp->zlib, cmp->compressor->level, Z_DEFLATED, bits,
+                      MAX_MEM_LEVEL - 1, Z_DEFAULT_STRATEGY);
+
+    return (rc == Z_OK) ? NXT_OK : NXT_ERROR;
+}
+
+
+static voidpf
+nxt_http_compress_zlib_alloc(voidpf opaque, uInt items, uInt size)
+{
+    return nxt_mp_alloc(opaque, (size_t) items * size);
+}
+
+
+static void
+nxt_http_compress_zlib_free(voidpf opaque, voidpf address)
+{
+    nxt_mp_free(opaque, address);
+}
+
+
+static nxt_int_t
+nxt_http_compress_zlib(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_compress_t *cmp, u_char *data, size_t size,
+    nxt_http_compress_op_t op)
+{
+    int        rc;
+    z_stream   *zs;
+    nxt_buf_t  *b;
+
+    static const int  flush[] = { Z_NO_FLUSH, Z_SYNC_FLUSH, Z_FINISH };
+
+    zs = &cmp->zlib;
+
+    zs->next_in = data;
+    zs->avail_in = size;
+
+    do {
+        b = nxt_http_compress_buf(task, r, cmp);
+        if (nxt_slow_path(b == NULL)) {
+            return NXT_ERROR;
+        }
+
+        zs->next_out = b->mem.free;
+        zs->avail_out = nxt_buf_mem_free_size(&b->mem);
+
+        rc = deflate(zs, flush[op]);
+
+        b->mem.free = zs->next_out;
+
+        if (nxt_slow_path(rc == Z_STREAM_ERROR)) {
+            nxt_alert(task, "deflate() failed: %d", rc);
+            nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
+            return NXT_ERROR;
+        }
+
+        nxt_http_compress_buf_done(cmp, op);
+
+    } while (zs->avail_out == 0 && rc != Z_STREAM_END);
+
+    return NXT_OK;
+}
+
+
+static void
+nxt_http_compress_zlib_end(nxt_http_compress_t *cmp)
+{
+    (void) deflateEnd(&cmp->zlib);
+}
+
+#endif
+
+
+#if (NXT_HAVE_BROTLI)
+
+static nxt_int_t
+nxt_http_compress_brotli_init(nxt_http_request_t *r, nxt_http_compress_t *cmp)
+{
+    cmp->brotli = BrotliEncoderCreateInstance(nxt_http_compress_brotli_alloc,
+                                              nxt_http_compress_brotli_free,
+                                              r->mem_pool);
+    if (nxt_slow_path(cmp->brotli == NULL)) {
+        return NXT_ERROR;
+    }
+
+    if (!BrotliEncoderSetParameter(cmp->brotli, BROTLI_PARAM_QUALITY,
+                                   cmp->compressor->level))
+    {
+        return NXT_ERROR;
+    }
+
+    return NXT_OK;
+}
+
+
+static void *
+nxt_http_compress_brotli_alloc(void *opaque, size_t size)
+{
+    return nxt_mp_alloc(opaque, size);
+}
+
+
+static void
+nxt_http_compress_brotli_free(void *opaque, void *address)
+{
+    if (address != NULL) {
+        nxt_mp_free(opaque, address);
+    }
+}
+
+
+static nxt_int_t
+nxt_http_compress_brotli(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_compress_t *cmp, u_char *data, size_t size,
+    nxt_http_compress_op_t op)
+{
+    size_t         avail_in, avail_out;
+    uint8_t        *next_out;
+    nxt_buf_t      *b;
+    const uint8_t  *next_in;
+
+    static const BrotliEncoderOperation  operation[] = {
+        BROTLI_OPERATION_PROCESS,
+        BROTLI_OPERATION_FLUSH,
+        BROTLI_OPERATION_FINISH,
+    };
+
+    next_in = data;
+    avail_in = size;
+
+    for ( ;; ) {
+        b = nxt_http_compress_buf(task, r, cmp);
+        if (nxt_slow_path(b == NULL)) {
+            return NXT_ERROR;
+        }
+
+        next_out = b->mem.free;
+        avail_out = nxt_buf_mem_free_size(&b->mem);
+
+        if (nxt_slow_path(!BrotliEncoderCompressStream(cmp->brotli,
+                                                       operation[op],
+                                                       &avail_in, &next_in,
+                                                       &avail_out, &next_out,
+                                                       NULL)))
+        {
+            nxt_alert(task, "BrotliEncoderCompressStream() failed");
+            nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
+            return NXT_ERROR;
+        }
+
+        b->mem.free = next_out;
+
+        if (avail_in == 0 && !BrotliEncoderHasMoreOutput(cmp->brotli)
+            && (op != NXT_HTTP_COMPRESS_FINISH
+                || BrotliEncoderIsFinished(cmp->brotli)))
+        {
+            nxt_http_compress_buf_done(cmp, op);
+            return NXT_OK;
+        }
+
+        nxt_http_compress_buf_done(cmp, op);
+    }
+}
+
+
+static void
+nxt_http_compress_brotli_end(nxt_http_compress_t *cmp)
+{
+    BrotliEncoderDestroyInstance(cmp->brotli);
+}
+
+#endif
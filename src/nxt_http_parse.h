@@ -103,6 +103,7 @@ typedef struct {
 
     uint8_t                   state;
     uint8_t                   last;         /* 1 bit */
+    uint8_t                   complete;     /* 1 bit */
     uint8_t                   chunk_error;  /* 1 bit */
     uint8_t                   error;        /* 1 bit */
 } nxt_http_chunk_parse_t;
@@ -53,6 +53,7 @@ nxt_int_t
 nxt_http_proxy_init(nxt_mp_t *mp, nxt_http_action_t *action,
     nxt_http_action_conf_t *acf)
 {
+    nxt_int_t             ret;
     nxt_str_t             name;
     nxt_sockaddr_t        *sa;
     nxt_upstream_t        *up;
@@ -92,6 +93,12 @@ nxt_http_proxy_init(nxt_mp_t *mp, nxt_http_action_t *action,
         proxy->protocol = NXT_HTTP_PROTO_H1;
         up->type.proxy = proxy;
 
+        ret = nxt_upstream_keepalive_create(mp, acf->keepalive,
+                                            &up->keepalive);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
+
         action->u.upstream = up;
         action->handler = nxt_http_proxy;
     }
@@ -143,6 +150,9 @@ nxt_upstream_proxy_handler(nxt_task_t *task, nxt_http_request_t *r,
     peer->server = us;
 
     us->upstream = upstream;
+    us->mem_pool = r->mem_pool;
+    us->start = nxt_thread_monotonic_time(task->thread);
+
     upstream->proto->get(task, us);
 
     return NULL;
@@ -255,6 +265,8 @@ nxt_http_proxy_header_read(nxt_task_t *task, void *obj, void *data)
 
     r->status = peer->status;
 
+    peer->server->response = nxt_thread_monotonic_time(task->thread);
+
     nxt_debug(task, "http proxy status: %d", peer->status);
 
     nxt_list_each(field, peer->fields) {
@@ -275,6 +287,13 @@ nxt_http_proxy_header_read(nxt_task_t *task, void *obj, void *data)
 
     } nxt_list_loop;
 
+    if (nxt_slow_path(nxt_http_cache_store_init(task, r) != NXT_OK
+                      || nxt_http_compress_init(task, r) != NXT_OK))
+    {
+        nxt_http_proxy_error(task, r, peer);
+        return;
+    }
+
     r->state = &nxt_http_proxy_read_state;
 
     nxt_http_request_header_send(task, r, nxt_http_proxy_send_body, peer);
@@ -311,6 +330,8 @@ nxt_http_proxy_send_body(nxt_task_t *task, void *obj, void *data)
     } else {
         nxt_http_proto[peer->protocol].peer_close(task, peer);
 
+        nxt_upstream_server_free(task, peer->server);
+
         nxt_mp_release(r->mem_pool);
     }
 }
@@ -375,14 +396,50 @@ nxt_http_proxy_buf_mem_free(nxt_task_t *task, nxt_http_request_t *r,
 static void
 nxt_http_proxy_error(nxt_task_t *task, void *obj, void *data)
 {
-    nxt_http_peer_t     *peer;
-    nxt_http_request_t  *r;
+    nxt_http_peer_t        *peer;
+    nxt_http_request_t     *r;
+    nxt_upstream_server_t  *us;
 
     r = obj;
     peer = r->peer;
 
     nxt_http_proto[peer->protocol].peer_close(task, peer);
 
+    if (peer->retry && peer->status == NXT_HTTP_BAD_GATEWAY) {
+        nxt_debug(task, "http proxy retry");
+
+        peer->closed = 0;
+        r->state = &nxt_http_proxy_header_send_state;
+
+        nxt_http_proto[peer->protocol].peer_connect(task, peer);
+        return;
+    }
+
+    us = peer->server;
+
+    us->failed = (us->response == 0
+                  && (peer->status == NXT_HTTP_BAD_GATEWAY
+                      || peer->status == NXT_HTTP_GATEWAY_TIMEOUT));
+
+    nxt_upstream_server_free(task, us);
+
+    if (us->failed
+        && r->state == &nxt_http_proxy_header_send_state
+        && us->upstream->proto != &nxt_upstream_simple_proto)
+    {
+        /* The request has not been sent, another server can be tried. */
+
+        nxt_debug(task, "http proxy next upstream");
+
+        peer->closed = 0;
+
+        us->failed = 0;
+        us->start = nxt_thread_monotonic_time(task->thread);
+
+        us->upstream->proto->get(task, us);
+        return;
+    }
+
     nxt_mp_release(r->mem_pool);
 
     nxt_http_request_error(&r->task, r, peer->status);
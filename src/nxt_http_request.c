@@ -24,6 +24,8 @@ static void nxt_http_request_proto_info(nxt_task_t *task,
 static void nxt_http_request_mem_buf_completion(nxt_task_t *task, void *obj,
     void *data);
 static void nxt_http_request_done(nxt_task_t *task, void *obj, void *data);
+static void nxt_http_request_stats(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_proto_t proto);
 
 static u_char *nxt_http_date_cache_handler(u_char *buf, nxt_realtime_t *now,
     struct tm *tm, size_t size, const char *format);
@@ -73,6 +75,12 @@ nxt_http_init(nxt_task_t *task)
         return ret;
     }
 
+    ret = nxt_h2p_init(task);
+
+    if (ret != NXT_OK) {
+        return ret;
+    }
+
     return nxt_http_response_hash_init(task);
 }
 
@@ -278,7 +286,7 @@ nxt_http_request_create(nxt_task_t *task)
     r->resp.content_length_n = -1;
     r->state = &nxt_http_request_init_state;
 
-    r->start_time = nxt_thread_monotonic_time(task->thread);
+    r->start_time = nxt_precise_time();
 
     task->thread->engine->requests_cnt++;
 
@@ -567,6 +575,18 @@ nxt_http_request_action(nxt_task_t *task, nxt_http_request_t *r,
                 }
             }
 
+            if (action->cache != NULL && r->cache == NULL) {
+                ret = nxt_http_cache(task, r, action);
+
+                if (ret == NXT_DONE) {
+                    return;
+                }
+
+                if (nxt_slow_path(ret != NXT_OK)) {
+                    break;
+                }
+            }
+
             action = action->handler(task, r, action);
 
             if (action == NULL) {
@@ -720,6 +740,17 @@ nxt_http_request_ws_frame_start(nxt_task_t *task, nxt_http_request_t *r,
 void
 nxt_http_request_send(nxt_task_t *task, nxt_http_request_t *r, nxt_buf_t *out)
 {
+    if (r->compress != NULL) {
+        out = nxt_http_compress(task, r, out);
+        if (out == NULL) {
+            return;
+        }
+    }
+
+    if (r->cache != NULL) {
+        nxt_http_cache_store(task, r, out);
+    }
+
     if (nxt_fast_path(r->proto.any != NULL)) {
         nxt_http_proto[r->protocol].send(task, r, out);
     }
@@ -812,12 +843,12 @@ nxt_http_request_error_handler(nxt_task_t *task, void *obj, void *data)
 void
 nxt_http_request_close_handler(nxt_task_t *task, void *obj, void *data)
 {
-    nxt_tstr_t               *log_format;
     nxt_http_proto_t         proto;
     nxt_http_request_t       *r;
     nxt_http_protocol_t      protocol;
     nxt_socket_conf_joint_t  *conf;
     nxt_router_access_log_t  *access_log;
+    nxt_router_log_format_t  *log_format;
 
     r = obj;
     proto.any = data;
@@ -827,6 +858,8 @@ nxt_http_request_close_handler(nxt_task_t *task, void *obj, void *data)
     if (!r->logged) {
         r->logged = 1;
 
+        nxt_http_request_stats(task, r, proto);
+
         access_log = conf->socket_conf->router_conf->access_log;
         log_format = conf->socket_conf->router_conf->log_format;
 
@@ -852,6 +885,10 @@ nxt_http_request_close_handler(nxt_task_t *task, void *obj, void *data)
         nxt_tstr_query_release(r->tstr_query);
     }
 
+    if (r->cache != NULL) {
+        nxt_http_cache_release(task, r);
+    }
+
     if (nxt_fast_path(proto.any != NULL)) {
         protocol = r->protocol;
 
@@ -862,6 +899,38 @@ nxt_http_request_close_handler(nxt_task_t *task, void *obj, void *data)
 }
 
 
+static void
+nxt_http_request_stats(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_proto_t proto)
+{
+    uint64_t    usec;
+    nxt_off_t   received, sent;
+    nxt_uint_t  slot;
+
+    slot = task->thread->engine->id % NXT_ROUTER_STATS_SLOTS;
+
+    received = (r->body != NULL) ? r->content_length_n : 0;
+
+    sent = (proto.any != NULL)
+           ? nxt_http_proto[r->protocol].body_bytes_sent(task, proto) : 0;
+
+    usec = (nxt_precise_time() - r->start_time) / 1000;
+
+    nxt_status_counters_add(&r->conf->socket_conf->stats->slots[slot],
+                            r->status, received, sent, usec);
+
+    if (r->route_stats != NULL) {
+        nxt_status_counters_add(&r->route_stats->slots[slot], r->status,
+                                received, sent, usec);
+    }
+
+    if (r->app_stats != NULL) {
+        nxt_status_counters_add(&r->app_stats->slots[slot], r->status,
+                                received, sent, usec);
+    }
+}
+
+
 static u_char *
 nxt_http_date_cache_handler(u_char *buf, nxt_realtime_t *now, struct tm *tm,
     size_t size, const char *format)
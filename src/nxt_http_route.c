@@ -11,6 +11,23 @@
 #include <nxt_regex.h>
 
 
+#define NXT_HTTP_ROUTE_INDEX_MIN       16
+#define NXT_HTTP_ROUTE_ADDR_INDEX_MIN  16
+#define NXT_HTTP_ROUTE_REGEX_SET_MIN   4
+
+
+/* Request values that route steps depend on. */
+
+#define NXT_HTTP_ROUTE_DEP_SCHEME      0x01
+#define NXT_HTTP_ROUTE_DEP_HOST        0x02
+#define NXT_HTTP_ROUTE_DEP_URI         0x04
+#define NXT_HTTP_ROUTE_DEP_METHOD      0x08
+#define NXT_HTTP_ROUTE_DEP_ARGS        0x10
+#define NXT_HTTP_ROUTE_DEP_SOURCE      0x20
+/* Header fields and cookies are not memoized. */
+#define NXT_HTTP_ROUTE_DEP_FIELDS      0x40
+
+
 typedef enum {
     NXT_HTTP_ROUTE_TABLE = 0,
     NXT_HTTP_ROUTE_STRING,
@@ -121,10 +138,23 @@ typedef struct {
 } nxt_http_route_table_t;
 
 
+/*
+ * Prefix trees of address patterns that match any port,
+ * the first item is for IPv4 and the second one is for IPv6.
+ */
+
+typedef struct {
+    nxt_http_route_addr_node_t     *positive[2];
+    nxt_http_route_addr_node_t     *negative[2];
+    nxt_bool_t                     any_positive;
+} nxt_http_route_addr_index_t;
+
+
 struct nxt_http_route_addr_rule_s {
     /* The object must be the first field. */
     nxt_http_route_object_t        object:8;
     uint32_t                       items;
+    nxt_http_route_addr_index_t    *index;
     nxt_http_route_addr_pattern_t  addr_pattern[0];
 };
 
@@ -138,13 +168,46 @@ typedef union {
 
 typedef struct {
     uint32_t                       items;
+    /* Dependencies of this and all previous steps of the route. */
+    uint32_t                       depends;
     nxt_http_action_t              action;
     nxt_http_route_test_t          test[0];
 } nxt_http_route_match_t;
 
 
+typedef struct nxt_http_route_trie_s  nxt_http_route_trie_t;
+
+struct nxt_http_route_trie_s {
+    u_char                         ch;
+
+    nxt_array_t                    *next;    /* of nxt_http_route_trie_t * */
+    nxt_array_t                    *prefix;  /* of uint32_t */
+    nxt_array_t                    *exact;   /* of uint32_t */
+};
+
+
+typedef struct {
+    nxt_str_t                      host;
+    uint32_t                       *steps;
+} nxt_http_route_host_t;
+
+
+typedef struct {
+    uint32_t                       words;
+
+    /* Bitmaps of steps that do not depend on the host or URI. */
+    uint32_t                       *any_host;
+    uint32_t                       *any_uri;
+
+    nxt_lvlhsh_t                   hosts;
+    nxt_http_route_trie_t          *uri;
+} nxt_http_route_index_t;
+
+
 struct nxt_http_route_s {
     nxt_str_t                      name;
+    nxt_router_stats_t             *stats;
+    nxt_http_route_index_t         *index;
     uint32_t                       items;
     nxt_http_route_match_t         *match[0];
 };
@@ -160,6 +223,21 @@ static nxt_http_route_t *nxt_http_route_create(nxt_task_t *task,
     nxt_router_temp_conf_t *tmcf, nxt_conf_value_t *cv);
 static nxt_http_route_match_t *nxt_http_route_match_create(nxt_task_t *task,
     nxt_router_temp_conf_t *tmcf, nxt_conf_value_t *cv);
+static nxt_int_t nxt_http_route_index_create(nxt_mp_t *mp,
+    nxt_http_route_t *route);
+static nxt_bool_t nxt_http_route_indexable(nxt_http_route_rule_t *rule,
+    nxt_bool_t prefix);
+static nxt_int_t nxt_http_route_index_host(nxt_mp_t *mp,
+    nxt_http_route_index_t *index, nxt_array_t *hosts, nxt_str_t *host,
+    uint32_t step);
+static nxt_int_t nxt_http_route_host_test(nxt_lvlhsh_query_t *lhq, void *data);
+static nxt_int_t nxt_http_route_index_uri(nxt_mp_t *mp,
+    nxt_http_route_trie_t *node, nxt_http_route_pattern_slice_t *slice,
+    uint32_t step);
+static nxt_http_route_trie_t *nxt_http_route_trie_next(
+    nxt_http_route_trie_t *node, u_char ch);
+static nxt_int_t nxt_http_route_trie_add(nxt_mp_t *mp, nxt_array_t **steps,
+    uint32_t step);
 static nxt_http_route_table_t *nxt_http_route_table_create(nxt_task_t *task,
     nxt_mp_t *mp, nxt_conf_value_t *table_cv, nxt_http_route_object_t object,
     nxt_bool_t case_sensitive, nxt_http_uri_encoding_t encoding);
@@ -173,8 +251,19 @@ static nxt_http_route_rule_t *nxt_http_route_rule_create(nxt_task_t *task,
     nxt_mp_t *mp, nxt_conf_value_t *cv, nxt_bool_t case_sensitive,
     nxt_http_route_pattern_case_t pattern_case,
     nxt_http_uri_encoding_t encoding);
+#if (NXT_HAVE_REGEX)
+static nxt_int_t nxt_http_route_regex_set_create(nxt_task_t *task,
+    nxt_mp_t *mp, nxt_http_route_rule_t *rule, nxt_conf_value_t *cv);
+static nxt_bool_t nxt_http_route_regex_set_member(
+    nxt_http_route_pattern_t *pattern, nxt_conf_value_t *cv, uint32_t i,
+    nxt_bool_t negative, nxt_str_t *source);
+#endif
 static int nxt_http_pattern_compare(const void *one, const void *two);
 static int nxt_http_addr_pattern_compare(const void *one, const void *two);
+static nxt_int_t nxt_http_route_addr_index_create(nxt_mp_t *mp,
+    nxt_http_route_addr_rule_t *addr_rule);
+static nxt_int_t nxt_http_route_addr_index(
+    nxt_http_route_addr_rule_t *addr_rule, nxt_sockaddr_t *sa);
 static nxt_int_t nxt_http_route_pattern_create(nxt_task_t *task, nxt_mp_t *mp,
     nxt_conf_value_t *cv, nxt_http_route_pattern_t *pattern,
     nxt_http_route_pattern_case_t pattern_case,
@@ -202,6 +291,17 @@ static nxt_int_t nxt_http_route_find(nxt_http_routes_t *routes, nxt_str_t *name,
 
 static nxt_http_action_t *nxt_http_route_handler(nxt_task_t *task,
     nxt_http_request_t *r, nxt_http_action_t *start);
+static nxt_http_action_t *nxt_http_route_index_handler(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_http_route_t *route);
+static void nxt_http_route_trie_set(uint32_t *bits, nxt_array_t *steps);
+static nxt_http_action_t *nxt_http_route_memo_find(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_http_route_t *route);
+static void nxt_http_route_memo_store(nxt_http_request_t *r,
+    nxt_http_route_t *route, uint32_t step);
+static ssize_t nxt_http_route_memo_key(nxt_http_request_t *r,
+    uint32_t depends, u_char *key, size_t size);
+static u_char *nxt_http_route_memo_add(u_char *p, u_char *end, u_char *value,
+    size_t length);
 static nxt_http_action_t *nxt_http_route_match(nxt_task_t *task,
     nxt_http_request_t *r, nxt_http_route_match_t *match);
 static nxt_int_t nxt_http_route_table(nxt_http_request_t *r,
@@ -239,6 +339,7 @@ nxt_http_routes_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_mp_t           *mp;
     nxt_str_t          name, *string;
     nxt_bool_t         object;
+    nxt_queue_t        *stats;
     nxt_conf_value_t   *route_conf;
     nxt_http_route_t   *route;
     nxt_http_routes_t  *routes;
@@ -287,10 +388,47 @@ nxt_http_routes_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         route->name.start = NULL;
     }
 
+    stats = &tmcf->router_conf->router->route_stats;
+
+    for (i = 0; i < n; i++) {
+        route = routes->route[i];
+
+        if (route->name.length == 0) {
+            nxt_str_set(&name, "routes");
+
+        } else {
+            name.length = nxt_length("routes/") + route->name.length;
+
+            name.start = nxt_mp_nget(tmcf->mem_pool, name.length);
+            if (nxt_slow_path(name.start == NULL)) {
+                return NULL;
+            }
+
+            nxt_sprintf(name.start, name.start + name.length, "routes/%V",
+                        &route->name);
+        }
+
+        route->stats = nxt_router_stats(stats, &name);
+        if (nxt_slow_path(route->stats == NULL)) {
+            return NULL;
+        }
+    }
+
     return routes;
 }
 
 
+nxt_router_stats_t *
+nxt_http_route_stats(nxt_http_routes_t *routes, nxt_uint_t n)
+{
+    if (n >= routes->items) {
+        return NULL;
+    }
+
+    return routes->route[n]->stats;
+}
+
+
 static nxt_conf_map_t  nxt_http_route_match_conf[] = {
     {
         nxt_string("scheme"),
@@ -371,6 +509,7 @@ nxt_http_route_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         return NULL;
     }
 
+    route->index = NULL;
     route->items = n;
     m = &route->match[0];
 
@@ -382,13 +521,378 @@ nxt_http_route_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
             return NULL;
         }
 
+        if (i > 0) {
+            match->depends |= route->match[i - 1]->depends;
+        }
+
         *m++ = match;
     }
 
+    if (n >= NXT_HTTP_ROUTE_INDEX_MIN) {
+        if (nxt_http_route_index_create(tmcf->router_conf->mem_pool, route)
+            != NXT_OK)
+        {
+            return NULL;
+        }
+    }
+
     return route;
 }
 
 
+static const nxt_lvlhsh_proto_t  nxt_http_route_host_hash_proto
+    nxt_aligned(64) =
+{
+    NXT_LVLHSH_DEFAULT,
+    nxt_http_route_host_test,
+    nxt_mp_lvlhsh_alloc,
+    nxt_mp_lvlhsh_free,
+};
+
+
+/*
+ * The index narrows the steps of a long route to those that can match
+ * the request host and URI.  Steps whose "host" lists only exact names
+ * are hashed by name, steps whose "uri" lists only exact or prefix
+ * patterns are placed into a trie; other steps match any host or URI.
+ * The candidates are still fully evaluated in their original order,
+ * so the first match is the same as without the index.
+ */
+
+static nxt_int_t
+nxt_http_route_index_create(nxt_mp_t *mp, nxt_http_route_t *route)
+{
+    size_t                          size;
+    uint32_t                        i, j, words;
+    nxt_int_t                       ret;
+    nxt_str_t                       host;
+    nxt_uint_t                      indexed;
+    nxt_array_t                     *hosts;
+    nxt_http_route_rule_t           *rule, *host_rule, *uri_rule;
+    nxt_http_route_host_t           **h;
+    nxt_http_route_test_t           *test, *end;
+    nxt_http_route_match_t          *match;
+    nxt_http_route_index_t          *index;
+    nxt_http_route_pattern_t        *pattern;
+    nxt_http_route_pattern_slice_t  *slice;
+
+    words = (route->items + 31) / 32;
+    size = words * sizeof(uint32_t);
+
+    index = nxt_mp_zget(mp, sizeof(nxt_http_route_index_t));
+    if (nxt_slow_path(index == NULL)) {
+        return NXT_ERROR;
+    }
+
+    index->words = words;
+
+    index->any_host = nxt_mp_zget(mp, size);
+    index->any_uri = nxt_mp_zget(mp, size);
+    index->uri = nxt_mp_zget(mp, sizeof(nxt_http_route_trie_t));
+
+    hosts = nxt_array_create(mp, 4, sizeof(nxt_http_route_host_t *));
+
+    if (nxt_slow_path(index->any_host == NULL || index->any_uri == NULL
+                      || index->uri == NULL || hosts == NULL))
+    {
+        return NXT_ERROR;
+    }
+
+    indexed = 0;
+
+    for (i = 0; i < route->items; i++) {
+        match = route->match[i];
+
+        host_rule = NULL;
+        uri_rule = NULL;
+
+        test = &match->test[0];
+        end = test + match->items;
+
+        while (test < end) {
+            rule = test->rule;
+
+            if (rule->object == NXT_HTTP_ROUTE_STRING
+                && rule->u.offset == offsetof(nxt_http_request_t, host))
+            {
+                host_rule = rule;
+
+            } else if (rule->object == NXT_HTTP_ROUTE_STRING_PTR
+                       && rule->u.offset == offsetof(nxt_http_request_t, path))
+            {
+                uri_rule = rule;
+            }
+
+            test++;
+        }
+
+        if (host_rule != NULL && nxt_http_route_indexable(host_rule, 0)) {
+            indexed++;
+
+            for (j = 0; j < host_rule->items; j++) {
+                pattern = &host_rule->pattern[j];
+
+                if (pattern->negative) {
+                    continue;
+                }
+
+                slice = pattern->u.pattern_slices->elts;
+
+                host.start = slice->start;
+                host.length = slice->length;
+
+                ret = nxt_http_route_index_host(mp, index, hosts, &host, i);
+                if (nxt_slow_path(ret != NXT_OK)) {
+                    return NXT_ERROR;
+                }
+            }
+
+        } else {
+            index->any_host[i / 32] |= 1U << (i % 32);
+        }
+
+        if (uri_rule != NULL && nxt_http_route_indexable(uri_rule, 1)) {
+            indexed++;
+
+            for (j = 0; j < uri_rule->items; j++) {
+                pattern = &uri_rule->pattern[j];
+
+                if (pattern->negative) {
+                    continue;
+                }
+
+                slice = pattern->u.pattern_slices->elts;
+
+                ret = nxt_http_route_index_uri(mp, index->uri, slice, i);
+                if (nxt_slow_path(ret != NXT_OK)) {
+                    return NXT_ERROR;
+                }
+            }
+
+        } else {
+            index->any_uri[i / 32] |= 1U << (i % 32);
+        }
+    }
+
+    if (indexed == 0) {
+        return NXT_OK;
+    }
+
+    /* A host entry selects the steps for the host and any host. */
+
+    h = hosts->elts;
+
+    for (i = 0; i < hosts->nelts; i++) {
+        for (j = 0; j < words; j++) {
+            h[i]->steps[j] |= index->any_host[j];
+        }
+    }
+
+    route->index = index;
+
+    return NXT_OK;
+}
+
+
+static nxt_bool_t
+nxt_http_route_indexable(nxt_http_route_rule_t *rule, nxt_bool_t prefix)
+{
+    uint32_t                        i;
+    nxt_uint_t                      n;
+    nxt_http_route_pattern_t        *pattern;
+    nxt_http_route_pattern_slice_t  *slice;
+
+    n = 0;
+
+    for (i = 0; i < rule->items; i++) {
+        pattern = &rule->pattern[i];
+
+        /* Negative patterns only narrow a match further. */
+        if (pattern->negative) {
+            continue;
+        }
+
+#if (NXT_HAVE_REGEX)
+        if (pattern->regex) {
+            return 0;
+        }
+#endif
+
+        if (pattern->u.pattern_slices->nelts != 1) {
+            return 0;
+        }
+
+        slice = pattern->u.pattern_slices->elts;
+
+        if (slice->type != NXT_HTTP_ROUTE_PATTERN_EXACT
+            && !(prefix && slice->type == NXT_HTTP_ROUTE_PATTERN_BEGIN))
+        {
+            return 0;
+        }
+
+        n++;
+    }
+
+    return (n != 0);
+}
+
+
+static nxt_int_t
+nxt_http_route_index_host(nxt_mp_t *mp, nxt_http_route_index_t *index,
+    nxt_array_t *hosts, nxt_str_t *host, uint32_t step)
+{
+    nxt_int_t              ret;
+    nxt_lvlhsh_query_t     lhq;
+    nxt_http_route_host_t  *entry, **h;
+
+    lhq.key = *host;
+    lhq.key_hash = nxt_djb_hash(host->start, host->length);
+    lhq.proto = &nxt_http_route_host_hash_proto;
+
+    if (nxt_lvlhsh_find(&index->hosts, &lhq) == NXT_OK) {
+        entry = lhq.value;
+
+    } else {
+        entry = nxt_mp_get(mp, sizeof(nxt_http_route_host_t));
+        if (nxt_slow_path(entry == NULL)) {
+            return NXT_ERROR;
+        }
+
+        entry->host = *host;
+
+        entry->steps = nxt_mp_zget(mp, index->words * sizeof(uint32_t));
+        if (nxt_slow_path(entry->steps == NULL)) {
+            return NXT_ERROR;
+        }
+
+        lhq.replace = 0;
+        lhq.value = entry;
+        lhq.pool = mp;
+
+        ret = nxt_lvlhsh_insert(&index->hosts, &lhq);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
+
+        h = nxt_array_add(hosts);
+        if (nxt_slow_path(h == NULL)) {
+            return NXT_ERROR;
+        }
+
+        *h = entry;
+    }
+
+    entry->steps[step / 32] |= 1U << (step % 32);
+
+    return NXT_OK;
+}
+
+
+static nxt_int_t
+nxt_http_route_host_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_http_route_host_t  *entry;
+
+    entry = data;
+
+    return nxt_strstr_eq(&lhq->key, &entry->host) ? NXT_OK : NXT_DECLINED;
+}
+
+
+static nxt_int_t
+nxt_http_route_index_uri(nxt_mp_t *mp, nxt_http_route_trie_t *node,
+    nxt_http_route_pattern_slice_t *slice, uint32_t step)
+{
+    u_char                 *p, *end;
+    nxt_http_route_trie_t  *next, **n;
+
+    p = slice->start;
+    end = p + slice->length;
+
+    while (p < end) {
+        next = nxt_http_route_trie_next(node, *p);
+
+        if (next == NULL) {
+            if (node->next == NULL) {
+                node->next = nxt_array_create(mp, 1,
+                                              sizeof(nxt_http_route_trie_t *));
+                if (nxt_slow_path(node->next == NULL)) {
+                    return NXT_ERROR;
+                }
+            }
+
+            next = nxt_mp_zget(mp, sizeof(nxt_http_route_trie_t));
+            if (nxt_slow_path(next == NULL)) {
+                return NXT_ERROR;
+            }
+
+            next->ch = *p;
+
+            n = nxt_array_add(node->next);
+            if (nxt_slow_path(n == NULL)) {
+                return NXT_ERROR;
+            }
+
+            *n = next;
+        }
+
+        node = next;
+        p++;
+    }
+
+    if (slice->type == NXT_HTTP_ROUTE_PATTERN_EXACT) {
+        return nxt_http_route_trie_add(mp, &node->exact, step);
+    }
+
+    return nxt_http_route_trie_add(mp, &node->prefix, step);
+}
+
+
+static nxt_http_route_trie_t *
+nxt_http_route_trie_next(nxt_http_route_trie_t *node, u_char ch)
+{
+    nxt_uint_t             i;
+    nxt_http_route_trie_t  **next;
+
+    if (node->next == NULL) {
+        return NULL;
+    }
+
+    next = node->next->elts;
+
+    for (i = 0; i < node->next->nelts; i++) {
+        if (next[i]->ch == ch) {
+            return next[i];
+        }
+    }
+
+    return NULL;
+}
+
+
+static nxt_int_t
+nxt_http_route_trie_add(nxt_mp_t *mp, nxt_array_t **steps, uint32_t step)
+{
+    uint32_t  *s;
+
+    if (*steps == NULL) {
+        *steps = nxt_array_create(mp, 1, sizeof(uint32_t));
+        if (nxt_slow_path(*steps == NULL)) {
+            return NXT_ERROR;
+        }
+    }
+
+    s = nxt_array_add(*steps);
+    if (nxt_slow_path(s == NULL)) {
+        return NXT_ERROR;
+    }
+
+    *s = step;
+
+    return NXT_OK;
+}
+
+
 static nxt_http_route_match_t *
 nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_conf_value_t *cv)
@@ -421,6 +925,7 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     }
 
     match->items = n;
+    match->depends = 0;
 
     action_conf = nxt_conf_get_path(cv, &action_path);
     if (nxt_slow_path(action_conf == NULL)) {
@@ -458,6 +963,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rule->object = NXT_HTTP_ROUTE_SCHEME;
         test->rule = rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_SCHEME;
     }
 
     if (mtcf.host != NULL) {
@@ -472,6 +979,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rule->object = NXT_HTTP_ROUTE_STRING;
         test->rule = rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_HOST;
     }
 
     if (mtcf.uri != NULL) {
@@ -486,6 +995,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rule->object = NXT_HTTP_ROUTE_STRING_PTR;
         test->rule = rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_URI;
     }
 
     if (mtcf.method != NULL) {
@@ -500,6 +1011,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rule->object = NXT_HTTP_ROUTE_STRING_PTR;
         test->rule = rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_METHOD;
     }
 
     if (mtcf.headers != NULL) {
@@ -512,6 +1025,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
         test->table = table;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_FIELDS;
     }
 
     if (mtcf.arguments != NULL) {
@@ -524,6 +1039,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
         test->table = table;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_ARGS;
     }
 
     if (mtcf.cookies != NULL) {
@@ -536,6 +1053,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
         test->table = table;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_FIELDS;
     }
 
     if (mtcf.query != NULL) {
@@ -549,6 +1068,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rule->object = NXT_HTTP_ROUTE_QUERY;
         test->rule = rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_ARGS;
     }
 
     if (mtcf.source != NULL) {
@@ -560,6 +1081,8 @@ nxt_http_route_match_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         addr_rule->object = NXT_HTTP_ROUTE_SOURCE;
         test->addr_rule = addr_rule;
         test++;
+
+        match->depends |= NXT_HTTP_ROUTE_DEP_SOURCE;
     }
 
     if (mtcf.destination != NULL) {
@@ -633,11 +1156,31 @@ static nxt_conf_map_t  nxt_http_route_action_conf[] = {
         NXT_CONF_MAP_PTR,
         offsetof(nxt_http_action_conf_t, types)
     },
+    {
+        nxt_string("open_file_cache"),
+        NXT_CONF_MAP_PTR,
+        offsetof(nxt_http_action_conf_t, open_file_cache)
+    },
+    {
+        nxt_string("precompressed"),
+        NXT_CONF_MAP_PTR,
+        offsetof(nxt_http_action_conf_t, precompressed)
+    },
     {
         nxt_string("fallback"),
         NXT_CONF_MAP_PTR,
         offsetof(nxt_http_action_conf_t, fallback)
     },
+    {
+        nxt_string("keepalive"),
+        NXT_CONF_MAP_PTR,
+        offsetof(nxt_http_action_conf_t, keepalive)
+    },
+    {
+        nxt_string("cache"),
+        NXT_CONF_MAP_PTR,
+        offsetof(nxt_http_action_conf_t, cache)
+    },
 };
 
 
@@ -671,6 +1214,13 @@ nxt_http_action_init(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         }
     }
 
+    if (acf.cache != NULL) {
+        ret = nxt_http_cache_init(rtcf, action, &acf);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return ret;
+        }
+    }
+
     if (acf.ret != NULL) {
         return nxt_http_return_init(rtcf, action, &acf);
     }
@@ -847,9 +1397,216 @@ nxt_http_route_rule_create(nxt_task_t *task, nxt_mp_t *mp,
         }
     }
 
-    return rule;
+#if (NXT_HAVE_REGEX)
+    if (n >= NXT_HTTP_ROUTE_REGEX_SET_MIN) {
+        ret = nxt_http_route_regex_set_create(task, mp, rule, cv);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
+    }
+#endif
+
+    return rule;
+}
+
+
+#if (NXT_HAVE_REGEX)
+
+/*
+ * Regular expressions of a rule that have the same negation are combined
+ * into a single alternation, so a value is tested against the whole set
+ * in one pass.  The patterns that rely on group numbers or names, or may
+ * break the enclosing group, are kept as is.
+ */
+
+static nxt_int_t
+nxt_http_route_regex_set_create(nxt_task_t *task, nxt_mp_t *mp,
+    nxt_http_route_rule_t *rule, nxt_conf_value_t *cv)
+{
+    u_char                    *p;
+    size_t                    length;
+    uint32_t                  i, j, n, first;
+    nxt_str_t                 source, set;
+    nxt_bool_t                negative;
+    nxt_regex_t               *re;
+    nxt_regex_err_t           err;
+    nxt_http_route_pattern_t  *pattern;
+
+    pattern = &rule->pattern[0];
+
+    for (negative = 0; negative <= 1; negative++) {
+        n = 0;
+        length = 0;
+        first = 0;
+
+        for (i = 0; i < rule->items; i++) {
+            if (nxt_http_route_regex_set_member(&pattern[i], cv, i, negative,
+                                                &source))
+            {
+                if (n++ == 0) {
+                    first = i;
+                }
+
+                length += nxt_length("|(?:)") + source.length;
+            }
+        }
+
+        if (n < NXT_HTTP_ROUTE_REGEX_SET_MIN) {
+            continue;
+        }
+
+        set.start = nxt_mp_alloc(mp, length);
+        if (nxt_slow_path(set.start == NULL)) {
+            return NXT_ERROR;
+        }
+
+        p = set.start;
+
+        for (i = first; i < rule->items; i++) {
+            if (nxt_http_route_regex_set_member(&pattern[i], cv, i, negative,
+                                                &source))
+            {
+                if (p != set.start) {
+                    *p++ = '|';
+                }
+
+                p = nxt_cpymem(p, "(?:", 3);
+                p = nxt_cpymem(p, source.start, source.length);
+                *p++ = ')';
+            }
+        }
+
+        set.length = p - set.start;
+
+        re = nxt_regex_compile(mp, &set, &err);
+
+        nxt_mp_free(mp, set.start);
+
+        if (re == NULL) {
+            nxt_debug(task, "regex set of %uD patterns is not compiled: %s",
+                      n, err.msg);
+            continue;
+        }
+
+        for (i = first; i < rule->items; i++) {
+            if (nxt_http_route_regex_set_member(&pattern[i], cv, i, negative,
+                                                &source))
+            {
+                /* The removed patterns are marked with NULL. */
+                pattern[i].u.regex = (i == first) ? re : NULL;
+            }
+        }
+    }
+
+    j = 0;
+
+    for (i = 0; i < rule->items; i++) {
+        if (pattern[i].regex && pattern[i].u.regex == NULL) {
+            continue;
+        }
+
+        pattern[j++] = pattern[i];
+    }
+
+    rule->items = j;
+
+    return NXT_OK;
+}
+
+
+static nxt_bool_t
+nxt_http_route_regex_set_member(nxt_http_route_pattern_t *pattern,
+    nxt_conf_value_t *cv, uint32_t i, nxt_bool_t negative, nxt_str_t *source)
+{
+    u_char            c, *p, *end;
+    nxt_conf_value_t  *value;
+
+    if (!pattern->regex || pattern->u.regex == NULL
+        || pattern->negative != negative)
+    {
+        return 0;
+    }
+
+    value = nxt_conf_get_array_element_or_itself(cv, i);
+    nxt_conf_get_string(value, source);
+
+    /* Skip "~" or "!~". */
+    source->start += negative + 1;
+    source->length -= negative + 1;
+
+    p = source->start;
+    end = p + source->length;
+
+    while (p < end) {
+        c = *p++;
+
+        switch (c) {
+
+        case '#':
+            /* A possible comment in the extended mode. */
+            return 0;
+
+        case '\\':
+            if (p == end) {
+                return 0;
+            }
+
+            c = *p++;
+
+            /* Back references and quoting. */
+            if ((c >= '1' && c <= '9') || c == 'g' || c == 'k' || c == 'Q') {
+                return 0;
+            }
+
+            break;
+
+        case '(':
+            if (p == end) {
+                return 0;
+            }
+
+            if (*p == '*') {
+                /* Verbs and options at the start of a pattern. */
+                return 0;
+            }
+
+            if (*p != '?') {
+                break;
+            }
+
+            if (p + 2 > end) {
+                return 0;
+            }
+
+            c = p[1];
+
+            if (c == ':' || c == '=' || c == '!' || c == '>') {
+                break;
+            }
+
+            if (c == '<' && p + 3 <= end && (p[2] == '=' || p[2] == '!')) {
+                break;
+            }
+
+            /* Inline options only, not named or numbered groups. */
+            if (nxt_strchr("imnsxJU^", c) != NULL
+                || (c == '-' && p + 3 <= end && !nxt_isdigit(p[2])))
+            {
+                break;
+            }
+
+            return 0;
+
+        default:
+            break;
+        }
+    }
+
+    return 1;
 }
 
+#endif
+
 
 nxt_http_route_addr_rule_t *
 nxt_http_route_addr_rule_create(nxt_task_t *task, nxt_mp_t *mp,
@@ -872,6 +1629,7 @@ nxt_http_route_addr_rule_create(nxt_task_t *task, nxt_mp_t *mp,
     }
 
     addr_rule->items = n;
+    addr_rule->index = NULL;
 
     for (i = 0; i < n; i++) {
         pattern = &addr_rule->addr_pattern[i];
@@ -888,6 +1646,12 @@ nxt_http_route_addr_rule_create(nxt_task_t *task, nxt_mp_t *mp,
             nxt_http_addr_pattern_compare);
     }
 
+    if (n >= NXT_HTTP_ROUTE_ADDR_INDEX_MIN) {
+        if (nxt_http_route_addr_index_create(mp, addr_rule) != NXT_OK) {
+            return NULL;
+        }
+    }
+
     return addr_rule;
 }
 
@@ -933,6 +1697,109 @@ nxt_http_addr_pattern_compare(const void *one, const void *two)
 }
 
 
+static nxt_int_t
+nxt_http_route_addr_index_create(nxt_mp_t *mp,
+    nxt_http_route_addr_rule_t *addr_rule)
+{
+    size_t                         size;
+    u_char                         *key, *mask;
+    uint32_t                       i, n;
+    nxt_int_t                      ret;
+    nxt_uint_t                     family, prefix;
+    nxt_http_route_addr_node_t     **root;
+    nxt_http_route_addr_index_t    *index;
+    nxt_http_route_addr_pattern_t  *p;
+
+    index = nxt_mp_zget(mp, sizeof(nxt_http_route_addr_index_t));
+    if (nxt_slow_path(index == NULL)) {
+        return NXT_ERROR;
+    }
+
+    n = 0;
+
+    /*
+     * Address prefixes are moved to the trees, other patterns are kept
+     * in their original order (negative ones first) for sequential tests.
+     */
+
+    for (i = 0; i < addr_rule->items; i++) {
+        p = &addr_rule->addr_pattern[i];
+
+        if (!p->base.negative) {
+            index->any_positive = 1;
+        }
+
+        if (p->base.port.start != 0 || p->base.port.end != 65535
+            || p->base.match_type == NXT_HTTP_ROUTE_ADDR_RANGE)
+        {
+            goto sequential;
+        }
+
+        switch (p->base.addr_family) {
+
+        case AF_INET:
+            family = 0;
+            key = (u_char *) &p->addr.v4.start;
+            mask = (u_char *) &p->addr.v4.end;
+            size = sizeof(struct in_addr);
+            break;
+
+#if (NXT_INET6)
+        case AF_INET6:
+            family = 1;
+            key = p->addr.v6.start.s6_addr;
+            mask = p->addr.v6.end.s6_addr;
+            size = sizeof(struct in6_addr);
+            break;
+#endif
+
+        default:
+            goto sequential;
+        }
+
+        switch (p->base.match_type) {
+
+        case NXT_HTTP_ROUTE_ADDR_ANY:
+            prefix = 0;
+            break;
+
+        case NXT_HTTP_ROUTE_ADDR_EXACT:
+            prefix = size * 8;
+            break;
+
+        default: /* NXT_HTTP_ROUTE_ADDR_CIDR */
+            for (prefix = 0;
+                 prefix < size * 8 && nxt_http_route_addr_bit(mask, prefix);
+                 prefix++)
+            {
+                /* void */
+            }
+
+            break;
+        }
+
+        root = p->base.negative ? &index->negative[family]
+                                : &index->positive[family];
+
+        ret = nxt_http_route_addr_tree_insert(mp, root, key, prefix, size);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
+
+        continue;
+
+    sequential:
+
+        addr_rule->addr_pattern[n++] = *p;
+    }
+
+    addr_rule->items = n;
+    addr_rule->index = index;
+
+    return NXT_OK;
+}
+
+
 static nxt_int_t
 nxt_http_route_pattern_create(nxt_task_t *task, nxt_mp_t *mp,
     nxt_conf_value_t *cv, nxt_http_route_pattern_t *pattern,
@@ -1558,9 +2425,30 @@ nxt_http_route_handler(nxt_task_t *task, nxt_http_request_t *r,
 
     route = start->u.route;
 
+    r->route_stats = route->stats;
+
+    if (r->route_memo != NULL && !r->log_route) {
+        action = nxt_http_route_memo_find(task, r, route);
+        if (action != NULL) {
+            return action;
+        }
+    }
+
+    if (route->index != NULL && !r->log_route) {
+        return nxt_http_route_index_handler(task, r, route);
+    }
+
     for (i = 0; i < route->items; i++) {
         action = nxt_http_route_match(task, r, route->match[i]);
 
+        r->route_steps++;
+
+        if (r->route_memo != NULL && action != NULL
+            && action != NXT_HTTP_ACTION_ERROR)
+        {
+            nxt_http_route_memo_store(r, route, i);
+        }
+
         if (nxt_slow_path(r->log_route)) {
             uint32_t    lvl = (action == NULL) ? NXT_LOG_INFO : NXT_LOG_NOTICE;
             const char  *sel = (action == NULL) ? "discarded" : "selected";
@@ -1583,6 +2471,251 @@ nxt_http_route_handler(nxt_task_t *task, nxt_http_request_t *r,
 }
 
 
+static nxt_http_action_t *
+nxt_http_route_index_handler(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_route_t *route)
+{
+    u_char                  *p, *end;
+    uint32_t                i, w, bit, mask, *hosts, *uris;
+    nxt_str_t               *path;
+    nxt_lvlhsh_query_t      lhq;
+    nxt_http_action_t       *action;
+    nxt_http_route_host_t   *entry;
+    nxt_http_route_trie_t   *node;
+    nxt_http_route_index_t  *index;
+
+    index = route->index;
+
+    lhq.key = r->host;
+    lhq.key_hash = nxt_djb_hash(r->host.start, r->host.length);
+    lhq.proto = &nxt_http_route_host_hash_proto;
+
+    if (nxt_lvlhsh_find(&index->hosts, &lhq) == NXT_OK) {
+        entry = lhq.value;
+        hosts = entry->steps;
+
+    } else {
+        hosts = index->any_host;
+    }
+
+    uris = nxt_mp_nget(r->mem_pool, index->words * sizeof(uint32_t));
+    if (nxt_slow_path(uris == NULL)) {
+        return NXT_HTTP_ACTION_ERROR;
+    }
+
+    nxt_memcpy(uris, index->any_uri, index->words * sizeof(uint32_t));
+
+    path = r->path;
+
+    if (path != NULL) {
+        node = index->uri;
+        p = path->start;
+        end = p + path->length;
+
+        for ( ;; ) {
+            nxt_http_route_trie_set(uris, node->prefix);
+
+            if (p == end) {
+                nxt_http_route_trie_set(uris, node->exact);
+                break;
+            }
+
+            node = nxt_http_route_trie_next(node, *p++);
+            if (node == NULL) {
+                break;
+            }
+        }
+    }
+
+    for (w = 0; w < index->words; w++) {
+        mask = hosts[w] & uris[w];
+
+        for (bit = 0; mask != 0; bit++, mask >>= 1) {
+
+            if ((mask & 1) == 0) {
+                continue;
+            }
+
+            i = w * 32 + bit;
+
+            action = nxt_http_route_match(task, r, route->match[i]);
+
+            r->route_steps++;
+
+            if (action != NULL) {
+                if (r->route_memo != NULL && action != NXT_HTTP_ACTION_ERROR) {
+                    nxt_http_route_memo_store(r, route, i);
+                }
+
+                return action;
+            }
+        }
+    }
+
+    nxt_http_request_error(task, r, NXT_HTTP_NOT_FOUND);
+
+    return NULL;
+}
+
+
+static void
+nxt_http_route_trie_set(uint32_t *bits, nxt_array_t *steps)
+{
+    uint32_t    *step;
+    nxt_uint_t  i;
+
+    if (steps == NULL) {
+        return;
+    }
+
+    step = steps->elts;
+
+    for (i = 0; i < steps->nelts; i++) {
+        bits[step[i] / 32] |= 1U << (step[i] % 32);
+    }
+}
+
+
+/*
+ * A connection remembers the last matched step of a route.  The step
+ * is selected again without evaluation if the request values which
+ * it and all previous steps depend on have not changed.
+ */
+
+static nxt_http_action_t *
+nxt_http_route_memo_find(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_http_route_t *route)
+{
+    u_char                  key[NXT_HTTP_ROUTE_MEMO_KEY_SIZE];
+    ssize_t                 length;
+    nxt_event_engine_t      *engine;
+    nxt_http_route_memo_t   *memo;
+    nxt_http_route_match_t  *match;
+
+    memo = r->route_memo;
+    engine = task->thread->engine;
+
+    if (memo->route == route
+        && memo->generation == r->conf->socket_conf->router_conf->generation)
+    {
+        match = route->match[memo->step];
+
+        length = nxt_http_route_memo_key(r, match->depends, key, sizeof(key));
+
+        if (length == (ssize_t) memo->length
+            && memcmp(key, memo->key, length) == 0)
+        {
+            engine->route_memo_hits_cnt++;
+
+            return &match->action;
+        }
+    }
+
+    engine->route_memo_misses_cnt++;
+
+    return NULL;
+}
+
+
+static void
+nxt_http_route_memo_store(nxt_http_request_t *r, nxt_http_route_t *route,
+    uint32_t step)
+{
+    ssize_t                 length;
+    nxt_http_route_memo_t   *memo;
+    nxt_http_route_match_t  *match;
+
+    memo = r->route_memo;
+    match = route->match[step];
+
+    length = nxt_http_route_memo_key(r, match->depends, memo->key,
+                                     sizeof(memo->key));
+    if (length < 0) {
+        memo->route = NULL;
+        return;
+    }
+
+    memo->route = route;
+    memo->generation = r->conf->socket_conf->router_conf->generation;
+    memo->step = step;
+    memo->length = length;
+}
+
+
+static ssize_t
+nxt_http_route_memo_key(nxt_http_request_t *r, uint32_t depends, u_char *key,
+    size_t size)
+{
+    u_char          *p, *end, tls;
+    nxt_str_t       *s;
+    nxt_sockaddr_t  *sa;
+
+    if (depends & NXT_HTTP_ROUTE_DEP_FIELDS) {
+        return -1;
+    }
+
+    p = key;
+    end = key + size;
+
+    if (depends & NXT_HTTP_ROUTE_DEP_SCHEME) {
+        tls = r->tls;
+        p = nxt_http_route_memo_add(p, end, &tls, 1);
+    }
+
+    if (depends & NXT_HTTP_ROUTE_DEP_HOST) {
+        p = nxt_http_route_memo_add(p, end, r->host.start, r->host.length);
+    }
+
+    if (depends & NXT_HTTP_ROUTE_DEP_URI) {
+        s = r->path;
+        p = (s != NULL) ? nxt_http_route_memo_add(p, end, s->start, s->length)
+                        : nxt_http_route_memo_add(p, end, NULL, 0);
+    }
+
+    if (depends & NXT_HTTP_ROUTE_DEP_METHOD) {
+        s = r->method;
+        p = (s != NULL) ? nxt_http_route_memo_add(p, end, s->start, s->length)
+                        : nxt_http_route_memo_add(p, end, NULL, 0);
+    }
+
+    if (depends & NXT_HTTP_ROUTE_DEP_ARGS) {
+        s = r->args;
+        p = (s != NULL) ? nxt_http_route_memo_add(p, end, s->start, s->length)
+                        : nxt_http_route_memo_add(p, end, NULL, 0);
+    }
+
+    if (depends & NXT_HTTP_ROUTE_DEP_SOURCE) {
+        sa = r->remote;
+        p = nxt_http_route_memo_add(p, end, (u_char *) &sa->u.sockaddr,
+                                    sa->socklen);
+    }
+
+    return (p != NULL) ? p - key : -1;
+}
+
+
+static u_char *
+nxt_http_route_memo_add(u_char *p, u_char *end, u_char *value, size_t length)
+{
+    uint32_t  n;
+
+    if (p == NULL || (size_t) (end - p) < sizeof(uint32_t) + length) {
+        return NULL;
+    }
+
+    /* A missing value differs from an empty one. */
+    n = (value != NULL) ? length : 0xffffffff;
+
+    p = nxt_cpymem(p, &n, sizeof(uint32_t));
+
+    if (value == NULL) {
+        return p;
+    }
+
+    return nxt_cpymem(p, value, length);
+}
+
+
 static nxt_http_action_t *
 nxt_http_route_match(nxt_task_t *task, nxt_http_request_t *r,
     nxt_http_route_match_t *match)
@@ -1866,6 +2999,10 @@ nxt_http_route_addr_rule(nxt_http_request_t *r,
     nxt_bool_t                     matches;
     nxt_http_route_addr_pattern_t  *p;
 
+    if (addr_rule->index != NULL) {
+        return nxt_http_route_addr_index(addr_rule, sa);
+    }
+
     n = addr_rule->items;
 
     if (n == 0) {
@@ -1898,6 +3035,74 @@ nxt_http_route_addr_rule(nxt_http_request_t *r,
 }
 
 
+static nxt_int_t
+nxt_http_route_addr_index(nxt_http_route_addr_rule_t *addr_rule,
+    nxt_sockaddr_t *sa)
+{
+    u_char                         *key;
+    uint32_t                       n;
+    nxt_uint_t                     family;
+    nxt_bool_t                     matches;
+    nxt_http_route_addr_index_t    *index;
+    nxt_http_route_addr_pattern_t  *p;
+
+    index = addr_rule->index;
+
+    switch (sa->u.sockaddr.sa_family) {
+
+    case AF_INET:
+        family = 0;
+        key = (u_char *) &sa->u.sockaddr_in.sin_addr;
+        break;
+
+#if (NXT_INET6)
+    case AF_INET6:
+        family = 1;
+        key = sa->u.sockaddr_in6.sin6_addr.s6_addr;
+        break;
+#endif
+
+    default:
+        family = 0;
+        key = NULL;
+        break;
+    }
+
+    if (key != NULL
+        && nxt_http_route_addr_tree_find(index->negative[family], key))
+    {
+        return 0;
+    }
+
+    p = addr_rule->addr_pattern;
+
+    for (n = addr_rule->items; n > 0; n--, p++) {
+
+        matches = nxt_http_route_addr_pattern_match(p, sa);
+
+        if (p->base.negative) {
+            if (matches) {
+                continue;
+            }
+
+            return 0;
+        }
+
+        if (matches) {
+            return 1;
+        }
+    }
+
+    if (key != NULL
+        && nxt_http_route_addr_tree_find(index->positive[family], key))
+    {
+        return 1;
+    }
+
+    return !index->any_positive;
+}
+
+
 static nxt_int_t
 nxt_http_route_header(nxt_http_request_t *r, nxt_http_route_rule_t *rule)
 {
@@ -2098,18 +3303,24 @@ nxt_http_route_pattern(nxt_http_request_t *r, nxt_http_route_pattern_t *pattern,
     size_t                          test_length;
     uint32_t                        i;
     nxt_array_t                     *pattern_slices;
+#if (NXT_HAVE_REGEX)
+    nxt_event_engine_t              *engine;
+#endif
     nxt_http_route_pattern_slice_t  *pattern_slice;
 
 #if (NXT_HAVE_REGEX)
     if (pattern->regex) {
-        if (r->regex_match == NULL) {
-            r->regex_match = nxt_regex_match_create(r->mem_pool, 0);
-            if (nxt_slow_path(r->regex_match == NULL)) {
+        engine = r->task.thread->engine;
+
+        if (engine->regex_match == NULL) {
+            engine->regex_match = nxt_regex_match_create(engine->mem_pool, 0);
+            if (nxt_slow_path(engine->regex_match == NULL)) {
                 return NXT_ERROR;
             }
         }
 
-        return nxt_regex_match(pattern->u.regex, start, length, r->regex_match);
+        return nxt_regex_match(pattern->u.regex, start, length,
+                               engine->regex_match);
     }
 #endif
 
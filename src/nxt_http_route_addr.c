@@ -8,6 +8,24 @@
 #include <nxt_http_route_addr.h>
 
 
+/*
+ * A node of the compressed binary (Patricia) tree of address prefixes.
+ * The key holds at least "prefix" significant bits in network order;
+ * a "terminal" node ends one of the inserted prefixes.
+ */
+
+struct nxt_http_route_addr_node_s {
+    nxt_http_route_addr_node_t  *child[2];
+    uint8_t                     prefix;
+    uint8_t                     terminal;
+    u_char                      key[0];
+};
+
+
+static nxt_http_route_addr_node_t *nxt_http_route_addr_node_create(
+    nxt_mp_t *mp, const u_char *key, nxt_uint_t prefix, size_t size);
+static nxt_uint_t nxt_http_route_addr_common(const u_char *key1,
+    const u_char *key2, nxt_uint_t bits);
 #if (NXT_INET6)
 static nxt_bool_t nxt_valid_ipv6_blocks(u_char *c, size_t len);
 #endif
@@ -313,6 +331,141 @@ nxt_http_route_addr_pattern_parse(nxt_mp_t *mp,
 }
 
 
+nxt_int_t
+nxt_http_route_addr_tree_insert(nxt_mp_t *mp, nxt_http_route_addr_node_t **root,
+    const u_char *key, nxt_uint_t prefix, size_t size)
+{
+    nxt_uint_t                  common;
+    nxt_http_route_addr_node_t  *node, *split, **link;
+
+    link = root;
+
+    for ( ;; ) {
+        node = *link;
+
+        if (node == NULL) {
+            node = nxt_http_route_addr_node_create(mp, key, prefix, size);
+            if (nxt_slow_path(node == NULL)) {
+                return NXT_ERROR;
+            }
+
+            node->terminal = 1;
+            *link = node;
+
+            return NXT_OK;
+        }
+
+        common = nxt_http_route_addr_common(node->key, key,
+                                            nxt_min(node->prefix, prefix));
+
+        if (common == node->prefix) {
+
+            if (common == prefix) {
+                node->terminal = 1;
+                return NXT_OK;
+            }
+
+            if (node->terminal) {
+                /* The shorter prefix already covers the key. */
+                return NXT_OK;
+            }
+
+            link = &node->child[nxt_http_route_addr_bit(key, common)];
+            continue;
+        }
+
+        split = nxt_http_route_addr_node_create(mp, key, common, size);
+        if (nxt_slow_path(split == NULL)) {
+            return NXT_ERROR;
+        }
+
+        split->child[nxt_http_route_addr_bit(node->key, common)] = node;
+
+        if (common == prefix) {
+            split->terminal = 1;
+
+        } else {
+            node = nxt_http_route_addr_node_create(mp, key, prefix, size);
+            if (nxt_slow_path(node == NULL)) {
+                return NXT_ERROR;
+            }
+
+            node->terminal = 1;
+            split->child[nxt_http_route_addr_bit(key, common)] = node;
+        }
+
+        *link = split;
+
+        return NXT_OK;
+    }
+}
+
+
+nxt_bool_t
+nxt_http_route_addr_tree_find(nxt_http_route_addr_node_t *node,
+    const u_char *key)
+{
+    while (node != NULL) {
+
+        if (nxt_http_route_addr_common(node->key, key, node->prefix)
+            != node->prefix)
+        {
+            return 0;
+        }
+
+        if (node->terminal) {
+            return 1;
+        }
+
+        node = node->child[nxt_http_route_addr_bit(key, node->prefix)];
+    }
+
+    return 0;
+}
+
+
+static nxt_http_route_addr_node_t *
+nxt_http_route_addr_node_create(nxt_mp_t *mp, const u_char *key,
+    nxt_uint_t prefix, size_t size)
+{
+    nxt_http_route_addr_node_t  *node;
+
+    node = nxt_mp_zget(mp, sizeof(nxt_http_route_addr_node_t) + size);
+    if (nxt_slow_path(node == NULL)) {
+        return NULL;
+    }
+
+    node->prefix = prefix;
+    nxt_memcpy(node->key, key, size);
+
+    return node;
+}
+
+
+static nxt_uint_t
+nxt_http_route_addr_common(const u_char *key1, const u_char *key2,
+    nxt_uint_t bits)
+{
+    u_char      c;
+    nxt_uint_t  n;
+
+    for (n = 0; n < bits; n += 8) {
+        c = key1[n >> 3] ^ key2[n >> 3];
+
+        if (c != 0) {
+            while ((c & 0x80) == 0) {
+                c <<= 1;
+                n++;
+            }
+
+            return nxt_min(n, bits);
+        }
+    }
+
+    return bits;
+}
+
+
 #if (NXT_INET6)
 
 static nxt_bool_t
@@ -56,6 +56,9 @@ typedef struct {
 } nxt_http_route_addr_base_t;
 
 
+typedef struct nxt_http_route_addr_node_s  nxt_http_route_addr_node_t;
+
+
 typedef struct {
     nxt_http_route_addr_base_t           base;
 
@@ -68,7 +71,16 @@ typedef struct {
 } nxt_http_route_addr_pattern_t;
 
 
+#define nxt_http_route_addr_bit(key, n)                                       \
+    (((key)[(n) >> 3] >> (7 - ((n) & 7))) & 1)
+
+
 NXT_EXPORT nxt_int_t nxt_http_route_addr_pattern_parse(nxt_mp_t *mp,
     nxt_http_route_addr_pattern_t *pattern, nxt_conf_value_t *cv);
+NXT_EXPORT nxt_int_t nxt_http_route_addr_tree_insert(nxt_mp_t *mp,
+    nxt_http_route_addr_node_t **root, const u_char *key, nxt_uint_t prefix,
+    size_t size);
+NXT_EXPORT nxt_bool_t nxt_http_route_addr_tree_find(
+    nxt_http_route_addr_node_t *node, const u_char *key);
 
 #endif /* _NXT_HTTP_ROUTE_ADDR_H_INCLUDED_ */
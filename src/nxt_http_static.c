@@ -16,6 +16,12 @@ typedef struct {
 } nxt_http_static_share_t;
 
 
+typedef struct {
+    uint32_t                    max;
+    nxt_msec_t                  valid;
+} nxt_http_static_cache_conf_t;
+
+
 typedef struct {
     nxt_uint_t                  nshares;
     nxt_http_static_share_t     *shares;
@@ -25,6 +31,8 @@ typedef struct {
     nxt_uint_t                  resolve;
 #endif
     nxt_http_route_rule_t       *types;
+    nxt_http_static_cache_conf_t  *cache;
+    uint8_t                     precompressed;  /* 1 bit */
 } nxt_http_static_conf_t;
 
 
@@ -39,8 +47,65 @@ typedef struct {
 } nxt_http_static_ctx_t;
 
 
-#define NXT_HTTP_STATIC_BUF_COUNT  2
-#define NXT_HTTP_STATIC_BUF_SIZE   (128 * 1024)
+typedef struct {
+    nxt_off_t                   start;
+    nxt_off_t                   end;
+} nxt_http_static_range_t;
+
+
+typedef struct {
+    nxt_str_t                   encoding;
+    nxt_str_t                   exten;
+} nxt_http_static_encoding_t;
+
+
+/*
+ * The open file cache keeps descriptors and information of regular files
+ * per engine, so it needs no locking.  An entry is keyed by the file name
+ * along with the chroot and resolve flags it has been opened with, and
+ * it is valid for the "valid" time of the action that has opened the file.
+ * Then the file is opened and checked again on the next request, so
+ * changed or replaced files are picked up.  Expired entries are also
+ * closed by a timer, and the least recently used entries are evicted when
+ * the cache is full.  An evicted entry that is still used by requests is
+ * closed when the last of them completes.
+ *
+ * A precompressed sibling that cannot be opened or is not a regular file
+ * is cached as a negative entry without a descriptor, so it is not looked
+ * up again on every request until the entry expires.
+ */
+
+typedef struct {
+    nxt_file_t                  file;
+    nxt_file_info_t             info;
+    nxt_msec_t                  expires;
+    nxt_queue_link_t            link;
+    uint32_t                    count;
+    uint8_t                     evicted;  /* 1 bit */
+    uint8_t                     negative;  /* 1 bit */
+    uint32_t                    key_hash;
+    uint32_t                    key_length;
+    u_char                      key[];
+} nxt_http_static_cache_entry_t;
+
+
+typedef struct {
+    nxt_file_t                     file;
+    nxt_http_static_cache_entry_t  *entry;
+} nxt_http_static_file_t;
+
+
+#define NXT_HTTP_STATIC_BUF_COUNT   2
+#define NXT_HTTP_STATIC_BUF_SIZE    (128 * 1024)
+#define NXT_HTTP_STATIC_MAX_RANGES  16
+
+
+/* Precompressed files in the order of preference. */
+
+static const nxt_http_static_encoding_t  nxt_http_static_encodings[] = {
+    { nxt_string("br"),   nxt_string(".br") },
+    { nxt_string("gzip"), nxt_string(".gz") },
+};
 
 
 static nxt_http_action_t *nxt_http_static(nxt_task_t *task,
@@ -56,10 +121,34 @@ static u_char *nxt_http_static_chroot_match(u_char *chr, u_char *shr);
 #endif
 static void nxt_http_static_extract_extension(nxt_str_t *path,
     nxt_str_t *exten);
+static nxt_int_t nxt_http_static_range(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_file_t *f, nxt_file_info_t *fi,
+    nxt_str_t *etag, nxt_str_t *mtype, nxt_http_field_t *content_type);
+static nxt_bool_t nxt_http_static_if_range(nxt_http_field_t *if_range,
+    nxt_file_info_t *fi, nxt_str_t *etag);
+static nxt_int_t nxt_http_static_range_parse(nxt_http_field_t *range,
+    nxt_off_t size, nxt_http_static_range_t *ranges);
+static nxt_int_t nxt_http_static_cache_key(nxt_http_request_t *r,
+    nxt_http_static_ctx_t *ctx, u_char *fname, nxt_str_t *key);
+static nxt_http_static_cache_entry_t *nxt_http_static_cache_get(
+    nxt_task_t *task, nxt_str_t *key);
+static void nxt_http_static_cache_add(nxt_task_t *task,
+    nxt_http_static_cache_conf_t *conf, nxt_str_t *key,
+    nxt_http_static_file_t *sf, nxt_file_info_t *fi);
+static void nxt_http_static_cache_expire(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_http_static_cache_evict(nxt_task_t *task,
+    nxt_http_static_cache_entry_t *entry);
+static nxt_int_t nxt_http_static_cache_test(nxt_lvlhsh_query_t *lhq,
+    void *data);
+static void nxt_http_static_file_close(nxt_task_t *task, nxt_file_t *f);
 static void nxt_http_static_body_handler(nxt_task_t *task, void *obj,
     void *data);
 static void nxt_http_static_buf_completion(nxt_task_t *task, void *obj,
     void *data);
+static void nxt_http_static_sendfile(nxt_task_t *task, nxt_http_request_t *r);
+static void nxt_http_static_sendfile_completion(nxt_task_t *task, void *obj,
+    void *data);
 
 static nxt_int_t nxt_http_static_mtypes_hash_test(nxt_lvlhsh_query_t *lhq,
     void *data);
@@ -70,6 +159,21 @@ static void nxt_http_static_mtypes_hash_free(void *data, void *p);
 static const nxt_http_request_state_t  nxt_http_static_send_state;
 
 
+static nxt_conf_map_t  nxt_http_static_cache_conf[] = {
+    {
+        nxt_string("max"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_http_static_cache_conf_t, max),
+    },
+
+    {
+        nxt_string("valid"),
+        NXT_CONF_MAP_MSEC,
+        offsetof(nxt_http_static_cache_conf_t, valid),
+    },
+};
+
+
 nxt_int_t
 nxt_http_static_init(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_http_action_t *action, nxt_http_action_conf_t *acf)
@@ -171,6 +275,29 @@ nxt_http_static_init(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         }
     }
 
+    if (acf->open_file_cache != NULL) {
+        conf->cache = nxt_mp_alloc(mp, sizeof(nxt_http_static_cache_conf_t));
+        if (nxt_slow_path(conf->cache == NULL)) {
+            return NXT_ERROR;
+        }
+
+        conf->cache->max = 1000;
+        conf->cache->valid = 60 * 1000;
+
+        if (nxt_conf_map_object(mp, acf->open_file_cache,
+                                nxt_http_static_cache_conf,
+                                nxt_nitems(nxt_http_static_cache_conf),
+                                conf->cache)
+            != NXT_OK)
+        {
+            return NXT_ERROR;
+        }
+    }
+
+    if (acf->precompressed != NULL) {
+        conf->precompressed = nxt_conf_get_boolean(acf->precompressed);
+    }
+
     if (acf->fallback != NULL) {
         action->fallback = nxt_mp_alloc(mp, sizeof(nxt_http_action_t));
         if (nxt_slow_path(action->fallback == NULL)) {
@@ -304,15 +431,15 @@ static void
 nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
 {
     size_t                  length, encode;
-    u_char                  *p, *fname;
+    u_char                  *p, *fname, *base;
     struct tm               tm;
     nxt_buf_t               *fb;
     nxt_int_t               ret;
-    nxt_str_t               *shr, *index, exten, *mtype;
-    nxt_uint_t              level;
+    nxt_str_t               *shr, *index, exten, *mtype, etag, key;
+    nxt_uint_t              level, n;
     nxt_file_t              *f, file;
     nxt_file_info_t         fi;
-    nxt_http_field_t        *field;
+    nxt_http_field_t        *field, *content_type;
     nxt_http_status_t       status;
     nxt_router_conf_t       *rtcf;
     nxt_http_action_t       *action;
@@ -320,6 +447,10 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
     nxt_work_handler_t      body_handler;
     nxt_http_static_ctx_t   *ctx;
     nxt_http_static_conf_t  *conf;
+    nxt_http_static_file_t  *sf;
+
+    nxt_http_static_cache_entry_t     *entry;
+    const nxt_http_static_encoding_t  *encoding;
 
     r = obj;
     ctx = data;
@@ -371,6 +502,70 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
         fname = ctx->share.start;
     }
 
+    base = fname;
+    n = conf->precompressed ? 0 : nxt_nitems(nxt_http_static_encodings);
+
+again:
+
+    encoding = NULL;
+
+    while (n < nxt_nitems(nxt_http_static_encodings)) {
+        encoding = &nxt_http_static_encodings[n++];
+
+        if (nxt_http_accept_encoding(r, (char *) encoding->encoding.start,
+                                     encoding->encoding.length))
+        {
+            break;
+        }
+
+        encoding = NULL;
+    }
+
+    if (encoding != NULL) {
+        length = nxt_strlen(base);
+
+        fname = nxt_mp_nget(r->mem_pool, length + encoding->exten.length + 1);
+        if (nxt_slow_path(fname == NULL)) {
+            goto fail;
+        }
+
+        p = nxt_cpymem(fname, base, length);
+        p = nxt_cpymem(p, encoding->exten.start, encoding->exten.length);
+        *p = '\0';
+
+    } else {
+        fname = base;
+    }
+
+    if (conf->cache != NULL) {
+        ret = nxt_http_static_cache_key(r, ctx, fname, &key);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            goto fail;
+        }
+
+        entry = nxt_http_static_cache_get(task, &key);
+
+        if (entry != NULL) {
+            if (entry->negative) {
+                goto again;
+            }
+
+            sf = nxt_mp_get(r->mem_pool, sizeof(nxt_http_static_file_t));
+            if (nxt_slow_path(sf == NULL)) {
+                goto fail;
+            }
+
+            sf->file = entry->file;
+            sf->entry = entry;
+            entry->count++;
+
+            f = &sf->file;
+            fi = entry->info;
+
+            goto cached;
+        }
+    }
+
     nxt_memzero(&file, sizeof(nxt_file_t));
 
     file.name = fname;
@@ -389,7 +584,7 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
         if (chr->length > 0) {
             resolve |= RESOLVE_IN_ROOT;
 
-            fname = share->is_const
+            fname = (share->is_const && encoding == NULL)
                     ? share->fname
                     : nxt_http_static_chroot_match(chr->start, file.name);
 
@@ -438,6 +633,14 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
 
     if (nxt_slow_path(ret != NXT_OK)) {
 
+        if (encoding != NULL) {
+            if (conf->cache != NULL) {
+                nxt_http_static_cache_add(task, conf->cache, &key, NULL, NULL);
+            }
+
+            goto again;
+        }
+
         switch (file.error) {
 
         /*
@@ -499,19 +702,39 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
         goto fail;
     }
 
-    f = nxt_mp_get(r->mem_pool, sizeof(nxt_file_t));
-    if (nxt_slow_path(f == NULL)) {
+    sf = nxt_mp_get(r->mem_pool, sizeof(nxt_http_static_file_t));
+    if (nxt_slow_path(sf == NULL)) {
         nxt_file_close(task, &file);
         goto fail;
     }
 
-    *f = file;
+    sf->file = file;
+    sf->entry = NULL;
+
+    f = &sf->file;
 
     ret = nxt_file_info(f, &fi);
     if (nxt_slow_path(ret != NXT_OK)) {
         goto fail;
     }
 
+    if (encoding != NULL && !nxt_is_file(&fi)) {
+        nxt_http_static_file_close(task, f);
+        f = NULL;
+
+        if (conf->cache != NULL) {
+            nxt_http_static_cache_add(task, conf->cache, &key, NULL, NULL);
+        }
+
+        goto again;
+    }
+
+    if (conf->cache != NULL && nxt_is_file(&fi)) {
+        nxt_http_static_cache_add(task, conf->cache, &key, sf, &fi);
+    }
+
+cached:
+
     if (nxt_fast_path(nxt_is_file(&fi))) {
         r->status = NXT_HTTP_OK;
         r->resp.content_length_n = nxt_file_size(&fi);
@@ -553,6 +776,36 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
                                           nxt_file_size(&fi))
                               - p;
 
+        etag.start = field->value;
+        etag.length = field->value_length;
+
+        field = nxt_list_zero_add(r->resp.fields);
+        if (nxt_slow_path(field == NULL)) {
+            goto fail;
+        }
+
+        nxt_http_field_set(field, "Accept-Ranges", "bytes");
+
+        if (conf->precompressed) {
+            field = nxt_list_zero_add(r->resp.fields);
+            if (nxt_slow_path(field == NULL)) {
+                goto fail;
+            }
+
+            nxt_http_field_set(field, "Vary", "Accept-Encoding");
+
+            if (encoding != NULL) {
+                field = nxt_list_zero_add(r->resp.fields);
+                if (nxt_slow_path(field == NULL)) {
+                    goto fail;
+                }
+
+                nxt_http_field_name_set(field, "Content-Encoding");
+                field->value = encoding->encoding.start;
+                field->value_length = encoding->encoding.length;
+            }
+        }
+
         if (exten.start == NULL) {
             nxt_http_static_extract_extension(shr, &exten);
         }
@@ -561,19 +814,31 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
             mtype = nxt_http_static_mtype_get(&rtcf->mtypes_hash, &exten);
         }
 
+        content_type = NULL;
+
         if (mtype->length != 0) {
-            field = nxt_list_zero_add(r->resp.fields);
-            if (nxt_slow_path(field == NULL)) {
+            content_type = nxt_list_zero_add(r->resp.fields);
+            if (nxt_slow_path(content_type == NULL)) {
                 goto fail;
             }
 
-            nxt_http_field_name_set(field, "Content-Type");
+            nxt_http_field_name_set(content_type, "Content-Type");
 
-            field->value = mtype->start;
-            field->value_length = mtype->length;
+            content_type->value = mtype->start;
+            content_type->value_length = mtype->length;
         }
 
-        if (ctx->need_body && nxt_file_size(&fi) > 0) {
+        r->out = NULL;
+
+        if (r->range != NULL) {
+            ret = nxt_http_static_range(task, r, f, &fi, &etag, mtype,
+                                        content_type);
+            if (nxt_slow_path(ret != NXT_OK)) {
+                goto fail;
+            }
+        }
+
+        if (r->status == NXT_HTTP_OK && nxt_file_size(&fi) > 0) {
             fb = nxt_mp_zget(r->mem_pool, NXT_BUF_FILE_SIZE);
             if (nxt_slow_path(fb == NULL)) {
                 goto fail;
@@ -583,17 +848,20 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
             fb->file_end = nxt_file_size(&fi);
 
             r->out = fb;
+        }
 
+        if (ctx->need_body && r->out != NULL) {
             body_handler = &nxt_http_static_body_handler;
 
         } else {
-            nxt_file_close(task, f);
+            nxt_http_static_file_close(task, f);
+            r->out = NULL;
             body_handler = NULL;
         }
 
     } else {
         /* Not a file. */
-        nxt_file_close(task, f);
+        nxt_http_static_file_close(task, f);
 
         if (nxt_slow_path(!nxt_is_dir(&fi)
                           || shr->start[shr->length - 1] == '/'))
@@ -657,7 +925,7 @@ nxt_http_static_send_ready(nxt_task_t *task, void *obj, void *data)
 fail:
 
     if (f != NULL) {
-        nxt_file_close(task, f);
+        nxt_http_static_file_close(task, f);
     }
 
     nxt_http_request_error(task, r, NXT_HTTP_INTERNAL_SERVER_ERROR);
@@ -789,6 +1057,649 @@ nxt_http_static_extract_extension(nxt_str_t *path, nxt_str_t *exten)
 }
 
 
+static nxt_int_t
+nxt_http_static_cache_key(nxt_http_request_t *r, nxt_http_static_ctx_t *ctx,
+    u_char *fname, nxt_str_t *key)
+{
+    u_char  *p;
+    size_t  length, size;
+
+    /* The key is the NUL-terminated file name, resolve flags, and chroot. */
+
+    length = nxt_strlen(fname);
+    size = length + 1;
+
+#if (NXT_HAVE_OPENAT2)
+    size += 1 + ctx->chroot.length;
+#endif
+
+    p = nxt_mp_nget(r->mem_pool, size);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    key->start = p;
+    key->length = size;
+
+    p = nxt_cpymem(p, fname, length);
+    *p++ = '\0';
+
+#if (NXT_HAVE_OPENAT2)
+    {
+        nxt_http_static_conf_t  *conf;
+
+        conf = ctx->action->u.conf;
+
+        *p++ = (u_char) conf->resolve;
+        nxt_memcpy(p, ctx->chroot.start, ctx->chroot.length);
+    }
+#endif
+
+    return NXT_OK;
+}
+
+
+static const nxt_lvlhsh_proto_t  nxt_http_static_cache_proto
+    nxt_aligned(64) =
+{
+    NXT_LVLHSH_DEFAULT,
+    nxt_http_static_cache_test,
+    nxt_lvlhsh_alloc,
+    nxt_lvlhsh_free,
+};
+
+
+static nxt_http_static_cache_entry_t *
+nxt_http_static_cache_get(nxt_task_t *task, nxt_str_t *key)
+{
+    nxt_event_engine_t             *engine;
+    nxt_lvlhsh_query_t             lhq;
+    nxt_http_static_cache_entry_t  *entry;
+
+    engine = task->thread->engine;
+
+    lhq.key_hash = nxt_djb_hash(key->start, key->length);
+    lhq.key = *key;
+    lhq.proto = &nxt_http_static_cache_proto;
+
+    if (nxt_lvlhsh_find(&engine->static_cache, &lhq) != NXT_OK) {
+        engine->static_misses_cnt++;
+        return NULL;
+    }
+
+    entry = lhq.value;
+
+    if (nxt_msec_diff(entry->expires, engine->timers.now) <= 0) {
+        nxt_debug(task, "http static cache expired \"%s\"",
+                  entry->file.name);
+
+        nxt_http_static_cache_evict(task, entry);
+
+        engine->static_misses_cnt++;
+        return NULL;
+    }
+
+    nxt_queue_remove(&entry->link);
+    nxt_queue_insert_head(&engine->static_cache_lru, &entry->link);
+
+    engine->static_hits_cnt++;
+
+    return entry;
+}
+
+
+static void
+nxt_http_static_cache_add(nxt_task_t *task, nxt_http_static_cache_conf_t *conf,
+    nxt_str_t *key, nxt_http_static_file_t *sf, nxt_file_info_t *fi)
+{
+    nxt_int_t                      ret;
+    nxt_timer_t                    *timer;
+    nxt_queue_link_t               *link;
+    nxt_event_engine_t             *engine;
+    nxt_lvlhsh_query_t             lhq;
+    nxt_http_static_cache_entry_t  *entry;
+
+    engine = task->thread->engine;
+
+    if (engine->shutdown) {
+        return;
+    }
+
+    while (engine->static_cache_cnt >= conf->max) {
+        link = nxt_queue_last(&engine->static_cache_lru);
+        entry = nxt_queue_link_data(link, nxt_http_static_cache_entry_t, link);
+
+        nxt_http_static_cache_evict(task, entry);
+    }
+
+    entry = nxt_mp_alloc(engine->mem_pool,
+                         sizeof(nxt_http_static_cache_entry_t) + key->length);
+    if (nxt_slow_path(entry == NULL)) {
+        return;
+    }
+
+    entry->key_hash = nxt_djb_hash(key->start, key->length);
+    entry->key_length = key->length;
+    nxt_memcpy(entry->key, key->start, key->length);
+
+    lhq.key_hash = entry->key_hash;
+    lhq.key = *key;
+    lhq.replace = 0;
+    lhq.value = entry;
+    lhq.proto = &nxt_http_static_cache_proto;
+    lhq.pool = NULL;
+
+    ret = nxt_lvlhsh_insert(&engine->static_cache, &lhq);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        nxt_mp_free(engine->mem_pool, entry);
+        return;
+    }
+
+    nxt_debug(task, "http static cache add \"%s\"%s", entry->key,
+              (sf == NULL) ? " negative" : "");
+
+    if (sf != NULL) {
+        entry->file = sf->file;
+        entry->info = *fi;
+        entry->count = 1;
+        entry->negative = 0;
+
+        sf->entry = entry;
+
+    } else {
+        nxt_memzero(&entry->file, sizeof(nxt_file_t));
+        entry->file.fd = NXT_FILE_INVALID;
+        entry->count = 0;
+        entry->negative = 1;
+
+        engine->static_negative_cnt++;
+    }
+
+    /* The key starts with the NUL-terminated full file name. */
+    entry->file.name = entry->key;
+    entry->expires = engine->timers.now + conf->valid;
+    entry->evicted = 0;
+
+    nxt_queue_insert_head(&engine->static_cache_lru, &entry->link);
+    engine->static_cache_cnt++;
+
+    timer = &engine->static_cache_timer;
+
+    if (!timer->enabled || nxt_msec_diff(entry->expires, timer->time) < 0) {
+        timer->handler = nxt_http_static_cache_expire;
+        timer->task = &engine->task;
+        timer->log = &nxt_main_log;
+        timer->work_queue = &engine->fast_work_queue;
+        timer->bias = NXT_TIMER_DEFAULT_BIAS;
+
+        nxt_timer_add(engine, timer, conf->valid);
+    }
+}
+
+
+static void
+nxt_http_static_cache_expire(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_int_t                      diff;
+    nxt_msec_t                     timeout;
+    nxt_timer_t                    *timer;
+    nxt_queue_link_t               *link;
+    nxt_event_engine_t             *engine;
+    nxt_http_static_cache_entry_t  *entry;
+
+    timer = obj;
+    engine = nxt_timer_data(timer, nxt_event_engine_t, static_cache_timer);
+
+    timeout = 0;
+
+    link = nxt_queue_first(&engine->static_cache_lru);
+
+    while (link != nxt_queue_tail(&engine->static_cache_lru)) {
+        entry = nxt_queue_link_data(link, nxt_http_static_cache_entry_t, link);
+        link = nxt_queue_next(link);
+
+        diff = nxt_msec_diff(entry->expires, engine->timers.now);
+
+        if (diff <= 0) {
+            nxt_http_static_cache_evict(task, entry);
+            continue;
+        }
+
+        if (timeout == 0 || (nxt_msec_t) diff < timeout) {
+            timeout = diff;
+        }
+    }
+
+    if (timeout != 0) {
+        nxt_timer_add(engine, timer, timeout);
+    }
+}
+
+
+static void
+nxt_http_static_cache_evict(nxt_task_t *task,
+    nxt_http_static_cache_entry_t *entry)
+{
+    nxt_event_engine_t  *engine;
+    nxt_lvlhsh_query_t  lhq;
+
+    engine = task->thread->engine;
+
+    lhq.key_hash = entry->key_hash;
+    lhq.key.length = entry->key_length;
+    lhq.key.start = entry->key;
+    lhq.proto = &nxt_http_static_cache_proto;
+    lhq.pool = NULL;
+
+    (void) nxt_lvlhsh_delete(&engine->static_cache, &lhq);
+
+    nxt_queue_remove(&entry->link);
+    engine->static_cache_cnt--;
+
+    if (entry->negative) {
+        engine->static_negative_cnt--;
+    }
+
+    entry->evicted = 1;
+
+    if (entry->count == 0) {
+        if (!entry->negative) {
+            nxt_file_close(task, &entry->file);
+        }
+
+        nxt_mp_free(engine->mem_pool, entry);
+    }
+}
+
+
+static nxt_int_t
+nxt_http_static_cache_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_http_static_cache_entry_t  *entry;
+
+    entry = data;
+
+    if (lhq->key.length == entry->key_length
+        && memcmp(lhq->key.start, entry->key, entry->key_length) == 0)
+    {
+        return NXT_OK;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+static void
+nxt_http_static_file_close(nxt_task_t *task, nxt_file_t *f)
+{
+    nxt_event_engine_t             *engine;
+    nxt_http_static_file_t         *sf;
+    nxt_http_static_cache_entry_t  *entry;
+
+    sf = nxt_container_of(f, nxt_http_static_file_t, file);
+    entry = sf->entry;
+
+    if (entry == NULL) {
+        nxt_file_close(task, f);
+        return;
+    }
+
+    entry->count--;
+
+    if (entry->count == 0 && entry->evicted) {
+        engine = task->thread->engine;
+
+        nxt_file_close(task, &entry->file);
+        nxt_mp_free(engine->mem_pool, entry);
+    }
+}
+
+
+void
+nxt_http_static_cache_close(nxt_task_t *task)
+{
+    nxt_queue_link_t               *link;
+    nxt_event_engine_t             *engine;
+    nxt_http_static_cache_entry_t  *entry;
+
+    engine = task->thread->engine;
+
+    while (!nxt_queue_is_empty(&engine->static_cache_lru)) {
+        link = nxt_queue_first(&engine->static_cache_lru);
+        entry = nxt_queue_link_data(link, nxt_http_static_cache_entry_t, link);
+
+        nxt_http_static_cache_evict(task, entry);
+    }
+
+    if (engine->static_cache_timer.enabled) {
+        (void) nxt_timer_delete(engine, &engine->static_cache_timer);
+    }
+}
+
+
+/*
+ * Byte ranges are served as a chain of file buffers sharing the same file.
+ * Each buffer of a multipart response carries the part header in its memory
+ * part and the range in its file part, the last buffer carries the closing
+ * boundary only.  The chain is read into the body buffers by
+ * nxt_http_static_buf_completion(), so only the requested ranges are read.
+ */
+
+static nxt_int_t
+nxt_http_static_range(nxt_task_t *task, nxt_http_request_t *r, nxt_file_t *f,
+    nxt_file_info_t *fi, nxt_str_t *etag, nxt_str_t *mtype,
+    nxt_http_field_t *content_type)
+{
+    u_char                   *p, *end;
+    size_t                   length;
+    uint32_t                 boundary[2];
+    nxt_int_t                i, n;
+    nxt_off_t                size, total;
+    nxt_buf_t                *fb, **next;
+    nxt_http_field_t         *field;
+    nxt_http_static_range_t  ranges[NXT_HTTP_STATIC_MAX_RANGES];
+
+    if (r->if_range != NULL && !nxt_http_static_if_range(r->if_range, fi, etag))
+    {
+        return NXT_OK;
+    }
+
+    size = nxt_file_size(fi);
+
+    n = nxt_http_static_range_parse(r->range, size, ranges);
+
+    if (n == NXT_DECLINED) {
+        return NXT_OK;
+    }
+
+    field = nxt_list_zero_add(r->resp.fields);
+    if (nxt_slow_path(field == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_http_field_name_set(field, "Content-Range");
+
+    length = nxt_length("bytes -/") + 3 * NXT_OFF_T_LEN;
+
+    p = nxt_mp_nget(r->mem_pool, length);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    field->value = p;
+
+    if (n == 0) {
+        r->status = NXT_HTTP_RANGE_NOT_SATISFIABLE;
+        r->resp.content_length_n = 0;
+
+        field->value_length = nxt_sprintf(p, p + length, "bytes */%O", size)
+                              - p;
+
+        if (content_type != NULL) {
+            content_type->skip = 1;
+        }
+
+        return NXT_OK;
+    }
+
+    r->status = NXT_HTTP_PARTIAL_CONTENT;
+
+    if (n == 1) {
+        r->resp.content_length_n = ranges[0].end - ranges[0].start;
+
+        field->value_length = nxt_sprintf(p, p + length, "bytes %O-%O/%O",
+                                          ranges[0].start, ranges[0].end - 1,
+                                          size)
+                              - p;
+
+        fb = nxt_mp_zget(r->mem_pool, NXT_BUF_FILE_SIZE);
+        if (nxt_slow_path(fb == NULL)) {
+            return NXT_ERROR;
+        }
+
+        fb->file = f;
+        fb->file_pos = ranges[0].start;
+        fb->file_end = ranges[0].end;
+
+        r->out = fb;
+
+        return NXT_OK;
+    }
+
+    /* The multipart response does not have the Content-Range field. */
+    field->skip = 1;
+
+    if (content_type == NULL) {
+        content_type = nxt_list_zero_add(r->resp.fields);
+        if (nxt_slow_path(content_type == NULL)) {
+            return NXT_ERROR;
+        }
+
+        nxt_http_field_name_set(content_type, "Content-Type");
+    }
+
+    boundary[0] = nxt_random(&task->thread->random);
+    boundary[1] = nxt_random(&task->thread->random);
+
+    length = nxt_length("multipart/byteranges; boundary=") + 16;
+
+    p = nxt_mp_nget(r->mem_pool, length);
+    if (nxt_slow_path(p == NULL)) {
+        return NXT_ERROR;
+    }
+
+    content_type->value = p;
+    content_type->value_length = nxt_sprintf(p, p + length,
+                                             "multipart/byteranges; "
+                                             "boundary=%08xD%08xD",
+                                             boundary[0], boundary[1])
+                                 - p;
+
+    total = 0;
+    next = &r->out;
+
+    for (i = 0; i <= n; i++) {
+        fb = nxt_mp_zget(r->mem_pool, NXT_BUF_FILE_SIZE);
+        if (nxt_slow_path(fb == NULL)) {
+            return NXT_ERROR;
+        }
+
+        length = nxt_length("\r\n--\r\n") + 16
+                 + nxt_length("Content-Type: \r\n") + mtype->length
+                 + nxt_length("Content-Range: bytes -/\r\n\r\n")
+                 + 3 * NXT_OFF_T_LEN;
+
+        p = nxt_mp_nget(r->mem_pool, length);
+        if (nxt_slow_path(p == NULL)) {
+            return NXT_ERROR;
+        }
+
+        end = p + length;
+
+        fb->mem.start = p;
+        fb->mem.pos = p;
+
+        if (i == n) {
+            p = nxt_sprintf(p, end, "\r\n--%08xD%08xD--\r\n",
+                            boundary[0], boundary[1]);
+
+        } else {
+            p = nxt_sprintf(p, end, "\r\n--%08xD%08xD\r\n",
+                            boundary[0], boundary[1]);
+
+            if (mtype->length != 0) {
+                p = nxt_sprintf(p, end, "Content-Type: %V\r\n", mtype);
+            }
+
+            p = nxt_sprintf(p, end, "Content-Range: bytes %O-%O/%O\r\n\r\n",
+                            ranges[i].start, ranges[i].end - 1, size);
+
+            fb->file_pos = ranges[i].start;
+            fb->file_end = ranges[i].end;
+
+            total += ranges[i].end - ranges[i].start;
+        }
+
+        fb->mem.free = p;
+        fb->mem.end = p;
+        fb->file = f;
+
+        total += p - fb->mem.start;
+
+        *next = fb;
+        next = &fb->next;
+    }
+
+    r->resp.content_length_n = total;
+
+    return NXT_OK;
+}
+
+
+static nxt_bool_t
+nxt_http_static_if_range(nxt_http_field_t *if_range, nxt_file_info_t *fi,
+    nxt_str_t *etag)
+{
+    nxt_time_t  mtime;
+
+    if (if_range->value_length > 0 && if_range->value[0] == '"') {
+        /* A strong comparison, weak entity tags never match. */
+        return nxt_str_eq(etag, if_range->value, if_range->value_length);
+    }
+
+    mtime = nxt_time_parse(if_range->value, if_range->value_length);
+
+    return (mtime >= 0 && mtime == nxt_file_mtime(fi));
+}
+
+
+/*
+ * Returns the number of satisfiable ranges, or NXT_DECLINED if the Range
+ * field is invalid or should be ignored and the whole file is to be sent.
+ * The ranges are converted to [start, end) intervals.
+ */
+
+static nxt_int_t
+nxt_http_static_range_parse(nxt_http_field_t *range, nxt_off_t size,
+    nxt_http_static_range_t *ranges)
+{
+    u_char      *p, *end;
+    nxt_int_t   n;
+    nxt_off_t   start, last, total, cutoff, cutlim;
+    nxt_uint_t  suffix;
+
+    static const nxt_str_t  bytes = nxt_string("bytes=");
+
+    p = range->value;
+    end = p + range->value_length;
+
+    if (range->value_length < bytes.length
+        || nxt_strncasecmp(p, bytes.start, bytes.length) != 0)
+    {
+        return NXT_DECLINED;
+    }
+
+    p += bytes.length;
+
+    cutoff = NXT_OFF_T_MAX / 10;
+    cutlim = NXT_OFF_T_MAX % 10;
+
+    n = 0;
+    total = 0;
+
+    for ( ;; ) {
+
+        while (p < end && (*p == ' ' || *p == '\t' || *p == ',')) {
+            p++;
+        }
+
+        if (p == end) {
+            break;
+        }
+
+        start = 0;
+        last = -1;
+        suffix = 1;
+
+        while (p < end && *p >= '0' && *p <= '9') {
+            if (start >= cutoff && (start > cutoff || *p - '0' > cutlim)) {
+                return NXT_DECLINED;
+            }
+
+            start = start * 10 + (*p++ - '0');
+            suffix = 0;
+        }
+
+        if (p == end || *p++ != '-') {
+            return NXT_DECLINED;
+        }
+
+        if (p < end && *p >= '0' && *p <= '9') {
+            last = 0;
+
+            do {
+                if (last >= cutoff && (last > cutoff || *p - '0' > cutlim)) {
+                    return NXT_DECLINED;
+                }
+
+                last = last * 10 + (*p++ - '0');
+
+            } while (p < end && *p >= '0' && *p <= '9');
+        }
+
+        while (p < end && (*p == ' ' || *p == '\t')) {
+            p++;
+        }
+
+        if (p < end && *p != ',') {
+            return NXT_DECLINED;
+        }
+
+        if (suffix) {
+            if (last == -1) {
+                return NXT_DECLINED;
+            }
+
+            if (last == 0 || size == 0) {
+                continue;
+            }
+
+            start = size - nxt_min(last, size);
+            last = size;
+
+        } else {
+            if (last != -1 && last < start) {
+                return NXT_DECLINED;
+            }
+
+            if (start >= size) {
+                continue;
+            }
+
+            last = (last == -1 || last >= size) ? size : last + 1;
+        }
+
+        if (n == NXT_HTTP_STATIC_MAX_RANGES) {
+            return NXT_DECLINED;
+        }
+
+        ranges[n].start = start;
+        ranges[n].end = last;
+        n++;
+
+        total += last - start;
+    }
+
+    /* Overlapping ranges larger than the file itself are ignored. */
+
+    if (total > size) {
+        return NXT_DECLINED;
+    }
+
+    return n;
+}
+
+
 static void
 nxt_http_static_body_handler(nxt_task_t *task, void *obj, void *data)
 {
@@ -800,9 +1711,20 @@ nxt_http_static_body_handler(nxt_task_t *task, void *obj, void *data)
     nxt_http_request_t  *r;
 
     r = obj;
-    fb = r->out;
 
-    rest = fb->file_end - fb->file_pos;
+    if (r->sendfile && r->cache == NULL && r->compress == NULL
+        && r->out->next == NULL && !nxt_buf_is_mem(r->out))
+    {
+        nxt_http_static_sendfile(task, r);
+        return;
+    }
+
+    rest = 0;
+
+    for (fb = r->out; fb != NULL; fb = fb->next) {
+        rest += nxt_buf_mem_used_size(&fb->mem) + fb->file_end - fb->file_pos;
+    }
+
     out = NULL;
     next = &out;
     n = 0;
@@ -844,6 +1766,47 @@ nxt_http_static_body_handler(nxt_task_t *task, void *obj, void *data)
 }
 
 
+/*
+ * The connection encrypts in the kernel (kTLS), so a single file range
+ * is passed to the connection as is instead of being read into memory.
+ */
+
+static void
+nxt_http_static_sendfile(nxt_task_t *task, nxt_http_request_t *r)
+{
+    nxt_buf_t  *fb;
+
+    fb = r->out;
+    r->out = NULL;
+
+    nxt_buf_set_file(fb);
+
+    fb->completion_handler = nxt_http_static_sendfile_completion;
+    fb->parent = r;
+
+    nxt_mp_retain(r->mem_pool);
+
+    fb->next = nxt_http_buf_last(r);
+
+    nxt_http_request_send(task, r, fb);
+}
+
+
+static void
+nxt_http_static_sendfile_completion(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_buf_t           *fb;
+    nxt_http_request_t  *r;
+
+    fb = obj;
+    r = data;
+
+    nxt_http_static_file_close(task, fb->file);
+
+    nxt_mp_release(r->mem_pool);
+}
+
+
 static const nxt_http_request_state_t  nxt_http_static_send_state
     nxt_aligned(64) =
 {
@@ -854,9 +1817,10 @@ static const nxt_http_request_state_t  nxt_http_static_send_state
 static void
 nxt_http_static_buf_completion(nxt_task_t *task, void *obj, void *data)
 {
+    u_char              *p, *end;
     ssize_t             n, size;
     nxt_buf_t           *b, *fb, *next;
-    nxt_off_t           rest;
+    nxt_file_t          *file;
     nxt_http_request_t  *r;
 
     b = obj;
@@ -870,38 +1834,68 @@ nxt_http_static_buf_completion(nxt_task_t *task, void *obj, void *data)
         goto clean;
     }
 
-    rest = fb->file_end - fb->file_pos;
-    size = nxt_buf_mem_size(&b->mem);
+    file = fb->file;
 
-    size = nxt_min(rest, (nxt_off_t) size);
+    p = b->mem.start;
+    end = b->mem.end;
 
-    n = nxt_file_read(fb->file, b->mem.start, size, fb->file_pos);
+    for ( ;; ) {
 
-    if (n != size) {
-        if (n >= 0) {
-            nxt_log(task, NXT_LOG_ERR, "file \"%FN\" has changed "
-                    "while sending response to a client", fb->file->name);
+        if (fb->mem.pos == fb->mem.free && fb->file_pos == fb->file_end) {
+            fb = fb->next;
+            r->out = fb;
+
+            if (fb == NULL) {
+                break;
+            }
+
+            continue;
         }
 
-        nxt_http_request_error_handler(task, r, r->proto.any);
-        goto clean;
+        if (p == end) {
+            break;
+        }
+
+        if (fb->mem.pos != fb->mem.free) {
+            size = nxt_min(fb->mem.free - fb->mem.pos, end - p);
+
+            p = nxt_cpymem(p, fb->mem.pos, size);
+            fb->mem.pos += size;
+
+            continue;
+        }
+
+        size = nxt_min(fb->file_end - fb->file_pos, (nxt_off_t) (end - p));
+
+        n = nxt_file_read(file, p, size, fb->file_pos);
+
+        if (n != size) {
+            if (n >= 0) {
+                nxt_log(task, NXT_LOG_ERR, "file \"%FN\" has changed "
+                        "while sending response to a client", file->name);
+            }
+
+            nxt_http_request_error_handler(task, r, r->proto.any);
+            goto clean;
+        }
+
+        p += n;
+        fb->file_pos += n;
     }
 
     next = b->next;
 
-    if (n == rest) {
-        nxt_file_close(task, fb->file);
-        r->out = NULL;
+    if (r->out == NULL) {
+        nxt_http_static_file_close(task, file);
 
         b->next = nxt_http_buf_last(r);
 
     } else {
-        fb->file_pos += n;
         b->next = NULL;
     }
 
     b->mem.pos = b->mem.start;
-    b->mem.free = b->mem.pos + n;
+    b->mem.free = p;
 
     nxt_http_request_send(task, r, b);
 
@@ -924,7 +1918,7 @@ nxt_http_static_buf_completion(nxt_task_t *task, void *obj, void *data)
     } while (b != NULL);
 
     if (fb != NULL) {
-        nxt_file_close(task, fb->file);
+        nxt_http_static_file_close(task, fb->file);
         r->out = NULL;
     }
 }
@@ -11,6 +11,14 @@ static nxt_int_t nxt_http_var_dollar(nxt_task_t *task, nxt_str_t *str,
     void *ctx, uint16_t field);
 static nxt_int_t nxt_http_var_request_time(nxt_task_t *task, nxt_str_t *str,
     void *ctx, uint16_t field);
+static nxt_int_t nxt_http_var_app_queue_time(nxt_task_t *task,
+    nxt_str_t *str, void *ctx, uint16_t field);
+static nxt_int_t nxt_http_var_app_time(nxt_task_t *task, nxt_str_t *str,
+    void *ctx, uint16_t field);
+static nxt_int_t nxt_http_var_ipc_time(nxt_task_t *task, nxt_str_t *str,
+    void *ctx, uint16_t field);
+static nxt_int_t nxt_http_var_interval(nxt_http_request_t *r, nxt_str_t *str,
+    nxt_nsec_t start, nxt_nsec_t end);
 static nxt_int_t nxt_http_var_method(nxt_task_t *task, nxt_str_t *str,
     void *ctx, uint16_t field);
 static nxt_int_t nxt_http_var_request_uri(nxt_task_t *task, nxt_str_t *str,
@@ -27,6 +35,8 @@ static u_char *nxt_http_log_date(u_char *buf, nxt_realtime_t *now,
     struct tm *tm, size_t size, const char *format);
 static nxt_int_t nxt_http_var_request_line(nxt_task_t *task, nxt_str_t *str,
     void *ctx, uint16_t field);
+static nxt_int_t nxt_http_var_route_steps(nxt_task_t *task, nxt_str_t *str,
+    void *ctx, uint16_t field);
 static nxt_int_t nxt_http_var_status(nxt_task_t *task, nxt_str_t *str,
     void *ctx, uint16_t field);
 static nxt_int_t nxt_http_var_body_bytes_sent(nxt_task_t *task, nxt_str_t *str,
@@ -50,6 +60,15 @@ static nxt_var_decl_t  nxt_http_vars[] = {
     }, {
         .name = nxt_string("request_time"),
         .handler = nxt_http_var_request_time,
+    }, {
+        .name = nxt_string("app_queue_time"),
+        .handler = nxt_http_var_app_queue_time,
+    }, {
+        .name = nxt_string("app_time"),
+        .handler = nxt_http_var_app_time,
+    }, {
+        .name = nxt_string("ipc_time"),
+        .handler = nxt_http_var_ipc_time,
     }, {
         .name = nxt_string("method"),
         .handler = nxt_http_var_method,
@@ -71,6 +90,9 @@ static nxt_var_decl_t  nxt_http_vars[] = {
     }, {
         .name = nxt_string("request_line"),
         .handler = nxt_http_var_request_line,
+    }, {
+        .name = nxt_string("route_steps"),
+        .handler = nxt_http_var_route_steps,
     }, {
         .name = nxt_string("status"),
         .handler = nxt_http_var_status,
@@ -126,7 +148,7 @@ nxt_http_var_request_time(nxt_task_t *task, nxt_str_t *str, void *ctx,
 
     r = ctx;
 
-    now = nxt_thread_monotonic_time(task->thread);
+    now = nxt_precise_time();
     ms = (now - r->start_time) / 1000000;
 
     str->start = nxt_mp_nget(r->mem_pool, NXT_TIME_T_LEN + 4);
@@ -143,6 +165,71 @@ nxt_http_var_request_time(nxt_task_t *task, nxt_str_t *str, void *ctx,
 }
 
 
+static nxt_int_t
+nxt_http_var_app_queue_time(nxt_task_t *task, nxt_str_t *str, void *ctx,
+    uint16_t field)
+{
+    nxt_http_request_t  *r;
+
+    r = ctx;
+
+    return nxt_http_var_interval(r, str, r->app_send_time, r->app_ack_time);
+}
+
+
+static nxt_int_t
+nxt_http_var_app_time(nxt_task_t *task, nxt_str_t *str, void *ctx,
+    uint16_t field)
+{
+    nxt_http_request_t  *r;
+
+    r = ctx;
+
+    return nxt_http_var_interval(r, str, r->app_ack_time, r->app_resp_time);
+}
+
+
+static nxt_int_t
+nxt_http_var_ipc_time(nxt_task_t *task, nxt_str_t *str, void *ctx,
+    uint16_t field)
+{
+    nxt_http_request_t  *r;
+
+    r = ctx;
+
+    return nxt_http_var_interval(r, str, r->app_resp_time, r->app_done_time);
+}
+
+
+static nxt_int_t
+nxt_http_var_interval(nxt_http_request_t *r, nxt_str_t *str, nxt_nsec_t start,
+    nxt_nsec_t end)
+{
+    u_char    *p;
+    uint64_t  usec;
+
+    if (start == 0 || end == 0) {
+        nxt_str_set(str, "-");
+
+        return NXT_OK;
+    }
+
+    usec = (end - start) / 1000;
+
+    str->start = nxt_mp_nget(r->mem_pool, NXT_TIME_T_LEN + 7);
+    if (nxt_slow_path(str->start == NULL)) {
+        return NXT_ERROR;
+    }
+
+    p = nxt_sprintf(str->start, str->start + NXT_TIME_T_LEN + 7, "%T.%06uL",
+                    (nxt_time_t) (usec / 1000000), usec % 1000000);
+
+    str->length = p - str->start;
+
+    return NXT_OK;
+}
+
+
 static nxt_int_t
 nxt_http_var_method(nxt_task_t *task, nxt_str_t *str, void *ctx, uint16_t field)
 {
@@ -306,6 +393,27 @@ nxt_http_var_body_bytes_sent(nxt_task_t *task, nxt_str_t *str, void *ctx,
 }
 
 
+static nxt_int_t
+nxt_http_var_route_steps(nxt_task_t *task, nxt_str_t *str, void *ctx,
+    uint16_t field)
+{
+    nxt_http_request_t  *r;
+
+    r = ctx;
+
+    str->start = nxt_mp_nget(r->mem_pool, NXT_INT32_T_LEN);
+    if (nxt_slow_path(str->start == NULL)) {
+        return NXT_ERROR;
+    }
+
+    str->length = nxt_sprintf(str->start, str->start + NXT_INT32_T_LEN, "%uD",
+                              r->route_steps)
+                  - str->start;
+
+    return NXT_OK;
+}
+
+
 static nxt_int_t
 nxt_http_var_status(nxt_task_t *task, nxt_str_t *str, void *ctx, uint16_t field)
 {
@@ -159,6 +159,12 @@ static nxt_conf_map_t  nxt_common_app_conf[] = {
         offsetof(nxt_common_app_conf_t, limits),
     },
 
+    {
+        nxt_string("cpu_affinity"),
+        NXT_CONF_MAP_PTR,
+        offsetof(nxt_common_app_conf_t, cpu_affinity),
+    },
+
 };
 
 
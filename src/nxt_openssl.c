@@ -6,6 +6,8 @@
 
 #include <nxt_main.h>
 #include <nxt_conf.h>
+#include <nxt_cert.h>
+#include <nxt_sha1.h>
 
 #define OPENSSL_SUPPRESS_DEPRECATED
 
@@ -14,6 +16,7 @@
 #include <openssl/err.h>
 #include <openssl/rand.h>
 #include <openssl/x509v3.h>
+#include <openssl/ocsp.h>
 #include <openssl/bio.h>
 #include <openssl/evp.h>
 
@@ -45,6 +48,67 @@ struct nxt_tls_tickets_s {
 };
 
 
+/*
+ * A session in the cache shared by all router threads.  The cache lives
+ * as long as the router process, so sessions survive reconfigurations.
+ */
+
+typedef struct {
+    nxt_queue_link_t       link;
+    time_t                 expire;
+    size_t                 size;
+    uint8_t                id_length;
+    u_char                 id[SSL_MAX_SSL_SESSION_ID_LENGTH];
+    u_char                 data[];
+} nxt_openssl_session_t;
+
+
+typedef struct {
+    nxt_thread_spinlock_t  lock;
+    nxt_lvlhsh_t           hash;
+    nxt_queue_t            queue;  /* Sessions in the order of addition. */
+    nxt_atomic_uint_t      count;
+} nxt_openssl_session_cache_t;
+
+
+#if OPENSSL_VERSION_NUMBER >= 0x10100003L
+typedef const u_char  nxt_openssl_session_id_t;
+#else
+typedef u_char        nxt_openssl_session_id_t;
+#endif
+
+
+#define NXT_OPENSSL_SESSION_MAX  8192
+
+
+/*
+ * OCSP stapling of a certificate bundle.  Responses are cached per
+ * certificate in nxt_cert.c and are fetched by the router thread that
+ * handles a handshake, the handshake itself never waits for the fetch.
+ */
+
+typedef struct {
+    nxt_str_t              key;       /* DER-encoded OCSP_CERTID. */
+    nxt_str_t              issuer;    /* DER-encoded issuer certificate. */
+    nxt_str_t              request;   /* HTTP request to the responder. */
+    nxt_sockaddr_t         *sockaddr;
+    nxt_time_t             refresh;
+} nxt_openssl_ocsp_t;
+
+
+typedef struct {
+    nxt_str_t              key;
+    nxt_str_t              issuer;
+    nxt_time_t             refresh;
+} nxt_openssl_ocsp_fetch_t;
+
+
+#define NXT_OPENSSL_OCSP_REFRESH      3600
+#define NXT_OPENSSL_OCSP_RETRY        300
+#define NXT_OPENSSL_OCSP_TIMEOUT      10000
+#define NXT_OPENSSL_OCSP_BUFFER_SIZE  16384
+
+
 typedef enum {
     NXT_OPENSSL_HANDSHAKE = 0,
     NXT_OPENSSL_READ,
@@ -64,7 +128,31 @@ static void nxt_openssl_locks_free(void);
 static nxt_int_t nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
     nxt_tls_init_t *tls_init, nxt_bool_t last);
 static nxt_int_t nxt_openssl_chain_file(nxt_task_t *task, SSL_CTX *ctx,
-    nxt_tls_conf_t *conf, nxt_mp_t *mp, nxt_bool_t single);
+    nxt_tls_init_t *tls_init, nxt_mp_t *mp, nxt_bool_t single);
+static nxt_int_t nxt_openssl_ocsp_init(nxt_task_t *task, SSL_CTX *ctx,
+    nxt_tls_init_t *tls_init, X509 *cert, BIO *bio, nxt_mp_t *mp);
+static nxt_int_t nxt_openssl_ocsp_responder(nxt_task_t *task,
+    nxt_openssl_ocsp_t *ocsp, OCSP_CERTID *id, nxt_str_t *url, nxt_mp_t *mp);
+static nxt_int_t nxt_openssl_ocsp_verify(nxt_task_t *task, u_char *data,
+    size_t size, nxt_str_t *key, X509 *issuer, nxt_time_t now,
+    nxt_time_t *expire);
+static int nxt_openssl_ocsp_staple(SSL *s, void *arg);
+static void nxt_openssl_ocsp_fetch(nxt_task_t *task, nxt_openssl_ocsp_t *ocsp);
+static void nxt_openssl_ocsp_connected(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_openssl_ocsp_sent(nxt_task_t *task, void *obj, void *data);
+static void nxt_openssl_ocsp_read(nxt_task_t *task, void *obj, void *data);
+static void nxt_openssl_ocsp_read_done(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_openssl_ocsp_error(nxt_task_t *task, void *obj, void *data);
+static void nxt_openssl_ocsp_send_timeout(nxt_task_t *task, void *obj,
+    void *data);
+static void nxt_openssl_ocsp_read_timeout(nxt_task_t *task, void *obj,
+    void *data);
+static nxt_msec_t nxt_openssl_ocsp_timer_value(nxt_conn_t *c, uintptr_t data);
+static void nxt_openssl_ocsp_done(nxt_task_t *task, nxt_conn_t *c,
+    u_char *data, size_t size);
+static void nxt_openssl_ocsp_free(nxt_task_t *task, void *obj, void *data);
 #if (NXT_HAVE_OPENSSL_CONF_CMD)
 static nxt_int_t nxt_ssl_conf_commands(nxt_task_t *task, SSL_CTX *ctx,
     nxt_conf_value_t *value, nxt_mp_t *mp);
@@ -77,6 +165,16 @@ static int nxt_tls_ticket_key_callback(SSL *s, unsigned char *name,
 #endif
 static void nxt_ssl_session_cache(SSL_CTX *ctx, size_t cache_size,
     time_t timeout);
+static nxt_int_t nxt_openssl_session_cache_shared(nxt_task_t *task,
+    SSL_CTX *ctx, nxt_tls_init_t *tls_init);
+static int nxt_openssl_session_new(SSL *s, SSL_SESSION *sess);
+static SSL_SESSION *nxt_openssl_session_get(SSL *s,
+    nxt_openssl_session_id_t *id, int length, int *copy);
+static void nxt_openssl_session_remove(SSL_CTX *ctx, SSL_SESSION *sess);
+static void nxt_openssl_session_expire(time_t now, size_t max);
+static void nxt_openssl_session_delete(nxt_openssl_session_t *session);
+static nxt_int_t nxt_openssl_session_test(nxt_lvlhsh_query_t *lhq,
+    void *data);
 static nxt_uint_t nxt_openssl_cert_get_names(nxt_task_t *task, X509 *cert,
     nxt_tls_conf_t *conf, nxt_mp_t *mp);
 static nxt_int_t nxt_openssl_bundle_hash_test(nxt_lvlhsh_query_t *lhq,
@@ -84,6 +182,11 @@ static nxt_int_t nxt_openssl_bundle_hash_test(nxt_lvlhsh_query_t *lhq,
 static nxt_int_t nxt_openssl_bundle_hash_insert(nxt_task_t *task,
     nxt_lvlhsh_t *lvlhsh, nxt_tls_bundle_hash_item_t *item, nxt_mp_t * mp);
 static nxt_int_t nxt_openssl_servername(SSL *s, int *ad, void *arg);
+#if (NXT_HAVE_OPENSSL_ALPN)
+static int nxt_openssl_alpn_select(SSL *s, const unsigned char **out,
+    unsigned char *outlen, const unsigned char *in, unsigned int inlen,
+    void *arg);
+#endif
 static nxt_tls_bundle_conf_t *nxt_openssl_find_ctx(nxt_tls_conf_t *conf,
     nxt_str_t *sn);
 static void nxt_openssl_server_free(nxt_task_t *task, nxt_tls_conf_t *conf);
@@ -94,6 +197,10 @@ static ssize_t nxt_openssl_conn_io_recvbuf(nxt_conn_t *c, nxt_buf_t *b);
 static ssize_t nxt_openssl_conn_io_sendbuf(nxt_task_t *task, nxt_sendbuf_t *sb);
 static ssize_t nxt_openssl_conn_io_send(nxt_task_t *task, nxt_sendbuf_t *sb,
     void *buf, size_t size);
+#if (NXT_HAVE_OPENSSL_KTLS)
+static ssize_t nxt_openssl_conn_io_sendfile(nxt_task_t *task,
+    nxt_sendbuf_t *sb);
+#endif
 static void nxt_openssl_conn_io_shutdown(nxt_task_t *task, void *obj,
     void *data);
 static nxt_int_t nxt_openssl_conn_test_error(nxt_task_t *task, nxt_conn_t *c,
@@ -114,6 +221,12 @@ const nxt_tls_lib_t  nxt_openssl_lib = {
 };
 
 
+static const nxt_conn_state_t  nxt_openssl_ocsp_connect_state;
+static const nxt_conn_state_t  nxt_openssl_ocsp_send_state;
+static const nxt_conn_state_t  nxt_openssl_ocsp_read_state;
+static const nxt_conn_state_t  nxt_openssl_ocsp_close_state;
+
+
 static nxt_conn_io_t  nxt_openssl_conn_io = {
     .read = nxt_conn_io_read,
     .recvbuf = nxt_openssl_conn_io_recvbuf,
@@ -128,6 +241,16 @@ static nxt_conn_io_t  nxt_openssl_conn_io = {
 static long  nxt_openssl_version;
 static int   nxt_openssl_connection_index;
 
+static nxt_openssl_session_cache_t  nxt_openssl_session_cache;
+
+
+static const nxt_lvlhsh_proto_t  nxt_openssl_session_proto  nxt_aligned(64) = {
+    NXT_LVLHSH_DEFAULT,
+    nxt_openssl_session_test,
+    nxt_lvlhsh_alloc,
+    nxt_lvlhsh_free,
+};
+
 
 static nxt_int_t
 nxt_openssl_library_init(nxt_task_t *task)
@@ -198,6 +321,8 @@ nxt_openssl_library_init(nxt_task_t *task)
 
     nxt_openssl_connection_index = index;
 
+    nxt_queue_init(&nxt_openssl_session_cache.queue);
+
     return NXT_OK;
 }
 
@@ -331,6 +456,17 @@ nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
     SSL_CTX_set_options(ctx, SSL_OP_IGNORE_UNEXPECTED_EOF);
 #endif
 
+#if (NXT_HAVE_OPENSSL_KTLS)
+    if (tls_init->ktls) {
+        /*
+         * The kernel takes over record encryption after the handshake
+         * if it supports the negotiated cipher, otherwise OpenSSL
+         * silently continues in user space.
+         */
+        SSL_CTX_set_options(ctx, SSL_OP_ENABLE_KTLS);
+    }
+#endif
+
 #ifdef SSL_MODE_RELEASE_BUFFERS
 
     if (nxt_openssl_version >= 10001078) {
@@ -344,7 +480,7 @@ nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
 
 #endif
 
-    if (nxt_openssl_chain_file(task, ctx, conf, mp,
+    if (nxt_openssl_chain_file(task, ctx, tls_init, mp,
                                last && bundle->next == NULL)
         != NXT_OK)
     {
@@ -380,6 +516,12 @@ nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
 
     nxt_ssl_session_cache(ctx, tls_init->cache_size, tls_init->timeout);
 
+    if (tls_init->shared_cache && tls_init->cache_size != 0
+        && nxt_openssl_session_cache_shared(task, ctx, tls_init) != NXT_OK)
+    {
+        goto fail;
+    }
+
 #if (NXT_HAVE_OPENSSL_TLSEXT)
     if (nxt_tls_ticket_keys(task, ctx, tls_init, mp) != NXT_OK) {
         goto fail;
@@ -388,6 +530,12 @@ nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
 
     SSL_CTX_set_options(ctx, SSL_OP_CIPHER_SERVER_PREFERENCE);
 
+#if (NXT_HAVE_OPENSSL_ALPN)
+    if (tls_init->http2) {
+        SSL_CTX_set_alpn_select_cb(ctx, nxt_openssl_alpn_select, NULL);
+    }
+#endif
+
     if (conf->ca_certificate != NULL) {
 
         /* TODO: verify callback */
@@ -447,97 +595,914 @@ nxt_openssl_server_init(nxt_task_t *task, nxt_mp_t *mp,
 
 
 static nxt_int_t
-nxt_openssl_chain_file(nxt_task_t *task, SSL_CTX *ctx, nxt_tls_conf_t *conf,
-    nxt_mp_t *mp, nxt_bool_t single)
+nxt_openssl_chain_file(nxt_task_t *task, SSL_CTX *ctx,
+    nxt_tls_init_t *tls_init, nxt_mp_t *mp, nxt_bool_t single)
 {
     BIO                    *bio;
     X509                   *cert, *ca;
     long                   reason;
     EVP_PKEY               *key;
     nxt_int_t              ret;
+    nxt_tls_conf_t         *conf;
     nxt_tls_bundle_conf_t  *bundle;
 
-    ret = NXT_ERROR;
-    cert = NULL;
+    ret = NXT_ERROR;
+    cert = NULL;
+    conf = tls_init->conf;
+
+    bio = BIO_new(BIO_s_fd());
+    if (bio == NULL) {
+        goto end;
+    }
+
+    bundle = conf->bundle;
+
+    BIO_set_fd(bio, bundle->chain_file, BIO_CLOSE);
+
+    cert = PEM_read_bio_X509_AUX(bio, NULL, NULL, NULL);
+    if (cert == NULL) {
+        goto end;
+    }
+
+    if (SSL_CTX_use_certificate(ctx, cert) != 1) {
+        goto end;
+    }
+
+    if (!single && nxt_openssl_cert_get_names(task, cert, conf, mp) != NXT_OK) {
+        goto clean;
+    }
+
+    for ( ;; ) {
+        ca = PEM_read_bio_X509(bio, NULL, NULL, NULL);
+
+        if (ca == NULL) {
+            reason = ERR_GET_REASON(ERR_peek_last_error());
+            if (reason != PEM_R_NO_START_LINE) {
+                goto end;
+            }
+
+            ERR_clear_error();
+            break;
+        }
+
+        /*
+         * Note that ca isn't freed if it was successfully added to the chain,
+         * while the main certificate needs a X509_free() call, since
+         * its reference count is increased by SSL_CTX_use_certificate().
+         */
+#ifdef SSL_CTX_add0_chain_cert
+        if (SSL_CTX_add0_chain_cert(ctx, ca) != 1) {
+#else
+        if (SSL_CTX_add_extra_chain_cert(ctx, ca) != 1) {
+#endif
+            X509_free(ca);
+            goto end;
+        }
+    }
+
+    if (BIO_reset(bio) != 0) {
+        goto end;
+    }
+
+    key = PEM_read_bio_PrivateKey(bio, NULL, NULL, NULL);
+    if (key == NULL) {
+        goto end;
+    }
+
+    if (SSL_CTX_use_PrivateKey(ctx, key) != 1) {
+        EVP_PKEY_free(key);
+        goto end;
+    }
+
+    EVP_PKEY_free(key);
+
+    if (nxt_openssl_ocsp_init(task, ctx, tls_init, cert, bio, mp) != NXT_OK) {
+        goto clean;
+    }
+
+    ret = NXT_OK;
+
+end:
+
+    if (ret != NXT_OK) {
+        nxt_openssl_log_error(task, NXT_LOG_ALERT,
+                              "nxt_openssl_chain_file() failed");
+    }
+
+clean:
+
+    BIO_free(bio);
+    X509_free(cert);
+
+    return ret;
+}
+
+
+static nxt_int_t
+nxt_openssl_ocsp_init(nxt_task_t *task, SSL_CTX *ctx, nxt_tls_init_t *tls_init,
+    X509 *cert, BIO *bio, nxt_mp_t *mp)
+{
+    int                       i, n;
+    long                      length;
+    char                      *type, *header;
+    u_char                    *p, *data;
+    X509                      *issuer;
+    nxt_int_t                 ret;
+    nxt_str_t                 url, *name;
+    nxt_time_t                now, expire, refresh;
+    OCSP_CERTID               *id;
+    STACK_OF(X509)            *chain;
+    nxt_conf_value_t          *value;
+    nxt_openssl_ocsp_t        *ocsp;
+    STACK_OF(OPENSSL_STRING)  *aia;
+
+    static nxt_str_t  refresh_str = nxt_string("refresh");
+    static nxt_str_t  responder_str = nxt_string("responder");
+
+    if (BIO_reset(bio) != 0) {
+        nxt_openssl_log_error(task, NXT_LOG_ALERT, "BIO_reset() failed");
+        return NXT_ERROR;
+    }
+
+    /* A response to staple can be uploaded along with the certificate. */
+
+    for ( ;; ) {
+        if (PEM_read_bio(bio, &type, &header, &data, &length) == 0) {
+            ERR_clear_error();
+            data = NULL;
+            break;
+        }
+
+        n = nxt_strcmp(type, NXT_CERT_PEM_OCSP);
+
+        OPENSSL_free(header);
+        OPENSSL_free(type);
+
+        if (n == 0) {
+            break;
+        }
+
+        OPENSSL_free(data);
+    }
+
+    if (data == NULL && tls_init->ocsp_conf == NULL) {
+        return NXT_OK;
+    }
+
+    ret = NXT_ERROR;
+    id = NULL;
+    aia = NULL;
+
+    name = &tls_init->conf->bundle->name;
+
+#ifdef SSL_CTX_get0_chain_certs
+    SSL_CTX_get0_chain_certs(ctx, &chain);
+#else
+    SSL_CTX_get_extra_chain_certs(ctx, &chain);
+#endif
+
+    issuer = NULL;
+
+    for (i = 0; i < sk_X509_num(chain); i++) {
+        if (X509_check_issued(sk_X509_value(chain, i), cert) == X509_V_OK) {
+            issuer = sk_X509_value(chain, i);
+            break;
+        }
+    }
+
+    if (issuer == NULL) {
+        nxt_alert(task, "OCSP stapling requires the issuer certificate "
+                  "in the \"%V\" bundle", name);
+        goto fail;
+    }
+
+    ocsp = nxt_mp_zget(mp, sizeof(nxt_openssl_ocsp_t));
+    if (nxt_slow_path(ocsp == NULL)) {
+        goto fail;
+    }
+
+    id = OCSP_cert_to_id(NULL, cert, issuer);
+    if (id == NULL) {
+        nxt_openssl_log_error(task, NXT_LOG_ALERT,
+                              "OCSP_cert_to_id() failed");
+        goto fail;
+    }
+
+    n = i2d_OCSP_CERTID(id, NULL);
+
+    p = nxt_mp_nget(mp, n);
+    if (nxt_slow_path(p == NULL)) {
+        goto fail;
+    }
+
+    ocsp->key.start = p;
+    ocsp->key.length = i2d_OCSP_CERTID(id, &p);
+
+    n = i2d_X509(issuer, NULL);
+
+    p = nxt_mp_nget(mp, n);
+    if (nxt_slow_path(p == NULL)) {
+        goto fail;
+    }
+
+    ocsp->issuer.start = p;
+    ocsp->issuer.length = i2d_X509(issuer, &p);
+
+    ocsp->refresh = NXT_OPENSSL_OCSP_REFRESH;
+
+    if (tls_init->ocsp_conf != NULL) {
+        value = nxt_conf_get_object_member(tls_init->ocsp_conf, &refresh_str,
+                                           NULL);
+        if (value != NULL) {
+            ocsp->refresh = nxt_conf_get_number(value);
+        }
+
+        value = nxt_conf_get_object_member(tls_init->ocsp_conf,
+                                           &responder_str, NULL);
+        if (value != NULL) {
+            nxt_conf_get_string(value, &url);
+
+        } else {
+            aia = X509_get1_ocsp(cert);
+
+            if (aia == NULL || sk_OPENSSL_STRING_num(aia) == 0) {
+                nxt_alert(task, "no OCSP responder URL in the \"%V\" "
+                          "certificate and no \"responder\" is set", name);
+                goto fail;
+            }
+
+            url.start = (u_char *) sk_OPENSSL_STRING_value(aia, 0);
+            url.length = nxt_strlen(url.start);
+        }
+
+        if (nxt_openssl_ocsp_responder(task, ocsp, id, &url, mp) != NXT_OK) {
+            goto fail;
+        }
+    }
+
+    if (data != NULL) {
+        now = time(NULL);
+
+        if (nxt_openssl_ocsp_verify(task, data, length, &ocsp->key, issuer,
+                                    now, &expire)
+            == NXT_OK)
+        {
+            refresh = expire;
+
+            if (ocsp->sockaddr != NULL) {
+                refresh = nxt_min(now + ocsp->refresh, expire);
+            }
+
+            if (nxt_cert_ocsp_set(&ocsp->key, data, length, expire, refresh)
+                != NXT_OK)
+            {
+                goto fail;
+            }
+
+        } else {
+            nxt_log(task, NXT_LOG_WARN, "the OCSP response in the \"%V\" "
+                    "bundle is not stapled", name);
+        }
+    }
+
+    SSL_CTX_set_tlsext_status_cb(ctx, nxt_openssl_ocsp_staple);
+    SSL_CTX_set_tlsext_status_arg(ctx, ocsp);
+
+    ret = NXT_OK;
+
+fail:
+
+    X509_email_free(aia);
+    OCSP_CERTID_free(id);
+
+    if (data != NULL) {
+        OPENSSL_free(data);
+    }
+
+    return ret;
+}
+
+
+static nxt_int_t
+nxt_openssl_ocsp_responder(nxt_task_t *task, nxt_openssl_ocsp_t *ocsp,
+    OCSP_CERTID *id, nxt_str_t *url, nxt_mp_t *mp)
+{
+    int             n;
+    u_char          *p, *end;
+    size_t          size;
+    nxt_str_t       host, uri, addr;
+    OCSP_CERTID     *cid;
+    OCSP_REQUEST    *req;
+    nxt_sockaddr_t  *sa;
+
+    static nxt_str_t  root = nxt_string("/");
+
+    if (!nxt_str_start(url, "http://", 7)) {
+        nxt_alert(task, "the OCSP responder \"%V\" is not supported, "
+                  "only \"http://\" responders are", url);
+        return NXT_ERROR;
+    }
+
+    host.start = url->start + 7;
+    end = url->start + url->length;
+
+    p = memchr(host.start, '/', end - host.start);
+
+    if (p != NULL) {
+        host.length = p - host.start;
+        uri.start = p;
+        uri.length = end - p;
+
+    } else {
+        host.length = end - host.start;
+        uri = root;
+    }
+
+    sa = NULL;
+
+    if (host.length != 0) {
+        sa = nxt_sockaddr_parse_optport(mp, &host);
+
+        if (sa != NULL && nxt_sockaddr_port_number(sa) == 0) {
+            addr.length = host.length + nxt_length(":80");
+
+            addr.start = nxt_mp_nget(mp, addr.length);
+            if (nxt_slow_path(addr.start == NULL)) {
+                return NXT_ERROR;
+            }
+
+            p = nxt_cpymem(addr.start, host.start, host.length);
+            nxt_memcpy(p, ":80", 3);
+
+            sa = nxt_sockaddr_parse(mp, &addr);
+        }
+    }
+
+    if (sa == NULL) {
+        nxt_alert(task, "the OCSP responder address \"%V\" is invalid, "
+                  "an IP address is required", &host);
+        return NXT_ERROR;
+    }
+
+    sa->type = SOCK_STREAM;
+    ocsp->sockaddr = sa;
+
+    req = OCSP_REQUEST_new();
+    if (req == NULL) {
+        goto fail;
+    }
+
+    cid = OCSP_CERTID_dup(id);
+    if (cid == NULL) {
+        goto fail;
+    }
+
+    if (OCSP_request_add0_id(req, cid) == NULL) {
+        OCSP_CERTID_free(cid);
+        goto fail;
+    }
+
+    n = i2d_OCSP_REQUEST(req, NULL);
+    if (n <= 0) {
+        goto fail;
+    }
+
+    size = nxt_length("POST  HTTP/1.0\r\n"
+                      "Host: \r\n"
+                      "Content-Type: application/ocsp-request\r\n"
+                      "Content-Length: \r\n\r\n")
+           + uri.length + host.length + NXT_INT_T_LEN + n;
+
+    p = nxt_mp_nget(mp, size);
+    if (nxt_slow_path(p == NULL)) {
+        goto fail;
+    }
+
+    ocsp->request.start = p;
+
+    p = nxt_sprintf(p, p + size, "POST %V HTTP/1.0\r\n"
+                                 "Host: %V\r\n"
+                                 "Content-Type: application/ocsp-request\r\n"
+                                 "Content-Length: %d\r\n\r\n",
+                    &uri, &host, n);
+
+    i2d_OCSP_REQUEST(req, &p);
+
+    ocsp->request.length = p - ocsp->request.start;
+
+    OCSP_REQUEST_free(req);
+
+    return NXT_OK;
+
+fail:
+
+    nxt_openssl_log_error(task, NXT_LOG_ALERT,
+                          "failed to create OCSP request");
+
+    OCSP_REQUEST_free(req);
+
+    return NXT_ERROR;
+}
+
+
+static nxt_int_t
+nxt_openssl_ocsp_verify(nxt_task_t *task, u_char *data, size_t size,
+    nxt_str_t *key, X509 *issuer, nxt_time_t now, nxt_time_t *expire)
+{
+    int                   status, day, sec;
+    nxt_int_t             ret;
+    X509_STORE            *store;
+    OCSP_CERTID           *id;
+    const u_char          *p;
+    OCSP_RESPONSE         *resp;
+    OCSP_BASICRESP        *basic;
+    ASN1_GENERALIZEDTIME  *this_update, *next_update;
+
+    ret = NXT_ERROR;
+    id = NULL;
+    store = NULL;
+    basic = NULL;
+
+    p = data;
+
+    resp = d2i_OCSP_RESPONSE(NULL, &p, size);
+    if (resp == NULL) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR, "d2i_OCSP_RESPONSE() failed");
+        goto end;
+    }
+
+    status = OCSP_response_status(resp);
+
+    if (status != OCSP_RESPONSE_STATUS_SUCCESSFUL) {
+        nxt_log(task, NXT_LOG_ERR, "unsuccessful OCSP response status: \"%s\"",
+                OCSP_response_status_str(status));
+        goto end;
+    }
+
+    basic = OCSP_response_get1_basic(resp);
+    if (basic == NULL) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR,
+                              "OCSP_response_get1_basic() failed");
+        goto end;
+    }
+
+    /*
+     * The response must be signed by the issuer or by a responder
+     * delegated by the issuer, the issuer is trusted as is.
+     */
+
+    store = X509_STORE_new();
+    if (store == NULL || X509_STORE_add_cert(store, issuer) != 1) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR,
+                              "failed to create OCSP verification store");
+        goto end;
+    }
+
+    X509_STORE_set_flags(store, X509_V_FLAG_PARTIAL_CHAIN);
+
+    if (OCSP_basic_verify(basic, NULL, store, 0) != 1) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR, "OCSP_basic_verify() failed");
+        goto end;
+    }
+
+    p = key->start;
+
+    id = d2i_OCSP_CERTID(NULL, &p, key->length);
+    if (id == NULL) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR, "d2i_OCSP_CERTID() failed");
+        goto end;
+    }
+
+    if (OCSP_resp_find_status(basic, id, &status, NULL, NULL, &this_update,
+                              &next_update)
+        != 1)
+    {
+        nxt_log(task, NXT_LOG_ERR, "certificate status not found "
+                "in OCSP response");
+        goto end;
+    }
+
+    if (status != V_OCSP_CERTSTATUS_GOOD) {
+        nxt_log(task, NXT_LOG_ERR, "certificate status \"%s\" "
+                "in OCSP response", OCSP_cert_status_str(status));
+        goto end;
+    }
+
+    if (OCSP_check_validity(this_update, next_update, 300, -1) != 1) {
+        nxt_openssl_log_error(task, NXT_LOG_ERR,
+                              "OCSP_check_validity() failed");
+        goto end;
+    }
+
+    if (next_update == NULL) {
+        *expire = NXT_TIME_T_MAX;
+
+    } else {
+        if (ASN1_TIME_diff(&day, &sec, NULL, next_update) != 1) {
+            nxt_openssl_log_error(task, NXT_LOG_ERR,
+                                  "ASN1_TIME_diff() failed");
+            goto end;
+        }
+
+        *expire = now + (nxt_time_t) day * 86400 + sec;
+    }
+
+    ret = NXT_OK;
+
+end:
+
+    OCSP_CERTID_free(id);
+    X509_STORE_free(store);
+    OCSP_BASICRESP_free(basic);
+    OCSP_RESPONSE_free(resp);
+
+    return ret;
+}
+
+
+static int
+nxt_openssl_ocsp_staple(SSL *s, void *arg)
+{
+    u_char              *p;
+    size_t              size;
+    nxt_conn_t          *c;
+    nxt_bool_t          refresh;
+    nxt_openssl_ocsp_t  *ocsp;
+
+    ocsp = arg;
+    refresh = 0;
+
+    p = nxt_cert_ocsp_get(&ocsp->key, time(NULL), &size,
+                          (ocsp->sockaddr != NULL) ? &refresh : NULL);
+
+    if (refresh) {
+        c = SSL_get_ex_data(s, nxt_openssl_connection_index);
+
+        nxt_openssl_ocsp_fetch(c->socket.task, ocsp);
+    }
+
+    if (p == NULL) {
+        return SSL_TLSEXT_ERR_NOACK;
+    }
+
+    /* OpenSSL takes ownership of the response. */
+    SSL_set_tlsext_status_ocsp_resp(s, p, size);
+
+    return SSL_TLSEXT_ERR_OK;
+}
+
+
+static void
+nxt_openssl_ocsp_fetch(nxt_task_t *task, nxt_openssl_ocsp_t *ocsp)
+{
+    nxt_mp_t                  *mp;
+    nxt_buf_t                 *b;
+    nxt_conn_t                *c;
+    nxt_sockaddr_t            *sa;
+    nxt_openssl_ocsp_fetch_t  *fetch;
+
+    nxt_debug(task, "openssl ocsp fetch");
+
+    /*
+     * The fetch has its own pool, since the listener configuration
+     * can be released before the responder replies.
+     */
+
+    mp = nxt_mp_create(1024, 128, 256, 32);
+    if (nxt_slow_path(mp == NULL)) {
+        goto fail;
+    }
+
+    fetch = nxt_mp_get(mp, sizeof(nxt_openssl_ocsp_fetch_t));
+    if (nxt_slow_path(fetch == NULL)) {
+        goto fail;
+    }
+
+    if (nxt_slow_path(nxt_str_dup(mp, &fetch->key, &ocsp->key) == NULL
+                      || nxt_str_dup(mp, &fetch->issuer, &ocsp->issuer)
+                         == NULL))
+    {
+        goto fail;
+    }
+
+    fetch->refresh = ocsp->refresh;
+
+    b = nxt_buf_mem_alloc(mp, ocsp->request.length, 0);
+    if (nxt_slow_path(b == NULL)) {
+        goto fail;
+    }
+
+    b->mem.free = nxt_cpymem(b->mem.free, ocsp->request.start,
+                             ocsp->request.length);
+
+    /* The address text is copied as well, it is used in error messages. */
+
+    sa = nxt_mp_get(mp, nxt_sockaddr_size(ocsp->sockaddr));
+    if (nxt_slow_path(sa == NULL)) {
+        goto fail;
+    }
+
+    nxt_memcpy(sa, ocsp->sockaddr, nxt_sockaddr_size(ocsp->sockaddr));
+
+    c = nxt_conn_create(mp, task);
+    if (nxt_slow_path(c == NULL)) {
+        goto fail;
+    }
+
+    nxt_conn_work_queue_set(c, &task->thread->engine->fast_work_queue);
+
+    c->socket.data = fetch;
+    c->remote = sa;
+    c->write = b;
+    c->write_state = &nxt_openssl_ocsp_connect_state;
+
+    nxt_conn_connect(task->thread->engine, c);
+
+    return;
+
+fail:
+
+    if (mp != NULL) {
+        nxt_mp_destroy(mp);
+    }
+
+    nxt_cert_ocsp_set(&ocsp->key, NULL, 0, 0,
+                      time(NULL) + nxt_min(ocsp->refresh,
+                                           NXT_OPENSSL_OCSP_RETRY));
+}
+
+
+static const nxt_conn_state_t  nxt_openssl_ocsp_connect_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_openssl_ocsp_connected,
+    .close_handler = nxt_openssl_ocsp_error,
+    .error_handler = nxt_openssl_ocsp_error,
+
+    .timer_handler = nxt_openssl_ocsp_send_timeout,
+    .timer_value = nxt_openssl_ocsp_timer_value,
+    .timer_data = NXT_OPENSSL_OCSP_TIMEOUT,
+};
+
+
+static void
+nxt_openssl_ocsp_connected(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = obj;
+
+    nxt_debug(task, "openssl ocsp connected");
+
+    c->write_state = &nxt_openssl_ocsp_send_state;
+
+    nxt_conn_write(task->thread->engine, c);
+}
+
+
+static const nxt_conn_state_t  nxt_openssl_ocsp_send_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_openssl_ocsp_sent,
+    .error_handler = nxt_openssl_ocsp_error,
+
+    .timer_handler = nxt_openssl_ocsp_send_timeout,
+    .timer_value = nxt_openssl_ocsp_timer_value,
+    .timer_data = NXT_OPENSSL_OCSP_TIMEOUT,
+};
+
+
+static void
+nxt_openssl_ocsp_sent(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t          *c;
+    nxt_event_engine_t  *engine;
+
+    c = obj;
+
+    nxt_debug(task, "openssl ocsp sent");
+
+    engine = task->thread->engine;
+
+    c->write = nxt_sendbuf_completion(task, &engine->fast_work_queue, c->write);
+
+    if (c->write != NULL) {
+        nxt_conn_write(engine, c);
+        return;
+    }
+
+    c->read = nxt_buf_mem_alloc(c->mem_pool, NXT_OPENSSL_OCSP_BUFFER_SIZE, 0);
+    if (nxt_slow_path(c->read == NULL)) {
+        nxt_openssl_ocsp_done(task, c, NULL, 0);
+        return;
+    }
+
+    c->read_state = &nxt_openssl_ocsp_read_state;
+
+    nxt_conn_read(engine, c);
+}
+
+
+static const nxt_conn_state_t  nxt_openssl_ocsp_read_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_openssl_ocsp_read,
+    .close_handler = nxt_openssl_ocsp_read_done,
+    .error_handler = nxt_openssl_ocsp_error,
+
+    .timer_handler = nxt_openssl_ocsp_read_timeout,
+    .timer_value = nxt_openssl_ocsp_timer_value,
+    .timer_data = NXT_OPENSSL_OCSP_TIMEOUT,
+};
+
+
+static void
+nxt_openssl_ocsp_read(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_buf_t   *b;
+    nxt_conn_t  *c;
+
+    c = obj;
+    b = c->read;
+
+    nxt_debug(task, "openssl ocsp read: %uz", nxt_buf_mem_used_size(&b->mem));
+
+    /* The responder closes the connection after the response. */
+
+    if (b->mem.free == b->mem.end) {
+        nxt_log(task, NXT_LOG_ERR, "OCSP responder %*s sent too large "
+                "response", (size_t) c->remote->length,
+                nxt_sockaddr_start(c->remote));
+
+        nxt_openssl_ocsp_done(task, c, NULL, 0);
+        return;
+    }
+
+    nxt_conn_read(task->thread->engine, c);
+}
+
+
+static void
+nxt_openssl_ocsp_read_done(nxt_task_t *task, void *obj, void *data)
+{
+    u_char      *p, *end;
+    nxt_buf_t   *b;
+    nxt_conn_t  *c;
+
+    c = obj;
+    b = c->read;
+
+    p = b->mem.pos;
+    end = b->mem.free;
+
+    nxt_debug(task, "openssl ocsp read done: %uz", end - p);
+
+    if (end - p < 12
+        || memcmp(p, "HTTP/1.", 7) != 0
+        || memcmp(p + 8, " 200", 4) != 0)
+    {
+        nxt_log(task, NXT_LOG_ERR, "OCSP responder %*s sent invalid "
+                "response", (size_t) c->remote->length,
+                nxt_sockaddr_start(c->remote));
+
+        nxt_openssl_ocsp_done(task, c, NULL, 0);
+        return;
+    }
+
+    p = nxt_memstrn(p, end, "\r\n\r\n", 4);
+
+    if (p == NULL) {
+        nxt_openssl_ocsp_done(task, c, NULL, 0);
+        return;
+    }
+
+    p += 4;
+
+    nxt_openssl_ocsp_done(task, c, p, end - p);
+}
+
+
+static void
+nxt_openssl_ocsp_error(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = obj;
+
+    nxt_log(task, NXT_LOG_ERR, "OCSP responder %*s request failed",
+            (size_t) c->remote->length, nxt_sockaddr_start(c->remote));
+
+    nxt_openssl_ocsp_done(task, c, NULL, 0);
+}
+
+
+static void
+nxt_openssl_ocsp_send_timeout(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = nxt_write_timer_conn(obj);
+
+    nxt_log(task, NXT_LOG_ERR, "OCSP responder %*s timed out",
+            (size_t) c->remote->length, nxt_sockaddr_start(c->remote));
+
+    nxt_openssl_ocsp_done(task, c, NULL, 0);
+}
+
+
+static void
+nxt_openssl_ocsp_read_timeout(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = nxt_read_timer_conn(obj);
 
-    bio = BIO_new(BIO_s_fd());
-    if (bio == NULL) {
-        goto end;
-    }
+    nxt_log(task, NXT_LOG_ERR, "OCSP responder %*s timed out",
+            (size_t) c->remote->length, nxt_sockaddr_start(c->remote));
 
-    bundle = conf->bundle;
+    nxt_openssl_ocsp_done(task, c, NULL, 0);
+}
 
-    BIO_set_fd(bio, bundle->chain_file, BIO_CLOSE);
 
-    cert = PEM_read_bio_X509_AUX(bio, NULL, NULL, NULL);
-    if (cert == NULL) {
-        goto end;
-    }
+static nxt_msec_t
+nxt_openssl_ocsp_timer_value(nxt_conn_t *c, uintptr_t data)
+{
+    return (nxt_msec_t) data;
+}
 
-    if (SSL_CTX_use_certificate(ctx, cert) != 1) {
-        goto end;
-    }
 
-    if (!single && nxt_openssl_cert_get_names(task, cert, conf, mp) != NXT_OK) {
-        goto clean;
-    }
+static void
+nxt_openssl_ocsp_done(nxt_task_t *task, nxt_conn_t *c, u_char *data,
+    size_t size)
+{
+    X509                      *issuer;
+    nxt_time_t                now, expire, refresh;
+    const u_char              *p;
+    nxt_openssl_ocsp_fetch_t  *fetch;
 
-    for ( ;; ) {
-        ca = PEM_read_bio_X509(bio, NULL, NULL, NULL);
+    fetch = c->socket.data;
 
-        if (ca == NULL) {
-            reason = ERR_GET_REASON(ERR_peek_last_error());
-            if (reason != PEM_R_NO_START_LINE) {
-                goto end;
-            }
+    now = time(NULL);
+    expire = 0;
+    refresh = now + nxt_min(fetch->refresh, NXT_OPENSSL_OCSP_RETRY);
 
-            ERR_clear_error();
-            break;
-        }
+    if (data != NULL) {
+        p = fetch->issuer.start;
 
-        /*
-         * Note that ca isn't freed if it was successfully added to the chain,
-         * while the main certificate needs a X509_free() call, since
-         * its reference count is increased by SSL_CTX_use_certificate().
-         */
-#ifdef SSL_CTX_add0_chain_cert
-        if (SSL_CTX_add0_chain_cert(ctx, ca) != 1) {
-#else
-        if (SSL_CTX_add_extra_chain_cert(ctx, ca) != 1) {
-#endif
-            X509_free(ca);
-            goto end;
+        issuer = d2i_X509(NULL, &p, fetch->issuer.length);
+
+        if (issuer != NULL
+            && nxt_openssl_ocsp_verify(task, data, size, &fetch->key, issuer,
+                                       now, &expire)
+               == NXT_OK)
+        {
+            refresh = nxt_min(now + fetch->refresh, expire);
+
+        } else {
+            data = NULL;
         }
-    }
 
-    if (BIO_reset(bio) != 0) {
-        goto end;
+        X509_free(issuer);
     }
 
-    key = PEM_read_bio_PrivateKey(bio, NULL, NULL, NULL);
-    if (key == NULL) {
-        goto end;
+    if (nxt_cert_ocsp_set(&fetch->key, data, size, expire, refresh) == NXT_OK
+        && data != NULL)
+    {
+        nxt_debug(task, "openssl ocsp response updated");
     }
 
-    if (SSL_CTX_use_PrivateKey(ctx, key) == 1) {
-        ret = NXT_OK;
-    }
+    c->socket.data = NULL;
+    c->block_read = 1;
+    c->block_write = 1;
 
-    EVP_PKEY_free(key);
+    if (c->socket.fd != -1) {
+        c->write_state = &nxt_openssl_ocsp_close_state;
 
-end:
+        nxt_conn_close(task->thread->engine, c);
 
-    if (ret != NXT_OK) {
-        nxt_openssl_log_error(task, NXT_LOG_ALERT,
-                              "nxt_openssl_chain_file() failed");
+    } else {
+        nxt_openssl_ocsp_free(task, c, NULL);
     }
+}
 
-clean:
 
-    BIO_free(bio);
-    X509_free(cert);
+static const nxt_conn_state_t  nxt_openssl_ocsp_close_state
+    nxt_aligned(64) =
+{
+    .ready_handler = nxt_openssl_ocsp_free,
+};
 
-    return ret;
+
+static void
+nxt_openssl_ocsp_free(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_conn_t  *c;
+
+    c = obj;
+
+    nxt_debug(task, "openssl ocsp free");
+
+    nxt_conn_free(task, c);
 }
 
 
@@ -845,6 +1810,244 @@ nxt_ssl_session_cache(SSL_CTX *ctx, size_t cache_size, time_t timeout)
 }
 
 
+static nxt_int_t
+nxt_openssl_session_cache_shared(nxt_task_t *task, SSL_CTX *ctx,
+    nxt_tls_init_t *tls_init)
+{
+    u_char      sid_ctx[20];
+    nxt_sha1_t  sha1;
+
+    /* Sessions of one listener must not be resumed on another. */
+
+    nxt_sha1_init(&sha1);
+    nxt_sha1_update(&sha1, tls_init->name.start, tls_init->name.length);
+    nxt_sha1_final(sid_ctx, &sha1);
+
+    if (SSL_CTX_set_session_id_context(ctx, sid_ctx, sizeof(sid_ctx)) == 0) {
+        nxt_openssl_log_error(task, NXT_LOG_ALERT,
+                              "SSL_CTX_set_session_id_context() failed");
+        return NXT_ERROR;
+    }
+
+    SSL_CTX_set_session_cache_mode(ctx, SSL_SESS_CACHE_SERVER
+                                        | SSL_SESS_CACHE_NO_INTERNAL);
+
+    SSL_CTX_sess_set_new_cb(ctx, nxt_openssl_session_new);
+    SSL_CTX_sess_set_get_cb(ctx, nxt_openssl_session_get);
+    SSL_CTX_sess_set_remove_cb(ctx, nxt_openssl_session_remove);
+
+    return NXT_OK;
+}
+
+
+static int
+nxt_openssl_session_new(SSL *s, SSL_SESSION *sess)
+{
+    int                          size;
+    u_char                       *p;
+    time_t                       now;
+    unsigned int                 length;
+    const u_char                 *id;
+    nxt_lvlhsh_query_t           lhq;
+    nxt_openssl_session_t        *session;
+    nxt_openssl_session_cache_t  *cache;
+
+    size = i2d_SSL_SESSION(sess, NULL);
+
+    if (size <= 0 || size > NXT_OPENSSL_SESSION_MAX) {
+        return 0;
+    }
+
+    id = SSL_SESSION_get_id(sess, &length);
+
+    session = nxt_malloc(sizeof(nxt_openssl_session_t) + size);
+    if (nxt_slow_path(session == NULL)) {
+        return 0;
+    }
+
+    p = session->data;
+    session->size = i2d_SSL_SESSION(sess, &p);
+
+    session->expire = SSL_SESSION_get_time(sess)
+                      + SSL_SESSION_get_timeout(sess);
+
+    session->id_length = length;
+    nxt_memcpy(session->id, id, length);
+
+    lhq.key_hash = nxt_murmur_hash2(session->id, length);
+    lhq.replace = 1;
+    lhq.key.length = length;
+    lhq.key.start = session->id;
+    lhq.value = session;
+    lhq.proto = &nxt_openssl_session_proto;
+    lhq.pool = NULL;
+
+    now = time(NULL);
+    cache = &nxt_openssl_session_cache;
+
+    nxt_thread_spin_lock(&cache->lock);
+
+    nxt_openssl_session_expire(now,
+                           SSL_CTX_sess_get_cache_size(SSL_get_SSL_CTX(s)));
+
+    if (nxt_lvlhsh_insert(&cache->hash, &lhq) != NXT_OK) {
+        nxt_thread_spin_unlock(&cache->lock);
+
+        nxt_free(session);
+
+        return 0;
+    }
+
+    if (lhq.value != session) {
+        /* A replaced session with the same id. */
+        nxt_queue_remove(&((nxt_openssl_session_t *) lhq.value)->link);
+        nxt_free(lhq.value);
+
+    } else {
+        cache->count++;
+    }
+
+    nxt_queue_insert_tail(&cache->queue, &session->link);
+
+    nxt_thread_spin_unlock(&cache->lock);
+
+    /* The session is not retained. */
+    return 0;
+}
+
+
+static SSL_SESSION *
+nxt_openssl_session_get(SSL *s, nxt_openssl_session_id_t *id, int length,
+    int *copy)
+{
+    const u_char                 *p;
+    SSL_SESSION                  *sess;
+    nxt_lvlhsh_query_t           lhq;
+    nxt_openssl_session_t        *session;
+    nxt_openssl_session_cache_t  *cache;
+
+    *copy = 0;
+
+    lhq.key_hash = nxt_murmur_hash2(id, length);
+    lhq.key.length = length;
+    lhq.key.start = (u_char *) id;
+    lhq.proto = &nxt_openssl_session_proto;
+
+    sess = NULL;
+    cache = &nxt_openssl_session_cache;
+
+    nxt_thread_spin_lock(&cache->lock);
+
+    if (nxt_lvlhsh_find(&cache->hash, &lhq) == NXT_OK) {
+        session = lhq.value;
+
+        if (session->expire > time(NULL)) {
+            p = session->data;
+            sess = d2i_SSL_SESSION(NULL, &p, session->size);
+
+        } else {
+            nxt_openssl_session_delete(session);
+        }
+    }
+
+    nxt_thread_spin_unlock(&cache->lock);
+
+    return sess;
+}
+
+
+static void
+nxt_openssl_session_remove(SSL_CTX *ctx, SSL_SESSION *sess)
+{
+    unsigned int                 length;
+    const u_char                 *id;
+    nxt_lvlhsh_query_t           lhq;
+    nxt_openssl_session_cache_t  *cache;
+
+    id = SSL_SESSION_get_id(sess, &length);
+
+    lhq.key_hash = nxt_murmur_hash2(id, length);
+    lhq.key.length = length;
+    lhq.key.start = (u_char *) id;
+    lhq.proto = &nxt_openssl_session_proto;
+
+    cache = &nxt_openssl_session_cache;
+
+    nxt_thread_spin_lock(&cache->lock);
+
+    if (nxt_lvlhsh_find(&cache->hash, &lhq) == NXT_OK) {
+        nxt_openssl_session_delete(lhq.value);
+    }
+
+    nxt_thread_spin_unlock(&cache->lock);
+}
+
+
+/* The cache lock must be held. */
+
+static void
+nxt_openssl_session_expire(time_t now, size_t max)
+{
+    nxt_queue_link_t       *lnk;
+    nxt_openssl_session_t  *session;
+
+    while (!nxt_queue_is_empty(&nxt_openssl_session_cache.queue)) {
+        lnk = nxt_queue_first(&nxt_openssl_session_cache.queue);
+        session = nxt_queue_link_data(lnk, nxt_openssl_session_t, link);
+
+        if (session->expire > now && nxt_openssl_session_cache.count < max) {
+            break;
+        }
+
+        nxt_openssl_session_delete(session);
+    }
+}
+
+
+/* The cache lock must be held. */
+
+static void
+nxt_openssl_session_delete(nxt_openssl_session_t *session)
+{
+    nxt_lvlhsh_query_t  lhq;
+
+    lhq.key_hash = nxt_murmur_hash2(session->id, session->id_length);
+    lhq.key.length = session->id_length;
+    lhq.key.start = session->id;
+    lhq.proto = &nxt_openssl_session_proto;
+    lhq.pool = NULL;
+
+    (void) nxt_lvlhsh_delete(&nxt_openssl_session_cache.hash, &lhq);
+
+    nxt_queue_remove(&session->link);
+    nxt_openssl_session_cache.count--;
+
+    nxt_free(session);
+}
+
+
+static nxt_int_t
+nxt_openssl_session_test(nxt_lvlhsh_query_t *lhq, void *data)
+{
+    nxt_openssl_session_t  *session;
+
+    session = data;
+
+    if (nxt_str_eq(&lhq->key, session->id, session->id_length)) {
+        return NXT_OK;
+    }
+
+    return NXT_DECLINED;
+}
+
+
+nxt_uint_t
+nxt_openssl_session_cache_count(void)
+{
+    return nxt_openssl_session_cache.count;
+}
+
+
 static nxt_uint_t
 nxt_openssl_cert_get_names(nxt_task_t *task, X509 *cert, nxt_tls_conf_t *conf,
     nxt_mp_t *mp)
@@ -1110,6 +2313,30 @@ nxt_openssl_servername(SSL *s, int *ad, void *arg)
 }
 
 
+#if (NXT_HAVE_OPENSSL_ALPN)
+
+static int
+nxt_openssl_alpn_select(SSL *s, const unsigned char **out,
+    unsigned char *outlen, const unsigned char *in, unsigned int inlen,
+    void *arg)
+{
+    int  ret;
+
+    static const unsigned char  protos[] = "\x02h2\x08http/1.1";
+
+    ret = SSL_select_next_proto((unsigned char **) out, outlen,
+                                protos, sizeof(protos) - 1, in, inlen);
+
+    if (ret != OPENSSL_NPN_NEGOTIATED) {
+        return SSL_TLSEXT_ERR_NOACK;
+    }
+
+    return SSL_TLSEXT_ERR_OK;
+}
+
+#endif
+
+
 static nxt_tls_bundle_conf_t *
 nxt_openssl_find_ctx(nxt_tls_conf_t *conf, nxt_str_t *sn)
 {
@@ -1245,6 +2472,10 @@ nxt_openssl_conn_handshake(nxt_task_t *task, void *obj, void *data)
     nxt_work_handler_t      handler;
     nxt_openssl_conn_t      *tls;
     const nxt_conn_state_t  *state;
+#if (NXT_HAVE_OPENSSL_ALPN)
+    unsigned int            len;
+    const unsigned char     *alpn;
+#endif
 
     c = obj;
 
@@ -1278,6 +2509,27 @@ nxt_openssl_conn_handshake(nxt_task_t *task, void *obj, void *data)
         /* ret == 1, the handshake was successfully completed. */
         tls->handshake = 1;
 
+        if (SSL_session_reused(tls->session)) {
+            task->thread->engine->tls_resumed_cnt++;
+
+        } else {
+            task->thread->engine->tls_full_cnt++;
+        }
+
+#if (NXT_HAVE_OPENSSL_ALPN)
+        SSL_get0_alpn_selected(tls->session, &alpn, &len);
+
+        c->alpn_h2 = (len == 2 && alpn[0] == 'h' && alpn[1] == '2');
+#endif
+
+#if (NXT_HAVE_OPENSSL_KTLS)
+        if (BIO_get_ktls_send(SSL_get_wbio(tls->session))) {
+            nxt_debug(task, "openssl conn kTLS send fd:%d", c->socket.fd);
+
+            c->sendfile = NXT_CONN_SENDFILE_ON;
+        }
+#endif
+
         if (c->read_state != NULL) {
             if (state->io_read_handler != NULL || c->read != NULL) {
                 nxt_conn_read(task->thread->engine, c);
@@ -1375,6 +2627,12 @@ nxt_openssl_conn_io_sendbuf(nxt_task_t *task, nxt_sendbuf_t *sb)
         return 0;
     }
 
+#if (NXT_HAVE_OPENSSL_KTLS)
+    if (niov == 0 && nxt_buf_is_file(sb->buf)) {
+        return nxt_openssl_conn_io_sendfile(task, sb);
+    }
+#endif
+
     return nxt_openssl_conn_io_send(task, sb, iov.iov_base, iov.iov_len);
 }
 
@@ -1419,6 +2677,59 @@ nxt_openssl_conn_io_send(nxt_task_t *task, nxt_sendbuf_t *sb, void *buf,
 }
 
 
+#if (NXT_HAVE_OPENSSL_KTLS)
+
+static ssize_t
+nxt_openssl_conn_io_sendfile(nxt_task_t *task, nxt_sendbuf_t *sb)
+{
+    size_t              size;
+    ossl_ssize_t        ret;
+    nxt_buf_t           *b;
+    nxt_err_t           err;
+    nxt_int_t           n;
+    nxt_conn_t          *c;
+    nxt_openssl_conn_t  *tls;
+
+    tls = sb->tls;
+    b = sb->buf;
+
+    size = nxt_min(b->file_end - b->file_pos, (nxt_off_t) sb->limit);
+
+    ret = SSL_sendfile(tls->session, b->file->fd, b->file_pos, size, 0);
+
+    err = (ret <= 0) ? nxt_socket_errno : 0;
+
+    nxt_debug(task, "SSL_sendfile(%d, %FD, @%O, %uz): %z err:%d",
+              sb->socket, b->file->fd, b->file_pos, size, ret, err);
+
+    if (ret > 0) {
+        if ((size_t) ret < size) {
+            sb->ready = 0;
+        }
+
+        return ret;
+    }
+
+    c = tls->conn;
+    c->socket.write_ready = sb->ready;
+
+    n = nxt_openssl_conn_test_error(task, c, ret, err, NXT_OPENSSL_WRITE);
+
+    sb->ready = c->socket.write_ready;
+
+    if (n == NXT_ERROR) {
+        sb->error = c->socket.error;
+        nxt_openssl_conn_error(task, err, "SSL_sendfile(%d, %FD, @%O, %uz) "
+                               "failed", sb->socket, b->file->fd,
+                               b->file_pos, size);
+    }
+
+    return n;
+}
+
+#endif
+
+
 static void
 nxt_openssl_conn_io_shutdown(nxt_task_t *task, void *obj, void *data)
 {
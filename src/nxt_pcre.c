@@ -22,6 +22,9 @@ struct nxt_regex_match_s {
 
 static void *nxt_pcre_malloc(size_t size);
 static void nxt_pcre_free(void *p);
+#if (PCRE_STUDY_JIT_COMPILE)
+static void nxt_pcre_cleanup(nxt_task_t *task, void *obj, void *data);
+#endif
 
 static nxt_mp_t  *nxt_pcre_mp;
 
@@ -32,6 +35,7 @@ nxt_regex_compile(nxt_mp_t *mp, nxt_str_t *source, nxt_regex_err_t *err)
     int          erroffset;
     char         *pattern;
     void         *saved_malloc, *saved_free;
+    const char   *errstr;
     nxt_regex_t  *re;
 
     err->offset = source->length;
@@ -59,12 +63,18 @@ nxt_regex_compile(nxt_mp_t *mp, nxt_str_t *source, nxt_regex_err_t *err)
 
     re->code = pcre_compile(pattern, 0, &err->msg, &erroffset, NULL);
     if (nxt_fast_path(re->code != NULL)) {
-#if 0
-        re->extra = pcre_study(re->code, PCRE_STUDY_JIT_COMPILE, &err->msg);
-        if (nxt_slow_path(re->extra == NULL && err->msg != NULL)) {
-            nxt_log_warn(thr->log, "pcre_study(%V) failed: %s", source, err->msg);
+#if (PCRE_STUDY_JIT_COMPILE)
+        /* A failed study is not fatal, the pattern is just interpreted. */
+        re->extra = pcre_study(re->code, PCRE_STUDY_JIT_COMPILE, &errstr);
+
+        if (re->extra != NULL
+            && nxt_mp_cleanup(mp, nxt_pcre_cleanup, NULL, re, NULL) != NXT_OK)
+        {
+            pcre_free_study(re->extra);
+            re->extra = NULL;
         }
 #else
+        (void) errstr;
         re->extra = NULL;
 #endif
 
@@ -101,6 +111,29 @@ nxt_pcre_free(void *p)
 }
 
 
+#if (PCRE_STUDY_JIT_COMPILE)
+
+static void
+nxt_pcre_cleanup(nxt_task_t *task, void *obj, void *data)
+{
+    void         *saved_free;
+    nxt_regex_t  *re;
+
+    re = obj;
+
+    /* The study data itself is allocated from the memory pool. */
+
+    saved_free = pcre_free;
+    pcre_free = nxt_pcre_free;
+
+    pcre_free_study(re->extra);
+
+    pcre_free = saved_free;
+}
+
+#endif
+
+
 nxt_regex_match_t *
 nxt_regex_match_create(nxt_mp_t *mp, size_t size)
 {
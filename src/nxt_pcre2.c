@@ -12,11 +12,13 @@
 
 static void *nxt_pcre2_malloc(PCRE2_SIZE size, void *memory_data);
 static void nxt_pcre2_free(void *p, void *memory_data);
+static void nxt_pcre2_cleanup(nxt_task_t *task, void *obj, void *data);
 
 
 struct nxt_regex_s {
     pcre2_code  *code;
     nxt_str_t   pattern;
+    uint8_t     jit;  /* 1 bit */
 };
 
 
@@ -68,20 +70,27 @@ nxt_regex_compile(nxt_mp_t *mp, nxt_str_t *source, nxt_regex_err_t *err)
         return NULL;
     }
 
-#if 0
-    errcode = pcre2_jit_compile(re, PCRE2_JIT_COMPLETE);
-    if (nxt_slow_path(errcode != 0 && errcode != PCRE2_ERROR_JIT_BADOPTION)) {
-        ret = pcre2_get_error_message(errcode, (PCRE2_UCHAR *) err->msg,
-                                      ERR_BUF_SIZE);
-        if (ret < 0) {
-            (void) nxt_sprintf(err->msg, err->msg + ERR_BUF_SIZE,
-                               "JIT compilation failed with unknown "
-                               "error code: %d%Z", errcode);
-        }
+    /*
+     * The JIT code is allocated outside of the memory pool
+     * and should be freed along with the pool.
+     */
 
-        return NULL;
+    if (nxt_slow_path(nxt_mp_cleanup(mp, nxt_pcre2_cleanup, NULL, re, NULL)
+                      != NXT_OK))
+    {
+        pcre2_code_free(re->code);
+        goto alloc_fail;
     }
-#endif
+
+    /*
+     * PCRE2_ERROR_JIT_BADOPTION means that the library is built without
+     * JIT support, other errors are not fatal either: the interpreter
+     * is used then.
+     */
+
+    errcode = pcre2_jit_compile(re->code, PCRE2_JIT_COMPLETE);
+
+    re->jit = (errcode == 0);
 
     return re;
 
@@ -107,6 +116,17 @@ nxt_pcre2_free(void *p, void *mp)
 }
 
 
+static void
+nxt_pcre2_cleanup(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_regex_t  *re;
+
+    re = obj;
+
+    pcre2_code_free(re->code);
+}
+
+
 nxt_regex_match_t *
 nxt_regex_match_create(nxt_mp_t *mp, size_t size)
 {
@@ -136,8 +156,14 @@ nxt_regex_match(nxt_regex_t *re, u_char *subject, size_t length,
     nxt_int_t    ret;
     PCRE2_UCHAR  errptr[ERR_BUF_SIZE];
 
-    ret = pcre2_match(re->code, (PCRE2_SPTR) subject, length, 0, 0, match,
-                      NULL);
+    if (re->jit) {
+        ret = pcre2_jit_match(re->code, (PCRE2_SPTR) subject, length, 0, 0,
+                              match, NULL);
+
+    } else {
+        ret = pcre2_match(re->code, (PCRE2_SPTR) subject, length, 0, 0, match,
+                          NULL);
+    }
 
     if (nxt_slow_path(ret < PCRE2_ERROR_NOMATCH)) {
 
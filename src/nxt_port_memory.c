@@ -445,7 +445,6 @@ static nxt_port_mmap_handler_t *
 nxt_port_mmap_get(nxt_task_t *task, nxt_port_mmaps_t *mmaps, nxt_chunk_id_t *c,
     nxt_int_t n, nxt_bool_t tracking)
 {
-    nxt_int_t                i, res, nchunks;
     nxt_free_map_t           *free_map;
     nxt_port_mmap_t          *port_mmap;
     nxt_port_mmap_t          *end_port_mmap;
@@ -471,28 +470,8 @@ nxt_port_mmap_get(nxt_task_t *task, nxt_port_mmaps_t *mmaps, nxt_chunk_id_t *c,
 
         free_map = tracking ? hdr->free_tracking_map : hdr->free_map;
 
-        while (nxt_port_mmap_get_free_chunk(free_map, c)) {
-            nchunks = 1;
-
-            while (nchunks < n) {
-                res = nxt_port_mmap_chk_set_chunk_busy(free_map, *c + nchunks);
-
-                if (res == 0) {
-                    for (i = 0; i < nchunks; i++) {
-                        nxt_port_mmap_set_chunk_free(free_map, *c + i);
-                    }
-
-                    *c += nchunks + 1;
-                    nchunks = 0;
-                    break;
-                }
-
-                nchunks++;
-            }
-
-            if (nchunks == n) {
-                goto unlock_return;
-            }
+        if (nxt_port_mmap_get_free_chunks(free_map, c, n, n) != 0) {
+            goto unlock_return;
         }
 
         hdr->oosm = 1;
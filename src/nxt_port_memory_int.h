@@ -99,6 +99,10 @@ nxt_port_mmap_chk_set_chunk_busy(nxt_free_map_t *m, nxt_chunk_id_t c);
 nxt_inline void
 nxt_port_mmap_set_chunk_free(nxt_free_map_t *m, nxt_chunk_id_t c);
 
+nxt_inline nxt_int_t
+nxt_port_mmap_get_free_chunks(nxt_free_map_t *m, nxt_chunk_id_t *c,
+    nxt_int_t n, nxt_int_t min_n);
+
 nxt_inline nxt_chunk_id_t
 nxt_port_mmap_chunk_id(nxt_port_mmap_header_t *hdr, const u_char *p)
 {
@@ -157,6 +161,46 @@ nxt_port_mmap_get_free_chunk(nxt_free_map_t *m, nxt_chunk_id_t *c)
 }
 
 
+/*
+ * Lock-free acquisition of up to "n" consecutive chunks starting the search
+ * from chunk "*c".  Every chunk is claimed with an atomic operation, so
+ * concurrent allocators and the remote side releasing chunks need no lock.
+ * Returns the number of acquired chunks which is at least "min_n" and at
+ * least 1, or 0 if no suitable run was found.
+ */
+
+nxt_inline nxt_int_t
+nxt_port_mmap_get_free_chunks(nxt_free_map_t *m, nxt_chunk_id_t *c,
+    nxt_int_t n, nxt_int_t min_n)
+{
+    nxt_int_t  i, nchunks;
+
+    while (nxt_port_mmap_get_free_chunk(m, c)) {
+        nchunks = 1;
+
+        while (nchunks < n) {
+            if (nxt_port_mmap_chk_set_chunk_busy(m, *c + nchunks) == 0) {
+                break;
+            }
+
+            nchunks++;
+        }
+
+        if (nchunks >= min_n) {
+            return nchunks;
+        }
+
+        for (i = 0; i < nchunks; i++) {
+            nxt_port_mmap_set_chunk_free(m, *c + i);
+        }
+
+        *c += nchunks + 1;
+    }
+
+    return 0;
+}
+
+
 nxt_inline void
 nxt_port_mmap_set_chunk_busy(nxt_free_map_t *m, nxt_chunk_id_t c)
 {
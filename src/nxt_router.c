@@ -19,6 +19,9 @@
 #include <nxt_unit_request.h>
 #include <nxt_unit_response.h>
 #include <nxt_router_request.h>
+#if (NXT_HAVE_CPU_AFFINITY)
+#include <nxt_cpu_affinity.h>
+#endif
 #include <nxt_app_queue.h>
 #include <nxt_port_queue.h>
 
@@ -107,6 +110,8 @@ static void nxt_router_app_restart_handler(nxt_task_t *task,
     nxt_port_recv_msg_t *msg);
 static void nxt_router_status_handler(nxt_task_t *task,
     nxt_port_recv_msg_t *msg);
+static u_char *nxt_router_status_entry(nxt_status_entry_t *entry,
+    nxt_router_stats_t *stats, u_char *p, u_char *start);
 static void nxt_router_remove_pid_handler(nxt_task_t *task,
     nxt_port_recv_msg_t *msg);
 
@@ -186,6 +191,12 @@ static nxt_int_t nxt_router_engine_quit(nxt_router_temp_conf_t *tmcf,
     nxt_router_engine_conf_t *recf);
 static nxt_int_t nxt_router_engine_joints_delete(nxt_router_temp_conf_t *tmcf,
     nxt_router_engine_conf_t *recf, nxt_queue_t *sockets);
+#if (NXT_HAVE_CPU_AFFINITY)
+static nxt_int_t nxt_router_engines_affinity(nxt_task_t *task,
+    nxt_router_t *router, nxt_router_temp_conf_t *tmcf);
+static void nxt_router_thread_affinity(nxt_task_t *task, void *obj,
+    void *data);
+#endif
 
 static nxt_int_t nxt_router_threads_create(nxt_task_t *task, nxt_runtime_t *rt,
     nxt_router_temp_conf_t *tmcf);
@@ -268,6 +279,16 @@ static void nxt_router_get_mmap_handler(nxt_task_t *task,
 
 extern const nxt_http_request_state_t  nxt_http_websocket;
 
+#if (NXT_HAVE_CPU_AFFINITY)
+
+typedef struct {
+    nxt_joint_job_t     job;
+    nxt_cpu_affinity_t  affinity;
+} nxt_router_affinity_job_t;
+
+#endif
+
+
 nxt_router_t  *nxt_router;
 
 static const nxt_str_t http_prefix = nxt_string("HTTP_");
@@ -367,6 +388,9 @@ nxt_router_start(nxt_task_t *task, nxt_process_data_t *data)
     nxt_queue_init(&router->engines);
     nxt_queue_init(&router->sockets);
     nxt_queue_init(&router->apps);
+    nxt_queue_init(&router->listener_stats);
+    nxt_queue_init(&router->route_stats);
+    nxt_queue_init(&router->app_stats);
 
     nxt_router = router;
 
@@ -807,6 +831,7 @@ nxt_router_conf_data_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
     nxt_debug(task, "conf_data_handler(%uz): %*s", size, size, p);
 
     tmcf->router_conf->router = nxt_router;
+    tmcf->router_conf->generation = ++nxt_router->generation;
     tmcf->stream = msg->port_msg.stream;
     tmcf->port = port;
 
@@ -947,14 +972,21 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
 {
     u_char               *p;
     size_t               alloc;
+    uint32_t             mark;
     nxt_app_t            *app;
     nxt_buf_t            *b;
-    nxt_uint_t           type;
+    nxt_uint_t           i, type;
     nxt_port_t           *port;
     nxt_status_app_t     *app_stat;
+    nxt_socket_conf_t    *skcf;
+    nxt_router_conf_t    *rtcf;
+    nxt_router_stats_t   *stats;
     nxt_event_engine_t   *engine;
+    nxt_status_entry_t   *entry;
     nxt_status_report_t  *report;
 
+    static uint32_t      nxt_router_status_mark;
+
     port = nxt_runtime_port_find(task->thread->runtime,
                                  msg->port_msg.pid,
                                  msg->port_msg.reply_port);
@@ -963,6 +995,38 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
         return;
     }
 
+    /*
+     * Listener and route counters outlive configurations, so only those
+     * referenced by the current listeners and routes are marked for the report.
+     * The socket configurations can be released by other engines, hence
+     * the lock.
+     */
+
+    mark = ++nxt_router_status_mark;
+    rtcf = NULL;
+
+    nxt_thread_spin_lock(&nxt_router->lock);
+
+    nxt_queue_each(skcf, &nxt_router->sockets, nxt_socket_conf_t, link) {
+
+        skcf->stats->report = mark;
+        rtcf = skcf->router_conf;
+
+    } nxt_queue_loop;
+
+    if (rtcf != NULL && rtcf->routes != NULL) {
+        for (i = 0; /* void */; i++) {
+            stats = nxt_http_route_stats(rtcf->routes, i);
+            if (stats == NULL) {
+                break;
+            }
+
+            stats->report = mark;
+        }
+    }
+
+    nxt_thread_spin_unlock(&nxt_router->lock);
+
     alloc = sizeof(nxt_status_report_t);
 
     nxt_queue_each(app, &nxt_router->apps, nxt_app_t, link) {
@@ -971,6 +1035,23 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
 
     } nxt_queue_loop;
 
+    nxt_queue_each(stats, &nxt_router->listener_stats, nxt_router_stats_t,
+                   link)
+    {
+        if (stats->report == mark) {
+            alloc += sizeof(nxt_status_entry_t) + stats->name.length;
+        }
+
+    } nxt_queue_loop;
+
+    nxt_queue_each(stats, &nxt_router->route_stats, nxt_router_stats_t, link) {
+
+        if (stats->report == mark) {
+            alloc += sizeof(nxt_status_entry_t) + stats->name.length;
+        }
+
+    } nxt_queue_loop;
+
     b = nxt_buf_mem_alloc(port->mem_pool, alloc, 0);
     if (nxt_slow_path(b == NULL)) {
         type = NXT_PORT_MSG_RPC_ERROR;
@@ -989,8 +1070,31 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
         report->closed_conns += engine->closed_conns_cnt;
         report->requests += engine->requests_cnt;
 
+        report->keepalive_hits += engine->upstream_hits_cnt;
+        report->keepalive_misses += engine->upstream_misses_cnt;
+        report->keepalive_idle += engine->upstream_idle_cnt;
+
+        report->static_hits += engine->static_hits_cnt;
+        report->static_misses += engine->static_misses_cnt;
+        report->static_open += engine->static_cache_cnt
+                               - engine->static_negative_cnt;
+
+        report->cache_hits += engine->http_cache_hits_cnt;
+        report->cache_misses += engine->http_cache_misses_cnt;
+        report->cache_bytes += engine->http_cache_size;
+
+        report->route_memo_hits += engine->route_memo_hits_cnt;
+        report->route_memo_misses += engine->route_memo_misses_cnt;
+
+        report->tls_full += engine->tls_full_cnt;
+        report->tls_resumed += engine->tls_resumed_cnt;
+
     } nxt_queue_loop;
 
+#if (NXT_HAVE_OPENSSL)
+    report->tls_sessions = nxt_openssl_session_cache_count();
+#endif
+
     report->apps_count = 0;
     app_stat = report->apps;
     p = b->mem.end;
@@ -1008,10 +1112,52 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
         app_stat->processes = app->processes;
         app_stat->idle_processes = app->idle_processes;
 
+        app_stat->plain_messages = app->plain_messages;
+        app_stat->plain_bytes = app->plain_bytes;
+        app_stat->shm_messages = app->shm_messages;
+        app_stat->shm_bytes = app->shm_bytes;
+
+        app_stat->queue_time = app->queue_time;
+        app_stat->app_time = app->app_time;
+        app_stat->ipc_time = app->ipc_time;
+
+        nxt_memzero(&app_stat->counters, sizeof(nxt_status_counters_t));
+
+        for (i = 0; i < NXT_ROUTER_STATS_SLOTS; i++) {
+            nxt_status_counters_sum(&app_stat->counters, &app->stats->slots[i]);
+        }
+
         report->apps_count++;
         app_stat++;
     } nxt_queue_loop;
 
+    entry = (nxt_status_entry_t *) app_stat;
+
+    report->listeners = (nxt_status_entry_t *) ((u_char *) entry - b->mem.pos);
+    report->listeners_count = 0;
+
+    nxt_queue_each(stats, &nxt_router->listener_stats, nxt_router_stats_t,
+                   link)
+    {
+        if (stats->report == mark) {
+            p = nxt_router_status_entry(entry++, stats, p, b->mem.pos);
+            report->listeners_count++;
+        }
+
+    } nxt_queue_loop;
+
+    report->routes = (nxt_status_entry_t *) ((u_char *) entry - b->mem.pos);
+    report->routes_count = 0;
+
+    nxt_queue_each(stats, &nxt_router->route_stats, nxt_router_stats_t, link) {
+
+        if (stats->report == mark) {
+            p = nxt_router_status_entry(entry++, stats, p, b->mem.pos);
+            report->routes_count++;
+        }
+
+    } nxt_queue_loop;
+
     type = NXT_PORT_MSG_RPC_READY_LAST;
 
 fail:
@@ -1020,6 +1166,57 @@ nxt_router_status_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg)
 }
 
 
+static u_char *
+nxt_router_status_entry(nxt_status_entry_t *entry, nxt_router_stats_t *stats,
+    u_char *p, u_char *start)
+{
+    nxt_uint_t  i;
+
+    p -= stats->name.length;
+
+    nxt_memcpy(p, stats->name.start, stats->name.length);
+
+    entry->name.length = stats->name.length;
+    entry->name.start = (u_char *) (p - start);
+
+    nxt_memzero(&entry->counters, sizeof(nxt_status_counters_t));
+
+    for (i = 0; i < NXT_ROUTER_STATS_SLOTS; i++) {
+        nxt_status_counters_sum(&entry->counters, &stats->slots[i]);
+    }
+
+    return p;
+}
+
+
+nxt_router_stats_t *
+nxt_router_stats(nxt_queue_t *stats, nxt_str_t *name)
+{
+    nxt_router_stats_t  *st;
+
+    nxt_queue_each(st, stats, nxt_router_stats_t, link) {
+
+        if (nxt_strstr_eq(&st->name, name)) {
+            return st;
+        }
+
+    } nxt_queue_loop;
+
+    st = nxt_zalloc(sizeof(nxt_router_stats_t) + name->length);
+    if (nxt_slow_path(st == NULL)) {
+        return NULL;
+    }
+
+    st->name.length = name->length;
+    st->name.start = nxt_pointer_to(st, sizeof(nxt_router_stats_t));
+    nxt_memcpy(st->name.start, name->start, name->length);
+
+    nxt_queue_insert_tail(stats, &st->link);
+
+    return st;
+}
+
+
 static void
 nxt_router_app_process_remove_pid(nxt_task_t *task, nxt_port_t *port,
     void *data)
@@ -1566,6 +1763,12 @@ static nxt_conf_map_t  nxt_router_http_conf[] = {
         offsetof(nxt_socket_conf_t, log_route),
     },
 
+    {
+        nxt_string("route_memo"),
+        NXT_CONF_MAP_INT8,
+        offsetof(nxt_socket_conf_t, route_memo),
+    },
+
     {
         nxt_string("server_version"),
         NXT_CONF_MAP_INT8,
@@ -1596,6 +1799,21 @@ static nxt_conf_map_t  nxt_router_websocket_conf[] = {
 };
 
 
+static nxt_conf_map_t  nxt_router_http2_conf[] = {
+    {
+        nxt_string("max_concurrent_streams"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_http2_conf_t, max_concurrent_streams),
+    },
+
+    {
+        nxt_string("initial_window_size"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_http2_conf_t, initial_window_size),
+    },
+};
+
+
 static nxt_int_t
 nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     u_char *start, u_char *end)
@@ -1620,6 +1838,7 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_conf_value_t            *js_module;
 #endif
     nxt_conf_value_t            *root, *conf, *http, *value, *websocket;
+    nxt_conf_value_t            *http2;
     nxt_conf_value_t            *applications, *application;
     nxt_conf_value_t            *listeners, *listener;
     nxt_socket_conf_t           *skcf;
@@ -1641,14 +1860,23 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     static nxt_str_t  conf_cache_path = nxt_string("/tls/session/cache_size");
     static nxt_str_t  conf_timeout_path = nxt_string("/tls/session/timeout");
     static nxt_str_t  conf_tickets = nxt_string("/tls/session/tickets");
+    static nxt_str_t  conf_shared = nxt_string("/tls/session/shared");
+    static nxt_str_t  conf_ktls = nxt_string("/tls/ktls");
+    static nxt_str_t  conf_ocsp = nxt_string("/tls/ocsp");
 #endif
 #if (NXT_HAVE_NJS)
     static nxt_str_t  js_module_path = nxt_string("/settings/js_module");
 #endif
     static nxt_str_t  static_path = nxt_string("/settings/http/static");
     static nxt_str_t  websocket_path = nxt_string("/settings/http/websocket");
+    static nxt_str_t  http2_path = nxt_string("/settings/http/http2");
+    static nxt_str_t  http2_enable_path = nxt_string("/http2");
+    static nxt_str_t  compress_path = nxt_string("/settings/http/compression");
     static nxt_str_t  forwarded_path = nxt_string("/forwarded");
     static nxt_str_t  client_ip_path = nxt_string("/client_ip");
+#if (NXT_HAVE_CPU_AFFINITY)
+    static nxt_str_t  cpu_affinity_path = nxt_string("/settings/cpu_affinity");
+#endif
 
     root = nxt_conf_json_parse(tmcf->mem_pool, start, end, NULL);
     if (root == NULL) {
@@ -1670,6 +1898,10 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         rtcf->threads = nxt_ncpu;
     }
 
+#if (NXT_HAVE_CPU_AFFINITY)
+    tmcf->cpu_affinity = nxt_conf_get_path(root, &cpu_affinity_path);
+#endif
+
     conf = nxt_conf_get_path(root, &static_path);
 
     ret = nxt_router_conf_process_static(task, rtcf, conf);
@@ -1677,6 +1909,15 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         return NXT_ERROR;
     }
 
+    conf = nxt_conf_get_path(root, &compress_path);
+
+    if (conf != NULL) {
+        rtcf->compression = nxt_http_compression_init(task, mp, conf);
+        if (nxt_slow_path(rtcf->compression == NULL)) {
+            return NXT_ERROR;
+        }
+    }
+
     router = rtcf->router;
 
     applications = nxt_conf_get_path(root, &applications_path);
@@ -1853,6 +2094,11 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
             app->targets = targets;
 
+            app->stats = nxt_router_stats(&router->app_stats, &name);
+            if (nxt_slow_path(app->stats == NULL)) {
+                goto app_fail;
+            }
+
             engine = task->thread->engine;
 
             app->engine = engine;
@@ -1938,6 +2184,7 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 #endif
 
     websocket = nxt_conf_get_path(root, &websocket_path);
+    http2 = nxt_conf_get_path(root, &http2_path);
 
     listeners = nxt_conf_get_path(root, &listeners_path);
 
@@ -1991,6 +2238,9 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
             skcf->websocket_conf.read_timeout = 60 * 1000;
             skcf->websocket_conf.keepalive_interval = 30 * 1000;
 
+            skcf->http2_conf.max_concurrent_streams = 128;
+            skcf->http2_conf.initial_window_size = 65535;
+
             nxt_str_null(&skcf->body_temp_path);
 
             if (http != NULL) {
@@ -2014,6 +2264,21 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
                 }
             }
 
+            if (http2 != NULL) {
+                ret = nxt_conf_map_object(mp, http2, nxt_router_http2_conf,
+                                          nxt_nitems(nxt_router_http2_conf),
+                                          &skcf->http2_conf);
+                if (ret != NXT_OK) {
+                    nxt_alert(task, "http2 map error");
+                    goto fail;
+                }
+            }
+
+            value = nxt_conf_get_path(listener, &http2_enable_path);
+            if (value != NULL) {
+                skcf->http2 = nxt_conf_get_boolean(value);
+            }
+
             t = &skcf->body_temp_path;
 
             if (t->length == 0) {
@@ -2050,6 +2315,10 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
                 tls_init->cache_size = 0;
                 tls_init->timeout = 300;
+                tls_init->shared_cache = 0;
+                tls_init->ktls = 0;
+                tls_init->http2 = skcf->http2;
+                tls_init->name = name;
 
                 value = nxt_conf_get_path(listener, &conf_cache_path);
                 if (value != NULL) {
@@ -2061,12 +2330,24 @@ nxt_router_conf_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
                     tls_init->timeout = nxt_conf_get_number(value);
                 }
 
+                value = nxt_conf_get_path(listener, &conf_shared);
+                if (value != NULL) {
+                    tls_init->shared_cache = nxt_conf_get_boolean(value);
+                }
+
                 tls_init->conf_cmds = nxt_conf_get_path(listener,
                                                         &conf_commands_path);
 
                 tls_init->tickets_conf = nxt_conf_get_path(listener,
                                                            &conf_tickets);
 
+                tls_init->ocsp_conf = nxt_conf_get_path(listener, &conf_ocsp);
+
+                value = nxt_conf_get_path(listener, &conf_ktls);
+                if (value != NULL) {
+                    tls_init->ktls = nxt_conf_get_boolean(value);
+                }
+
                 n = nxt_conf_array_elements_count_or_1(certificate);
 
                 for (i = 0; i < n; i++) {
@@ -2699,6 +2980,12 @@ nxt_router_socket_conf(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         return NULL;
     }
 
+    skcf->stats = nxt_router_stats(&tmcf->router_conf->router->listener_stats,
+                                   name);
+    if (nxt_slow_path(skcf->stats == NULL)) {
+        return NULL;
+    }
+
     size = nxt_sockaddr_size(sa);
 
     ret = nxt_router_listen_socket_find(tmcf, skcf, sa);
@@ -3249,6 +3536,9 @@ nxt_router_engines_create(nxt_task_t *task, nxt_router_t *router,
             return NXT_ERROR;
         }
 
+        /* The engine id selects the slot for status counters. */
+        recf->engine->id = task->thread->runtime->last_engine_id++;
+
         ret = nxt_router_engine_conf_create(tmcf, recf);
         if (nxt_slow_path(ret != NXT_OK)) {
             return ret;
@@ -3257,7 +3547,11 @@ nxt_router_engines_create(nxt_task_t *task, nxt_router_t *router,
         n++;
     }
 
+#if (NXT_HAVE_CPU_AFFINITY)
+    return nxt_router_engines_affinity(task, router, tmcf);
+#else
     return NXT_OK;
+#endif
 }
 
 
@@ -3445,6 +3739,100 @@ nxt_router_engine_joints_delete(nxt_router_temp_conf_t *tmcf,
 }
 
 
+#if (NXT_HAVE_CPU_AFFINITY)
+
+static nxt_int_t
+nxt_router_engines_affinity(nxt_task_t *task, nxt_router_t *router,
+    nxt_router_temp_conf_t *tmcf)
+{
+    nxt_uint_t                 n;
+    nxt_array_t                *sets;
+    nxt_cpu_affinity_t         *aff;
+    nxt_router_engine_conf_t   *recf;
+    nxt_router_affinity_job_t  *ajob;
+
+    if (tmcf->cpu_affinity == NULL && !router->cpu_affinity) {
+        return NXT_OK;
+    }
+
+    if (!router->cpu_affinity) {
+        if (sched_getaffinity(0, sizeof(cpu_set_t), &router->cpu_set) != 0) {
+            nxt_alert(task, "sched_getaffinity() failed %E", nxt_errno);
+            return NXT_ERROR;
+        }
+
+        router->cpu_affinity = 1;
+    }
+
+    if (tmcf->cpu_affinity != NULL) {
+        sets = nxt_cpu_affinity_sets(tmcf->mem_pool, tmcf->cpu_affinity);
+        if (nxt_slow_path(sets == NULL)) {
+            nxt_alert(task, "failed to resolve router threads CPU affinity");
+            return NXT_ERROR;
+        }
+
+    } else {
+        /* The setting has been removed, restore the original CPU set. */
+        sets = NULL;
+    }
+
+    recf = tmcf->engines->elts;
+
+    for (n = 0; n < tmcf->engines->nelts; n++, recf++) {
+
+        if (recf->action == NXT_ROUTER_ENGINE_DELETE) {
+            continue;
+        }
+
+        ajob = nxt_mp_alloc(tmcf->mem_pool, sizeof(nxt_router_affinity_job_t));
+        if (nxt_slow_path(ajob == NULL)) {
+            return NXT_ERROR;
+        }
+
+        if (sets != NULL) {
+            aff = sets->elts;
+            ajob->affinity = aff[n % sets->nelts];
+
+        } else {
+            ajob->affinity.cpus = router->cpu_set;
+            ajob->affinity.node = -1;
+        }
+
+        ajob->job.work.next = recf->jobs;
+        recf->jobs = &ajob->job.work;
+
+        ajob->job.task = tmcf->engine->task;
+        ajob->job.work.handler = nxt_router_thread_affinity;
+        ajob->job.work.task = &ajob->job.task;
+        ajob->job.work.obj = &ajob->job;
+        ajob->job.work.data = &ajob->affinity;
+        ajob->job.tmcf = tmcf;
+
+        tmcf->count++;
+    }
+
+    return NXT_OK;
+}
+
+
+static void
+nxt_router_thread_affinity(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_joint_job_t  *job;
+
+    job = obj;
+
+    (void) nxt_cpu_affinity_set(task, data);
+
+    job->work.next = NULL;
+    job->work.handler = nxt_router_conf_wait;
+
+    nxt_event_engine_post(job->tmcf->engine, &job->work);
+}
+
+#endif
+
+
 static nxt_int_t
 nxt_router_threads_create(nxt_task_t *task, nxt_runtime_t *rt,
     nxt_router_temp_conf_t *tmcf)
@@ -3805,6 +4193,11 @@ nxt_router_worker_thread_quit(nxt_task_t *task, void *obj, void *data)
 
     engine->shutdown = 1;
 
+    nxt_h1p_peer_pools_close(task);
+    nxt_http_static_cache_close(task);
+    nxt_http_cache_close(task);
+    nxt_router_access_log_flush(task);
+
     if (nxt_queue_is_empty(&engine->joints)) {
         nxt_thread_exit(task->thread);
     }
@@ -4048,6 +4441,7 @@ nxt_router_response_ready_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg,
     nxt_buf_t               *b, *next;
     nxt_port_t              *app_port;
     nxt_unit_field_t        *f;
+    nxt_nsec_t              now;
     nxt_http_field_t        *field;
     nxt_http_request_t      *r;
     nxt_unit_response_t     *resp;
@@ -4068,17 +4462,51 @@ nxt_router_response_ready_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg,
     app = req_rpc_data->app;
     nxt_assert(app != NULL);
 
+    now = nxt_precise_time();
+
     if (msg->port_msg.type == _NXT_PORT_MSG_REQ_HEADERS_ACK) {
+        r->app_ack_time = now;
+
+        nxt_status_histogram_add(&app->queue_time,
+                                 (now - r->app_send_time) / 1000);
+
         nxt_router_req_headers_ack_handler(task, msg, req_rpc_data);
 
         return;
     }
 
+    if (msg->size != 0) {
+        if (msg->port_msg.mmap) {
+            nxt_atomic_fetch_add(&app->shm_messages, 1);
+            nxt_atomic_fetch_add(&app->shm_bytes, msg->size);
+
+        } else {
+            nxt_atomic_fetch_add(&app->plain_messages, 1);
+            nxt_atomic_fetch_add(&app->plain_bytes, msg->size);
+        }
+    }
+
+    if (r->app_resp_time == 0) {
+        if (r->app_ack_time == 0) {
+            r->app_ack_time = r->app_send_time;
+        }
+
+        r->app_resp_time = now;
+
+        nxt_status_histogram_add(&app->app_time,
+                                 (now - r->app_ack_time) / 1000);
+    }
+
     b = (msg->size == 0) ? NULL : msg->buf;
 
     if (msg->port_msg.last != 0) {
         nxt_debug(task, "router data create last buf");
 
+        r->app_done_time = now;
+
+        nxt_status_histogram_add(&app->ipc_time,
+                                 (now - r->app_resp_time) / 1000);
+
         nxt_buf_chain_add(&b, nxt_http_buf_last(r));
 
         req_rpc_data->rpc_cancel = 0;
@@ -4189,6 +4617,16 @@ nxt_router_response_ready_handler(nxt_task_t *task, nxt_port_recv_msg_t *msg,
             nxt_buf_chain_add(&r->out, b);
         }
 
+        ret = nxt_http_cache_store_init(task, r);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            goto fail;
+        }
+
+        ret = nxt_http_compress_init(task, r);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            goto fail;
+        }
+
         nxt_http_request_header_send(task, r, nxt_http_request_send_body, NULL);
 
         if (r->websocket_handshake
@@ -5149,6 +5587,7 @@ nxt_router_process_http_request(nxt_task_t *task, nxt_http_request_t *r,
     engine = task->thread->engine;
 
     r->app_target = conf->target;
+    r->app_stats = conf->app->stats;
 
     req_rpc_data = nxt_port_rpc_register_handler_ex(task, engine->port,
                                           nxt_router_response_ready_handler,
@@ -5323,6 +5762,8 @@ nxt_router_app_prepare_request(nxt_task_t *task,
         buf->is_port_mmap_sent = 1;
         buf->mem.pos = buf->mem.free;
 
+        req_rpc_data->request->app_send_time = nxt_precise_time();
+
     } else {
         nxt_alert(task, "stream #%uD, app '%V': failed to send app message",
                   req_rpc_data->stream, &app->name);
@@ -14,6 +14,7 @@
 
 typedef struct nxt_http_request_s  nxt_http_request_t;
 #include <nxt_application.h>
+#include <nxt_status.h>
 
 
 typedef struct nxt_http_action_s        nxt_http_action_t;
@@ -22,11 +23,31 @@ typedef struct nxt_http_forward_s       nxt_http_forward_t;
 typedef struct nxt_upstream_s           nxt_upstream_t;
 typedef struct nxt_upstreams_s          nxt_upstreams_t;
 typedef struct nxt_router_access_log_s  nxt_router_access_log_t;
+typedef struct nxt_router_log_format_s  nxt_router_log_format_t;
+typedef struct nxt_http_compression_s   nxt_http_compression_t;
 
 
 #define NXT_HTTP_ACTION_ERROR  ((nxt_http_action_t *) -1)
 
 
+/*
+ * Status counters of listeners, routes, and applications are kept by name
+ * for the router life time, so they are not reset on reconfiguration.
+ * Engines update the slots selected by their ids to avoid contention,
+ * and the slots are summed up on demand.
+ */
+
+#define NXT_ROUTER_STATS_SLOTS  16
+
+
+typedef struct {
+    nxt_queue_link_t         link;
+    nxt_str_t                name;
+    uint32_t                 report;
+    nxt_status_counters_t    slots[NXT_ROUTER_STATS_SLOTS];
+} nxt_router_stats_t;
+
+
 typedef struct {
     nxt_thread_spinlock_t    lock;
     nxt_queue_t              engines;
@@ -34,13 +55,27 @@ typedef struct {
     nxt_queue_t              sockets;  /* of nxt_socket_conf_t */
     nxt_queue_t              apps;     /* of nxt_app_t */
 
+    nxt_queue_t              listener_stats;  /* of nxt_router_stats_t */
+    nxt_queue_t              route_stats;     /* of nxt_router_stats_t */
+    nxt_queue_t              app_stats;       /* of nxt_router_stats_t */
+
     nxt_router_access_log_t  *access_log;
+
+    /* Incremented for each new router configuration. */
+    uint32_t                 generation;
+
+#if (NXT_HAVE_CPU_AFFINITY)
+    /* CPU set the router process has been started with. */
+    cpu_set_t                cpu_set;
+    uint8_t                  cpu_affinity;  /* 1 bit */
+#endif
 } nxt_router_t;
 
 
 typedef struct {
     uint32_t                 count;
     uint32_t                 threads;
+    uint32_t                 generation;
 
     nxt_mp_t                 *mem_pool;
     nxt_tstr_state_t         *tstr_state;
@@ -52,8 +87,16 @@ typedef struct {
     nxt_lvlhsh_t             mtypes_hash;
     nxt_lvlhsh_t             apps_hash;
 
+    nxt_http_compression_t   *compression;
+
     nxt_router_access_log_t  *access_log;
-    nxt_tstr_t               *log_format;
+    nxt_router_log_format_t  *log_format;
+    nxt_tstr_t               *log_cond;
+    uint32_t                 log_sample[5];  /* Per status class. */
+    size_t                   log_buffer;
+    nxt_msec_t               log_flush;
+    uint8_t                  log_gzip;
+    uint8_t                  log_negate;  /* 1 bit */
 } nxt_router_conf_t;
 
 
@@ -90,6 +133,10 @@ typedef struct {
     nxt_array_t            *engines;
     nxt_router_conf_t      *router_conf;
     nxt_mp_t               *mem_pool;
+
+#if (NXT_HAVE_CPU_AFFINITY)
+    nxt_conf_value_t       *cpu_affinity;
+#endif
 } nxt_router_temp_conf_t;
 
 
@@ -149,6 +196,18 @@ struct nxt_app_s {
     nxt_atomic_t           use_count;
     nxt_queue_t            ack_waiting_req; /* of nxt_http_request_t.app_link */
 
+    /* Response data received from application processes. */
+    nxt_atomic_t           plain_messages;
+    nxt_atomic_t           plain_bytes;
+    nxt_atomic_t           shm_messages;
+    nxt_atomic_t           shm_bytes;
+
+    nxt_status_histogram_t queue_time;
+    nxt_status_histogram_t app_time;
+    nxt_status_histogram_t ipc_time;
+
+    nxt_router_stats_t     *stats;
+
     nxt_app_joint_t        *joint;
     nxt_port_t             *shared_port;
     nxt_port_t             *proto_port;
@@ -164,6 +223,12 @@ typedef struct {
 } nxt_websocket_conf_t;
 
 
+typedef struct {
+    uint32_t               max_concurrent_streams;
+    uint32_t               initial_window_size;
+} nxt_http2_conf_t;
+
+
 typedef struct {
     uint32_t               count;
     nxt_queue_link_t       link;
@@ -180,6 +245,8 @@ typedef struct {
 
     nxt_listen_socket_t    *listen;
 
+    nxt_router_stats_t     *stats;
+
     size_t                 header_buffer_size;
     size_t                 large_header_buffer_size;
     size_t                 large_header_buffers;
@@ -198,15 +265,20 @@ typedef struct {
     nxt_msec_t             proxy_read_timeout;
 
     nxt_websocket_conf_t   websocket_conf;
+    nxt_http2_conf_t       http2_conf;
 
     nxt_str_t              body_temp_path;
 
     uint8_t                log_route;  /* 1 bit */
 
+    uint8_t                route_memo;  /* 1 bit */
+
     uint8_t                discard_unsafe_fields;  /* 1 bit */
 
     uint8_t                server_version;         /* 1 bit */
 
+    uint8_t                http2;                  /* 1 bit */
+
     nxt_http_forward_t     *forwarded;
     nxt_http_forward_t     *client_ip;
 
@@ -233,7 +305,7 @@ typedef struct {
 struct nxt_router_access_log_s {
     void                   (*handler)(nxt_task_t *task, nxt_http_request_t *r,
                                       nxt_router_access_log_t *access_log,
-                                      nxt_tstr_t *format);
+                                      nxt_router_log_format_t *format);
     nxt_fd_t               fd;
     nxt_str_t              path;
     uint32_t               count;
@@ -261,6 +333,9 @@ void nxt_router_access_log_release(nxt_task_t *task,
     nxt_thread_spinlock_t *lock, nxt_router_access_log_t *access_log);
 void nxt_router_access_log_reopen_handler(nxt_task_t *task,
     nxt_port_recv_msg_t *msg);
+void nxt_router_access_log_flush(nxt_task_t *task);
+
+nxt_router_stats_t *nxt_router_stats(nxt_queue_t *stats, nxt_str_t *name);
 
 
 extern nxt_router_t  *nxt_router;
@@ -9,26 +9,75 @@
 #include <nxt_conf.h>
 #include <nxt_http.h>
 
+#if (NXT_HAVE_ZLIB)
+#include <zlib.h>
+#endif
+
+
+#define NXT_ROUTER_ACCESS_LOG_BUFFER  (64 * 1024)
+#define NXT_ROUTER_ACCESS_LOG_ALL     0xffffffff
+
 
 typedef struct {
     nxt_str_t                 path;
     nxt_str_t                 format;
+    nxt_str_t                 cond;
+    size_t                    buffer;
+    nxt_msec_t                flush;
+    int32_t                   gzip;
 } nxt_router_access_log_conf_t;
 
 
+typedef struct {
+    /* The escaped name with punctuation: {"name":" or ","name":". */
+    nxt_str_t                 name;
+    nxt_tstr_t                *value;
+} nxt_router_log_field_t;
+
+
+struct nxt_router_log_format_s {
+    nxt_tstr_t                *tstr;
+
+    nxt_uint_t                nfields;
+    nxt_router_log_field_t    *fields;
+};
+
+
 typedef struct {
     nxt_str_t                 text;
+    nxt_str_t                 *values;
     nxt_router_access_log_t   *access_log;
+    nxt_router_log_format_t   *format;
 } nxt_router_access_log_ctx_t;
 
 
+static nxt_int_t nxt_router_access_log_json_create(nxt_router_conf_t *rtcf,
+    nxt_router_log_format_t *format, nxt_conf_value_t *value);
 static void nxt_router_access_log_writer(nxt_task_t *task,
     nxt_http_request_t *r, nxt_router_access_log_t *access_log,
-    nxt_tstr_t *format);
+    nxt_router_log_format_t *format);
+static uint32_t nxt_router_access_log_rate(nxt_conf_value_t *value);
+static nxt_bool_t nxt_router_access_log_test(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_router_conf_t *rtcf);
+static nxt_bool_t nxt_router_access_log_sample(nxt_task_t *task,
+    nxt_http_request_t *r, nxt_router_conf_t *rtcf);
+static void nxt_router_access_log_json_ready(nxt_task_t *task, void *obj,
+    void *data);
 static void nxt_router_access_log_write_ready(nxt_task_t *task, void *obj,
     void *data);
 static void nxt_router_access_log_write_error(nxt_task_t *task, void *obj,
     void *data);
+static void nxt_router_access_log_buffer(nxt_task_t *task,
+    nxt_router_conf_t *rtcf, nxt_router_access_log_t *access_log,
+    nxt_str_t *text);
+static void nxt_router_access_log_buffer_write(nxt_task_t *task,
+    nxt_event_engine_t *engine);
+#if (NXT_HAVE_ZLIB)
+static nxt_int_t nxt_router_access_log_gzip_write(nxt_task_t *task,
+    nxt_fd_t fd, int level, u_char *start, size_t length);
+#endif
+static void nxt_router_access_log_flush_handler(nxt_task_t *task, void *obj,
+    void *data);
 static void nxt_router_access_log_ready(nxt_task_t *task,
     nxt_port_recv_msg_t *msg, void *data);
 static void nxt_router_access_log_error(nxt_task_t *task,
@@ -53,6 +102,30 @@ static nxt_conf_map_t  nxt_router_access_log_conf[] = {
         NXT_CONF_MAP_STR,
         offsetof(nxt_router_access_log_conf_t, format),
     },
+
+    {
+        nxt_string("if"),
+        NXT_CONF_MAP_STR,
+        offsetof(nxt_router_access_log_conf_t, cond),
+    },
+
+    {
+        nxt_string("buffer"),
+        NXT_CONF_MAP_SIZE,
+        offsetof(nxt_router_access_log_conf_t, buffer),
+    },
+
+    {
+        nxt_string("flush"),
+        NXT_CONF_MAP_MSEC,
+        offsetof(nxt_router_access_log_conf_t, flush),
+    },
+
+    {
+        nxt_string("gzip"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_router_access_log_conf_t, gzip),
+    },
 };
 
 
@@ -63,21 +136,47 @@ nxt_router_access_log_create(nxt_task_t *task, nxt_router_conf_t *rtcf,
     u_char                        *p;
     nxt_int_t                     ret;
     nxt_str_t                     str;
-    nxt_tstr_t                    *format;
+    nxt_uint_t                    i;
     nxt_router_t                  *router;
+    nxt_conf_value_t              *fields, *sample, *rate;
+    nxt_router_log_format_t       *format;
     nxt_router_access_log_t       *access_log;
     nxt_router_access_log_conf_t  alcf;
 
+    static nxt_str_t  format_str = nxt_string("format");
+    static nxt_str_t  sample_str = nxt_string("sample");
+    static nxt_str_t  status_class[] = {
+        nxt_string("1xx"),
+        nxt_string("2xx"),
+        nxt_string("3xx"),
+        nxt_string("4xx"),
+        nxt_string("5xx"),
+    };
     static nxt_str_t  log_format_str = nxt_string("$remote_addr - - "
         "[$time_local] \"$request_line\" $status $body_bytes_sent "
         "\"$header_referer\" \"$header_user_agent\"");
 
     alcf.format = log_format_str;
+    alcf.cond.length = 0;
+    alcf.buffer = 0;
+    alcf.flush = 1000;
+    alcf.gzip = 0;
+
+    fields = NULL;
+    sample = NULL;
 
     if (nxt_conf_type(value) == NXT_CONF_STRING) {
         nxt_conf_get_string(value, &alcf.path);
 
     } else {
+        fields = nxt_conf_get_object_member(value, &format_str, NULL);
+
+        if (fields != NULL && nxt_conf_type(fields) != NXT_CONF_OBJECT) {
+            fields = NULL;
+        }
+
+        sample = nxt_conf_get_object_member(value, &sample_str, NULL);
+
         ret = nxt_conf_map_object(rtcf->mem_pool, value,
                                   nxt_router_access_log_conf,
                                   nxt_nitems(nxt_router_access_log_conf),
@@ -114,24 +213,146 @@ nxt_router_access_log_create(nxt_task_t *task, nxt_router_conf_t *rtcf,
         nxt_memcpy(access_log->path.start, alcf.path.start, alcf.path.length);
     }
 
-    str.length = alcf.format.length + 1;
-
-    str.start = nxt_malloc(str.length);
-    if (str.start == NULL) {
-        nxt_alert(task, "failed to allocate log format structure");
+    format = nxt_mp_zget(rtcf->mem_pool, sizeof(nxt_router_log_format_t));
+    if (nxt_slow_path(format == NULL)) {
         return NXT_ERROR;
     }
 
-    p = nxt_cpymem(str.start, alcf.format.start, alcf.format.length);
-    *p = '\n';
+    if (fields != NULL) {
+        ret = nxt_router_access_log_json_create(rtcf, format, fields);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
 
-    format = nxt_tstr_compile(rtcf->tstr_state, &str, NXT_TSTR_LOGGING);
-    if (nxt_slow_path(format == NULL)) {
-        return NXT_ERROR;
+    } else {
+        str.length = alcf.format.length + 1;
+
+        str.start = nxt_malloc(str.length);
+        if (str.start == NULL) {
+            nxt_alert(task, "failed to allocate log format structure");
+            return NXT_ERROR;
+        }
+
+        p = nxt_cpymem(str.start, alcf.format.start, alcf.format.length);
+        *p = '\n';
+
+        format->tstr = nxt_tstr_compile(rtcf->tstr_state, &str,
+                                        NXT_TSTR_LOGGING);
+        if (nxt_slow_path(format->tstr == NULL)) {
+            return NXT_ERROR;
+        }
+    }
+
+    if (alcf.cond.length != 0) {
+
+        if (alcf.cond.start[0] == '!') {
+            rtcf->log_negate = 1;
+
+            alcf.cond.start++;
+            alcf.cond.length--;
+        }
+
+        rtcf->log_cond = nxt_tstr_compile(rtcf->tstr_state, &alcf.cond, 0);
+        if (nxt_slow_path(rtcf->log_cond == NULL)) {
+            return NXT_ERROR;
+        }
+    }
+
+    for (i = 0; i < nxt_nitems(rtcf->log_sample); i++) {
+        rtcf->log_sample[i] = NXT_ROUTER_ACCESS_LOG_ALL;
+
+        if (sample == NULL) {
+            continue;
+        }
+
+        if (nxt_conf_type(sample) != NXT_CONF_OBJECT) {
+            rtcf->log_sample[i] = nxt_router_access_log_rate(sample);
+            continue;
+        }
+
+        rate = nxt_conf_get_object_member(sample, &status_class[i], NULL);
+
+        if (rate != NULL) {
+            rtcf->log_sample[i] = nxt_router_access_log_rate(rate);
+        }
+    }
+
+    if (alcf.gzip != 0 && alcf.buffer == 0) {
+        alcf.buffer = NXT_ROUTER_ACCESS_LOG_BUFFER;
     }
 
     rtcf->access_log = access_log;
     rtcf->log_format = format;
+    rtcf->log_buffer = alcf.buffer;
+    rtcf->log_flush = alcf.flush;
+    rtcf->log_gzip = alcf.gzip;
+
+    return NXT_OK;
+}
+
+
+/*
+ * A JSON format is compiled once into a vector of fields, each holding
+ * the escaped name with the surrounding punctuation and the value template.
+ * Values are escaped as they are copied into the log line.
+ */
+
+static nxt_int_t
+nxt_router_access_log_json_create(nxt_router_conf_t *rtcf,
+    nxt_router_log_format_t *format, nxt_conf_value_t *value)
+{
+    u_char                  *p;
+    uint32_t                next;
+    nxt_str_t               name, str;
+    nxt_uint_t              i, n;
+    nxt_conf_value_t        *field;
+    nxt_router_log_field_t  *fields;
+
+    n = nxt_conf_object_members_count(value);
+
+    fields = nxt_mp_get(rtcf->mem_pool, n * sizeof(nxt_router_log_field_t));
+    if (nxt_slow_path(fields == NULL)) {
+        return NXT_ERROR;
+    }
+
+    next = 0;
+
+    for (i = 0; i < n; i++) {
+        field = nxt_conf_next_object_member(value, &name, &next);
+
+        p = nxt_mp_nget(rtcf->mem_pool,
+                        nxt_conf_json_escape_length(name.start, name.length)
+                        + nxt_length("\",\"\":\""));
+        if (nxt_slow_path(p == NULL)) {
+            return NXT_ERROR;
+        }
+
+        fields[i].name.start = p;
+
+        if (i == 0) {
+            *p++ = '{';
+
+        } else {
+            *p++ = '"'; *p++ = ',';
+        }
+
+        *p++ = '"';
+        p = nxt_conf_json_escape(p, name.start, name.length);
+        *p++ = '"'; *p++ = ':'; *p++ = '"';
+
+        fields[i].name.length = p - fields[i].name.start;
+
+        nxt_conf_get_string(field, &str);
+
+        fields[i].value = nxt_tstr_compile(rtcf->tstr_state, &str,
+                                           NXT_TSTR_LOGGING);
+        if (nxt_slow_path(fields[i].value == NULL)) {
+            return NXT_ERROR;
+        }
+    }
+
+    format->nfields = n;
+    format->fields = fields;
 
     return NXT_OK;
 }
@@ -139,51 +360,213 @@ nxt_router_access_log_create(nxt_task_t *task, nxt_router_conf_t *rtcf,
 
 static void
 nxt_router_access_log_writer(nxt_task_t *task, nxt_http_request_t *r,
-    nxt_router_access_log_t *access_log, nxt_tstr_t *format)
+    nxt_router_access_log_t *access_log, nxt_router_log_format_t *format)
 {
     nxt_int_t                    ret;
+    nxt_uint_t                   i;
     nxt_router_conf_t            *rtcf;
     nxt_router_access_log_ctx_t  *ctx;
 
+    rtcf = r->conf->socket_conf->router_conf;
+
+    if (!nxt_router_access_log_test(task, r, rtcf)) {
+        nxt_http_request_close_handler(task, r, r->proto.any);
+        return;
+    }
+
     ctx = nxt_mp_get(r->mem_pool, sizeof(nxt_router_access_log_ctx_t));
     if (nxt_slow_path(ctx == NULL)) {
         return;
     }
 
     ctx->access_log = access_log;
+    ctx->format = format;
 
-    if (nxt_tstr_is_const(format)) {
-        nxt_tstr_str(format, &ctx->text);
+    if (format->tstr != NULL && nxt_tstr_is_const(format->tstr)) {
+        nxt_tstr_str(format->tstr, &ctx->text);
 
         nxt_router_access_log_write_ready(task, r, ctx);
 
-    } else {
-        rtcf = r->conf->socket_conf->router_conf;
+        return;
+    }
 
+    ret = nxt_tstr_query_init(&r->tstr_query, rtcf->tstr_state,
+                              &r->tstr_cache, r, r->mem_pool);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        return;
+    }
+
+    if (format->tstr != NULL) {
+        nxt_tstr_query(task, r->tstr_query, format->tstr, &ctx->text);
+        nxt_tstr_query_resolve(task, r->tstr_query, ctx,
+                               nxt_router_access_log_write_ready,
+                               nxt_router_access_log_write_error);
+        return;
+    }
+
+    ctx->values = nxt_mp_get(r->mem_pool, format->nfields * sizeof(nxt_str_t));
+    if (nxt_slow_path(ctx->values == NULL)) {
+        return;
+    }
+
+    for (i = 0; i < format->nfields; i++) {
+        nxt_tstr_query(task, r->tstr_query, format->fields[i].value,
+                       &ctx->values[i]);
+    }
+
+    nxt_tstr_query_resolve(task, r->tstr_query, ctx,
+                           nxt_router_access_log_json_ready,
+                           nxt_router_access_log_write_error);
+}
+
+
+static uint32_t
+nxt_router_access_log_rate(nxt_conf_value_t *value)
+{
+    double  rate;
+
+    rate = nxt_conf_get_number(value);
+
+    return (rate < 1) ? rate * NXT_ROUTER_ACCESS_LOG_ALL
+                      : NXT_ROUTER_ACCESS_LOG_ALL;
+}
+
+
+/*
+ * The "if" condition and sampling are checked before the log line
+ * is formatted, so skipped requests cost no formatting work.
+ */
+
+static nxt_bool_t
+nxt_router_access_log_test(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_router_conf_t *rtcf)
+{
+    nxt_int_t   ret;
+    nxt_str_t   str;
+    nxt_bool_t  match;
+
+    if (rtcf->log_cond == NULL) {
+        return nxt_router_access_log_sample(task, r, rtcf);
+    }
+
+    if (nxt_tstr_is_const(rtcf->log_cond)) {
+        nxt_tstr_str(rtcf->log_cond, &str);
+
+    } else {
         ret = nxt_tstr_query_init(&r->tstr_query, rtcf->tstr_state,
                                   &r->tstr_cache, r, r->mem_pool);
         if (nxt_slow_path(ret != NXT_OK)) {
-            return;
+            return 0;
         }
 
-        nxt_tstr_query(task, r->tstr_query, format, &ctx->text);
-        nxt_tstr_query_resolve(task, r->tstr_query, ctx,
-                               nxt_router_access_log_write_ready,
-                               nxt_router_access_log_write_error);
-     }
+        nxt_tstr_query(task, r->tstr_query, rtcf->log_cond, &str);
+
+        if (nxt_slow_path(nxt_tstr_query_failed(r->tstr_query))) {
+            return 0;
+        }
+    }
+
+    match = !(str.length == 0
+              || nxt_str_eq(&str, "0", 1)
+              || nxt_str_eq(&str, "false", 5)
+              || nxt_str_eq(&str, "null", 4)
+              || nxt_str_eq(&str, "undefined", 9));
+
+    if (match == rtcf->log_negate) {
+        return 0;
+    }
+
+    return nxt_router_access_log_sample(task, r, rtcf);
+}
+
+
+/* The sample rate depends on the status class of the response. */
+
+static nxt_bool_t
+nxt_router_access_log_sample(nxt_task_t *task, nxt_http_request_t *r,
+    nxt_router_conf_t *rtcf)
+{
+    uint32_t  rate;
+
+    if (r->status < 100 || r->status >= 600) {
+        return 1;
+    }
+
+    rate = rtcf->log_sample[r->status / 100 - 1];
+
+    return rate == NXT_ROUTER_ACCESS_LOG_ALL
+           || nxt_random(&task->thread->random) < rate;
+}
+
+
+static void
+nxt_router_access_log_json_ready(nxt_task_t *task, void *obj, void *data)
+{
+    u_char                       *p;
+    size_t                       length;
+    nxt_str_t                    *value;
+    nxt_uint_t                   i;
+    nxt_http_request_t           *r;
+    nxt_router_log_field_t       *field;
+    nxt_router_log_format_t      *format;
+    nxt_router_access_log_ctx_t  *ctx;
+
+    r = obj;
+    ctx = data;
+
+    format = ctx->format;
+
+    length = nxt_length("\"}\n");
+
+    for (i = 0; i < format->nfields; i++) {
+        field = &format->fields[i];
+        value = &ctx->values[i];
+
+        length += field->name.length
+                  + nxt_conf_json_escape_length(value->start, value->length);
+    }
+
+    p = nxt_mp_nget(r->mem_pool, length);
+    if (nxt_slow_path(p == NULL)) {
+        nxt_http_request_close_handler(task, r, r->proto.any);
+        return;
+    }
+
+    ctx->text.start = p;
+    ctx->text.length = length;
+
+    for (i = 0; i < format->nfields; i++) {
+        field = &format->fields[i];
+        value = &ctx->values[i];
+
+        p = nxt_cpymem(p, field->name.start, field->name.length);
+        p = nxt_conf_json_escape(p, value->start, value->length);
+    }
+
+    *p++ = '"'; *p++ = '}'; *p = '\n';
+
+    nxt_router_access_log_write_ready(task, r, ctx);
 }
 
 
 static void
 nxt_router_access_log_write_ready(nxt_task_t *task, void *obj, void *data)
 {
+    nxt_router_conf_t            *rtcf;
     nxt_http_request_t           *r;
     nxt_router_access_log_ctx_t  *ctx;
 
     r = obj;
     ctx = data;
 
-    nxt_fd_write(ctx->access_log->fd, ctx->text.start, ctx->text.length);
+    rtcf = r->conf->socket_conf->router_conf;
+
+    if (rtcf->log_buffer == 0) {
+        nxt_fd_write(ctx->access_log->fd, ctx->text.start, ctx->text.length);
+
+    } else {
+        nxt_router_access_log_buffer(task, rtcf, ctx->access_log, &ctx->text);
+    }
 
     nxt_http_request_close_handler(task, r, r->proto.any);
 }
@@ -196,6 +579,200 @@ nxt_router_access_log_write_error(nxt_task_t *task, void *obj, void *data)
 }
 
 
+/*
+ * Each router thread collects log lines in its own buffer, so buffering
+ * needs no locking.  The buffer holds a reference to its access log and
+ * is written out when it fills up, when the "flush" interval expires,
+ * when another access log has to be buffered after reconfiguration,
+ * and when the thread quits.
+ */
+
+static void
+nxt_router_access_log_buffer(nxt_task_t *task, nxt_router_conf_t *rtcf,
+    nxt_router_access_log_t *access_log, nxt_str_t *text)
+{
+    u_char              *p;
+    nxt_timer_t         *timer;
+    nxt_buf_mem_t       *mem;
+    nxt_event_engine_t  *engine;
+
+    engine = task->thread->engine;
+    mem = &engine->access_log_buf;
+
+    if (engine->access_log != access_log
+        || (size_t) (mem->end - mem->start) != rtcf->log_buffer
+        || engine->access_log_gzip != rtcf->log_gzip)
+    {
+        nxt_router_access_log_flush(task);
+
+        p = nxt_malloc(rtcf->log_buffer);
+        if (nxt_slow_path(p == NULL)) {
+            nxt_fd_write(access_log->fd, text->start, text->length);
+            return;
+        }
+
+        mem->start = p;
+        mem->pos = p;
+        mem->free = p;
+        mem->end = p + rtcf->log_buffer;
+
+        nxt_router_access_log_use(&nxt_router->lock, access_log);
+
+        engine->access_log = access_log;
+        engine->access_log_gzip = rtcf->log_gzip;
+    }
+
+    if (text->length > (size_t) (mem->end - mem->free)) {
+        nxt_router_access_log_buffer_write(task, engine);
+
+        if (text->length > (size_t) (mem->end - mem->start)) {
+            nxt_fd_write(access_log->fd, text->start, text->length);
+            return;
+        }
+    }
+
+    mem->free = nxt_cpymem(mem->free, text->start, text->length);
+
+    timer = &engine->access_log_timer;
+
+    if (!timer->enabled) {
+        timer->handler = nxt_router_access_log_flush_handler;
+        timer->task = &engine->task;
+        timer->log = &nxt_main_log;
+        timer->work_queue = &engine->fast_work_queue;
+        timer->bias = NXT_TIMER_DEFAULT_BIAS;
+
+        nxt_timer_add(engine, timer, rtcf->log_flush);
+    }
+}
+
+
+static void
+nxt_router_access_log_buffer_write(nxt_task_t *task, nxt_event_engine_t *engine)
+{
+    size_t                   length;
+    nxt_buf_mem_t            *mem;
+    nxt_router_access_log_t  *access_log;
+
+    mem = &engine->access_log_buf;
+    access_log = engine->access_log;
+
+    length = mem->free - mem->pos;
+
+    if (length == 0) {
+        return;
+    }
+
+    nxt_debug(task, "access log write %uz", length);
+
+#if (NXT_HAVE_ZLIB)
+    if (engine->access_log_gzip != 0
+        && nxt_router_access_log_gzip_write(task, access_log->fd,
+                                            engine->access_log_gzip,
+                                            mem->pos, length)
+           == NXT_OK)
+    {
+        mem->free = mem->pos;
+        return;
+    }
+#endif
+
+    nxt_fd_write(access_log->fd, mem->pos, length);
+
+    mem->free = mem->pos;
+}
+
+
+#if (NXT_HAVE_ZLIB)
+
+/*
+ * Every write is a complete gzip member; concatenated members form
+ * a valid gzip file.
+ */
+
+static nxt_int_t
+nxt_router_access_log_gzip_write(nxt_task_t *task, nxt_fd_t fd, int level,
+    u_char *start, size_t length)
+{
+    int       rc;
+    u_char    *out;
+    size_t    size;
+    z_stream  zs;
+
+    nxt_memzero(&zs, sizeof(z_stream));
+
+    rc = deflateInit2(&zs, level, Z_DEFLATED, MAX_WBITS + 16, MAX_MEM_LEVEL,
+                      Z_DEFAULT_STRATEGY);
+    if (nxt_slow_path(rc != Z_OK)) {
+        nxt_alert(task, "deflateInit2() failed %d", rc);
+        return NXT_ERROR;
+    }
+
+    size = deflateBound(&zs, length);
+
+    out = nxt_malloc(size);
+    if (nxt_slow_path(out == NULL)) {
+        (void) deflateEnd(&zs);
+        return NXT_ERROR;
+    }
+
+    zs.next_in = start;
+    zs.avail_in = length;
+    zs.next_out = out;
+    zs.avail_out = size;
+
+    rc = deflate(&zs, Z_FINISH);
+
+    (void) deflateEnd(&zs);
+
+    if (nxt_slow_path(rc != Z_STREAM_END)) {
+        nxt_alert(task, "deflate() failed %d", rc);
+        nxt_free(out);
+        return NXT_ERROR;
+    }
+
+    nxt_fd_write(fd, out, size - zs.avail_out);
+
+    nxt_free(out);
+
+    return NXT_OK;
+}
+
+#endif
+
+
+static void
+nxt_router_access_log_flush_handler(nxt_task_t *task, void *obj, void *data)
+{
+    nxt_router_access_log_flush(task);
+}
+
+
+void
+nxt_router_access_log_flush(nxt_task_t *task)
+{
+    nxt_event_engine_t  *engine;
+
+    engine = task->thread->engine;
+
+    if (engine->access_log == NULL) {
+        return;
+    }
+
+    nxt_router_access_log_buffer_write(task, engine);
+
+    nxt_free(engine->access_log_buf.start);
+    nxt_memzero(&engine->access_log_buf, sizeof(nxt_buf_mem_t));
+
+    nxt_router_access_log_release(task, &nxt_router->lock, engine->access_log);
+    engine->access_log = NULL;
+
+    if (engine->access_log_timer.enabled) {
+        (void) nxt_timer_delete(engine, &engine->access_log_timer);
+    }
+}
+
+
 void
 nxt_router_access_log_open(nxt_task_t *task, nxt_router_temp_conf_t *tmcf)
 {
@@ -8,6 +8,284 @@
 #include <nxt_status.h>
 
 
+typedef struct {
+    const char  *name;
+    const char  *type;
+    const char  *help;
+    size_t      offset;
+} nxt_status_metric_t;
+
+
+static nxt_conf_value_t *nxt_status_entries_get(nxt_conf_value_t *obj,
+    nxt_status_report_t *report, nxt_status_entry_t *entries, size_t n,
+    nxt_uint_t index, nxt_mp_t *mp);
+static nxt_int_t nxt_status_counters_get(nxt_conf_value_t *obj,
+    nxt_status_counters_t *c, nxt_uint_t index, nxt_mp_t *mp);
+static nxt_conf_value_t *nxt_status_histogram_get(nxt_status_histogram_t *h,
+    nxt_mp_t *mp);
+static nxt_uint_t nxt_status_latency_bucket(uint64_t usec);
+static uint64_t nxt_status_latency_quantile(nxt_status_latency_t *h,
+    nxt_uint_t q);
+static u_char *nxt_status_metrics_family(u_char *p, u_char *end,
+    const char *name, const char *type, const char *help);
+static u_char *nxt_status_metrics_counters(u_char *p, u_char *end,
+    nxt_status_report_t *report, const char *kind, u_char *entries, size_t n,
+    size_t size, size_t offset);
+static u_char *nxt_status_metrics_entry(u_char *p, u_char *end,
+    nxt_status_report_t *report, nxt_str_t *entry, u_char *name,
+    const char *label);
+static u_char *nxt_status_metrics_histogram(u_char *p, u_char *end,
+    nxt_str_t *app, const char *phase, nxt_status_histogram_t *h);
+static u_char *nxt_status_metrics_sample(u_char *p, u_char *end,
+    const char *name, const char *label, nxt_str_t *value);
+
+
+/* Upper bounds of histogram buckets in microseconds; the last is unbounded. */
+
+static const uint64_t  nxt_status_histogram_bounds[] = {
+    50, 100, 250, 500, 1000, 5000, 10000, 25000, 50000, 100000, 250000,
+    500000, 1000000, 5000000,
+};
+
+
+static nxt_str_t  nxt_status_histogram_names[] = {
+    nxt_string("50"),
+    nxt_string("100"),
+    nxt_string("250"),
+    nxt_string("500"),
+    nxt_string("1000"),
+    nxt_string("5000"),
+    nxt_string("10000"),
+    nxt_string("25000"),
+    nxt_string("50000"),
+    nxt_string("100000"),
+    nxt_string("250000"),
+    nxt_string("500000"),
+    nxt_string("1000000"),
+    nxt_string("5000000"),
+    nxt_string("inf"),
+};
+
+
+/* The same bounds in seconds as OpenMetrics histograms require. */
+
+static const char  *nxt_status_metrics_le[] = {
+    "0.00005", "0.0001", "0.00025", "0.0005", "0.001", "0.005", "0.01",
+    "0.025", "0.05", "0.1", "0.25", "0.5", "1", "5", "+Inf",
+};
+
+
+/* Latency quantiles in thousandths, with their names and OpenMetrics labels. */
+
+static const nxt_uint_t  nxt_status_latency_quantiles[] = {
+    500, 900, 990, 999,
+};
+
+
+static nxt_str_t  nxt_status_latency_names[] = {
+    nxt_string("p50"),
+    nxt_string("p90"),
+    nxt_string("p99"),
+    nxt_string("p999"),
+};
+
+
+static const char  *nxt_status_metrics_quantiles[] = {
+    "0.5", "0.9", "0.99", "0.999",
+};
+
+
+static nxt_str_t  nxt_status_response_names[] = {
+    nxt_string("1xx"),
+    nxt_string("2xx"),
+    nxt_string("3xx"),
+    nxt_string("4xx"),
+    nxt_string("5xx"),
+};
+
+
+#define NXT_STATUS_METRIC(name, type, help, field)                            \
+    { name, type, help, offsetof(nxt_status_report_t, field) }
+
+static const nxt_status_metric_t  nxt_status_metrics_list[] = {
+    NXT_STATUS_METRIC("unit_connections_accepted", "counter",
+                      "Accepted client connections.", accepted_conns),
+    NXT_STATUS_METRIC("unit_connections_idle", "gauge",
+                      "Idle client connections.", idle_conns),
+    NXT_STATUS_METRIC("unit_connections_closed", "counter",
+                      "Closed client connections.", closed_conns),
+    NXT_STATUS_METRIC("unit_requests", "counter",
+                      "Client requests.", requests),
+    NXT_STATUS_METRIC("unit_proxy_keepalive_hits", "counter",
+                      "Proxied requests sent over a cached upstream "
+                      "connection.", keepalive_hits),
+    NXT_STATUS_METRIC("unit_proxy_keepalive_misses", "counter",
+                      "Proxied requests that opened a new upstream "
+                      "connection.", keepalive_misses),
+    NXT_STATUS_METRIC("unit_proxy_keepalive_idle", "gauge",
+                      "Cached idle upstream connections.", keepalive_idle),
+    NXT_STATUS_METRIC("unit_static_open_file_cache_hits", "counter",
+                      "Open file cache hits.", static_hits),
+    NXT_STATUS_METRIC("unit_static_open_file_cache_misses", "counter",
+                      "Open file cache misses.", static_misses),
+    NXT_STATUS_METRIC("unit_static_open_file_cache_open", "gauge",
+                      "Files held open by the open file cache.", static_open),
+    NXT_STATUS_METRIC("unit_cache_hits", "counter",
+                      "Response cache hits.", cache_hits),
+    NXT_STATUS_METRIC("unit_cache_misses", "counter",
+                      "Response cache misses.", cache_misses),
+    NXT_STATUS_METRIC("unit_cache_bytes", "gauge",
+                      "Size of cached responses in bytes.", cache_bytes),
+    NXT_STATUS_METRIC("unit_route_memo_hits", "counter",
+                      "Route memo hits.", route_memo_hits),
+    NXT_STATUS_METRIC("unit_route_memo_misses", "counter",
+                      "Route memo misses.", route_memo_misses),
+    NXT_STATUS_METRIC("unit_tls_session_cache_sessions", "gauge",
+                      "Sessions in the shared TLS session cache.",
+                      tls_sessions),
+};
+
+
+/*
+ * Size limits used to preallocate the metrics text: the unlabeled part
+ * of the output, and a single labeled sample without the label value.
+ */
+
+#define NXT_STATUS_METRICS_SIZE   16384
+#define NXT_STATUS_METRICS_LINE   128
+
+/*
+ * Samples per listener, route, or application: requests, responses,
+ * bytes, and the latency summary.
+ */
+
+#define NXT_STATUS_METRICS_ENTRY_LINES                                        \
+    (1 + 5 + 2 + nxt_nitems(nxt_status_latency_quantiles) + 2)
+
+/* Samples per application: processes, requests, ipc and timing histograms. */
+
+#define NXT_STATUS_METRICS_APP_LINES                                          \
+    (3 + 1 + 4 + 3 * (NXT_STATUS_HISTOGRAM_BUCKETS + 2))
+
+
+void
+nxt_status_histogram_add(nxt_status_histogram_t *h, uint64_t usec)
+{
+    nxt_uint_t  i;
+
+    for (i = 0; i < nxt_nitems(nxt_status_histogram_bounds); i++) {
+        if (usec <= nxt_status_histogram_bounds[i]) {
+            break;
+        }
+    }
+
+    nxt_atomic_fetch_add(&h->buckets[i], 1);
+    nxt_atomic_fetch_add(&h->sum, usec);
+    nxt_atomic_fetch_add(&h->count, 1);
+}
+
+
+void
+nxt_status_counters_add(nxt_status_counters_t *c, nxt_uint_t status,
+    nxt_off_t received, nxt_off_t sent, uint64_t usec)
+{
+    nxt_uint_t  i;
+
+    nxt_atomic_fetch_add(&c->requests, 1);
+
+    if (status >= 100 && status < 600) {
+        nxt_atomic_fetch_add(&c->responses[status / 100 - 1], 1);
+    }
+
+    if (received > 0) {
+        nxt_atomic_fetch_add(&c->bytes_received, received);
+    }
+
+    if (sent > 0) {
+        nxt_atomic_fetch_add(&c->bytes_sent, sent);
+    }
+
+    i = nxt_status_latency_bucket(usec);
+
+    nxt_atomic_fetch_add(&c->latency.buckets[i], 1);
+    nxt_atomic_fetch_add(&c->latency.sum, usec);
+    nxt_atomic_fetch_add(&c->latency.count, 1);
+}
+
+
+void
+nxt_status_counters_sum(nxt_status_counters_t *dst, nxt_status_counters_t *src)
+{
+    nxt_uint_t  i;
+
+    dst->requests += src->requests;
+
+    for (i = 0; i < nxt_nitems(src->responses); i++) {
+        dst->responses[i] += src->responses[i];
+    }
+
+    dst->bytes_received += src->bytes_received;
+    dst->bytes_sent += src->bytes_sent;
+
+    dst->latency.count += src->latency.count;
+    dst->latency.sum += src->latency.sum;
+
+    for (i = 0; i < NXT_STATUS_LATENCY_BUCKETS; i++) {
+        dst->latency.buckets[i] += src->latency.buckets[i];
+    }
+}
+
+
+static nxt_uint_t
+nxt_status_latency_bucket(uint64_t usec)
+{
+    nxt_uint_t  i, shift;
+
+    shift = 0;
+
+    while ((usec >> shift) >= 2 * NXT_STATUS_LATENCY_SUB) {
+        shift++;
+    }
+
+    i = shift * NXT_STATUS_LATENCY_SUB + (nxt_uint_t) (usec >> shift);
+
+    return nxt_min(i, NXT_STATUS_LATENCY_BUCKETS - 1);
+}
+
+
+/*
+ * Returns the highest value of the bucket that holds the q/1000 quantile,
+ * so the reported value is never below the actual one.
+ */
+
+static uint64_t
+nxt_status_latency_quantile(nxt_status_latency_t *h, nxt_uint_t q)
+{
+    uint64_t    rank, total;
+    nxt_uint_t  i, shift;
+
+    if (h->count == 0) {
+        return 0;
+    }
+
+    rank = (h->count * q + 999) / 1000;
+    total = 0;
+
+    for (i = 0; i < NXT_STATUS_LATENCY_BUCKETS - 1; i++) {
+        total += h->buckets[i];
+
+        if (total >= rank) {
+            break;
+        }
+    }
+
+    shift = (i < 2 * NXT_STATUS_LATENCY_SUB)
+            ? 0 : i / NXT_STATUS_LATENCY_SUB - 1;
+
+    return ((uint64_t) (i - shift * NXT_STATUS_LATENCY_SUB + 1) << shift) - 1;
+}
+
+
 nxt_conf_value_t *
 nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
 {
@@ -15,7 +293,8 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
     nxt_str_t         name;
     nxt_int_t         ret;
     nxt_status_app_t  *app;
-    nxt_conf_value_t  *status, *obj, *apps, *app_obj;
+    nxt_conf_value_t  *status, *obj, *apps, *app_obj, *ipc_obj, *time_obj;
+    nxt_conf_value_t  *ka_obj;
 
     static nxt_str_t conns_str = nxt_string("connections");
     static nxt_str_t acc_str = nxt_string("accepted");
@@ -28,8 +307,33 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
     static nxt_str_t procs_str = nxt_string("processes");
     static nxt_str_t run_str = nxt_string("running");
     static nxt_str_t start_str = nxt_string("starting");
+    static nxt_str_t ipc_str = nxt_string("ipc");
+    static nxt_str_t plain_str = nxt_string("plain");
+    static nxt_str_t shm_str = nxt_string("shm");
+    static nxt_str_t msgs_str = nxt_string("messages");
+    static nxt_str_t bytes_str = nxt_string("bytes");
+    static nxt_str_t timing_str = nxt_string("timing");
+    static nxt_str_t queue_str = nxt_string("queue");
+    static nxt_str_t app_str = nxt_string("app");
+    static nxt_str_t proxy_str = nxt_string("proxy");
+    static nxt_str_t keepalive_str = nxt_string("keepalive");
+    static nxt_str_t hits_str = nxt_string("hits");
+    static nxt_str_t misses_str = nxt_string("misses");
+    static nxt_str_t static_str = nxt_string("static");
+    static nxt_str_t cache_str = nxt_string("open_file_cache");
+    static nxt_str_t open_str = nxt_string("open");
+    static nxt_str_t http_cache_str = nxt_string("cache");
+    static nxt_str_t routes_str = nxt_string("routes");
+    static nxt_str_t memo_str = nxt_string("memo");
+    static nxt_str_t tls_str = nxt_string("tls");
+    static nxt_str_t handshakes_str = nxt_string("handshakes");
+    static nxt_str_t full_str = nxt_string("full");
+    static nxt_str_t resumed_str = nxt_string("resumed");
+    static nxt_str_t session_cache_str = nxt_string("session_cache");
+    static nxt_str_t sessions_str = nxt_string("sessions");
+    static nxt_str_t listeners_str = nxt_string("listeners");
 
-    status = nxt_conf_create_object(mp, 3);
+    status = nxt_conf_create_object(mp, 9);
     if (nxt_slow_path(status == NULL)) {
         return NULL;
     }
@@ -57,6 +361,122 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
 
     nxt_conf_set_member_integer(obj, &total_str, report->requests, 0);
 
+    obj = nxt_conf_create_object(mp, 1);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &proxy_str, obj, 3);
+
+    ka_obj = nxt_conf_create_object(mp, 3);
+    if (nxt_slow_path(ka_obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &keepalive_str, ka_obj, 0);
+
+    nxt_conf_set_member_integer(ka_obj, &hits_str, report->keepalive_hits, 0);
+    nxt_conf_set_member_integer(ka_obj, &misses_str,
+                                report->keepalive_misses, 1);
+    nxt_conf_set_member_integer(ka_obj, &idle_str, report->keepalive_idle, 2);
+
+    obj = nxt_conf_create_object(mp, 1);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &static_str, obj, 4);
+
+    ka_obj = nxt_conf_create_object(mp, 3);
+    if (nxt_slow_path(ka_obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &cache_str, ka_obj, 0);
+
+    nxt_conf_set_member_integer(ka_obj, &hits_str, report->static_hits, 0);
+    nxt_conf_set_member_integer(ka_obj, &misses_str, report->static_misses, 1);
+    nxt_conf_set_member_integer(ka_obj, &open_str, report->static_open, 2);
+
+    obj = nxt_conf_create_object(mp, 3);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &http_cache_str, obj, 5);
+
+    nxt_conf_set_member_integer(obj, &hits_str, report->cache_hits, 0);
+    nxt_conf_set_member_integer(obj, &misses_str, report->cache_misses, 1);
+    nxt_conf_set_member_integer(obj, &bytes_str, report->cache_bytes, 2);
+
+    obj = nxt_conf_create_object(mp, 1 + report->routes_count);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &routes_str, obj, 6);
+
+    obj = nxt_status_entries_get(obj, report,
+                                 nxt_pointer_to(report,
+                                                (uintptr_t) report->routes),
+                                 report->routes_count, 1, mp);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    ka_obj = nxt_conf_create_object(mp, 2);
+    if (nxt_slow_path(ka_obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &memo_str, ka_obj, 0);
+
+    nxt_conf_set_member_integer(ka_obj, &hits_str, report->route_memo_hits, 0);
+    nxt_conf_set_member_integer(ka_obj, &misses_str,
+                                report->route_memo_misses, 1);
+
+    obj = nxt_conf_create_object(mp, 2);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &tls_str, obj, 7);
+
+    ka_obj = nxt_conf_create_object(mp, 2);
+    if (nxt_slow_path(ka_obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &handshakes_str, ka_obj, 0);
+
+    nxt_conf_set_member_integer(ka_obj, &full_str, report->tls_full, 0);
+    nxt_conf_set_member_integer(ka_obj, &resumed_str, report->tls_resumed, 1);
+
+    ka_obj = nxt_conf_create_object(mp, 1);
+    if (nxt_slow_path(ka_obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &session_cache_str, ka_obj, 1);
+
+    nxt_conf_set_member_integer(ka_obj, &sessions_str, report->tls_sessions,
+                                0);
+
+    obj = nxt_conf_create_object(mp, report->listeners_count);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(status, &listeners_str, obj, 8);
+
+    obj = nxt_status_entries_get(obj, report,
+                                 nxt_pointer_to(report,
+                                                (uintptr_t) report->listeners),
+                                 report->listeners_count, 0, mp);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
     apps = nxt_conf_create_object(mp, report->apps_count);
     if (nxt_slow_path(apps == NULL)) {
         return NULL;
@@ -67,7 +487,7 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
     for (i = 0; i < report->apps_count; i++) {
         app = &report->apps[i];
 
-        app_obj = nxt_conf_create_object(mp, 2);
+        app_obj = nxt_conf_create_object(mp, 7);
         if (nxt_slow_path(app_obj == NULL)) {
             return NULL;
         }
@@ -91,7 +511,7 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
         nxt_conf_set_member_integer(obj, &start_str, app->pending_processes, 1);
         nxt_conf_set_member_integer(obj, &idle_str, app->idle_processes, 2);
 
-        obj = nxt_conf_create_object(mp, 1);
+        obj = nxt_conf_create_object(mp, 2);
         if (nxt_slow_path(obj == NULL)) {
             return NULL;
         }
@@ -99,7 +519,635 @@ nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp)
         nxt_conf_set_member(app_obj, &reqs_str, obj, 1);
 
         nxt_conf_set_member_integer(obj, &active_str, app->active_requests, 0);
+        nxt_conf_set_member_integer(obj, &total_str, app->counters.requests, 1);
+
+        ipc_obj = nxt_conf_create_object(mp, 2);
+        if (nxt_slow_path(ipc_obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(app_obj, &ipc_str, ipc_obj, 2);
+
+        obj = nxt_conf_create_object(mp, 2);
+        if (nxt_slow_path(obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(ipc_obj, &plain_str, obj, 0);
+
+        nxt_conf_set_member_integer(obj, &msgs_str, app->plain_messages, 0);
+        nxt_conf_set_member_integer(obj, &bytes_str, app->plain_bytes, 1);
+
+        obj = nxt_conf_create_object(mp, 2);
+        if (nxt_slow_path(obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(ipc_obj, &shm_str, obj, 1);
+
+        nxt_conf_set_member_integer(obj, &msgs_str, app->shm_messages, 0);
+        nxt_conf_set_member_integer(obj, &bytes_str, app->shm_bytes, 1);
+
+        time_obj = nxt_conf_create_object(mp, 3);
+        if (nxt_slow_path(time_obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(app_obj, &timing_str, time_obj, 3);
+
+        obj = nxt_status_histogram_get(&app->queue_time, mp);
+        if (nxt_slow_path(obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(time_obj, &queue_str, obj, 0);
+
+        obj = nxt_status_histogram_get(&app->app_time, mp);
+        if (nxt_slow_path(obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(time_obj, &app_str, obj, 1);
+
+        obj = nxt_status_histogram_get(&app->ipc_time, mp);
+        if (nxt_slow_path(obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(time_obj, &ipc_str, obj, 2);
+
+        ret = nxt_status_counters_get(app_obj, &app->counters, 4, mp);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
     }
 
     return status;
 }
+
+
+static nxt_conf_value_t *
+nxt_status_entries_get(nxt_conf_value_t *obj, nxt_status_report_t *report,
+    nxt_status_entry_t *entries, size_t n, nxt_uint_t index, nxt_mp_t *mp)
+{
+    size_t              i;
+    nxt_str_t           name;
+    nxt_int_t           ret;
+    nxt_conf_value_t    *entry_obj, *reqs_obj;
+    nxt_status_entry_t  *entry;
+
+    static nxt_str_t reqs_str = nxt_string("requests");
+    static nxt_str_t total_str = nxt_string("total");
+
+    for (i = 0; i < n; i++) {
+        entry = &entries[i];
+
+        entry_obj = nxt_conf_create_object(mp, 4);
+        if (nxt_slow_path(entry_obj == NULL)) {
+            return NULL;
+        }
+
+        name.length = entry->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) entry->name.start);
+
+        ret = nxt_conf_set_member_dup(obj, mp, &name, entry_obj, index + i);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
+
+        reqs_obj = nxt_conf_create_object(mp, 1);
+        if (nxt_slow_path(reqs_obj == NULL)) {
+            return NULL;
+        }
+
+        nxt_conf_set_member(entry_obj, &reqs_str, reqs_obj, 0);
+
+        nxt_conf_set_member_integer(reqs_obj, &total_str,
+                                    entry->counters.requests, 0);
+
+        ret = nxt_status_counters_get(entry_obj, &entry->counters, 1, mp);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NULL;
+        }
+    }
+
+    return obj;
+}
+
+
+static nxt_int_t
+nxt_status_counters_get(nxt_conf_value_t *obj, nxt_status_counters_t *c,
+    nxt_uint_t index, nxt_mp_t *mp)
+{
+    uint64_t          value;
+    nxt_uint_t        i;
+    nxt_conf_value_t  *member;
+
+    static nxt_str_t resps_str = nxt_string("responses");
+    static nxt_str_t bytes_str = nxt_string("bytes");
+    static nxt_str_t received_str = nxt_string("received");
+    static nxt_str_t sent_str = nxt_string("sent");
+    static nxt_str_t latency_str = nxt_string("latency");
+    static nxt_str_t sum_str = nxt_string("sum");
+
+    member = nxt_conf_create_object(mp, nxt_nitems(c->responses));
+    if (nxt_slow_path(member == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_conf_set_member(obj, &resps_str, member, index);
+
+    for (i = 0; i < nxt_nitems(c->responses); i++) {
+        nxt_conf_set_member_integer(member, &nxt_status_response_names[i],
+                                    c->responses[i], i);
+    }
+
+    member = nxt_conf_create_object(mp, 2);
+    if (nxt_slow_path(member == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_conf_set_member(obj, &bytes_str, member, index + 1);
+
+    nxt_conf_set_member_integer(member, &received_str, c->bytes_received, 0);
+    nxt_conf_set_member_integer(member, &sent_str, c->bytes_sent, 1);
+
+    member = nxt_conf_create_object(mp,
+                                    1 + nxt_nitems(nxt_status_latency_names));
+    if (nxt_slow_path(member == NULL)) {
+        return NXT_ERROR;
+    }
+
+    nxt_conf_set_member(obj, &latency_str, member, index + 2);
+
+    nxt_conf_set_member_integer(member, &sum_str, c->latency.sum, 0);
+
+    for (i = 0; i < nxt_nitems(nxt_status_latency_names); i++) {
+        value = nxt_status_latency_quantile(&c->latency,
+                                            nxt_status_latency_quantiles[i]);
+
+        nxt_conf_set_member_integer(member, &nxt_status_latency_names[i],
+                                    value, i + 1);
+    }
+
+    return NXT_OK;
+}
+
+
+static nxt_conf_value_t *
+nxt_status_histogram_get(nxt_status_histogram_t *h, nxt_mp_t *mp)
+{
+    nxt_uint_t        i;
+    nxt_conf_value_t  *obj, *buckets;
+
+    static nxt_str_t count_str = nxt_string("count");
+    static nxt_str_t sum_str = nxt_string("sum");
+    static nxt_str_t buckets_str = nxt_string("buckets");
+
+    obj = nxt_conf_create_object(mp, 3);
+    if (nxt_slow_path(obj == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member_integer(obj, &count_str, h->count, 0);
+    nxt_conf_set_member_integer(obj, &sum_str, h->sum, 1);
+
+    buckets = nxt_conf_create_object(mp, NXT_STATUS_HISTOGRAM_BUCKETS);
+    if (nxt_slow_path(buckets == NULL)) {
+        return NULL;
+    }
+
+    nxt_conf_set_member(obj, &buckets_str, buckets, 2);
+
+    for (i = 0; i < NXT_STATUS_HISTOGRAM_BUCKETS; i++) {
+        nxt_conf_set_member_integer(buckets, &nxt_status_histogram_names[i],
+                                    h->buckets[i], i);
+    }
+
+    return obj;
+}
+
+
+nxt_buf_t *
+nxt_status_metrics(nxt_status_report_t *report, nxt_mp_t *mp)
+{
+    u_char                     *p, *end;
+    size_t                     i, size;
+    uint64_t                   value;
+    nxt_buf_t                  *b;
+    nxt_str_t                  name;
+    nxt_uint_t                 n;
+    nxt_status_app_t           *app;
+    nxt_status_entry_t         *listeners, *routes;
+    const nxt_status_metric_t  *metric;
+
+    listeners = nxt_pointer_to(report, (uintptr_t) report->listeners);
+    routes = nxt_pointer_to(report, (uintptr_t) report->routes);
+
+    size = NXT_STATUS_METRICS_SIZE;
+
+    /* Label values may be twice as long after escaping. */
+
+    for (i = 0; i < report->listeners_count; i++) {
+        size += NXT_STATUS_METRICS_ENTRY_LINES
+                * (NXT_STATUS_METRICS_LINE + 2 * listeners[i].name.length);
+    }
+
+    for (i = 0; i < report->routes_count; i++) {
+        size += NXT_STATUS_METRICS_ENTRY_LINES
+                * (NXT_STATUS_METRICS_LINE + 2 * routes[i].name.length);
+    }
+
+    for (i = 0; i < report->apps_count; i++) {
+        size += (NXT_STATUS_METRICS_APP_LINES + NXT_STATUS_METRICS_ENTRY_LINES)
+                * (NXT_STATUS_METRICS_LINE + 2 * report->apps[i].name.length);
+    }
+
+    b = nxt_buf_mem_alloc(mp, size, 0);
+    if (nxt_slow_path(b == NULL)) {
+        return NULL;
+    }
+
+    p = b->mem.free;
+    end = b->mem.end;
+
+    for (n = 0; n < nxt_nitems(nxt_status_metrics_list); n++) {
+        metric = &nxt_status_metrics_list[n];
+
+        value = *(uint64_t *) ((u_char *) report + metric->offset);
+
+        p = nxt_status_metrics_family(p, end, metric->name, metric->type,
+                                      metric->help);
+
+        if (metric->type[0] == 'c') {
+            p = nxt_sprintf(p, end, "%s_total %uL\n", metric->name, value);
+
+        } else {
+            p = nxt_sprintf(p, end, "%s %uL\n", metric->name, value);
+        }
+    }
+
+    p = nxt_status_metrics_family(p, end, "unit_connections_active", "gauge",
+                                  "Active client connections.");
+
+    p = nxt_sprintf(p, end, "unit_connections_active %uL\n",
+                    report->accepted_conns - report->closed_conns
+                    - report->idle_conns);
+
+    p = nxt_status_metrics_family(p, end, "unit_tls_handshakes", "counter",
+                                  "Completed TLS handshakes.");
+
+    p = nxt_sprintf(p, end,
+                    "unit_tls_handshakes_total{type=\"full\"} %uL\n"
+                    "unit_tls_handshakes_total{type=\"resumed\"} %uL\n",
+                    report->tls_full, report->tls_resumed);
+
+    p = nxt_status_metrics_counters(p, end, report, "listener",
+                                    (u_char *) listeners,
+                                    report->listeners_count,
+                                    sizeof(nxt_status_entry_t),
+                                    offsetof(nxt_status_entry_t, counters));
+
+    p = nxt_status_metrics_counters(p, end, report, "route",
+                                    (u_char *) routes, report->routes_count,
+                                    sizeof(nxt_status_entry_t),
+                                    offsetof(nxt_status_entry_t, counters));
+
+    p = nxt_status_metrics_counters(p, end, report, "application",
+                                    (u_char *) report->apps,
+                                    report->apps_count,
+                                    sizeof(nxt_status_app_t),
+                                    offsetof(nxt_status_app_t, counters));
+
+    p = nxt_status_metrics_family(p, end, "unit_application_processes",
+                                  "gauge", "Application processes.");
+
+    for (i = 0; i < report->apps_count; i++) {
+        app = &report->apps[i];
+
+        name.length = app->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) app->name.start);
+
+        p = nxt_status_metrics_sample(p, end, "unit_application_processes",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",state=\"running\"} %uD\n", app->processes);
+
+        p = nxt_status_metrics_sample(p, end, "unit_application_processes",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",state=\"starting\"} %uD\n",
+                        app->pending_processes);
+
+        p = nxt_status_metrics_sample(p, end, "unit_application_processes",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",state=\"idle\"} %uD\n",
+                        app->idle_processes);
+    }
+
+    p = nxt_status_metrics_family(p, end, "unit_application_requests_active",
+                                  "gauge",
+                                  "Requests being processed by application.");
+
+    for (i = 0; i < report->apps_count; i++) {
+        app = &report->apps[i];
+
+        name.length = app->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) app->name.start);
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_requests_active",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, "} %uD\n", app->active_requests);
+    }
+
+    p = nxt_status_metrics_family(p, end, "unit_application_ipc_messages",
+                                  "counter",
+                                  "Response messages received from "
+                                  "application processes.");
+
+    for (i = 0; i < report->apps_count; i++) {
+        app = &report->apps[i];
+
+        name.length = app->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) app->name.start);
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_ipc_messages_total",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",transport=\"plain\"} %uL\n",
+                        app->plain_messages);
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_ipc_messages_total",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",transport=\"shm\"} %uL\n",
+                        app->shm_messages);
+    }
+
+    p = nxt_status_metrics_family(p, end, "unit_application_ipc_bytes",
+                                  "counter",
+                                  "Response bytes received from "
+                                  "application processes.");
+
+    for (i = 0; i < report->apps_count; i++) {
+        app = &report->apps[i];
+
+        name.length = app->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) app->name.start);
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_ipc_bytes_total",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",transport=\"plain\"} %uL\n",
+                        app->plain_bytes);
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_ipc_bytes_total",
+                                      "application", &name);
+        p = nxt_sprintf(p, end, ",transport=\"shm\"} %uL\n", app->shm_bytes);
+    }
+
+    p = nxt_status_metrics_family(p, end, "unit_application_timing_seconds",
+                                  "histogram",
+                                  "Request queueing, processing and "
+                                  "response passing time of application.");
+
+    for (i = 0; i < report->apps_count; i++) {
+        app = &report->apps[i];
+
+        name.length = app->name.length;
+        name.start = nxt_pointer_to(report, (uintptr_t) app->name.start);
+
+        p = nxt_status_metrics_histogram(p, end, &name, "queue",
+                                         &app->queue_time);
+        p = nxt_status_metrics_histogram(p, end, &name, "app",
+                                         &app->app_time);
+        p = nxt_status_metrics_histogram(p, end, &name, "ipc",
+                                         &app->ipc_time);
+    }
+
+    b->mem.free = nxt_cpymem(p, "# EOF\n", 6);
+
+    return b;
+}
+
+
+static u_char *
+nxt_status_metrics_family(u_char *p, u_char *end, const char *name,
+    const char *type, const char *help)
+{
+    return nxt_sprintf(p, end, "# TYPE %s %s\n# HELP %s %s\n",
+                       name, type, name, help);
+}
+
+
+/*
+ * Outputs request counters of listeners, routes or applications.  The entries
+ * are "size" bytes apart, start with the name, and have counters at "offset".
+ */
+
+static u_char *
+nxt_status_metrics_counters(u_char *p, u_char *end,
+    nxt_status_report_t *report, const char *kind, u_char *entries, size_t n,
+    size_t size, size_t offset)
+{
+    u_char                 *entry, name[64];
+    size_t                 i;
+    uint64_t               value;
+    nxt_uint_t             k;
+    nxt_status_counters_t  *c;
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_requests%Z", kind);
+    p = nxt_status_metrics_family(p, end, (char *) name, "counter",
+                                  "Client requests.");
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_requests_total%Z", kind);
+
+    for (i = 0; i < n; i++) {
+        entry = entries + i * size;
+        c = (nxt_status_counters_t *) (entry + offset);
+
+        p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry, name,
+                                     kind);
+        p = nxt_sprintf(p, end, "} %uA\n", c->requests);
+    }
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_responses%Z", kind);
+    p = nxt_status_metrics_family(p, end, (char *) name, "counter",
+                                  "Responses by status code class.");
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_responses_total%Z", kind);
+
+    for (i = 0; i < n; i++) {
+        entry = entries + i * size;
+        c = (nxt_status_counters_t *) (entry + offset);
+
+        for (k = 0; k < nxt_nitems(c->responses); k++) {
+            p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry,
+                                         name, kind);
+            p = nxt_sprintf(p, end, ",code=\"%V\"} %uA\n",
+                            &nxt_status_response_names[k], c->responses[k]);
+        }
+    }
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_received_bytes%Z", kind);
+    p = nxt_status_metrics_family(p, end, (char *) name, "counter",
+                                  "Request body bytes received.");
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_received_bytes_total%Z",
+                kind);
+
+    for (i = 0; i < n; i++) {
+        entry = entries + i * size;
+        c = (nxt_status_counters_t *) (entry + offset);
+
+        p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry, name,
+                                     kind);
+        p = nxt_sprintf(p, end, "} %uA\n", c->bytes_received);
+    }
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_sent_bytes%Z", kind);
+    p = nxt_status_metrics_family(p, end, (char *) name, "counter",
+                                  "Response body bytes sent.");
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_sent_bytes_total%Z", kind);
+
+    for (i = 0; i < n; i++) {
+        entry = entries + i * size;
+        c = (nxt_status_counters_t *) (entry + offset);
+
+        p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry, name,
+                                     kind);
+        p = nxt_sprintf(p, end, "} %uA\n", c->bytes_sent);
+    }
+
+    nxt_sprintf(name, name + sizeof(name), "unit_%s_request_duration_seconds%Z",
+                kind);
+    p = nxt_status_metrics_family(p, end, (char *) name, "summary",
+                                  "Time from reading the request header "
+                                  "to sending the response.");
+
+    for (i = 0; i < n; i++) {
+        entry = entries + i * size;
+        c = (nxt_status_counters_t *) (entry + offset);
+
+        nxt_sprintf(name, name + sizeof(name),
+                    "unit_%s_request_duration_seconds%Z", kind);
+
+        for (k = 0; k < nxt_nitems(nxt_status_latency_quantiles); k++) {
+            value = nxt_status_latency_quantile(&c->latency,
+                                                nxt_status_latency_quantiles[k]);
+
+            p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry,
+                                         name, kind);
+            p = nxt_sprintf(p, end, ",quantile=\"%s\"} %uL.%06uL\n",
+                            nxt_status_metrics_quantiles[k],
+                            value / 1000000, value % 1000000);
+        }
+
+        nxt_sprintf(name, name + sizeof(name),
+                    "unit_%s_request_duration_seconds_count%Z", kind);
+
+        p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry, name,
+                                     kind);
+        p = nxt_sprintf(p, end, "} %uA\n", c->latency.count);
+
+        nxt_sprintf(name, name + sizeof(name),
+                    "unit_%s_request_duration_seconds_sum%Z", kind);
+
+        p = nxt_status_metrics_entry(p, end, report, (nxt_str_t *) entry, name,
+                                     kind);
+        p = nxt_sprintf(p, end, "} %uA.%06uA\n",
+                        c->latency.sum / 1000000, c->latency.sum % 1000000);
+    }
+
+    return p;
+}
+
+
+static u_char *
+nxt_status_metrics_entry(u_char *p, u_char *end, nxt_status_report_t *report,
+    nxt_str_t *entry, u_char *name, const char *label)
+{
+    nxt_str_t  value;
+
+    value.length = entry->length;
+    value.start = nxt_pointer_to(report, (uintptr_t) entry->start);
+
+    return nxt_status_metrics_sample(p, end, (char *) name, label, &value);
+}
+
+
+static u_char *
+nxt_status_metrics_histogram(u_char *p, u_char *end, nxt_str_t *app,
+    const char *phase, nxt_status_histogram_t *h)
+{
+    uint64_t    total;
+    nxt_uint_t  i;
+
+    total = 0;
+
+    for (i = 0; i < NXT_STATUS_HISTOGRAM_BUCKETS; i++) {
+        total += h->buckets[i];
+
+        p = nxt_status_metrics_sample(p, end,
+                                      "unit_application_timing_seconds_bucket",
+                                      "application", app);
+        p = nxt_sprintf(p, end, ",phase=\"%s\",le=\"%s\"} %uL\n",
+                        phase, nxt_status_metrics_le[i], total);
+    }
+
+    p = nxt_status_metrics_sample(p, end,
+                                  "unit_application_timing_seconds_count",
+                                  "application", app);
+    p = nxt_sprintf(p, end, ",phase=\"%s\"} %uA\n", phase, h->count);
+
+    p = nxt_status_metrics_sample(p, end,
+                                  "unit_application_timing_seconds_sum",
+                                  "application", app);
+
+    return nxt_sprintf(p, end, ",phase=\"%s\"} %uA.%06uA\n", phase,
+                       h->sum / 1000000, h->sum % 1000000);
+}
+
+
+/*
+ * Starts a sample with the first label: name{label="value"
+ * The value is escaped as required by the text format.
+ */
+
+static u_char *
+nxt_status_metrics_sample(u_char *p, u_char *end, const char *name,
+    const char *label, nxt_str_t *value)
+{
+    u_char  ch, *s, *last;
+
+    p = nxt_sprintf(p, end, "%s{%s=\"", name, label);
+
+    s = value->start;
+    last = s + value->length;
+
+    while (s < last) {
+        ch = *s++;
+
+        switch (ch) {
+
+        case '\\':
+        case '"':
+            *p++ = '\\';
+            *p++ = ch;
+            break;
+
+        case '\n':
+            *p++ = '\\';
+            *p++ = 'n';
+            break;
+
+        default:
+            *p++ = ch;
+        }
+    }
+
+    *p++ = '"';
+
+    return p;
+}
@@ -7,27 +7,110 @@
 #define _NXT_STATUS_H_INCLUDED_
 
 
+#define NXT_STATUS_HISTOGRAM_BUCKETS  15
+
+/*
+ * Request latency is kept in log-linear buckets: values below 8 microseconds
+ * have a bucket each, and every next power of two is split into 8 buckets,
+ * which bounds the relative error by 12.5%.  Values of 2^27 microseconds
+ * (about 134 seconds) and above fall into the last bucket.
+ */
+
+#define NXT_STATUS_LATENCY_SUB        8
+#define NXT_STATUS_LATENCY_BUCKETS    200
+
+
+typedef struct {
+    nxt_atomic_uint_t  count;
+    nxt_atomic_uint_t  sum;  /* In microseconds. */
+    nxt_atomic_uint_t  buckets[NXT_STATUS_HISTOGRAM_BUCKETS];
+} nxt_status_histogram_t;
+
+
 typedef struct {
-    nxt_str_t         name;
-    uint32_t          active_requests;
-    uint32_t          pending_processes;
-    uint32_t          processes;
-    uint32_t          idle_processes;
+    nxt_atomic_uint_t  count;
+    nxt_atomic_uint_t  sum;  /* In microseconds. */
+    nxt_atomic_uint_t  buckets[NXT_STATUS_LATENCY_BUCKETS];
+} nxt_status_latency_t;
+
+
+typedef struct {
+    nxt_atomic_uint_t     requests;
+    nxt_atomic_uint_t     responses[5];  /* 1xx - 5xx */
+    nxt_atomic_uint_t     bytes_received;
+    nxt_atomic_uint_t     bytes_sent;
+    nxt_status_latency_t  latency;
+} nxt_status_counters_t;
+
+
+typedef struct {
+    nxt_str_t              name;
+    nxt_status_counters_t  counters;
+} nxt_status_entry_t;
+
+
+typedef struct {
+    nxt_str_t               name;
+    uint32_t                active_requests;
+    uint32_t                pending_processes;
+    uint32_t                processes;
+    uint32_t                idle_processes;
+
+    uint64_t                plain_messages;
+    uint64_t                plain_bytes;
+    uint64_t                shm_messages;
+    uint64_t                shm_bytes;
+
+    nxt_status_histogram_t  queue_time;
+    nxt_status_histogram_t  app_time;
+    nxt_status_histogram_t  ipc_time;
+
+    nxt_status_counters_t   counters;
 } nxt_status_app_t;
 
 
 typedef struct {
-    uint64_t          accepted_conns;
-    uint64_t          idle_conns;
-    uint64_t          closed_conns;
-    uint64_t          requests;
+    uint64_t             accepted_conns;
+    uint64_t             idle_conns;
+    uint64_t             closed_conns;
+    uint64_t             requests;
+
+    uint64_t             keepalive_hits;
+    uint64_t             keepalive_misses;
+    uint64_t             keepalive_idle;
+
+    uint64_t             static_hits;
+    uint64_t             static_misses;
+    uint64_t             static_open;
+
+    uint64_t             cache_hits;
+    uint64_t             cache_misses;
+    uint64_t             cache_bytes;
+
+    uint64_t             route_memo_hits;
+    uint64_t             route_memo_misses;
+
+    uint64_t             tls_full;
+    uint64_t             tls_resumed;
+    uint64_t             tls_sessions;
+
+    size_t               listeners_count;
+    nxt_status_entry_t   *listeners;
+    size_t               routes_count;
+    nxt_status_entry_t   *routes;
 
-    size_t            apps_count;
-    nxt_status_app_t  apps[];
+    size_t               apps_count;
+    nxt_status_app_t     apps[];
 } nxt_status_report_t;
 
 
+void nxt_status_histogram_add(nxt_status_histogram_t *h, uint64_t usec);
+void nxt_status_counters_add(nxt_status_counters_t *c, nxt_uint_t status,
+    nxt_off_t received, nxt_off_t sent, uint64_t usec);
+void nxt_status_counters_sum(nxt_status_counters_t *dst,
+    nxt_status_counters_t *src);
 nxt_conf_value_t *nxt_status_get(nxt_status_report_t *report, nxt_mp_t *mp);
+nxt_buf_t *nxt_status_metrics(nxt_status_report_t *report, nxt_mp_t *mp);
 
 
 #endif /* _NXT_STATUS_H_INCLUDED_ */
@@ -256,6 +256,49 @@ nxt_monotonic_time(nxt_monotonic_time_t *now)
 #endif
 
 
+/*
+ * Precise monotonic time to measure short intervals.  The monotonic time
+ * above is cached once per event loop iteration and may have the kernel
+ * jiffy precision.
+ */
+
+#if (NXT_HAVE_CLOCK_MONOTONIC)
+
+nxt_nsec_t
+nxt_precise_time(void)
+{
+    struct timespec  ts;
+
+    (void) clock_gettime(CLOCK_MONOTONIC, &ts);
+
+    return (nxt_nsec_t) ts.tv_sec * 1000000000 + ts.tv_nsec;
+}
+
+
+#elif (NXT_MACOSX)
+
+nxt_nsec_t
+nxt_precise_time(void)
+{
+    return mach_absolute_time();
+}
+
+
+#else
+
+nxt_nsec_t
+nxt_precise_time(void)
+{
+    struct timeval  tv;
+
+    (void) gettimeofday(&tv, NULL);
+
+    return (nxt_nsec_t) tv.tv_sec * 1000000000 + tv.tv_usec * 1000;
+}
+
+#endif
+
+
 /* Local time. */
 
 #if (NXT_HAVE_LOCALTIME_R)
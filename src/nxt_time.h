@@ -37,6 +37,7 @@ typedef struct {
 
 NXT_EXPORT void nxt_realtime(nxt_realtime_t *now);
 NXT_EXPORT void nxt_monotonic_time(nxt_monotonic_time_t *now);
+NXT_EXPORT nxt_nsec_t nxt_precise_time(void);
 NXT_EXPORT void nxt_localtime(nxt_time_t s, struct tm *tm);
 NXT_EXPORT void nxt_timezone_update(void);
 
@@ -87,6 +87,11 @@ struct nxt_tls_init_s {
     nxt_time_t                    timeout;
     nxt_conf_value_t              *conf_cmds;
     nxt_conf_value_t              *tickets_conf;
+    nxt_conf_value_t              *ocsp_conf;
+    nxt_bool_t                    shared_cache;
+    nxt_bool_t                    ktls;
+    nxt_bool_t                    http2;
+    nxt_str_t                     name;
 
     nxt_tls_conf_t                *conf;
 };
@@ -98,6 +103,7 @@ extern const nxt_tls_lib_t        nxt_openssl_lib;
 void nxt_cdecl nxt_openssl_log_error(nxt_task_t *task, nxt_uint_t level,
     const char *fmt, ...);
 u_char *nxt_openssl_copy_error(u_char *p, u_char *end);
+nxt_uint_t nxt_openssl_session_cache_count(void);
 #endif
 
 #if (NXT_HAVE_GNUTLS)
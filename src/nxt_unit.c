@@ -20,8 +20,9 @@
 #include <linux/memfd.h>
 #endif
 
-#define NXT_UNIT_MAX_PLAIN_SIZE  1024
-#define NXT_UNIT_LOCAL_BUF_SIZE  \
+#define NXT_UNIT_MAX_PLAIN_SIZE    1024
+#define NXT_UNIT_PLAIN_SIZE_LIMIT  (8 * 1024)
+#define NXT_UNIT_LOCAL_BUF_SIZE    \
     (NXT_UNIT_MAX_PLAIN_SIZE + sizeof(nxt_port_msg_t))
 
 enum {
@@ -109,6 +110,7 @@ static nxt_port_mmap_header_t *nxt_unit_new_mmap(nxt_unit_ctx_t *ctx,
 static int nxt_unit_shm_open(nxt_unit_ctx_t *ctx, size_t size);
 static int nxt_unit_send_mmap(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
     int fd);
+static uint32_t nxt_unit_plain_size(nxt_unit_impl_t *lib, uint32_t size);
 static int nxt_unit_get_outgoing_buf(nxt_unit_ctx_t *ctx,
     nxt_unit_port_t *port, uint32_t size,
     uint32_t min_size, nxt_unit_mmap_buf_t *mmap_buf, char *local_buf);
@@ -298,6 +300,10 @@ struct nxt_unit_ctx_impl_s {
 
     nxt_unit_mmap_buf_t           *free_buf;
 
+    /*  per-thread outgoing shared memory allocation cache */
+    nxt_port_mmap_header_t        *mmap_hdr;
+    nxt_chunk_id_t                mmap_chunk;
+
     /*  of nxt_unit_request_info_impl_t */
     nxt_queue_t                   free_req;
 
@@ -359,6 +365,9 @@ struct nxt_unit_impl_s {
     uint32_t                 shm_mmap_limit;
     uint32_t                 request_limit;
 
+    /* Moving average of outgoing buffer sizes, see nxt_unit_plain_size(). */
+    nxt_atomic_int_t         outgoing_size_avg;
+
     pthread_mutex_t          mutex;
 
     nxt_lvlhsh_t             processes;        /* of nxt_unit_process_t */
@@ -616,6 +625,7 @@ nxt_unit_create(nxt_unit_init_t *init)
     lib->shm_mmap_limit = (init->shm_limit + PORT_MMAP_DATA_SIZE - 1)
                             / PORT_MMAP_DATA_SIZE;
     lib->request_limit = init->request_limit;
+    lib->outgoing_size_avg = 0;
 
     lib->processes.slot = NULL;
     lib->ports.slot = NULL;
@@ -703,6 +713,9 @@ nxt_unit_ctx_init(nxt_unit_impl_t *lib, nxt_unit_ctx_impl_t *ctx_impl,
     nxt_queue_init(&ctx_impl->pending_rbuf);
     nxt_queue_init(&ctx_impl->free_rbuf);
 
+    ctx_impl->mmap_hdr = NULL;
+    ctx_impl->mmap_chunk = 0;
+
     ctx_impl->free_buf = NULL;
     nxt_unit_mmap_buf_insert(&ctx_impl->free_buf, &ctx_impl->ctx_buf[1]);
     nxt_unit_mmap_buf_insert(&ctx_impl->free_buf, &ctx_impl->ctx_buf[0]);
@@ -3491,13 +3504,43 @@ static nxt_port_mmap_header_t *
 nxt_unit_mmap_get(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
     nxt_chunk_id_t *c, int *n, int min_n)
 {
-    int                     res, nchunks, i;
+    int                     res, nchunks;
     uint32_t                outgoing_size;
     nxt_unit_mmap_t         *mm, *mm_end;
     nxt_unit_impl_t         *lib;
+    nxt_unit_ctx_impl_t     *ctx_impl;
     nxt_port_mmap_header_t  *hdr;
 
     lib = nxt_container_of(ctx->unit, nxt_unit_impl_t, unit);
+    ctx_impl = nxt_container_of(ctx, nxt_unit_ctx_impl_t, ctx);
+
+    /*
+     * Fast path: try the segment this context allocated from last time,
+     * starting right after the previous allocation.  Chunks are claimed
+     * atomically and outgoing segments are unmapped only when the library
+     * is destroyed, so the mmaps mutex is not required here.
+     */
+
+    hdr = ctx_impl->mmap_hdr;
+
+    if (hdr != NULL && hdr->sent_over == 0xFFFFu) {
+        *c = ctx_impl->mmap_chunk;
+
+        nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, c, *n, min_n);
+
+        if (nchunks == 0 && ctx_impl->mmap_chunk != 0) {
+            *c = 0;
+
+            nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, c, *n,
+                                                    min_n);
+        }
+
+        if (nchunks != 0) {
+            *n = nchunks;
+
+            goto done;
+        }
+    }
 
     pthread_mutex_lock(&lib->outgoing.mutex);
 
@@ -3519,37 +3562,12 @@ nxt_unit_mmap_get(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
 
         *c = 0;
 
-        while (nxt_port_mmap_get_free_chunk(hdr->free_map, c)) {
-            nchunks = 1;
+        nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, c, *n, min_n);
 
-            while (nchunks < *n) {
-                res = nxt_port_mmap_chk_set_chunk_busy(hdr->free_map,
-                                                       *c + nchunks);
+        if (nchunks != 0) {
+            *n = nchunks;
 
-                if (res == 0) {
-                    if (nchunks >= min_n) {
-                        *n = nchunks;
-
-                        goto unlock;
-                    }
-
-                    for (i = 0; i < nchunks; i++) {
-                        nxt_port_mmap_set_chunk_free(hdr->free_map, *c + i);
-                    }
-
-                    *c += nchunks + 1;
-                    nchunks = 0;
-                    break;
-                }
-
-                nchunks++;
-            }
-
-            if (nchunks >= min_n) {
-                *n = nchunks;
-
-                goto unlock;
-            }
+            goto unlock;
         }
 
         hdr->oosm = 1;
@@ -3602,13 +3620,22 @@ nxt_unit_mmap_get(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
 
 unlock:
 
+    pthread_mutex_unlock(&lib->outgoing.mutex);
+
+    if (nxt_slow_path(hdr == NULL)) {
+        return NULL;
+    }
+
+done:
+
+    ctx_impl->mmap_hdr = hdr;
+    ctx_impl->mmap_chunk = *c + *n;
+
     nxt_atomic_fetch_add(&lib->outgoing.allocated_chunks, *n);
 
     nxt_unit_debug(ctx, "allocated_chunks %d",
                    (int) lib->outgoing.allocated_chunks);
 
-    pthread_mutex_unlock(&lib->outgoing.mutex);
-
     return hdr;
 }
 
@@ -3926,6 +3953,42 @@ nxt_unit_send_mmap(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port, int fd)
 }
 
 
+/*
+ * Returns the largest buffer size that is sent as a plain port message
+ * rather than in shared memory.  Shared memory is allocated in chunks of
+ * PORT_MMAP_CHUNK_SIZE and each chunk has to be acknowledged by the router,
+ * which is wasteful when most of the messages are small.  So when the
+ * moving average of requested sizes is small, or the shared memory limit
+ * is nearly exhausted, messages up to NXT_UNIT_PLAIN_SIZE_LIMIT are copied
+ * through the socket instead.  Concurrent updates of the average may be
+ * lost; this only makes it slightly less precise.
+ */
+
+static uint32_t
+nxt_unit_plain_size(nxt_unit_impl_t *lib, uint32_t size)
+{
+    nxt_atomic_int_t  avg, allocated;
+
+    avg = lib->outgoing_size_avg;
+    avg += ((nxt_atomic_int_t) size - avg) / 8;
+    lib->outgoing_size_avg = avg;
+
+    allocated = lib->outgoing.allocated_chunks;
+
+    if (allocated * 4
+        >= (nxt_atomic_int_t) lib->shm_mmap_limit * PORT_MMAP_CHUNK_COUNT * 3)
+    {
+        return NXT_UNIT_PLAIN_SIZE_LIMIT;
+    }
+
+    if (avg <= NXT_UNIT_PLAIN_SIZE_LIMIT / 2) {
+        return NXT_UNIT_PLAIN_SIZE_LIMIT;
+    }
+
+    return NXT_UNIT_MAX_PLAIN_SIZE;
+}
+
+
 static int
 nxt_unit_get_outgoing_buf(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
     uint32_t size, uint32_t min_size,
@@ -3933,10 +3996,13 @@ nxt_unit_get_outgoing_buf(nxt_unit_ctx_t *ctx, nxt_unit_port_t *port,
 {
     int                     nchunks, min_nchunks;
     nxt_chunk_id_t          c;
+    nxt_unit_impl_t         *lib;
     nxt_port_mmap_header_t  *hdr;
 
-    if (size <= NXT_UNIT_MAX_PLAIN_SIZE) {
-        if (local_buf != NULL) {
+    lib = nxt_container_of(ctx->unit, nxt_unit_impl_t, unit);
+
+    if (size <= nxt_unit_plain_size(lib, size)) {
+        if (local_buf != NULL && size <= NXT_UNIT_MAX_PLAIN_SIZE) {
             mmap_buf->free_ptr = NULL;
             mmap_buf->plain_ptr = local_buf;
 
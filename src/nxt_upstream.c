@@ -13,6 +13,21 @@ static nxt_http_action_t *nxt_upstream_handler(nxt_task_t *task,
     nxt_http_request_t *r, nxt_http_action_t *action);
 
 
+static nxt_conf_map_t  nxt_upstream_keepalive_conf[] = {
+    {
+        nxt_string("connections"),
+        NXT_CONF_MAP_INT32,
+        offsetof(nxt_upstream_keepalive_t, connections),
+    },
+
+    {
+        nxt_string("idle_timeout"),
+        NXT_CONF_MAP_MSEC,
+        offsetof(nxt_upstream_keepalive_t, idle_timeout),
+    },
+};
+
+
 nxt_int_t
 nxt_upstreams_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_conf_value_t *conf)
@@ -23,9 +38,10 @@ nxt_upstreams_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_int_t         ret;
     nxt_str_t         name, *string;
     nxt_upstreams_t   *upstreams;
-    nxt_conf_value_t  *upstreams_conf, *upcf;
+    nxt_conf_value_t  *upstreams_conf, *upcf, *kacf;
 
     static nxt_str_t  upstreams_name = nxt_string("upstreams");
+    static nxt_str_t  keepalive_name = nxt_string("keepalive");
 
     upstreams_conf = nxt_conf_get_object_member(conf, &upstreams_name, NULL);
 
@@ -63,6 +79,14 @@ nxt_upstreams_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
         if (nxt_slow_path(ret != NXT_OK)) {
             return NXT_ERROR;
         }
+
+        kacf = nxt_conf_get_object_member(upcf, &keepalive_name, NULL);
+
+        ret = nxt_upstream_keepalive_create(mp, kacf,
+                                            &upstreams->upstream[i].keepalive);
+        if (nxt_slow_path(ret != NXT_OK)) {
+            return NXT_ERROR;
+        }
     }
 
     tmcf->router_conf->upstreams = upstreams;
@@ -71,6 +95,51 @@ nxt_upstreams_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 }
 
 
+nxt_int_t
+nxt_upstream_keepalive_create(nxt_mp_t *mp, nxt_conf_value_t *conf,
+    nxt_upstream_keepalive_t **keepalive)
+{
+    nxt_int_t                 ret;
+    nxt_upstream_keepalive_t  *ka;
+
+    if (conf == NULL) {
+        *keepalive = NULL;
+        return NXT_OK;
+    }
+
+    ka = nxt_mp_alloc(mp, sizeof(nxt_upstream_keepalive_t));
+    if (nxt_slow_path(ka == NULL)) {
+        return NXT_ERROR;
+    }
+
+    ka->connections = 16;
+    ka->idle_timeout = 60 * 1000;
+
+    ret = nxt_conf_map_object(mp, conf, nxt_upstream_keepalive_conf,
+                              nxt_nitems(nxt_upstream_keepalive_conf), ka);
+    if (nxt_slow_path(ret != NXT_OK)) {
+        return NXT_ERROR;
+    }
+
+    *keepalive = ka;
+
+    return NXT_OK;
+}
+
+
+void
+nxt_upstream_server_free(nxt_task_t *task, nxt_upstream_server_t *us)
+{
+    const nxt_upstream_server_proto_t  *proto;
+
+    proto = us->upstream->proto;
+
+    if (proto->free != NULL) {
+        proto->free(task, us);
+    }
+}
+
+
 nxt_int_t
 nxt_upstream_find(nxt_upstreams_t *upstreams, nxt_str_t *name,
     nxt_http_action_t *action)
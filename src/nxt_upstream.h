@@ -30,14 +30,24 @@ typedef nxt_upstream_t *(*nxt_upstream_joint_create_t)(
     nxt_router_temp_conf_t *tmcf, nxt_upstream_t *upstream);
 typedef void (*nxt_upstream_server_get_t)(nxt_task_t *task,
     nxt_upstream_server_t *us);
+typedef void (*nxt_upstream_server_free_t)(nxt_task_t *task,
+    nxt_upstream_server_t *us);
 
 
 typedef struct {
     nxt_upstream_joint_create_t                joint_create;
     nxt_upstream_server_get_t                  get;
+    nxt_upstream_server_free_t                 free;
 } nxt_upstream_server_proto_t;
 
 
+typedef struct {
+    /* The maximum number of idle connections per server and engine. */
+    uint32_t                                   connections;
+    nxt_msec_t                                 idle_timeout;
+} nxt_upstream_keepalive_t;
+
+
 struct nxt_upstream_s {
     const nxt_upstream_server_proto_t          *proto;
 
@@ -46,6 +56,8 @@ struct nxt_upstream_s {
         nxt_upstream_round_robin_t             *round_robin;
     } type;
 
+    nxt_upstream_keepalive_t                   *keepalive;
+
     nxt_str_t                                  name;
 };
 
@@ -60,9 +72,21 @@ struct nxt_upstream_server_s {
     nxt_sockaddr_t                             *sockaddr;
     const nxt_upstream_peer_state_t            *state;
     nxt_upstream_t                             *upstream;
+    nxt_mp_t                                   *mem_pool;
 
     uint8_t                                    protocol;
 
+    /* The request start time and the response header receipt time. */
+    nxt_nsec_t                                 start;
+    nxt_nsec_t                                 response;
+
+    /* Servers already tried by the request, a bit per server. */
+    uint8_t                                    *tried;
+    uint32_t                                   tries;
+
+    uint8_t                                    failed;  /* 1 bit */
+    uint8_t                                    probe;   /* 1 bit */
+
     union {
         nxt_upstream_round_robin_server_t      *round_robin;
     } server;
@@ -73,6 +97,9 @@ struct nxt_upstream_server_s {
 };
 
 
+void nxt_upstream_server_free(nxt_task_t *task, nxt_upstream_server_t *us);
+nxt_int_t nxt_upstream_keepalive_create(nxt_mp_t *mp, nxt_conf_value_t *conf,
+    nxt_upstream_keepalive_t **keepalive);
 nxt_int_t nxt_upstream_round_robin_create(nxt_task_t *task,
     nxt_router_temp_conf_t *tmcf, nxt_conf_value_t *upstream_conf,
     nxt_upstream_t *upstream);
@@ -10,6 +10,47 @@
 #include <nxt_upstream.h>
 
 
+/*
+ * Besides the smooth weighted round robin, the "least_conn" and "peak_ewma"
+ * methods are supported.  The former selects a server with the least
+ * number of active requests relative to its weight.  The latter selects
+ * a server with the least product of the active requests number and
+ * the exponentially weighted moving average of the response time.  The
+ * average follows growing response times immediately, while it decays
+ * with the NXT_UPSTREAM_EWMA_DECAY time constant otherwise.  Servers with
+ * equal costs are selected in the weighted round robin order.
+ *
+ * The statistics are shared by all engines, the counters are updated
+ * atomically, while the averages may lose a concurrent update.
+ *
+ * Failures are tracked passively: a server that fails "max_fails" times
+ * within "fail_timeout" is not selected for "fail_timeout".  Then a single
+ * probe request is sent to it; the probe is claimed atomically, so only
+ * one engine sends it.  A success restores the server, a failure disables
+ * it again.  If all servers are disabled, requests fail at once.
+ * A single server of an upstream is never disabled.
+ */
+
+
+#define NXT_UPSTREAM_EWMA_DECAY    10000000  /* 10s in microseconds. */
+#define NXT_UPSTREAM_EWMA_PENALTY  1000000   /* 1s in microseconds. */
+
+
+typedef struct {
+    nxt_atomic_t                       conns;
+    nxt_atomic_t                       ewma;   /* In microseconds. */
+    nxt_atomic_t                       stamp;  /* In microseconds. */
+
+    nxt_atomic_t                       fails;
+    nxt_atomic_t                       failed;  /* In milliseconds. */
+    nxt_atomic_t                       probe;
+} nxt_upstream_round_robin_stats_t;
+
+
+typedef double (*nxt_upstream_round_robin_cost_t)(
+    nxt_upstream_round_robin_server_t *s, nxt_nsec_t now);
+
+
 struct nxt_upstream_round_robin_server_s {
     nxt_sockaddr_t                     *sockaddr;
 
@@ -18,6 +59,11 @@ struct nxt_upstream_round_robin_server_s {
     int32_t                            weight;
 
     uint8_t                            protocol;
+
+    uint32_t                           max_fails;
+    nxt_msec_t                         fail_timeout;
+
+    nxt_upstream_round_robin_stats_t   *stats;
 };
 
 
@@ -31,11 +77,45 @@ static nxt_upstream_t *nxt_upstream_round_robin_joint_create(
     nxt_router_temp_conf_t *tmcf, nxt_upstream_t *upstream);
 static void nxt_upstream_round_robin_server_get(nxt_task_t *task,
     nxt_upstream_server_t *us);
+static nxt_bool_t nxt_upstream_round_robin_available(
+    nxt_upstream_round_robin_t *round_robin, uint32_t i,
+    nxt_upstream_server_t *us);
+static void nxt_upstream_round_robin_select(nxt_task_t *task,
+    nxt_upstream_server_t *us, nxt_upstream_round_robin_server_t *best);
+static void nxt_upstream_round_robin_server_free(nxt_task_t *task,
+    nxt_upstream_server_t *us);
+static void nxt_upstream_least_conn_server_get(nxt_task_t *task,
+    nxt_upstream_server_t *us);
+static void nxt_upstream_peak_ewma_server_get(nxt_task_t *task,
+    nxt_upstream_server_t *us);
+static void nxt_upstream_round_robin_cost_server_get(nxt_task_t *task,
+    nxt_upstream_server_t *us, nxt_upstream_round_robin_cost_t cost);
+static double nxt_upstream_least_conn_cost(nxt_upstream_round_robin_server_t *s,
+    nxt_nsec_t now);
+static double nxt_upstream_peak_ewma_cost(nxt_upstream_round_robin_server_t *s,
+    nxt_nsec_t now);
+static void nxt_upstream_peak_ewma_server_free(nxt_task_t *task,
+    nxt_upstream_server_t *us);
 
 
 static const nxt_upstream_server_proto_t  nxt_upstream_round_robin_proto = {
     .joint_create = nxt_upstream_round_robin_joint_create,
     .get          = nxt_upstream_round_robin_server_get,
+    .free         = nxt_upstream_round_robin_server_free,
+};
+
+
+static const nxt_upstream_server_proto_t  nxt_upstream_least_conn_proto = {
+    .joint_create = nxt_upstream_round_robin_joint_create,
+    .get          = nxt_upstream_least_conn_server_get,
+    .free         = nxt_upstream_round_robin_server_free,
+};
+
+
+static const nxt_upstream_server_proto_t  nxt_upstream_peak_ewma_proto = {
+    .joint_create = nxt_upstream_round_robin_joint_create,
+    .get          = nxt_upstream_peak_ewma_server_get,
+    .free         = nxt_upstream_peak_ewma_server_free,
 };
 
 
@@ -43,20 +123,43 @@ nxt_int_t
 nxt_upstream_round_robin_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
     nxt_conf_value_t *upstream_conf, nxt_upstream_t *upstream)
 {
-    double                      total, k, w;
-    size_t                      size;
-    uint32_t                    i, n, next, wt;
-    nxt_mp_t                    *mp;
-    nxt_str_t                   name;
-    nxt_sockaddr_t              *sa;
-    nxt_conf_value_t            *servers_conf, *srvcf, *wtcf;
-    nxt_upstream_round_robin_t  *urr;
+    double                             total, k, w;
+    size_t                             size;
+    uint32_t                           i, n, next, wt;
+    nxt_mp_t                           *mp;
+    nxt_str_t                          name;
+    nxt_sockaddr_t                     *sa;
+    nxt_conf_value_t                   *servers_conf, *srvcf, *wtcf, *mtcf;
+    nxt_conf_value_t                   *value;
+    nxt_upstream_round_robin_t         *urr;
+    nxt_upstream_round_robin_stats_t   *stats;
+    const nxt_upstream_server_proto_t  *proto;
 
     static nxt_str_t  servers = nxt_string("servers");
     static nxt_str_t  weight = nxt_string("weight");
+    static nxt_str_t  max_fails = nxt_string("max_fails");
+    static nxt_str_t  fail_timeout = nxt_string("fail_timeout");
+    static nxt_str_t  method = nxt_string("method");
+    static nxt_str_t  least_conn = nxt_string("least_conn");
+    static nxt_str_t  peak_ewma = nxt_string("peak_ewma");
 
     mp = tmcf->router_conf->mem_pool;
 
+    proto = &nxt_upstream_round_robin_proto;
+
+    mtcf = nxt_conf_get_object_member(upstream_conf, &method, NULL);
+
+    if (mtcf != NULL) {
+        nxt_conf_get_string(mtcf, &name);
+
+        if (nxt_strstr_eq(&name, &least_conn)) {
+            proto = &nxt_upstream_least_conn_proto;
+
+        } else if (nxt_strstr_eq(&name, &peak_ewma)) {
+            proto = &nxt_upstream_peak_ewma_proto;
+        }
+    }
+
     servers_conf = nxt_conf_get_object_member(upstream_conf, &servers, NULL);
     n = nxt_conf_object_members_count(servers_conf);
 
@@ -110,9 +213,31 @@ nxt_upstream_round_robin_create(nxt_task_t *task, nxt_router_temp_conf_t *tmcf,
 
         urr->server[i].weight = wt;
         urr->server[i].effective_weight = wt;
+
+        value = nxt_conf_get_object_member(srvcf, &max_fails, NULL);
+        urr->server[i].max_fails = (value != NULL)
+                                   ? nxt_conf_get_number(value) : 1;
+
+        value = nxt_conf_get_object_member(srvcf, &fail_timeout, NULL);
+        urr->server[i].fail_timeout = (value != NULL)
+                                      ? nxt_conf_get_number(value) * 1000
+                                      : 10000;
+
+        if (n == 1) {
+            urr->server[i].max_fails = 0;
+        }
+
+        /* The statistics are padded to a cache line. */
+
+        stats = nxt_mp_zalign(mp, 64, nxt_align_size(sizeof(*stats), 64));
+        if (nxt_slow_path(stats == NULL)) {
+            return NXT_ERROR;
+        }
+
+        urr->server[i].stats = stats;
     }
 
-    upstream->proto = &nxt_upstream_round_robin_proto;
+    upstream->proto = proto;
     upstream->type.round_robin = urr;
 
     return NXT_OK;
@@ -177,8 +302,17 @@ nxt_upstream_round_robin_server_get(nxt_task_t *task, nxt_upstream_server_t *us)
     s = round_robin->server;
     n = round_robin->items;
 
+    if (us->tries++ == n) {
+        us->state->error(task, us);
+        return;
+    }
+
     for (i = 0; i < n; i++) {
 
+        if (!nxt_upstream_round_robin_available(round_robin, i, us)) {
+            continue;
+        }
+
         s[i].current_weight += s[i].effective_weight;
         total += s[i].effective_weight;
 
@@ -197,9 +331,323 @@ nxt_upstream_round_robin_server_get(nxt_task_t *task, nxt_upstream_server_t *us)
     }
 
     best->current_weight -= total;
+
+    nxt_upstream_round_robin_select(task, us, best);
+}
+
+
+static nxt_bool_t
+nxt_upstream_round_robin_available(nxt_upstream_round_robin_t *round_robin,
+    uint32_t i, nxt_upstream_server_t *us)
+{
+    nxt_msec_t                         now;
+    nxt_upstream_round_robin_stats_t   *stats;
+    nxt_upstream_round_robin_server_t  *s;
+
+    if (us->tried != NULL && (us->tried[i / 8] & (1 << (i % 8))) != 0) {
+        return 0;
+    }
+
+    s = &round_robin->server[i];
+    stats = s->stats;
+
+    if (s->max_fails == 0 || stats->fails < s->max_fails) {
+        return 1;
+    }
+
+    /* The server is disabled, a probe request is allowed after timeout. */
+
+    now = us->start / 1000000;
+
+    return (stats->probe == 0
+            && nxt_msec_diff(now, stats->failed)
+               >= (nxt_msec_int_t) s->fail_timeout);
+}
+
+
+static void
+nxt_upstream_round_robin_select(nxt_task_t *task, nxt_upstream_server_t *us,
+    nxt_upstream_round_robin_server_t *best)
+{
+    uint32_t                          i, n;
+    nxt_upstream_round_robin_t        *round_robin;
+    nxt_upstream_round_robin_stats_t  *stats;
+
+    round_robin = us->upstream->type.round_robin;
+    n = round_robin->items;
+
+    if (us->tried == NULL) {
+        us->tried = nxt_mp_zget(us->mem_pool, (n + 7) / 8);
+        if (nxt_slow_path(us->tried == NULL)) {
+            us->state->error(task, us);
+            return;
+        }
+    }
+
+    i = best - round_robin->server;
+    us->tried[i / 8] |= 1 << (i % 8);
+
+    stats = best->stats;
+
+    if (best->max_fails != 0 && stats->fails >= best->max_fails) {
+
+        if (!nxt_atomic_try_lock(&stats->probe)) {
+            /* Another engine has claimed the probe, select again. */
+            us->tries--;
+            us->upstream->proto->get(task, us);
+            return;
+        }
+
+        nxt_debug(task, "upstream server probe");
+
+        us->probe = 1;
+    }
+
+    (void) nxt_atomic_fetch_add(&stats->conns, 1);
+
     us->sockaddr = best->sockaddr;
     us->protocol = best->protocol;
     us->server.round_robin = best;
 
     us->state->ready(task, us);
 }
+
+
+static void
+nxt_upstream_round_robin_server_free(nxt_task_t *task,
+    nxt_upstream_server_t *us)
+{
+    nxt_msec_t                         now;
+    nxt_atomic_uint_t                  fails, failed;
+    nxt_upstream_round_robin_stats_t   *stats;
+    nxt_upstream_round_robin_server_t  *s;
+
+    s = us->server.round_robin;
+
+    if (s == NULL) {
+        return;
+    }
+
+    us->server.round_robin = NULL;
+
+    stats = s->stats;
+
+    (void) nxt_atomic_fetch_add(&stats->conns, -1);
+
+    if (s->max_fails != 0) {
+
+        if (!us->failed) {
+            if (stats->fails != 0) {
+                (void) nxt_atomic_xchg(&stats->fails, 0);
+            }
+
+        } else {
+            now = nxt_thread_monotonic_time(task->thread) / 1000000;
+
+            if (!us->probe) {
+                failed = stats->failed;
+
+                /* Only one engine restarts the count of an expired window. */
+
+                if (nxt_msec_diff(now, failed)
+                    >= (nxt_msec_int_t) s->fail_timeout
+                    && nxt_atomic_cmp_set(&stats->failed, failed, now))
+                {
+                    (void) nxt_atomic_xchg(&stats->fails, 0);
+                }
+
+                fails = nxt_atomic_fetch_add(&stats->fails, 1) + 1;
+
+                if (fails == s->max_fails) {
+                    nxt_log(task, NXT_LOG_WARN,
+                            "upstream server %*s is disabled for %M ms",
+                            (size_t) s->sockaddr->length,
+                            nxt_sockaddr_start(s->sockaddr), s->fail_timeout);
+                }
+            }
+
+            (void) nxt_atomic_xchg(&stats->failed, now);
+        }
+    }
+
+    if (us->probe) {
+        us->probe = 0;
+        nxt_atomic_release(&stats->probe);
+    }
+}
+
+
+static void
+nxt_upstream_least_conn_server_get(nxt_task_t *task, nxt_upstream_server_t *us)
+{
+    nxt_upstream_round_robin_cost_server_get(task, us,
+                                             nxt_upstream_least_conn_cost);
+}
+
+
+static void
+nxt_upstream_peak_ewma_server_get(nxt_task_t *task, nxt_upstream_server_t *us)
+{
+    nxt_upstream_round_robin_cost_server_get(task, us,
+                                             nxt_upstream_peak_ewma_cost);
+}
+
+
+static void
+nxt_upstream_round_robin_cost_server_get(nxt_task_t *task,
+    nxt_upstream_server_t *us, nxt_upstream_round_robin_cost_t cost)
+{
+    double                             c, min;
+    int32_t                            total;
+    uint32_t                           i, n;
+    nxt_bool_t                         many;
+    nxt_upstream_round_robin_t         *round_robin;
+    nxt_upstream_round_robin_server_t  *s, *best, *next;
+
+    best = NULL;
+    many = 0;
+    min = 0;
+
+    round_robin = us->upstream->type.round_robin;
+
+    s = round_robin->server;
+    n = round_robin->items;
+
+    if (us->tries++ == n) {
+        us->state->error(task, us);
+        return;
+    }
+
+    for (i = 0; i < n; i++) {
+
+        if (s[i].weight == 0
+            || !nxt_upstream_round_robin_available(round_robin, i, us))
+        {
+            continue;
+        }
+
+        c = cost(&s[i], us->start);
+
+        if (best == NULL || c < min) {
+            best = &s[i];
+            min = c;
+            many = 0;
+
+        } else if (c == min) {
+            many = 1;
+        }
+    }
+
+    if (best == NULL) {
+        us->state->error(task, us);
+        return;
+    }
+
+    if (many) {
+        next = NULL;
+        total = 0;
+
+        for (i = best - s; i < n; i++) {
+
+            if (s[i].weight == 0
+                || !nxt_upstream_round_robin_available(round_robin, i, us)
+                || cost(&s[i], us->start) != min)
+            {
+                continue;
+            }
+
+            s[i].current_weight += s[i].weight;
+            total += s[i].weight;
+
+            if (next == NULL || s[i].current_weight > next->current_weight) {
+                next = &s[i];
+            }
+        }
+
+        if (next != NULL) {
+            next->current_weight -= total;
+            best = next;
+        }
+    }
+
+    nxt_upstream_round_robin_select(task, us, best);
+}
+
+
+static double
+nxt_upstream_least_conn_cost(nxt_upstream_round_robin_server_t *s,
+    nxt_nsec_t now)
+{
+    return (double) s->stats->conns / s->weight;
+}
+
+
+static double
+nxt_upstream_peak_ewma_cost(nxt_upstream_round_robin_server_t *s,
+    nxt_nsec_t now)
+{
+    double                            ewma;
+    nxt_atomic_int_t                  elapsed;
+    nxt_atomic_uint_t                 conns;
+    nxt_upstream_round_robin_stats_t  *stats;
+
+    stats = s->stats;
+    conns = stats->conns;
+    ewma = stats->ewma;
+
+    if (ewma == 0) {
+        /* A server without responses yet is penalized while busy. */
+        ewma = (conns != 0) ? NXT_UPSTREAM_EWMA_PENALTY : 0;
+
+    } else {
+        elapsed = now / 1000 - stats->stamp;
+
+        if (elapsed > 0) {
+            ewma *= exp(-(double) elapsed / NXT_UPSTREAM_EWMA_DECAY);
+        }
+    }
+
+    return (ewma + 1) * (conns + 1) / s->weight;
+}
+
+
+static void
+nxt_upstream_peak_ewma_server_free(nxt_task_t *task,
+    nxt_upstream_server_t *us)
+{
+    double                             w;
+    nxt_atomic_int_t                   elapsed;
+    nxt_atomic_uint_t                  rtt, now, ewma;
+    nxt_upstream_round_robin_stats_t   *stats;
+    nxt_upstream_round_robin_server_t  *s;
+
+    s = us->server.round_robin;
+
+    nxt_upstream_round_robin_server_free(task, us);
+
+    if (s == NULL || us->response == 0) {
+        return;
+    }
+
+    stats = s->stats;
+
+    rtt = (us->response - us->start) / 1000;
+    now = us->response / 1000;
+
+    ewma = stats->ewma;
+    elapsed = now - stats->stamp;
+
+    if (rtt >= ewma) {
+        ewma = rtt;
+
+    } else if (elapsed > 0) {
+        w = exp(-(double) elapsed / NXT_UPSTREAM_EWMA_DECAY);
+        ewma = ewma * w + rtt * (1 - w);
+
+    } else {
+        return;
+    }
+
+    stats->ewma = ewma;
+    stats->stamp = now;
+}
@@ -0,0 +1,238 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_main.h>
+#include <nxt_port_memory_int.h>
+#include <inttypes.h>
+
+
+/*
+ * Shared memory chunk allocation micro-benchmark.  Every worker thread
+ * allocates and releases runs of chunks in a single segment, emulating
+ * response buffers in flight.  The "mutex" method scans the free map
+ * from the start under a lock, the way outgoing buffers used to be
+ * allocated; the "lock-free" method claims chunks atomically starting
+ * from a per-thread position, like nxt_unit_mmap_get() does now.
+ */
+
+
+#define NXT_MMAP_TEST_INFLIGHT  16
+
+
+typedef struct {
+    nxt_port_mmap_header_t  *hdr;
+    nxt_thread_mutex_t      mutex;
+    nxt_bool_t              lock;
+    nxt_uint_t              nops;
+} nxt_mmap_test_t;
+
+
+typedef struct {
+    nxt_mmap_test_t         *test;
+    nxt_uint_t              id;
+    uint64_t                allocs;
+    uint64_t                fails;
+} nxt_mmap_test_worker_t;
+
+
+static void *
+nxt_mmap_test_worker(void *data)
+{
+    nxt_int_t               n, nchunks, i;
+    nxt_uint_t              k, slot;
+    nxt_chunk_id_t          c, hint;
+    nxt_mmap_test_t         *test;
+    nxt_port_mmap_header_t  *hdr;
+    nxt_mmap_test_worker_t  *w;
+    nxt_chunk_id_t          start[NXT_MMAP_TEST_INFLIGHT];
+    nxt_int_t               size[NXT_MMAP_TEST_INFLIGHT];
+
+    w = data;
+    test = w->test;
+    hdr = test->hdr;
+
+    hint = 0;
+    nxt_memzero(size, sizeof(size));
+
+    for (k = 0; k < test->nops; k++) {
+        slot = k % NXT_MMAP_TEST_INFLIGHT;
+
+        for (i = 0; i < size[slot]; i++) {
+            nxt_port_mmap_set_chunk_free(hdr->free_map, start[slot] + i);
+        }
+
+        size[slot] = 0;
+
+        n = 1 + (k + w->id) % 4;
+
+        if (test->lock) {
+            nxt_thread_mutex_lock(&test->mutex);
+
+            c = 0;
+            nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, &c, n, n);
+
+            nxt_thread_mutex_unlock(&test->mutex);
+
+        } else {
+            c = hint;
+            nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, &c, n, n);
+
+            if (nchunks == 0 && hint != 0) {
+                c = 0;
+                nchunks = nxt_port_mmap_get_free_chunks(hdr->free_map, &c,
+                                                        n, n);
+            }
+
+            hint = c + nchunks;
+        }
+
+        if (nchunks == 0) {
+            w->fails++;
+            continue;
+        }
+
+        start[slot] = c;
+        size[slot] = nchunks;
+
+        w->allocs++;
+    }
+
+    for (slot = 0; slot < NXT_MMAP_TEST_INFLIGHT; slot++) {
+        for (i = 0; i < size[slot]; i++) {
+            nxt_port_mmap_set_chunk_free(hdr->free_map, start[slot] + i);
+        }
+    }
+
+    return NULL;
+}
+
+
+static nxt_int_t
+nxt_mmap_test_run(nxt_mmap_test_t *test, nxt_uint_t nthreads)
+{
+    uint64_t                allocs, fails;
+    nxt_uint_t              i;
+    nxt_nsec_t              start, elapsed;
+    pthread_t               *threads;
+    nxt_mmap_test_worker_t  *workers;
+
+    threads = nxt_malloc(nthreads * sizeof(pthread_t));
+    workers = nxt_zalloc(nthreads * sizeof(nxt_mmap_test_worker_t));
+
+    if (threads == NULL || workers == NULL) {
+        return NXT_ERROR;
+    }
+
+    nxt_thread_time_update(nxt_thread());
+    start = nxt_thread_monotonic_time(nxt_thread());
+
+    for (i = 0; i < nthreads; i++) {
+        workers[i].test = test;
+        workers[i].id = i;
+
+        if (pthread_create(&threads[i], NULL, nxt_mmap_test_worker,
+                           &workers[i]) != 0)
+        {
+            return NXT_ERROR;
+        }
+    }
+
+    allocs = 0;
+    fails = 0;
+
+    for (i = 0; i < nthreads; i++) {
+        pthread_join(threads[i], NULL);
+
+        allocs += workers[i].allocs;
+        fails += workers[i].fails;
+    }
+
+    nxt_thread_time_update(nxt_thread());
+    elapsed = nxt_thread_monotonic_time(nxt_thread()) - start;
+
+    if (elapsed == 0) {
+        elapsed = 1;
+    }
+
+    printf("%-9s threads: %2d  allocs: %10"PRIu64"  fails: %6"PRIu64
+           "  %8.2f Mallocs/sec\n",
+           test->lock ? "mutex" : "lock-free", (int) nthreads, allocs, fails,
+           (double) allocs * 1000 / elapsed);
+
+    for (i = 0; i < MAX_FREE_IDX; i++) {
+        if (test->hdr->free_map[i] != (nxt_free_map_t) -1) {
+            printf("chunks leaked\n");
+            return NXT_ERROR;
+        }
+    }
+
+    nxt_free(threads);
+    nxt_free(workers);
+
+    return NXT_OK;
+}
+
+
+extern char  **environ;
+
+
+int nxt_cdecl
+main(int argc, char **argv)
+{
+    nxt_uint_t       i, max_threads, nthreads;
+    nxt_mmap_test_t  test;
+
+    max_threads = 8;
+    test.nops = 1000000;
+
+    for (i = 1; i < (nxt_uint_t) argc; i++) {
+
+        if (strcmp(argv[i], "-n") == 0 && i + 1 < (nxt_uint_t) argc) {
+            test.nops = atoi(argv[++i]);
+            continue;
+        }
+
+        if (strcmp(argv[i], "-t") == 0 && i + 1 < (nxt_uint_t) argc) {
+            max_threads = atoi(argv[++i]);
+            continue;
+        }
+
+        printf("unknown option %s\n", argv[i]);
+
+        return 1;
+    }
+
+    if (nxt_lib_start("port_mmap_test", argv, &environ) != NXT_OK) {
+        return 1;
+    }
+
+    test.hdr = nxt_zalloc(sizeof(nxt_port_mmap_header_t));
+    if (test.hdr == NULL) {
+        return 1;
+    }
+
+    nxt_memset(test.hdr->free_map, 0xFFU, sizeof(test.hdr->free_map));
+    nxt_port_mmap_set_chunk_busy(test.hdr->free_map, PORT_MMAP_CHUNK_COUNT);
+
+    if (nxt_thread_mutex_create(&test.mutex) != NXT_OK) {
+        return 1;
+    }
+
+    for (nthreads = 1; nthreads <= max_threads; nthreads *= 2) {
+        test.lock = 1;
+
+        if (nxt_mmap_test_run(&test, nthreads) != NXT_OK) {
+            return 1;
+        }
+
+        test.lock = 0;
+
+        if (nxt_mmap_test_run(&test, nthreads) != NXT_OK) {
+            return 1;
+        }
+    }
+
+    return 0;
+}
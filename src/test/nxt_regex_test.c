@@ -0,0 +1,201 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_main.h>
+#include <nxt_regex.h>
+#include "nxt_tests.h"
+
+
+static nxt_regex_t *nxt_regex_test_compile(nxt_thread_t *thr, nxt_mp_t *mp,
+    nxt_str_t *source);
+static nxt_uint_t nxt_regex_test_run(nxt_regex_t **re, nxt_uint_t nre,
+    nxt_regex_match_t *match, nxt_uint_t n);
+
+
+static nxt_str_t  nxt_regex_test_patterns[] = {
+    nxt_string("^/api/v[0-9]+/users/[0-9]+$"),
+    nxt_string("^/api/v[0-9]+/orders/[a-f0-9]{8}$"),
+    nxt_string("^/static/.*\\.(css|js)$"),
+    nxt_string("^/images/.*\\.(png|jpe?g|gif|webp)$"),
+    nxt_string("^/blog/[0-9]{4}/[0-9]{2}/[a-z0-9-]+/?$"),
+    nxt_string("^/(?i)download/.*\\.zip$"),
+    nxt_string("^/admin(/.*)?$"),
+    nxt_string("^/health(z)?$"),
+    nxt_string("^/metrics$"),
+    nxt_string("^/search\\?q=[^&]+"),
+    nxt_string("^/docs/[a-z]+/[a-z0-9_-]+\\.html$"),
+    nxt_string("^/feeds?/(rss|atom)\\.xml$"),
+    nxt_string("^/u/[A-Za-z0-9_]{3,16}$"),
+    nxt_string("^/files/[^/]+/[^/]+$"),
+    nxt_string("^/ws/[a-z]+$"),
+    nxt_string("^/(robots\\.txt|favicon\\.ico|sitemap\\.xml)$"),
+};
+
+
+static nxt_str_t  nxt_regex_test_subjects[] = {
+    nxt_string("/api/v2/users/1234"),
+    nxt_string("/api/v1/orders/deadbeef"),
+    nxt_string("/static/css/main.css"),
+    nxt_string("/images/logo.webp"),
+    nxt_string("/blog/2023/05/some-post/"),
+    nxt_string("/Download/archive.ZIP"),
+    nxt_string("/admin/settings"),
+    nxt_string("/healthz"),
+    nxt_string("/favicon.ico"),
+    nxt_string("/api/v2/users/me"),
+    nxt_string("/static/css/main.scss"),
+    nxt_string("/blog/23/05/post"),
+    nxt_string("/u/ab"),
+    nxt_string("/files/a/b/c"),
+    nxt_string("/products/12345/reviews?page=2"),
+    nxt_string("/"),
+};
+
+
+static nxt_regex_t *
+nxt_regex_test_compile(nxt_thread_t *thr, nxt_mp_t *mp, nxt_str_t *source)
+{
+    nxt_regex_t      *re;
+    nxt_regex_err_t  err;
+
+    re = nxt_regex_compile(mp, source, &err);
+
+    if (re == NULL) {
+        nxt_log_error(NXT_LOG_NOTICE, thr->log,
+                      "regex test failed: \"%V\": %V at %uz",
+                      source, &err.msg, err.offset);
+    }
+
+    return re;
+}
+
+
+static nxt_uint_t
+nxt_regex_test_run(nxt_regex_t **re, nxt_uint_t nre, nxt_regex_match_t *match,
+    nxt_uint_t n)
+{
+    nxt_str_t   *subject;
+    nxt_uint_t  i, j, matched;
+
+    matched = 0;
+
+    for (i = 0; i < n; i++) {
+        subject = &nxt_regex_test_subjects[i
+                                     % nxt_nitems(nxt_regex_test_subjects)];
+
+        for (j = 0; j < nre; j++) {
+            if (nxt_regex_match(re[j], subject->start, subject->length, match))
+            {
+                matched++;
+                break;
+            }
+        }
+    }
+
+    return matched;
+}
+
+
+nxt_int_t
+nxt_regex_test(nxt_thread_t *thr, nxt_uint_t n)
+{
+    u_char             *p;
+    size_t             length;
+    nxt_mp_t           *mp;
+    nxt_str_t          source;
+    nxt_uint_t         i, nre, seq_matched, set_matched;
+    nxt_nsec_t         start, end;
+    nxt_regex_t        **re, *set;
+    nxt_regex_match_t  *match;
+
+    nxt_log_error(NXT_LOG_NOTICE, thr->log, "regex test started: %ui", n);
+
+    mp = nxt_mp_create(1024, 128, 256, 32);
+    if (mp == NULL) {
+        return NXT_ERROR;
+    }
+
+    nre = nxt_nitems(nxt_regex_test_patterns);
+    length = 0;
+
+    re = nxt_mp_get(mp, nre * sizeof(nxt_regex_t *));
+    if (re == NULL) {
+        return NXT_ERROR;
+    }
+
+    for (i = 0; i < nre; i++) {
+        re[i] = nxt_regex_test_compile(thr, mp, &nxt_regex_test_patterns[i]);
+        if (re[i] == NULL) {
+            return NXT_ERROR;
+        }
+
+        length += nxt_length("(?:)|") + nxt_regex_test_patterns[i].length;
+    }
+
+    source.start = nxt_mp_nget(mp, length);
+    if (source.start == NULL) {
+        return NXT_ERROR;
+    }
+
+    p = source.start;
+
+    for (i = 0; i < nre; i++) {
+        if (i != 0) {
+            *p++ = '|';
+        }
+
+        p = nxt_cpymem(p, "(?:", 3);
+        p = nxt_cpymem(p, nxt_regex_test_patterns[i].start,
+                       nxt_regex_test_patterns[i].length);
+        *p++ = ')';
+    }
+
+    source.length = p - source.start;
+
+    set = nxt_regex_test_compile(thr, mp, &source);
+    if (set == NULL) {
+        return NXT_ERROR;
+    }
+
+    match = nxt_regex_match_create(mp, 0);
+    if (match == NULL) {
+        return NXT_ERROR;
+    }
+
+    nxt_thread_time_update(thr);
+    start = nxt_thread_monotonic_time(thr);
+
+    seq_matched = nxt_regex_test_run(re, nre, match, n);
+
+    nxt_thread_time_update(thr);
+    end = nxt_thread_monotonic_time(thr);
+
+    nxt_log_error(NXT_LOG_NOTICE, thr->log,
+                  "regex test sequential: %ui patterns, %0.3fs",
+                  nre, (end - start) / 1000000000.0);
+
+    start = end;
+
+    set_matched = nxt_regex_test_run(&set, 1, match, n);
+
+    nxt_thread_time_update(thr);
+    end = nxt_thread_monotonic_time(thr);
+
+    nxt_log_error(NXT_LOG_NOTICE, thr->log, "regex test set: %0.3fs",
+                  (end - start) / 1000000000.0);
+
+    if (seq_matched != set_matched) {
+        nxt_log_error(NXT_LOG_NOTICE, thr->log,
+                      "regex test failed: %ui sequential matches, "
+                      "%ui set matches", seq_matched, set_matched);
+        return NXT_ERROR;
+    }
+
+    nxt_mp_destroy(mp);
+
+    nxt_log_error(NXT_LOG_NOTICE, thr->log, "regex test passed");
+
+    return NXT_OK;
+}
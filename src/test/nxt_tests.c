@@ -166,6 +166,12 @@ main(int argc, char **argv)
         return 1;
     }
 
+#if (NXT_HAVE_REGEX)
+    if (nxt_regex_test(thr, 100 * 1000) != NXT_OK) {
+        return 1;
+    }
+#endif
+
 #if (NXT_HAVE_CLONE_NEWUSER)
     if (nxt_clone_creds_test(thr) != NXT_OK) {
         return 1;
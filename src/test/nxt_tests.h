@@ -66,6 +66,7 @@ nxt_int_t nxt_http_parse_test(nxt_thread_t *thr);
 nxt_int_t nxt_strverscmp_test(nxt_thread_t *thr);
 nxt_int_t nxt_base64_test(nxt_thread_t *thr);
 nxt_int_t nxt_clone_creds_test(nxt_thread_t *thr);
+nxt_int_t nxt_regex_test(nxt_thread_t *thr, nxt_uint_t n);
 
 
 #endif /* _NXT_TESTS_H_INCLUDED_ */
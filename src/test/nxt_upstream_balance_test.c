@@ -0,0 +1,353 @@
+
+/*
+ * Copyright (C) NGINX, Inc.
+ */
+
+#include <nxt_router.h>
+#include <nxt_http.h>
+#include <nxt_upstream.h>
+#include <math.h>
+
+
+/*
+ * Upstream balancing benchmark.  A discrete event simulation drives
+ * the upstream balancing methods with a Poisson stream of requests.
+ * Every simulated backend serves a fixed number of requests concurrently
+ * and queues the rest; service times are exponentially distributed.
+ * The last backend is slow, the rest are fast.  Response time
+ * percentiles and the share of requests of each backend are reported.
+ */
+
+
+#define NXT_BALANCE_TEST_SERVERS  4
+#define NXT_BALANCE_TEST_WORKERS  4
+
+
+typedef struct {
+    double                 service;  /* Mean service time in milliseconds. */
+    nxt_nsec_t             free[NXT_BALANCE_TEST_WORKERS];
+    nxt_uint_t             requests;
+} nxt_balance_test_server_t;
+
+
+typedef struct {
+    nxt_balance_test_server_t  server[NXT_BALANCE_TEST_SERVERS];
+
+    nxt_upstream_server_t      **heap;
+    nxt_uint_t                 nheap;
+
+    nxt_nsec_t                 now;
+    uint64_t                   random;
+} nxt_balance_test_t;
+
+
+static nxt_balance_test_t  nxt_balance_test;
+
+
+static double
+nxt_balance_test_random(void)
+{
+    uint64_t  x;
+
+    /* xorshift64* */
+
+    x = nxt_balance_test.random;
+    x ^= x >> 12;
+    x ^= x << 25;
+    x ^= x >> 27;
+    nxt_balance_test.random = x;
+
+    return ((x * 0x2545F4914F6CDD1DULL) >> 11) * (1.0 / 9007199254740992.0);
+}
+
+
+static nxt_nsec_t
+nxt_balance_test_exponential(double mean)
+{
+    return -mean * log(1.0 - nxt_balance_test_random()) * 1000000;
+}
+
+
+static void
+nxt_balance_test_heap_push(nxt_upstream_server_t *us)
+{
+    nxt_uint_t             i, parent;
+    nxt_upstream_server_t  **heap;
+
+    heap = nxt_balance_test.heap;
+    i = nxt_balance_test.nheap++;
+
+    while (i > 0) {
+        parent = (i - 1) / 2;
+
+        if (heap[parent]->response <= us->response) {
+            break;
+        }
+
+        heap[i] = heap[parent];
+        i = parent;
+    }
+
+    heap[i] = us;
+}
+
+
+static nxt_upstream_server_t *
+nxt_balance_test_heap_pop(void)
+{
+    nxt_uint_t             i, child, n;
+    nxt_upstream_server_t  *top, *last, **heap;
+
+    heap = nxt_balance_test.heap;
+    top = heap[0];
+
+    n = --nxt_balance_test.nheap;
+    last = heap[n];
+    i = 0;
+
+    for ( ;; ) {
+        child = 2 * i + 1;
+
+        if (child >= n) {
+            break;
+        }
+
+        if (child + 1 < n && heap[child + 1]->response < heap[child]->response)
+        {
+            child++;
+        }
+
+        if (last->response <= heap[child]->response) {
+            break;
+        }
+
+        heap[i] = heap[child];
+        i = child;
+    }
+
+    heap[i] = last;
+
+    return top;
+}
+
+
+static void
+nxt_balance_test_ready(nxt_task_t *task, nxt_upstream_server_t *us)
+{
+    nxt_uint_t                 i, w;
+    nxt_nsec_t                 start;
+    nxt_balance_test_server_t  *s;
+
+    /* Servers listen on ports 8001, 8002, etc. */
+
+    i = nxt_sockaddr_port_number(us->sockaddr) - 8001;
+
+    s = &nxt_balance_test.server[i];
+    s->requests++;
+
+    w = 0;
+
+    for (i = 1; i < NXT_BALANCE_TEST_WORKERS; i++) {
+        if (s->free[i] < s->free[w]) {
+            w = i;
+        }
+    }
+
+    start = nxt_max(us->start, s->free[w]);
+
+    us->response = start + nxt_balance_test_exponential(s->service);
+    s->free[w] = us->response;
+
+    nxt_balance_test_heap_push(us);
+}
+
+
+static void
+nxt_balance_test_error(nxt_task_t *task, nxt_upstream_server_t *us)
+{
+    printf("no server selected\n");
+    exit(1);
+}
+
+
+static const nxt_upstream_peer_state_t  nxt_balance_test_state = {
+    .ready = nxt_balance_test_ready,
+    .error = nxt_balance_test_error,
+};
+
+
+static int nxt_cdecl
+nxt_balance_test_compare(const void *one, const void *two)
+{
+    nxt_nsec_t  a, b;
+
+    a = *(nxt_nsec_t *) one;
+    b = *(nxt_nsec_t *) two;
+
+    return (a > b) - (a < b);
+}
+
+
+static nxt_int_t
+nxt_balance_test_run(nxt_task_t *task, nxt_mp_t *mp, const char *method,
+    nxt_uint_t nreqs, double load)
+{
+    u_char                  *end;
+    double                  sum;
+    nxt_int_t               ret;
+    nxt_uint_t              i, n;
+    nxt_nsec_t              *latency;
+    nxt_upstream_t          upstream;
+    nxt_conf_value_t        *conf;
+    nxt_router_conf_t       rtcf;
+    nxt_upstream_server_t   *us, *done;
+    nxt_router_temp_conf_t  tmcf;
+    u_char                  buf[512];
+
+    end = nxt_sprintf(buf, buf + sizeof(buf),
+                      "{\"method\":\"%s\",\"servers\":{"
+                      "\"127.0.0.1:8001\":{},\"127.0.0.1:8002\":{},"
+                      "\"127.0.0.1:8003\":{},\"127.0.0.1:8004\":{}}}",
+                      method);
+
+    conf = nxt_conf_json_parse(mp, buf, end, NULL);
+    if (conf == NULL) {
+        return NXT_ERROR;
+    }
+
+    nxt_memzero(&rtcf, sizeof(nxt_router_conf_t));
+    nxt_memzero(&tmcf, sizeof(nxt_router_temp_conf_t));
+    nxt_memzero(&upstream, sizeof(nxt_upstream_t));
+
+    rtcf.mem_pool = mp;
+    tmcf.router_conf = &rtcf;
+
+    ret = nxt_upstream_round_robin_create(task, &tmcf, conf, &upstream);
+    if (ret != NXT_OK) {
+        return NXT_ERROR;
+    }
+
+    nxt_memzero(&nxt_balance_test, sizeof(nxt_balance_test_t));
+
+    nxt_balance_test.random = 0x9E3779B97F4A7C15ULL;
+
+    nxt_balance_test.heap = nxt_malloc(nreqs * sizeof(nxt_upstream_server_t *));
+    us = nxt_zalloc(nreqs * sizeof(nxt_upstream_server_t));
+    latency = nxt_malloc(nreqs * sizeof(nxt_nsec_t));
+
+    if (nxt_balance_test.heap == NULL || us == NULL || latency == NULL) {
+        return NXT_ERROR;
+    }
+
+    for (i = 0; i < NXT_BALANCE_TEST_SERVERS; i++) {
+        nxt_balance_test.server[i].service = 2;
+    }
+
+    /* The slow server. */
+    nxt_balance_test.server[NXT_BALANCE_TEST_SERVERS - 1].service = 20;
+
+    n = 0;
+
+    for (i = 0; i < nreqs; i++) {
+        nxt_balance_test.now += nxt_balance_test_exponential(1.0 / load);
+
+        while (nxt_balance_test.nheap != 0
+               && nxt_balance_test.heap[0]->response <= nxt_balance_test.now)
+        {
+            done = nxt_balance_test_heap_pop();
+            latency[n++] = done->response - done->start;
+
+            nxt_upstream_server_free(task, done);
+        }
+
+        us[i].upstream = &upstream;
+        us[i].mem_pool = mp;
+        us[i].state = &nxt_balance_test_state;
+        us[i].start = nxt_balance_test.now;
+
+        upstream.proto->get(task, &us[i]);
+    }
+
+    while (nxt_balance_test.nheap != 0) {
+        done = nxt_balance_test_heap_pop();
+        latency[n++] = done->response - done->start;
+    }
+
+    qsort(latency, n, sizeof(nxt_nsec_t), nxt_balance_test_compare);
+
+    sum = 0;
+
+    for (i = 0; i < n; i++) {
+        sum += latency[i];
+    }
+
+    printf("%-12s mean: %9.2fms  p50: %9.2fms  p99: %9.2fms  max: %9.2fms"
+           "  slow: %5.2f%%\n",
+           method, sum / n / 1000000, latency[n / 2] / 1000000.0,
+           latency[n * 99 / 100] / 1000000.0, latency[n - 1] / 1000000.0,
+           100.0 * nxt_balance_test.server[NXT_BALANCE_TEST_SERVERS - 1]
+                   .requests / n);
+
+    nxt_free(nxt_balance_test.heap);
+    nxt_free(us);
+    nxt_free(latency);
+
+    return NXT_OK;
+}
+
+
+extern char  **environ;
+
+
+int nxt_cdecl
+main(int argc, char **argv)
+{
+    double      load;
+    nxt_mp_t    *mp;
+    nxt_uint_t  i, nreqs;
+    nxt_task_t  task;
+
+    nreqs = 200000;
+    load = 3;
+
+    for (i = 1; i < (nxt_uint_t) argc; i++) {
+
+        if (strcmp(argv[i], "-n") == 0 && i + 1 < (nxt_uint_t) argc) {
+            nreqs = atoi(argv[++i]);
+            continue;
+        }
+
+        if (strcmp(argv[i], "-l") == 0 && i + 1 < (nxt_uint_t) argc) {
+            load = atof(argv[++i]);
+            continue;
+        }
+
+        printf("unknown option %s\n", argv[i]);
+
+        return 1;
+    }
+
+    if (nxt_lib_start("upstream_balance_test", argv, &environ) != NXT_OK) {
+        return 1;
+    }
+
+    mp = nxt_mp_create(1024, 128, 256, 32);
+    if (mp == NULL) {
+        return 1;
+    }
+
+    nxt_memzero(&task, sizeof(nxt_task_t));
+
+    printf("%d servers with %d workers, mean service time 2ms, the last "
+           "one 20ms, %.2f requests per ms\n",
+           NXT_BALANCE_TEST_SERVERS, NXT_BALANCE_TEST_WORKERS, load);
+
+    if (nxt_balance_test_run(&task, mp, "round_robin", nreqs, load) != NXT_OK
+        || nxt_balance_test_run(&task, mp, "least_conn", nreqs, load) != NXT_OK
+        || nxt_balance_test_run(&task, mp, "peak_ewma", nreqs, load) != NXT_OK)
+    {
+        return 1;
+    }
+
+    return 0;
+}
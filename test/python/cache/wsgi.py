@@ -0,0 +1,28 @@
+import time
+
+count = 0
+
+
+def application(environ, start_response):
+    global count
+
+    count += 1
+
+    if 'HTTP_X_DELAY' in environ:
+        time.sleep(float(environ['HTTP_X_DELAY']))
+
+    body = str(count).encode() + b'.' * int(environ.get('HTTP_X_LENGTH', 0))
+
+    headers = [
+        ('Content-Type', 'text/plain'),
+        ('Content-Length', str(len(body))),
+    ]
+
+    if 'HTTP_X_CACHE_CONTROL' in environ:
+        headers.append(('Cache-Control', environ['HTTP_X_CACHE_CONTROL']))
+
+    if 'HTTP_X_COOKIE' in environ:
+        headers.append(('Set-Cookie', environ['HTTP_X_COOKIE']))
+
+    start_response(environ.get('HTTP_X_STATUS', '200'), headers)
+    return [body]
@@ -0,0 +1,20 @@
+def application(environ, start_response):
+
+    content_length = int(environ.get('CONTENT_LENGTH', 0))
+    body = bytes(environ['wsgi.input'].read(content_length))
+
+    headers = [
+        ('Content-Type', environ.get('HTTP_X_CONTENT_TYPE', 'text/plain'))
+    ]
+
+    if 'HTTP_X_ETAG' in environ:
+        headers.append(('ETag', environ['HTTP_X_ETAG']))
+
+    if 'HTTP_X_CHUNKS' in environ:
+        start_response('200', headers)
+        return [body] * int(environ['HTTP_X_CHUNKS'])
+
+    headers.append(('Content-Length', str(len(body))))
+
+    start_response('200', headers)
+    return [body]
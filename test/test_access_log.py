@@ -1,3 +1,5 @@
+import gzip
+import json
 import time
 
 import pytest
@@ -295,6 +297,42 @@ Connection: close
             wait_for_record(fr'^\/bbs {len(body)}$', 'access.log') is not None
         ), '$body_bytes_sent'
 
+    def test_access_log_app_timing(self, wait_for_record):
+        self.load('threads')
+
+        self.set_format('$uri $app_queue_time $app_time $ipc_time')
+
+        assert (
+            self.get(
+                url='/app_time',
+                headers={
+                    'Host': 'localhost',
+                    'X-Delay': '1',
+                    'Connection': 'close',
+                },
+            )['status']
+            == 200
+        )
+        assert (
+            wait_for_record(
+                r'^\/app_time \d+\.\d{6} [1-9]\.\d{6} \d+\.\d{6}$',
+                'access.log',
+            )
+            is not None
+        ), 'app timing'
+
+        assert 'success' in self.conf(
+            [{"action": {"return": 200}}], 'routes'
+        ), 'routes'
+        assert 'success' in self.conf(
+            {"*:7080": {"pass": "routes"}}, 'listeners'
+        ), 'listeners'
+
+        assert self.get(url='/return')['status'] == 200
+        assert (
+            wait_for_record(r'^\/return - - -$', 'access.log') is not None
+        ), 'no app timing'
+
     def test_access_log_incorrect(self, temp_dir, skip_alert):
         skip_alert(r'failed to apply new conf')
 
@@ -310,3 +348,266 @@ Connection: close
             },
             'access_log',
         ), 'access_log format incorrect'
+
+    def test_access_log_buffer(self, search_in_file, wait_for_record):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{option.temp_dir}/access.log',
+                'format': '$uri',
+                'buffer': 4096,
+                'flush': 1,
+            },
+            'access_log',
+        ), 'access_log buffer'
+
+        for i in range(3):
+            assert self.get(url=f'/buffered{i}')['status'] == 200
+
+        assert search_in_file(r'/buffered', 'access.log') is None, 'buffered'
+
+        assert wait_for_record(r'^/buffered2$', 'access.log') is not None
+
+        assert search_in_file(
+            r'/buffered0\n/buffered1\n/buffered2', 'access.log'
+        ), 'flushed'
+
+    def test_access_log_buffer_size(self, search_in_file):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{option.temp_dir}/access.log',
+                'format': '$uri',
+                'buffer': 20,
+                'flush': 60,
+            },
+            'access_log',
+        ), 'access_log buffer'
+
+        assert self.get(url='/size0')['status'] == 200
+        assert self.get(url='/size1')['status'] == 200
+        assert self.get(url='/size2')['status'] == 200
+
+        time.sleep(0.1)
+
+        assert search_in_file(r'^/size0\n/size1\n$', 'access.log'), 'full'
+
+        assert self.get(url=f'/{"x" * 30}')['status'] == 200
+
+        time.sleep(0.1)
+
+        assert search_in_file(r'/size2\n/x{30}\n$', 'access.log'), 'long line'
+
+    def test_access_log_gzip(self, temp_dir, wait_for_record):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{temp_dir}/access.log.gz',
+                'format': '$uri',
+                'gzip': 9,
+                'flush': 1,
+            },
+            'access_log',
+        ), 'access_log gzip'
+
+        assert self.get(url='/gzip0')['status'] == 200
+
+        time.sleep(1.5)
+
+        assert self.get(url='/gzip1')['status'] == 200
+
+        time.sleep(1.5)
+
+        with open(f'{temp_dir}/access.log.gz', 'rb') as f:
+            data = f.read()
+
+        assert data[:2] == b'\x1f\x8b', 'gzip magic'
+        assert gzip.decompress(data) == b'/gzip0\n/gzip1\n', 'gzip members'
+
+    def test_access_log_buffer_invalid(self):
+        def check_access_log(conf):
+            assert 'error' in self.conf(
+                {'path': f'{option.temp_dir}/access.log', **conf},
+                'access_log',
+            ), f'invalid {conf}'
+
+        check_access_log({'buffer': 0})
+        check_access_log({'buffer': '1k'})
+        check_access_log({'flush': 0})
+        check_access_log({'flush': 2147484})
+        check_access_log({'gzip': 0})
+        check_access_log({'gzip': 10})
+
+    def test_access_log_json(self, wait_for_record):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{option.temp_dir}/access.log',
+                'format': {
+                    'uri': '$uri',
+                    'status': '$status',
+                    'agent': '$header_user_agent',
+                    'const': 'te"xt',
+                },
+            },
+            'access_log',
+        ), 'access_log json'
+
+        assert (
+            self.get(
+                url='/json',
+                headers={
+                    'Host': 'localhost',
+                    'User-Agent': 'quo"te\\back\tslash',
+                    'Connection': 'close',
+                },
+            )['status']
+            == 200
+        )
+
+        line = wait_for_record(r'^\{"uri":"/json".*$', 'access.log')
+        assert line is not None, 'json line'
+
+        assert json.loads(line.group(0)) == {
+            'uri': '/json',
+            'status': '200',
+            'agent': 'quo"te\\back\tslash',
+            'const': 'te"xt',
+        }, 'json fields'
+
+        assert self.get(url='/json_empty')['status'] == 200
+
+        line = wait_for_record(r'^\{"uri":"/json_empty".*$', 'access.log')
+        assert json.loads(line.group(0))['agent'] == '-', 'json empty'
+
+    def test_access_log_json_invalid(self):
+        def check_format(format):
+            assert 'error' in self.conf(
+                {'path': f'{option.temp_dir}/access.log', 'format': format},
+                'access_log',
+            ), f'invalid {format}'
+
+        check_format({})
+        check_format({'uri': 1})
+        check_format({'uri': '$blah'})
+        check_format([])
+
+    def test_access_log_if(self, search_in_file, wait_for_record):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{option.temp_dir}/access.log',
+                'format': '$uri',
+                'if': '$arg_log',
+            },
+            'access_log',
+        ), 'access_log if'
+
+        assert self.get(url='/no')['status'] == 200
+        assert self.get(url='/zero?log=0')['status'] == 200
+        assert self.get(url='/false?log=false')['status'] == 200
+        assert self.get(url='/yes?log=1')['status'] == 200
+
+        assert wait_for_record(r'^/yes$', 'access.log') is not None, 'yes'
+        assert search_in_file(r'^/(no|zero|false)$', 'access.log') is None
+
+        assert 'success' in self.conf('"!$arg_log"', 'access_log/if')
+
+        assert self.get(url='/negated')['status'] == 200
+        assert self.get(url='/skipped?log=1')['status'] == 200
+
+        assert wait_for_record(r'^/negated$', 'access.log') is not None
+        assert search_in_file(r'^/skipped$', 'access.log') is None, 'negated'
+
+    def test_access_log_sample(self, search_in_file, wait_for_record):
+        self.load('empty')
+
+        assert 'success' in self.conf(
+            {
+                'path': f'{option.temp_dir}/access.log',
+                'format': '$uri',
+                'sample': 0,
+            },
+            'access_log',
+        ), 'access_log sample'
+
+        for _ in range(10):
+            assert self.get(url='/sampled')['status'] == 200
+
+        assert 'success' in self.conf('1', 'access_log/sample')
+
+        assert self.get(url='/all')['status'] == 200
+
+        assert wait_for_record(r'^/all$', 'access.log') is not None, 'all'
+        assert search_in_file(r'^/sampled$', 'access.log') is None, 'none'
+
+        assert 'success' in self.conf('0.5', 'access_log/sample')
+
+        for _ in range(50):
+            assert self.get(url='/half')['status'] == 200
+
+        assert wait_for_record(r'^/half$', 'access.log') is not None
+
+        time.sleep(0.2)
+
+        with open(f'{option.temp_dir}/access.log') as f:
+            assert f.read().count('/half\n') < 50, 'half'
+
+    def test_access_log_sample_status(self, wait_for_record):
+        assert 'success' in self.conf(
+            {
+                "listeners": {"*:7080": {"pass": "routes"}},
+                "routes": [
+                    {
+                        "match": {"uri": "/error"},
+                        "action": {"return": 503},
+                    },
+                    {"action": {"return": 200}},
+                ],
+                "access_log": {
+                    "path": f'{option.temp_dir}/access.log',
+                    "format": "$uri $status",
+                    "sample": {"2xx": 0.01, "5xx": 1},
+                },
+            }
+        ), 'access_log sample status'
+
+        for _ in range(50):
+            assert self.get(url='/ok')['status'] == 200
+
+        for _ in range(10):
+            assert self.get(url='/error')['status'] == 503
+
+        assert wait_for_record(r'^/error 503$', 'access.log') is not None
+
+        time.sleep(0.2)
+
+        with open(f'{option.temp_dir}/access.log') as f:
+            log = f.read()
+
+        assert log.count('/error 503\n') == 10, 'all 5xx'
+        assert log.count('/ok 200\n') < 10, 'sampled 2xx'
+
+    def test_access_log_if_invalid(self):
+        def check_access_log(conf):
+            assert 'error' in self.conf(
+                {'path': f'{option.temp_dir}/access.log', **conf},
+                'access_log',
+            ), f'invalid {conf}'
+
+        check_access_log({'if': ''})
+        check_access_log({'if': '!'})
+        check_access_log({'if': '$blah'})
+        check_access_log({'if': 1})
+        check_access_log({'sample': -0.1})
+        check_access_log({'sample': 1.5})
+        check_access_log({'sample': '1'})
+        check_access_log({'sample': {'6xx': 1}})
+        check_access_log({'sample': {'2XX': 1}})
+        check_access_log({'sample': {'2xx': 1.5}})
+        check_access_log({'sample': {'2xx': '1'}})
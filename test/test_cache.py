@@ -0,0 +1,301 @@
+import gzip
+import re
+import time
+
+import pytest
+from unit.applications.lang.python import TestApplicationPython
+from unit.option import option
+from unit.status import Status
+
+
+class TestCache(TestApplicationPython):
+    prerequisites = {'modules': {'python': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self):
+        python_dir = f'{option.test_dir}/python/cache'
+
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "routes"},
+                    "*:7081": {"pass": "applications/cache"},
+                },
+                "routes": [
+                    {
+                        "action": {
+                            "pass": "applications/cache",
+                            "cache": {"valid": 60},
+                        }
+                    }
+                ],
+                "applications": {
+                    "cache": {
+                        "type": self.get_application_type(),
+                        "processes": {"spare": 0},
+                        "path": python_dir,
+                        "working_directory": python_dir,
+                        "module": "wsgi",
+                    }
+                },
+            }
+        ), 'cache configuration'
+
+        Status.init()
+
+    def get_cached(self, url='/', headers=None, method='GET', port=7080):
+        req_headers = {'Host': 'localhost', 'Connection': 'close'}
+        req_headers.update(headers or {})
+
+        return self.http(method, url=url, headers=req_headers, port=port)
+
+    def test_cache(self):
+        resp = self.get_cached()
+        assert resp['status'] == 200, 'status'
+        assert 'Age' not in resp['headers'], 'miss Age'
+
+        body = resp['body']
+
+        resp = self.get_cached()
+        assert resp['body'] == body, 'hit'
+        assert resp['headers']['Age'] == '0', 'hit Age'
+        assert resp['headers']['Content-Type'] == 'text/plain', 'Content-Type'
+        assert resp['headers']['Content-Length'] == str(len(body))
+
+        assert self.get_cached(url='/blah')['body'] != body, 'key'
+
+        assert Status.get('/cache/hits') == 1, 'hits'
+        assert Status.get('/cache/misses') == 2, 'misses'
+        assert Status.get('/cache/bytes') > 0, 'bytes'
+
+    def test_cache_key(self):
+        assert 'success' in self.conf('"$uri"', 'routes/0/action/cache/key')
+
+        body = self.get_cached(url='/?a')['body']
+        assert self.get_cached(url='/?b')['body'] == body, 'key'
+        assert self.get_cached(url='/blah')['body'] != body, 'key uri'
+
+    def test_cache_control(self):
+        def check_not_cached(headers):
+            body = self.get_cached(headers=headers)['body']
+            resp = self.get_cached(headers=headers)
+            assert resp['body'] != body, f'not cached {headers}'
+            assert 'Age' not in resp['headers'], f'no Age {headers}'
+
+        check_not_cached({'X-Cache-Control': 'no-store'})
+        check_not_cached({'X-Cache-Control': 'max-age=60, private'})
+        check_not_cached({'X-Cache-Control': 'No-Cache'})
+        check_not_cached({'X-Cache-Control': 'max-age=0'})
+        check_not_cached({'X-Cache-Control': 'max-age=0, s-maxage=0'})
+        check_not_cached({'X-Cookie': 'a=b'})
+        check_not_cached({'X-Status': '404'})
+        check_not_cached({'Authorization': 'Basic dXNlcjpwYXNz'})
+        check_not_cached({'Cache-Control': 'no-cache'})
+
+        assert 'success' in self.conf_delete('routes/0/action/cache/valid')
+
+        check_not_cached({})
+
+        headers = {'X-Cache-Control': 'max-age=0, s-maxage=60'}
+        body = self.get_cached(headers=headers)['body']
+        assert self.get_cached(headers=headers)['body'] == body, 's-maxage'
+
+    def test_cache_expire(self):
+        headers = {'X-Cache-Control': 'max-age=1'}
+
+        body = self.get_cached(headers=headers)['body']
+        assert self.get_cached(headers=headers)['body'] == body, 'cached'
+
+        time.sleep(1.1)
+
+        assert self.get_cached(headers=headers)['body'] != body, 'expired'
+
+    def test_cache_stale_while_revalidate(self):
+        headers = {'X-Cache-Control': 'max-age=1, stale-while-revalidate=10'}
+
+        body = self.get_cached(headers=headers)['body']
+
+        time.sleep(1.1)
+
+        sock = self.get(
+            headers={
+                'Host': 'localhost',
+                'X-Delay': '1',
+                'Connection': 'close',
+                **headers,
+            },
+            no_recv=True,
+        )
+
+        time.sleep(0.2)
+
+        resp = self.get_cached(headers=headers)
+        assert resp['body'] == body, 'stale'
+        assert resp['headers']['Age'] == '1', 'stale Age'
+
+        updated = self._resp_to_dict(self.recvall(sock).decode())['body']
+        sock.close()
+        assert updated != body, 'updated'
+
+        assert self.get_cached(headers=headers)['body'] == updated, 'fresh'
+
+    def test_cache_coalescing(self):
+        socks = []
+
+        for _ in range(3):
+            socks.append(
+                self.get(
+                    headers={
+                        'Host': 'localhost',
+                        'X-Delay': '1',
+                        'Connection': 'close',
+                    },
+                    no_recv=True,
+                )
+            )
+
+            time.sleep(0.1)
+
+        bodies = []
+
+        for sock in socks:
+            resp = self._resp_to_dict(self.recvall(sock).decode())
+            sock.close()
+
+            assert resp['status'] == 200, 'status'
+            bodies.append(resp['body'])
+
+        assert bodies[1] == bodies[0] and bodies[2] == bodies[0], 'coalesced'
+
+        assert Status.get('/cache/hits') == 2, 'hits'
+        assert Status.get('/cache/misses') == 1, 'misses'
+
+    def test_cache_methods(self):
+        body = self.get_cached()['body']
+
+        resp = self.get_cached(method='HEAD')
+        assert resp['status'] == 200, 'HEAD status'
+        assert resp['headers']['Content-Length'] == str(len(body)), 'HEAD'
+        assert resp['body'] == '', 'HEAD body'
+
+        assert self.get_cached(method='POST')['body'] != body, 'POST'
+
+        resp = self.get_cached(method='HEAD', url='/head')
+        assert 'Age' not in resp['headers'], 'HEAD miss'
+        assert 'Age' not in self.get_cached(url='/head')['headers'], 'HEAD store'
+
+    def test_cache_max_entry_size(self):
+        assert 'success' in self.conf(
+            '10', 'routes/0/action/cache/max_entry_size'
+        )
+
+        def check_cached(length, cached):
+            headers = {'X-Length': length}
+
+            body = self.get_cached(url=f'/{length}', headers=headers)['body']
+            resp = self.get_cached(url=f'/{length}', headers=headers)
+            assert (resp['body'] == body) == cached, f'length {length}'
+
+        check_cached('5', True)
+        check_cached('20', False)
+
+    def test_cache_max_size(self):
+        assert 'success' in self.conf(
+            '200', 'routes/0/action/cache/max_size'
+        )
+
+        for url in ['/1', '/2', '/3']:
+            assert self.get_cached(url=url)['status'] == 200
+
+        assert Status.get('/cache/bytes') <= 200, 'max_size'
+        assert 'Age' in self.get_cached(url='/3')['headers'], 'last cached'
+        assert 'Age' not in self.get_cached(url='/1')['headers'], 'evicted'
+
+    def test_cache_proxy(self):
+        assert 'success' in self.conf(
+            {"proxy": "http://127.0.0.1:7081", "cache": {"valid": 60}},
+            'routes/0/action',
+        )
+
+        resp = self.get_cached()
+        assert resp['status'] == 200, 'status'
+
+        body = resp['body']
+
+        resp = self.get_cached()
+        assert resp['body'] == body, 'proxy hit'
+        assert 'Age' in resp['headers'], 'proxy Age'
+
+        assert self.get_cached(port=7081)['body'] != body, 'direct'
+
+    def test_cache_compression(self):
+        assert 'success' in self.conf(
+            {
+                "http": {
+                    "compression": {
+                        "compressors": [{"encoding": "gzip", "min_length": 10}]
+                    }
+                }
+            },
+            'settings',
+        )
+
+        def get_gzip():
+            resp = self.http(
+                'GET',
+                headers={
+                    'Host': 'localhost',
+                    'Accept-Encoding': 'gzip',
+                    'X-Length': '100',
+                    'Connection': 'close',
+                },
+                raw_resp=True,
+                encoding='latin-1',
+            )
+
+            head, body = resp.split('\r\n\r\n', 1)
+            resp = self._resp_to_dict(f'{head}\r\n\r\n')
+            resp['body'] = body.encode('latin-1')
+
+            return resp
+
+        resp = get_gzip()
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'miss encoding'
+        assert 'Age' not in resp['headers'], 'miss'
+
+        resp = get_gzip()
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'hit encoding'
+        assert 'Age' in resp['headers'], 'hit'
+        assert resp['headers']['Content-Length'] == str(len(resp['body']))
+
+        body = gzip.decompress(resp['body']).decode()
+        assert re.match(r'^\d+\.{100}$', body), 'hit body'
+
+        resp = self.get_cached(headers={'X-Length': '100'})
+        assert 'Content-Encoding' not in resp['headers'], 'identity'
+        assert 'Age' not in resp['headers'], 'identity miss'
+
+        resp = self.get_cached(headers={'X-Length': '100'})
+        assert 'Age' in resp['headers'], 'identity hit'
+        assert resp['body'] != body, 'identity variant'
+
+        assert Status.get('/cache/hits') == 2, 'hits'
+        assert Status.get('/cache/misses') == 2, 'misses'
+
+    def test_cache_invalid(self):
+        def check_cache(cache):
+            assert 'error' in self.conf(
+                cache, 'routes/0/action/cache'
+            ), f'invalid {cache}'
+
+        check_cache('"blah"')
+        check_cache({"key": 1})
+        check_cache({"valid": -1})
+        check_cache({"valid": 2147484})
+        check_cache({"max_size": 0})
+        check_cache({"max_entry_size": "1"})
+        check_cache({"blah": 1})
+
+        assert 'error' in self.conf(
+            {"return": 200, "cache": {}}, 'routes/0/action'
+        ), 'return cache'
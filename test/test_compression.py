@@ -0,0 +1,211 @@
+import gzip
+import os
+import zlib
+
+import pytest
+from unit.applications.lang.python import TestApplicationPython
+from unit.option import option
+
+
+class TestCompression(TestApplicationPython):
+    prerequisites = {'modules': {'python': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self):
+        python_dir = f'{option.test_dir}/python/compression'
+
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "applications/compression"},
+                    "*:7081": {"pass": "routes"},
+                },
+                "routes": [{"action": {"proxy": "http://127.0.0.1:7080"}}],
+                "applications": {
+                    "compression": {
+                        "type": self.get_application_type(),
+                        "processes": {"spare": 0},
+                        "path": python_dir,
+                        "working_directory": python_dir,
+                        "module": "wsgi",
+                    }
+                },
+                "settings": {
+                    "http": {
+                        "compression": {
+                            "compressors": [
+                                {"encoding": "gzip", "min_length": 10},
+                                {
+                                    "encoding": "deflate",
+                                    "level": 9,
+                                    "min_length": 1,
+                                },
+                            ]
+                        }
+                    }
+                },
+            }
+        ), 'compression configuration'
+
+    def post_compressed(self, body, encoding='gzip', port=7080, headers=None):
+        req_headers = {
+            'Host': 'localhost',
+            'Accept-Encoding': encoding,
+            'Connection': 'close',
+        }
+        req_headers.update(headers or {})
+
+        resp = self.post(
+            port=port,
+            headers=req_headers,
+            body=body,
+            raw_resp=True,
+            encoding='latin-1',
+        )
+
+        head, body = resp.split('\r\n\r\n', 1)
+        resp = self._resp_to_dict(f'{head}\r\n\r\n')
+        body = body.encode('latin-1')
+
+        if resp['headers'].get('Transfer-Encoding') == 'chunked':
+            data = b''
+
+            while True:
+                size, body = body.split(b'\r\n', 1)
+                size = int(size, 16)
+
+                if size == 0:
+                    break
+
+                data += body[:size]
+                body = body[size + 2 :]
+
+            body = data
+
+        resp['body'] = body
+
+        return resp
+
+    def test_compression_gzip(self):
+        body = 'compressed text ' * 100
+
+        resp = self.post_compressed(body)
+        assert resp['status'] == 200, 'status'
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'encoding'
+        assert resp['headers']['Vary'] == 'Accept-Encoding', 'Vary'
+        assert 'Content-Length' not in resp['headers'], 'no Content-Length'
+        assert len(resp['body']) < len(body), 'compressed'
+        assert gzip.decompress(resp['body']) == body.encode(), 'body'
+
+    def test_compression_deflate(self):
+        body = 'compressed text ' * 100
+
+        resp = self.post_compressed(body, encoding='deflate')
+        assert resp['headers']['Content-Encoding'] == 'deflate', 'encoding'
+        assert zlib.decompress(resp['body']) == body.encode(), 'body'
+
+        resp = self.post_compressed(body, encoding='br, deflate, gzip')
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'preference'
+
+        resp = self.post_compressed(body, encoding='gzip;q=0, *')
+        assert resp['headers']['Content-Encoding'] == 'deflate', 'q=0'
+
+    def test_compression_not_accepted(self):
+        body = 'text ' * 100
+
+        for encoding in ['identity', 'br', 'gzip;q=0', 'gzip; q=0.000, *;q=0']:
+            resp = self.post_compressed(body, encoding=encoding)
+            assert 'Content-Encoding' not in resp['headers'], encoding
+            assert resp['headers']['Content-Length'] == '500', encoding
+            assert resp['body'] == body.encode(), encoding
+
+    def test_compression_types(self):
+        body = 'text ' * 100
+
+        resp = self.post_compressed(
+            body, headers={'X-Content-Type': 'application/json; charset=utf-8'}
+        )
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'json'
+
+        resp = self.post_compressed(
+            body, headers={'X-Content-Type': 'application/octet-stream'}
+        )
+        assert 'Content-Encoding' not in resp['headers'], 'octet-stream'
+        assert 'Vary' not in resp['headers'], 'octet-stream Vary'
+
+        assert 'success' in self.conf(
+            '"application/octet-stream"', 'settings/http/compression/types'
+        )
+
+        resp = self.post_compressed(
+            body, headers={'X-Content-Type': 'application/octet-stream'}
+        )
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'types'
+
+        resp = self.post_compressed(body)
+        assert 'Content-Encoding' not in resp['headers'], 'types text'
+
+    def test_compression_min_length(self):
+        resp = self.post_compressed('short')
+        assert 'Content-Encoding' not in resp['headers'], 'short'
+        assert resp['body'] == b'short', 'short body'
+
+        resp = self.post_compressed('short', encoding='gzip, deflate')
+        assert resp['headers']['Content-Encoding'] == 'deflate', 'min_length'
+        assert zlib.decompress(resp['body']) == b'short', 'deflate body'
+
+    def test_compression_chunked(self):
+        body = os.urandom(16 * 1024).hex()
+
+        resp = self.post_compressed(body, headers={'X-Chunks': '10'})
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'encoding'
+        assert gzip.decompress(resp['body']) == body.encode() * 10, 'body'
+
+    def test_compression_etag(self):
+        resp = self.post_compressed('text ' * 10, headers={'X-ETag': '"abc"'})
+        assert resp['headers']['ETag'] == 'W/"abc"', 'weak ETag'
+
+        resp = self.post_compressed(
+            'text ' * 10, headers={'X-ETag': 'W/"abc"'}
+        )
+        assert resp['headers']['ETag'] == 'W/"abc"', 'weak ETag unchanged'
+
+    def test_compression_head(self):
+        resp = self.http(
+            'HEAD',
+            headers={
+                'Host': 'localhost',
+                'Accept-Encoding': 'gzip',
+                'Connection': 'close',
+            },
+        )
+        assert resp['status'] == 200, 'status'
+        assert 'Content-Encoding' not in resp['headers'], 'HEAD'
+
+    def test_compression_proxy(self):
+        body = 'proxied text ' * 1000
+
+        resp = self.post_compressed(body, port=7081)
+        assert resp['status'] == 200, 'status'
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'encoding'
+        assert gzip.decompress(resp['body']) == body.encode(), 'body'
+
+        resp = self.post_compressed(body, port=7081, encoding='identity')
+        assert resp['body'] == body.encode(), 'identity'
+
+    def test_compression_invalid(self):
+        def check_compression(compression):
+            assert 'error' in self.conf(
+                compression, 'settings/http/compression'
+            ), f'invalid {compression}'
+
+        check_compression({})
+        check_compression({"compressors": [{"encoding": "blah"}]})
+        check_compression({"compressors": [{"level": 1}]})
+        check_compression({"compressors": ["gzip"]})
+        check_compression({"compressors": [{"encoding": "gzip", "level": 0}]})
+        check_compression({"compressors": [{"encoding": "gzip", "level": 10}]})
+        check_compression(
+            {"compressors": [{"encoding": "gzip", "min_length": -1}]}
+        )
+        check_compression({"compressors": [], "types": 1})
@@ -0,0 +1,114 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import pytest
+from unit.applications.lang.python import TestApplicationPython
+
+
+class TestCpuAffinity(TestApplicationPython):
+    prerequisites = {'modules': {'python': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self):
+        if not sys.platform.startswith('linux'):
+            pytest.skip('requires Linux')
+
+        self.load('empty')
+
+    def pids_for_process(self, name):
+        output = subprocess.check_output(['ps', 'ax']).decode()
+
+        return [
+            re.search(r'^\s*(\d+)', m).group(1)
+            for m in re.findall(fr'.*unit: {name}', output)
+        ]
+
+    def cpus_allowed(self, pid, task=None):
+        path = f'/proc/{pid}/status'
+        if task is not None:
+            path = f'/proc/{pid}/task/{task}/status'
+
+        with open(path) as f:
+            return re.search(r'Cpus_allowed_list:\s*(\S+)', f.read()).group(
+                1
+            )
+
+    def test_cpu_affinity_settings(self):
+        for value in ['auto', 'numa', 0, '0', '0-1,3', [0, '1-2']]:
+            assert 'success' in self.conf(
+                {'cpu_affinity': value}, 'settings'
+            ), f'valid {value}'
+
+        for value in ['none', '1-0', '0,', '-1', -1, [], [True], True]:
+            assert 'error' in self.conf(
+                {'cpu_affinity': value}, 'settings'
+            ), f'invalid {value}'
+
+        assert 'success' in self.conf_delete('settings/cpu_affinity')
+
+    def test_cpu_affinity_application(self):
+        for value in ['auto', 'numa', 0, '0-1', ['0', 1]]:
+            assert 'success' in self.conf(
+                json.dumps(value), 'applications/empty/cpu_affinity'
+            ), f'valid {value}'
+
+        for value in ['x', -1, [], [{}]]:
+            assert 'error' in self.conf(
+                json.dumps(value), 'applications/empty/cpu_affinity'
+            ), f'invalid {value}'
+
+    def test_cpu_affinity_application_process(self):
+        cpu = sorted(os.sched_getaffinity(0))[0]
+
+        assert 'success' in self.conf('2', 'applications/empty/processes')
+        assert 'success' in self.conf(
+            str(cpu), 'applications/empty/cpu_affinity'
+        )
+        assert self.get()['status'] == 200
+
+        pids = self.pids_for_process('"empty" application')
+        assert len(pids) == 2, 'processes'
+
+        for pid in pids:
+            assert self.cpus_allowed(pid) == str(cpu), 'app affinity'
+
+    def test_cpu_affinity_router_threads(self):
+        cpu = sorted(os.sched_getaffinity(0))[0]
+
+        pid = self.pids_for_process('router')[0]
+        tasks = os.listdir(f'/proc/{pid}/task')
+        before = self.cpus_allowed(pid)
+
+        assert 'success' in self.conf({'cpu_affinity': cpu}, 'settings')
+        assert self.get()['status'] == 200
+
+        time.sleep(0.2)
+
+        for task in os.listdir(f'/proc/{pid}/task'):
+            assert self.cpus_allowed(pid, task) == str(cpu), 'pinned'
+
+        assert 'success' in self.conf_delete('settings/cpu_affinity')
+        assert self.get()['status'] == 200
+
+        time.sleep(0.2)
+
+        for task in tasks:
+            assert self.cpus_allowed(pid, task) == before, 'restored'
+
+    def test_cpu_affinity_numa_mempolicy(self):
+        if not os.path.exists('/sys/devices/system/node/node0'):
+            pytest.skip('requires NUMA information')
+
+        assert 'success' in self.conf(
+            '"numa"', 'applications/empty/cpu_affinity'
+        )
+        assert self.get()['status'] == 200
+
+        pid = self.pids_for_process('"empty" application')[0]
+
+        with open(f'/proc/{pid}/numa_maps') as f:
+            assert re.search(r' prefer:\d+ ', f.read()), 'preferred node'
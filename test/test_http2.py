@@ -0,0 +1,670 @@
+import socket
+import ssl
+import struct
+
+import pytest
+from unit.applications.tls import TestApplicationTLS
+from unit.option import option
+
+PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+DATA = 0x0
+HEADERS = 0x1
+RST_STREAM = 0x3
+SETTINGS = 0x4
+PING = 0x6
+GOAWAY = 0x7
+WINDOW_UPDATE = 0x8
+CONTINUATION = 0x9
+
+END_STREAM = 0x1
+ACK = 0x1
+END_HEADERS = 0x4
+
+PROTOCOL_ERROR = 0x1
+FLOW_CONTROL_ERROR = 0x3
+FRAME_SIZE_ERROR = 0x6
+REFUSED_STREAM = 0x7
+
+# The HPACK static table names, RFC 7541, Appendix A.
+HPACK_STATIC = [
+    ':authority', ':method', ':method', ':path', ':path', ':scheme',
+    ':scheme', ':status', ':status', ':status', ':status', ':status',
+    ':status', ':status', 'accept-charset', 'accept-encoding',
+    'accept-language', 'accept-ranges', 'accept',
+    'access-control-allow-origin', 'age', 'allow', 'authorization',
+    'cache-control', 'content-disposition', 'content-encoding',
+    'content-language', 'content-length', 'content-location',
+    'content-range', 'content-type', 'cookie', 'date', 'etag', 'expect',
+    'expires', 'from', 'host', 'if-match', 'if-modified-since',
+    'if-none-match', 'if-range', 'if-unmodified-since', 'last-modified',
+    'link', 'location', 'max-forwards', 'proxy-authenticate',
+    'proxy-authorization', 'range', 'referer', 'refresh', 'retry-after',
+    'server', 'set-cookie', 'strict-transport-security',
+    'transfer-encoding', 'user-agent', 'vary', 'via', 'www-authenticate',
+]
+
+HPACK_STATUS = {8: '200', 9: '204', 10: '206', 11: '304', 12: '400',
+                13: '404', 14: '500'}
+
+
+def hpack_int_encode(value, prefix, first=0):
+    mask = (1 << prefix) - 1
+
+    if value < mask:
+        return bytes([first | value])
+
+    out = bytearray([first | mask])
+    value -= mask
+
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+    return bytes(out)
+
+
+def hpack_encode(headers):
+    out = b''
+
+    for name, value in headers:
+        name = name.encode()
+        value = value.encode()
+
+        out += b'\x00' + hpack_int_encode(len(name), 7) + name
+        out += hpack_int_encode(len(value), 7) + value
+
+    return out
+
+
+def hpack_int(data, pos, prefix):
+    mask = (1 << prefix) - 1
+    value = data[pos] & mask
+    pos += 1
+
+    if value < mask:
+        return value, pos
+
+    shift = 0
+
+    while True:
+        b = data[pos]
+        pos += 1
+        value += (b & 0x7F) << shift
+        shift += 7
+
+        if not b & 0x80:
+            return value, pos
+
+
+def hpack_string(data, pos):
+    assert not data[pos] & 0x80, 'no huffman'
+
+    length, pos = hpack_int(data, pos, 7)
+
+    return data[pos : pos + length].decode(), pos + length
+
+
+def hpack_decode(data):
+    headers = {}
+    pos = 0
+
+    while pos < len(data):
+        if data[pos] & 0x80:
+            index, pos = hpack_int(data, pos, 7)
+            headers[':status'] = HPACK_STATUS[index]
+            continue
+
+        assert data[pos] & 0xE0 == 0, 'literal without indexing'
+
+        index, pos = hpack_int(data, pos, 4)
+
+        if index:
+            name = HPACK_STATIC[index - 1]
+        else:
+            name, pos = hpack_string(data, pos)
+
+        headers[name], pos = hpack_string(data, pos)
+
+    return headers
+
+
+def settings(**kwargs):
+    ids = {
+        'max_concurrent_streams': 3,
+        'initial_window_size': 4,
+        'max_frame_size': 5,
+    }
+
+    return b''.join(
+        struct.pack('>HI', ids[name], value) for name, value in kwargs.items()
+    )
+
+
+class H2:
+    def __init__(self, sock):
+        self.sock = sock
+        self.pending = []
+        self.stream_window_update = True
+
+    def send(self, type, flags=0, stream=0, payload=b''):
+        header = struct.pack('>I', len(payload))[1:]
+        header += bytes([type, flags]) + struct.pack('>I', stream)
+
+        self.sock.sendall(header + payload)
+
+    def recv_exact(self, size):
+        data = b''
+
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+
+            if not chunk:
+                return None
+
+            data += chunk
+
+        return data
+
+    def recv(self):
+        if self.pending:
+            return self.pending.pop(0)
+
+        header = self.recv_exact(9)
+
+        if header is None:
+            return None
+
+        length = struct.unpack('>I', b'\x00' + header[:3])[0]
+        stream = struct.unpack('>I', header[5:])[0] & 0x7FFFFFFF
+
+        payload = self.recv_exact(length) if length else b''
+
+        if header[3] == DATA and length:
+            increment = struct.pack('>I', length)
+
+            self.send(WINDOW_UPDATE, 0, 0, increment)
+
+            if self.stream_window_update:
+                self.send(WINDOW_UPDATE, 0, stream, increment)
+
+        return header[3], header[4], stream, payload
+
+    def wait(self, type, stream=None):
+        skipped = []
+
+        while True:
+            frame = self.recv()
+
+            if frame is None:
+                self.pending = skipped + self.pending
+                return None
+
+            if frame[0] == type and (stream is None or frame[2] == stream):
+                self.pending = skipped + self.pending
+                return frame
+
+            skipped.append(frame)
+
+    def request(self, stream, method='GET', path='/', headers=None, body=None):
+        block = hpack_encode(
+            [
+                (':method', method),
+                (':scheme', 'http'),
+                (':authority', 'localhost'),
+                (':path', path),
+            ]
+            + (headers or [])
+        )
+
+        flags = END_HEADERS if body is not None else END_HEADERS | END_STREAM
+
+        self.send(HEADERS, flags, stream, block)
+
+        if body is not None:
+            self.send(DATA, END_STREAM, stream, body)
+
+    def response(self, stream):
+        resp = {'headers': {}, 'body': b''}
+        skipped = []
+
+        while True:
+            frame = self.recv()
+
+            if frame is None:
+                resp['closed'] = True
+                break
+
+            type, flags, id, payload = frame
+
+            if id != stream:
+                skipped.append(frame)
+                continue
+
+            if type == RST_STREAM:
+                resp['reset'] = struct.unpack('>I', payload)[0]
+                break
+
+            if type == HEADERS:
+                resp['headers'].update(hpack_decode(payload))
+
+            elif type == DATA:
+                resp['body'] += payload
+
+            if flags & END_STREAM:
+                break
+
+        self.pending = skipped + self.pending
+
+        resp['status'] = int(resp['headers'].get(':status', 0))
+
+        return resp
+
+
+class TestHTTP2(TestApplicationTLS):
+    prerequisites = {'modules': {'python': 'any', 'openssl': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self, temp_dir):
+        with open(f'{temp_dir}/index.html', 'w') as f:
+            f.write('0123456789')
+
+        with open(f'{temp_dir}/big', 'wb') as f:
+            f.write(b'x' * 200000)
+
+        assert 'success' in self.conf(
+            {
+                "settings": {"http": {}},
+                "listeners": {"*:7080": {"pass": "routes", "http2": True}},
+                "routes": [
+                    {
+                        "match": {"uri": "/app"},
+                        "action": {"pass": "applications/mirror"},
+                    },
+                    {
+                        "match": {"uri": "/return"},
+                        "action": {"return": 204},
+                    },
+                    {
+                        "match": {"cookies": {"a": "1", "b": "2"}},
+                        "action": {"return": 200},
+                    },
+                    {"action": {"share": f'{temp_dir}$uri'}},
+                ],
+                "applications": {
+                    "mirror": {
+                        "type": self.get_application_type(),
+                        "processes": {"spare": 0},
+                        "path": f'{option.test_dir}/python/mirror',
+                        "working_directory": f'{option.test_dir}'
+                        '/python/mirror',
+                        "module": "wsgi",
+                    }
+                },
+            }
+        ), 'load configuration'
+
+    def get_application_type(self):
+        return 'python'
+
+    def connect(self, port=7080, wrapper=None, **kwargs):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.settimeout(10)
+
+        if wrapper is not None:
+            sock = wrapper(sock)
+
+        h2 = H2(sock)
+
+        sock.sendall(PREFACE)
+        h2.send(SETTINGS, 0, 0, settings(**kwargs))
+
+        frame = h2.wait(SETTINGS)
+        assert frame is not None and not frame[1] & ACK, 'server settings'
+
+        return h2
+
+    def goaway(self, h2):
+        frame = h2.wait(GOAWAY)
+        assert frame is not None, 'goaway'
+
+        return struct.unpack('>I', frame[3][4:8])[0]
+
+    def test_http2_get(self):
+        h2 = self.connect()
+
+        h2.request(1, path='/index.html')
+        resp = h2.response(1)
+
+        assert resp['status'] == 200, 'status'
+        assert resp['headers']['content-length'] == '10', 'content length'
+        assert resp['headers']['server'].startswith('Unit'), 'server'
+        assert resp['body'] == b'0123456789', 'body'
+
+        h2.request(3, path='/return')
+        assert h2.response(3)['status'] == 204, 'return'
+
+        h2.request(5, path='/blah')
+        assert h2.response(5)['status'] == 404, 'not found'
+
+        h2.request(7, path='/blah', headers=[('cookie', 'a=1'), ('cookie', 'b=2')])
+        assert h2.response(7)['status'] == 200, 'cookies'
+
+    def test_http2_settings_advertised(self):
+        assert 'success' in self.conf(
+            {"max_concurrent_streams": 10, "initial_window_size": 1000000},
+            'settings/http/http2',
+        )
+
+        sock = socket.create_connection(('127.0.0.1', 7080))
+        sock.settimeout(10)
+
+        h2 = H2(sock)
+        sock.sendall(PREFACE)
+        h2.send(SETTINGS)
+
+        frame = h2.wait(SETTINGS)
+        values = dict(
+            struct.unpack('>HI', frame[3][i : i + 6])
+            for i in range(0, len(frame[3]), 6)
+        )
+
+        assert values[3] == 10, 'max concurrent streams'
+        assert values[4] == 1000000, 'initial window size'
+
+    def test_http2_streams(self):
+        h2 = self.connect()
+
+        for stream in range(1, 20, 2):
+            h2.request(
+                stream,
+                method='POST',
+                path='/app',
+                body=str(stream).encode() * 100,
+            )
+
+        for stream in reversed(range(1, 20, 2)):
+            resp = h2.response(stream)
+
+            assert resp['status'] == 200, f'stream {stream} status'
+            assert resp['body'] == str(stream).encode() * 100, 'body'
+
+    def test_http2_body(self):
+        h2 = self.connect()
+
+        body = b'0123456789' * 5000
+
+        h2.send(
+            HEADERS,
+            END_HEADERS,
+            1,
+            hpack_encode(
+                [
+                    (':method', 'POST'),
+                    (':scheme', 'http'),
+                    (':path', '/app'),
+                    ('content-length', str(len(body))),
+                ]
+            ),
+        )
+
+        for i in range(0, len(body), 10000):
+            h2.send(DATA, 0, 1, body[i : i + 10000])
+
+        h2.send(DATA, END_STREAM, 1)
+
+        resp = h2.response(1)
+        assert resp['status'] == 200, 'status'
+        assert resp['body'] == body, 'body'
+
+        h2.send(
+            HEADERS,
+            END_HEADERS,
+            3,
+            hpack_encode(
+                [(':method', 'POST'), (':scheme', 'http'), (':path', '/app')]
+            ),
+        )
+        h2.send(DATA, 0, 3, b'blah')
+        h2.send(DATA, END_STREAM, 3, b'blah')
+
+        assert h2.response(3)['body'] == b'blahblah', 'no content length'
+
+        h2.request(
+            5,
+            method='POST',
+            path='/app',
+            headers=[('content-length', '5')],
+            body=b'blah',
+        )
+
+        assert h2.response(5)['status'] == 400, 'content length mismatch'
+
+    def test_http2_max_body_size(self):
+        assert 'success' in self.conf({"max_body_size": 10}, 'settings/http')
+
+        h2 = self.connect()
+
+        h2.request(1, method='POST', path='/app', body=b'x' * 20)
+
+        assert h2.response(1)['status'] == 413, 'payload too large'
+
+    def test_http2_flow_control(self, temp_dir):
+        h2 = self.connect(initial_window_size=1000)
+
+        h2.request(1, path='/index.html')
+        assert h2.response(1)['body'] == b'0123456789', 'small'
+
+        h2.stream_window_update = False
+        h2.request(3, path='/big')
+
+        frame = h2.wait(DATA, 3)
+        assert len(frame[3]) == 1000, 'window limited'
+
+        h2.send(PING, 0, 0, b'12345678')
+        assert h2.wait(PING) is not None, 'ping'
+        assert DATA not in [f[0] for f in h2.pending], 'window exhausted'
+
+        h2.stream_window_update = True
+        h2.send(WINDOW_UPDATE, 0, 3, struct.pack('>I', 200000))
+
+        resp = h2.response(3)
+        assert len(frame[3] + resp['body']) == 200000, 'window updates'
+
+    def test_http2_flow_control_settings(self):
+        h2 = self.connect(initial_window_size=0)
+
+        h2.request(1, path='/index.html')
+
+        frame = h2.wait(HEADERS, 1)
+        assert frame is not None, 'headers'
+
+        h2.send(SETTINGS, 0, 0, settings(initial_window_size=65535))
+
+        assert h2.response(1)['body'] == b'0123456789', 'window opened'
+
+    def test_http2_frame_size(self):
+        h2 = self.connect(max_frame_size=20000)
+
+        h2.request(1, path='/big')
+        resp = h2.response(1)
+
+        assert len(resp['body']) == 200000, 'body'
+
+    def test_http2_max_concurrent_streams(self):
+        assert 'success' in self.conf(
+            {"max_concurrent_streams": 1}, 'settings/http/http2'
+        )
+
+        h2 = self.connect()
+
+        h2.send(
+            HEADERS,
+            END_HEADERS,
+            1,
+            hpack_encode(
+                [(':method', 'POST'), (':scheme', 'http'), (':path', '/app')]
+            ),
+        )
+
+        h2.request(3, path='/index.html')
+        assert h2.response(3).get('reset') == REFUSED_STREAM, 'refused'
+
+        h2.send(DATA, END_STREAM, 1, b'blah')
+        assert h2.response(1)['body'] == b'blah', 'first stream'
+
+        h2.request(5, path='/index.html')
+        assert h2.response(5)['status'] == 200, 'stream after close'
+
+    def test_http2_reset(self):
+        h2 = self.connect()
+
+        h2.send(
+            HEADERS,
+            END_HEADERS,
+            1,
+            hpack_encode(
+                [(':method', 'POST'), (':scheme', 'http'), (':path', '/app')]
+            ),
+        )
+        h2.send(RST_STREAM, 0, 1, struct.pack('>I', 8))
+
+        h2.request(3, path='/index.html')
+        assert h2.response(3)['status'] == 200, 'after reset'
+
+    def test_http2_continuation(self):
+        h2 = self.connect()
+
+        block = hpack_encode(
+            [
+                (':method', 'GET'),
+                (':scheme', 'http'),
+                (':path', '/index.html'),
+                ('x-long', 'x' * 1000),
+            ]
+        )
+
+        h2.send(HEADERS, END_STREAM, 1, block[:100])
+        h2.send(CONTINUATION, 0, 1, block[100:500])
+        h2.send(CONTINUATION, END_HEADERS, 1, block[500:])
+
+        assert h2.response(1)['status'] == 200, 'continuation'
+
+    def test_http2_ping(self):
+        h2 = self.connect()
+
+        h2.send(PING, 0, 0, b'12345678')
+
+        frame = h2.wait(PING)
+        assert frame[1] == ACK, 'ping ack'
+        assert frame[3] == b'12345678', 'ping payload'
+
+    def test_http2_malformed(self):
+        h2 = self.connect()
+
+        def check(stream, headers):
+            h2.send(HEADERS, END_HEADERS | END_STREAM, stream,
+                    hpack_encode(headers))
+
+            assert h2.response(stream).get('reset') == PROTOCOL_ERROR, (
+                f'malformed {headers}'
+            )
+
+        check(1, [(':method', 'GET'), (':scheme', 'http')])
+        check(3, [(':method', 'GET'), (':path', '/')])
+        check(5, [(':method', 'GET'), (':scheme', 'http'), (':path', '/'),
+                  ('X-Upper', '1')])
+        check(7, [(':method', 'GET'), (':scheme', 'http'), (':path', '/'),
+                  ('connection', 'close')])
+        check(9, [(':method', 'GET'), (':scheme', 'http'), ('x', '1'),
+                  (':path', '/')])
+        check(11, [(':method', 'GET'), (':scheme', 'http'), (':path', '/'),
+                   ('te', 'gzip')])
+
+        h2.request(13, path='blah')
+        assert h2.response(13)['status'] == 400, 'bad path'
+
+        h2.request(15, path='/index.html')
+        assert h2.response(15)['status'] == 200, 'still alive'
+
+    def test_http2_connection_errors(self):
+        h2 = self.connect()
+        h2.send(DATA, 0, 0, b'blah')
+        assert self.goaway(h2) == PROTOCOL_ERROR, 'data on stream 0'
+
+        h2 = self.connect()
+        h2.send(PING, 0, 0, b'1234')
+        assert self.goaway(h2) == FRAME_SIZE_ERROR, 'ping size'
+
+        h2 = self.connect()
+        h2.send(HEADERS, END_HEADERS, 2, b'')
+        assert self.goaway(h2) == PROTOCOL_ERROR, 'even stream'
+
+        h2 = self.connect()
+        h2.send(WINDOW_UPDATE, 0, 0, struct.pack('>I', 0x7FFFFFFF))
+        assert self.goaway(h2) == FLOW_CONTROL_ERROR, 'window overflow'
+
+        h2 = self.connect()
+        h2.send(HEADERS, END_HEADERS | END_STREAM, 1, b'\xff\xff')
+        assert self.goaway(h2) == 0x9, 'compression error'
+
+        sock = socket.create_connection(('127.0.0.1', 7080))
+        sock.settimeout(10)
+        h2 = H2(sock)
+        sock.sendall(PREFACE)
+        h2.send(PING, 0, 0, b'12345678')
+        assert self.goaway(h2) == PROTOCOL_ERROR, 'no settings'
+
+    def test_http2_goaway(self):
+        h2 = self.connect()
+
+        h2.request(1, path='/index.html')
+        assert h2.response(1)['status'] == 200, 'request'
+
+        h2.send(GOAWAY, 0, 0, struct.pack('>II', 0, 0))
+
+        assert h2.wait(HEADERS) is None, 'closed'
+
+    def test_http2_http1(self):
+        assert self.get(url='/index.html')['body'] == '0123456789', 'http/1'
+
+        assert 'success' in self.conf('false', 'listeners/*:7080/http2')
+
+        sock = socket.create_connection(('127.0.0.1', 7080))
+        sock.settimeout(10)
+        sock.sendall(PREFACE)
+
+        assert sock.recv(1024).startswith(b'HTTP/1.1 '), 'disabled'
+
+    def test_http2_tls(self):
+        self.certificate()
+
+        assert 'success' in self.conf(
+            {"pass": "routes", "http2": True, "tls": {"certificate": "default"}},
+            'listeners/*:7080',
+        )
+
+        self.context.set_alpn_protocols(['h2', 'http/1.1'])
+
+        h2 = self.connect(wrapper=self.context.wrap_socket)
+        assert h2.sock.selected_alpn_protocol() == 'h2', 'alpn'
+
+        h2.request(1, path='/big')
+        assert len(h2.response(1)['body']) == 200000, 'tls body'
+
+        self.context.set_alpn_protocols(['http/1.1'])
+
+        assert self.get_ssl(url='/index.html')['status'] == 200, 'http/1.1'
+
+    def test_http2_settings_invalid(self):
+        def check(conf):
+            assert 'error' in self.conf(conf, 'settings/http/http2'), conf
+
+        check({"max_concurrent_streams": 0})
+        check({"initial_window_size": 0})
+        check({"initial_window_size": 2147483648})
+        check({"blah": 1})
+
+        assert 'error' in self.conf('1', 'listeners/*:7080/http2')
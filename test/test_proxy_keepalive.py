@@ -0,0 +1,247 @@
+import time
+
+import pytest
+from unit.applications.lang.python import TestApplicationPython
+from unit.option import option
+from unit.status import Status
+
+
+class TestProxyKeepalive(TestApplicationPython):
+    prerequisites = {'modules': {'python': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "routes"},
+                    "*:7081": {"pass": "applications/mirror"},
+                },
+                "routes": [
+                    {
+                        "action": {
+                            "proxy": "http://127.0.0.1:7081",
+                            "keepalive": {"idle_timeout": 2},
+                        }
+                    }
+                ],
+                "applications": {
+                    "mirror": self.app_default('mirror'),
+                    "204_no_content": self.app_default('204_no_content'),
+                },
+            }
+        ), 'proxy keepalive configuration'
+
+    def app_default(self, name):
+        name_dir = f'{option.test_dir}/python/{name}'
+        return {
+            "type": self.get_application_type(),
+            "processes": {"spare": 0},
+            "path": name_dir,
+            "working_directory": name_dir,
+            "module": "wsgi",
+        }
+
+    def post_http10(self, *args, **kwargs):
+        return self.post(*args, http_10=True, **kwargs)
+
+    def test_proxy_keepalive(self):
+        Status.init()
+
+        for i in range(10):
+            body = str(i) * (i + 1)
+            resp = self.post_http10(body=body)
+
+            assert resp['status'] == 200, 'status'
+            assert resp['body'] == body, 'body'
+
+        assert Status.get('/proxy/keepalive') == {
+            'hits': 9,
+            'misses': 1,
+            'idle': 1,
+        }, 'keepalive status'
+
+        assert Status.get('/connections/accepted') == 11, 'upstream reused'
+
+    def test_proxy_keepalive_disabled(self):
+        assert 'success' in self.conf_delete('routes/0/action/keepalive')
+
+        Status.init()
+
+        for _ in range(5):
+            assert self.post_http10(body='0123456789')['status'] == 200
+
+        assert Status.get('/proxy/keepalive') == {
+            'hits': 0,
+            'misses': 0,
+            'idle': 0,
+        }, 'keepalive status'
+
+        assert Status.get('/connections/accepted') == 10, 'no reuse'
+
+    def test_proxy_keepalive_no_content(self):
+        assert 'success' in self.conf(
+            '"applications/204_no_content"', 'listeners/*:7081/pass'
+        )
+
+        Status.init()
+
+        for _ in range(3):
+            assert self.get(http_10=True)['status'] == 204, 'status'
+
+        assert Status.get('/proxy/keepalive/hits') == 2, 'hits'
+
+    def test_proxy_keepalive_connections(self):
+        assert 'success' in self.conf(
+            {"connections": 1, "idle_timeout": 2},
+            'routes/0/action/keepalive',
+        )
+
+        socks = []
+        for _ in range(3):
+            sock = self.post(
+                headers={
+                    'Host': 'localhost',
+                    'Content-Length': '10',
+                    'Connection': 'close',
+                },
+                body='0123456789',
+                start=True,
+                no_recv=True,
+            )
+            socks.append(sock)
+
+        for sock in socks:
+            assert self.recvall(sock).decode().startswith('HTTP/1.1 200')
+            sock.close()
+
+        time.sleep(0.2)
+
+        assert Status.get('/proxy/keepalive/idle') == 1, 'pool size'
+
+    def test_proxy_keepalive_idle_timeout(self):
+        assert 'success' in self.conf(
+            {"idle_timeout": 1}, 'routes/0/action/keepalive'
+        )
+
+        Status.init()
+
+        assert self.post_http10(body='0')['status'] == 200
+        assert Status.get('/proxy/keepalive/idle') == 1, 'idle'
+
+        time.sleep(2)
+
+        assert Status.get('/proxy/keepalive/idle') == 0, 'idle expired'
+
+        assert self.post_http10(body='0')['status'] == 200
+        assert Status.get('/proxy/keepalive/misses') == 2, 'misses'
+
+    def test_proxy_keepalive_upstream_close(self):
+        assert 'success' in self.conf(
+            {"http": {"idle_timeout": 1}}, 'settings'
+        )
+
+        assert self.post_http10(body='0')['status'] == 200
+
+        time.sleep(2)
+
+        for _ in range(3):
+            resp = self.post_http10(body='01234')
+            assert resp['status'] == 200, 'status'
+            assert resp['body'] == '01234', 'body'
+
+    def test_proxy_keepalive_upstreams(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "upstreams/one"},
+                    "*:7081": {"pass": "applications/mirror"},
+                },
+                "upstreams": {
+                    "one": {
+                        "servers": {"127.0.0.1:7081": {}},
+                        "keepalive": {"connections": 4, "idle_timeout": 2},
+                    }
+                },
+                "applications": {"mirror": self.app_default('mirror')},
+            }
+        ), 'upstreams keepalive configuration'
+
+        Status.init()
+
+        for _ in range(5):
+            assert self.post_http10(body='0123456789')['status'] == 200
+
+        assert Status.get('/proxy/keepalive/hits') == 4, 'hits'
+
+    def test_proxy_keepalive_separate_pools(self):
+        assert 'success' in self.conf(
+            {
+                "one": {
+                    "servers": {"127.0.0.1:7081": {}},
+                    "keepalive": {"idle_timeout": 10},
+                }
+            },
+            'upstreams',
+        )
+        assert 'success' in self.conf(
+            [
+                {
+                    "match": {"uri": "/short"},
+                    "action": {
+                        "proxy": "http://127.0.0.1:7081",
+                        "keepalive": {"idle_timeout": 1},
+                    },
+                },
+                {
+                    "match": {"uri": "/long"},
+                    "action": {"pass": "upstreams/one"},
+                },
+            ],
+            'routes',
+        )
+
+        Status.init()
+
+        assert self.post_http10(url='/long', body='0')['status'] == 200
+        assert self.post_http10(url='/short', body='0')['status'] == 200
+
+        assert Status.get('/proxy/keepalive') == {
+            'hits': 0,
+            'misses': 2,
+            'idle': 2,
+        }, 'separate pools'
+
+        time.sleep(2)
+
+        assert Status.get('/proxy/keepalive/idle') == 1, 'own idle timeout'
+
+        assert self.post_http10(url='/long', body='0')['status'] == 200
+        assert Status.get('/proxy/keepalive/hits') == 1, 'long reused'
+
+    def test_proxy_keepalive_invalid(self):
+        def check_keepalive(keepalive):
+            assert 'error' in self.conf(
+                keepalive, 'routes/0/action/keepalive'
+            ), f'invalid {keepalive}'
+
+        check_keepalive('"blah"')
+        check_keepalive({"connections": 0})
+        check_keepalive({"connections": -1})
+        check_keepalive({"connections": 2147483648})
+        check_keepalive({"connections": "1"})
+        check_keepalive({"idle_timeout": 0})
+        check_keepalive({"idle_timeout": 2147484})
+        check_keepalive({"blah": 1})
+
+        assert 'error' in self.conf(
+            {
+                "listeners": {"*:7080": {"pass": "upstreams/one"}},
+                "upstreams": {
+                    "one": {
+                        "servers": {"127.0.0.1:7081": {}},
+                        "keepalive": {"connections": 0},
+                    }
+                },
+            }
+        ), 'invalid upstream keepalive'
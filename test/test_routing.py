@@ -2,6 +2,7 @@
 import pytest
 from unit.applications.lang.python import TestApplicationPython
 from unit.option import option
+from unit.status import Status
 
 
 class TestRouting(TestApplicationPython):
@@ -286,6 +287,48 @@ class TestRouting(TestApplicationPython):
         assert self.get(url='/blh')['status'] == 404, '/blh'
         assert self.get(url='/BLAH')['status'] == 200, '/BLAH'
 
+    def test_routes_match_regex_set(self):
+        if not option.available['modules']['regex']:
+            pytest.skip('requires regex')
+
+        self.route_match(
+            {
+                "uri": [
+                    "~^/a[0-9]+$",
+                    "~^/b/",
+                    "~(?i)^/case$",
+                    "~^/(x)\\1$",
+                    "~^/(?<n>y)\\k<n>$",
+                    "~^/z(?=z)",
+                    "!~^/b/no",
+                    "!~^/a1$",
+                    "!~^/a22",
+                    "!~/deny$",
+                    "/exact",
+                ]
+            }
+        )
+
+        def check(uri, status):
+            assert self.get(url=uri)['status'] == status, uri
+
+        check('/a0', 200)
+        check('/a1', 404)
+        check('/a22', 404)
+        check('/a333', 200)
+        check('/a', 404)
+        check('/b/', 200)
+        check('/b/no', 404)
+        check('/b/deny', 404)
+        check('/CASE', 200)
+        check('/xx', 200)
+        check('/x', 404)
+        check('/yy', 200)
+        check('/zz', 200)
+        check('/z', 404)
+        check('/exact', 200)
+        check('/other', 404)
+
     def test_routes_pass_encode(self):
         python_dir = f'{option.test_dir}/python'
 
@@ -1727,6 +1770,46 @@ class TestRouting(TestApplicationPython):
         assert self.get(sock_type='ipv6')['status'] == 200, '0'
         assert self.get(port=7081)['status'] == 404, '0 ipv4'
 
+    def test_routes_source_index(self):
+        assert 'success' in self.conf(
+            {
+                "*:7080": {"pass": "routes"},
+                "[::1]:7081": {"pass": "routes"},
+            },
+            'listeners',
+        ), 'source listeners configure'
+
+        def check(source, ipv4, ipv6):
+            self.route_match({"source": source})
+            assert self.get()['status'] == ipv4, f'{source[-2:]}'
+            assert (
+                self.get(sock_type='ipv6', port=7081)['status'] == ipv6
+            ), f'{source[-2:]} ipv6'
+
+        filler = [f'10.{i}.0.0/16' for i in range(64)]
+        filler += [f'2001:db8:{i:x}::/48' for i in range(64)]
+        negative = [f'!{addr}' for addr in filler]
+
+        check(filler, 404, 404)
+        check(filler + ["127.0.0.0/8"], 200, 404)
+        check(filler + ["127.0.1.0/24", "127.0.0.1"], 200, 404)
+        check(filler + ["127.0.0.0/25", "127.0.0.1"], 200, 404)
+        check(filler + ["::1"], 404, 200)
+        check(filler + ["::/1"], 404, 200)
+        check(filler + ["0.0.0.0/0"], 200, 404)
+
+        check(negative, 200, 200)
+        check(negative + ["!127.0.0.0/8"], 404, 200)
+        check(negative + ["!::1"], 200, 404)
+        check(filler + ["!127.0.0.0/24", "127.0.0.0/8"], 404, 404)
+        check(filler + ["!127.0.0.2", "127.0.0.0/8"], 200, 404)
+
+        check(filler + ["127.0.0.2-127.0.0.3"], 404, 404)
+        check(filler + ["127.0.0.0-127.0.0.1"], 200, 404)
+        check(negative + ["!127.0.0.0-127.0.0.1"], 404, 200)
+        check(filler + ["*:1-65535"], 200, 200)
+        check(negative + ["!*:1-65535"], 404, 404)
+
     def test_routes_source_unix(self, temp_dir):
         addr = f'{temp_dir}/sock'
 
@@ -1913,3 +1996,154 @@ class TestRouting(TestApplicationPython):
         ), 'proxy configure'
 
         assert self.get()['status'] == 200, 'proxy'
+
+    def test_routes_index(self):
+        def step(i, match=None):
+            route = {
+                "action": {"return": 301, "location": f"/{i}/$route_steps"}
+            }
+
+            if match is not None:
+                route["match"] = match
+
+            return route
+
+        routes = [
+            step(i, {"host": f"t{i}.example.com", "uri": f"/t{i}/*"})
+            for i in range(20)
+        ]
+        routes += [
+            step(20, {"uri": "~^/regex/"}),
+            step(
+                21,
+                {
+                    "host": ["t3.example.com", "!t4.example.com"],
+                    "uri": ["/exact", "!/exact/no"],
+                },
+            ),
+            step(22, {"host": "*.example.com", "uri": "/wild"}),
+            step(23, {"uri": ["/t5/*", "/other"], "method": "POST"}),
+            step(24, {"host": "t1.example.com"}),
+        ]
+        routes += [step(i, {"host": f"filler{i}"}) for i in range(25, 40)]
+        routes.append(step(40))
+
+        assert 'success' in self.conf(routes, 'routes')
+
+        def check(host, uri, expect, method='GET'):
+            resp = self.http(
+                method,
+                url=uri,
+                headers={'Host': host, 'Connection': 'close'},
+            )
+            assert resp['status'] == 301, 'status'
+
+            selected, steps = resp['headers']['Location'].split('/')[1:]
+            assert int(selected) == expect, f'{method} {host}{uri}'
+
+            return int(steps)
+
+        requests = [
+            ('t0.example.com', '/t0/a', 0),
+            ('T0.Example.com', '/t0/', 0),
+            ('t0.example.com', '/t1/a', 40),
+            ('t1.example.com', '/nothing', 24),
+            ('t3.example.com', '/exact', 21),
+            ('t3.example.com', '/exact/no', 40),
+            ('t4.example.com', '/exact', 40),
+            ('x.example.com', '/wild', 22),
+            ('t2.example.com', '/regex/a', 20),
+            ('t5.example.com', '/t5/x', 5),
+            ('filler30', '/', 30),
+            ('unknown', '/t5', 40),
+        ]
+
+        indexed = []
+
+        for host, uri, expect in requests:
+            indexed.append(check(host, uri, expect))
+
+        assert check('t0.example.com', '/t5/x', 23, method='POST') == 2
+        assert check('t0.example.com', '/t0/a', 0) == 1, 'index steps'
+        assert check('t1.example.com', '/nothing', 24) == 2, 'index skip'
+
+        assert 'success' in self.conf(
+            {"http": {"log_route": True}}, 'settings'
+        ), 'log_route'
+
+        for (host, uri, expect), steps in zip(requests, indexed):
+            assert check(host, uri, expect) >= steps, 'linear'
+
+        assert check('t1.example.com', '/nothing', 24) == 25, 'linear steps'
+
+    def test_routes_memo(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {"*:7080": {"pass": "routes"}},
+                "routes": [
+                    {"match": {"uri": "/a"}, "action": {"return": 200}},
+                    {
+                        "match": {"uri": "/b", "method": "GET"},
+                        "action": {"return": 201},
+                    },
+                    {
+                        "match": {"headers": {"X-Test": "1"}},
+                        "action": {"return": 202},
+                    },
+                    {"action": {"return": 203}},
+                ],
+                "applications": {},
+                "settings": {"http": {"route_memo": True}},
+            }
+        ), 'route_memo configure'
+
+        Status.init()
+
+        resp, sock = self.get(
+            headers={'Host': 'localhost'}, url='/a', start=True, read_timeout=1
+        )
+        assert resp['status'] == 200, 'first'
+
+        def check(uri, status, method='GET', headers=None):
+            req_headers = {'Host': 'localhost'}
+            req_headers.update(headers or {})
+
+            resp = self.http(
+                method,
+                url=uri,
+                headers=req_headers,
+                sock=sock,
+                start=True,
+                read_timeout=1,
+            )[0]
+            assert resp['status'] == status, f'{method} {uri} {headers}'
+
+        check('/a', 200)
+        check('/b', 201)
+        check('/b', 201)
+        check('/b', 203, method='POST')
+        check('/x', 203)
+        check('/x', 203)
+        check('/a', 200)
+        check('/a', 200, headers={'X-Test': '1'})
+        check('/b', 202, method='POST', headers={'X-Test': '1'})
+
+        assert Status.get('/routes/memo') == {'hits': 3, 'misses': 7}
+
+        assert 'success' in self.conf(
+            {"return": 204}, 'routes/0/action'
+        ), 'reconfigure'
+
+        check('/a', 204)
+        check('/a', 204)
+
+        assert Status.get('/routes/memo') == {'hits': 4, 'misses': 8}
+
+        sock.close()
+
+        assert 'success' in self.conf_delete('settings/http/route_memo')
+
+        assert self.get(url='/a')['status'] == 204, 'disabled'
+        assert Status.get('/routes/memo') == {'hits': 4, 'misses': 8}
+
+        assert 'error' in self.conf('1', 'settings/http/route_memo')
@@ -0,0 +1,157 @@
+import os
+import time
+
+import pytest
+from unit.applications.proto import TestApplicationProto
+from unit.status import Status
+
+
+class TestStaticCache(TestApplicationProto):
+    prerequisites = {}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self, temp_dir):
+        os.makedirs(f'{temp_dir}/assets')
+
+        for name, data in [('index.html', '0123456789'), ('README', 'readme')]:
+            with open(f'{temp_dir}/assets/{name}', 'w') as f:
+                f.write(data)
+
+        self._load_conf(
+            {
+                "listeners": {"*:7080": {"pass": "routes"}},
+                "routes": [
+                    {
+                        "action": {
+                            "share": f'{temp_dir}/assets$uri',
+                            "open_file_cache": {"valid": 1},
+                        }
+                    }
+                ],
+            }
+        )
+
+        Status.init()
+
+    def test_static_cache(self):
+        for _ in range(3):
+            assert self.get()['body'] == '0123456789', 'body'
+
+        assert self.get(url='/README')['body'] == 'readme', 'body 2'
+
+        assert Status.get('/static/open_file_cache') == {
+            'hits': 2,
+            'misses': 2,
+            'open': 2,
+        }, 'cache status'
+
+        assert self.get(url='/blah')['status'] == 404, 'not found'
+        assert Status.get('/static/open_file_cache/open') == 2, 'not cached'
+
+        time.sleep(2)
+
+        assert Status.get('/static/open_file_cache/open') == 0, 'expired'
+
+    def test_static_cache_revalidate(self, temp_dir):
+        etag = self.get()['headers']['ETag']
+
+        with open(f'{temp_dir}/assets/new', 'w') as f:
+            f.write('new')
+
+        os.rename(f'{temp_dir}/assets/new', f'{temp_dir}/assets/index.html')
+
+        resp = self.get()
+        assert resp['body'] == '0123456789', 'cached'
+        assert resp['headers']['ETag'] == etag, 'cached ETag'
+
+        time.sleep(1.1)
+
+        resp = self.get()
+        assert resp['body'] == 'new', 'revalidated'
+        assert resp['headers']['ETag'] != etag, 'revalidated ETag'
+
+    def test_static_cache_max(self):
+        assert 'success' in self.conf(
+            {"max": 1, "valid": 1}, 'routes/0/action/open_file_cache'
+        )
+
+        Status.init()
+
+        for _ in range(2):
+            assert self.get()['status'] == 200
+            assert self.get(url='/README')['status'] == 200
+
+        assert Status.get('/static/open_file_cache') == {
+            'hits': 0,
+            'misses': 4,
+            'open': 1,
+        }, 'evicted'
+
+    def test_static_cache_range(self, temp_dir):
+        assert self.get()['status'] == 200
+
+        resp = self.get(
+            headers={
+                'Host': 'localhost',
+                'Range': 'bytes=2-5',
+                'Connection': 'close',
+            }
+        )
+        assert resp['status'] == 206, 'range status'
+        assert resp['body'] == '2345', 'range body'
+
+        assert self.head()['headers']['Content-Length'] == '10', 'head'
+
+        assert Status.get('/static/open_file_cache/hits') == 2, 'hits'
+
+    def test_static_cache_precompressed(self):
+        assert 'success' in self.conf(
+            'true', 'routes/0/action/precompressed'
+        )
+
+        Status.init()
+
+        for _ in range(2):
+            resp = self.get(
+                headers={
+                    'Host': 'localhost',
+                    'Accept-Encoding': 'gzip',
+                    'Connection': 'close',
+                }
+            )
+            assert resp['status'] == 200, 'status'
+            assert 'Content-Encoding' not in resp['headers'], 'not encoded'
+
+        assert Status.get('/static/open_file_cache') == {
+            'hits': 2,
+            'misses': 2,
+            'open': 1,
+        }, 'negative'
+
+    def test_static_cache_disabled(self):
+        assert 'success' in self.conf_delete('routes/0/action/open_file_cache')
+
+        Status.init()
+
+        for _ in range(3):
+            assert self.get()['status'] == 200
+
+        assert Status.get('/static/open_file_cache') == {
+            'hits': 0,
+            'misses': 0,
+            'open': 0,
+        }, 'disabled'
+
+    def test_static_cache_invalid(self):
+        def check_cache(cache):
+            assert 'error' in self.conf(
+                cache, 'routes/0/action/open_file_cache'
+            ), f'invalid {cache}'
+
+        check_cache('"blah"')
+        check_cache({"max": 0})
+        check_cache({"max": "1"})
+        check_cache({"max": 2147483648})
+        check_cache({"valid": 0})
+        check_cache({"valid": 2147484})
+        check_cache({"blah": 1})
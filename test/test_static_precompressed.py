@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from unit.applications.proto import TestApplicationProto
+
+
+class TestStaticPrecompressed(TestApplicationProto):
+    prerequisites = {}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self, temp_dir):
+        os.makedirs(f'{temp_dir}/assets/dir.gz')
+
+        for name, data in [
+            ('index.html', 'plain'),
+            ('index.html.gz', 'gzip'),
+            ('index.html.br', 'brotli'),
+            ('style.css', 'plain css'),
+            ('style.css.gz', 'gzip css'),
+            ('dir', 'plain dir'),
+        ]:
+            with open(f'{temp_dir}/assets/{name}', 'w') as f:
+                f.write(data)
+
+        self._load_conf(
+            {
+                "listeners": {"*:7080": {"pass": "routes"}},
+                "routes": [
+                    {
+                        "action": {
+                            "share": f'{temp_dir}/assets$uri',
+                            "precompressed": True,
+                        }
+                    }
+                ],
+            }
+        )
+
+    def get_encoded(self, encoding, url='/', method='GET'):
+        return self.http(
+            method,
+            url=url,
+            headers={
+                'Host': 'localhost',
+                'Accept-Encoding': encoding,
+                'Connection': 'close',
+            },
+        )
+
+    def check_encoded(self, encoding, body, content_encoding, url='/'):
+        resp = self.get_encoded(encoding, url=url)
+        assert resp['status'] == 200, 'status'
+        assert resp['body'] == body, f'body {encoding}'
+        assert resp['headers']['Vary'] == 'Accept-Encoding', 'Vary'
+
+        if content_encoding is None:
+            assert 'Content-Encoding' not in resp['headers'], 'not encoded'
+
+        else:
+            assert (
+                resp['headers']['Content-Encoding'] == content_encoding
+            ), f'Content-Encoding {encoding}'
+
+        return resp
+
+    def test_static_precompressed(self):
+        resp = self.check_encoded('gzip', 'gzip', 'gzip')
+        assert resp['headers']['Content-Type'] == 'text/html', 'Content-Type'
+        assert resp['headers']['Content-Length'] == '4', 'Content-Length'
+
+        self.check_encoded('gzip, br', 'brotli', 'br')
+        self.check_encoded('br;q=0, gzip', 'gzip', 'gzip')
+        self.check_encoded('*', 'brotli', 'br')
+        self.check_encoded('identity', 'plain', None)
+
+        assert self.get()['body'] == 'plain', 'no Accept-Encoding'
+
+    def test_static_precompressed_missing(self):
+        resp = self.check_encoded('br', 'plain css', None, url='/style.css')
+        assert resp['headers']['Content-Type'] == 'text/css', 'Content-Type'
+
+        self.check_encoded('br, gzip', 'gzip css', 'gzip', url='/style.css')
+
+        self.check_encoded('gzip', 'plain dir', None, url='/dir')
+
+    def test_static_precompressed_head(self):
+        resp = self.get_encoded('gzip', method='HEAD')
+        assert resp['status'] == 200, 'status'
+        assert resp['headers']['Content-Encoding'] == 'gzip', 'encoding'
+        assert resp['headers']['Content-Length'] == '4', 'Content-Length'
+        assert resp['body'] == '', 'body'
+
+    def test_static_precompressed_disabled(self):
+        assert 'success' in self.conf(
+            'false', 'routes/0/action/precompressed'
+        )
+
+        resp = self.get_encoded('gzip, br')
+        assert resp['body'] == 'plain', 'body'
+        assert 'Content-Encoding' not in resp['headers'], 'not encoded'
+        assert 'Vary' not in resp['headers'], 'no Vary'
+
+        assert 'error' in self.conf('1', 'routes/0/action/precompressed')
@@ -0,0 +1,160 @@
+import os
+import re
+
+import pytest
+from unit.applications.proto import TestApplicationProto
+
+
+class TestStaticRange(TestApplicationProto):
+    prerequisites = {}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self, temp_dir):
+        os.makedirs(f'{temp_dir}/assets')
+
+        with open(f'{temp_dir}/assets/index.html', 'w') as index:
+            index.write('0123456789')
+
+        self._load_conf(
+            {
+                "listeners": {"*:7080": {"pass": "routes"}},
+                "routes": [{"action": {"share": f'{temp_dir}/assets$uri'}}],
+            }
+        )
+
+    def get_range(self, byte_range, url='/index.html', method='GET', **kwargs):
+        headers = {
+            'Host': 'localhost',
+            'Range': byte_range,
+            'Connection': 'close',
+        }
+        headers.update(kwargs.pop('headers', {}))
+
+        return self.http(method, url=url, headers=headers, **kwargs)
+
+    def multipart(self, resp):
+        boundary = re.search(
+            r'^multipart/byteranges; boundary=(\w+)$',
+            resp['headers']['Content-Type'],
+        ).group(1)
+
+        body = resp['body']
+        assert len(body) == int(resp['headers']['Content-Length'])
+        assert body.endswith(f'\r\n--{boundary}--\r\n'), 'closing boundary'
+
+        parts = []
+        for part in body.split(f'\r\n--{boundary}')[1:-1]:
+            headers, data = part.split('\r\n\r\n', 1)
+            parts.append(
+                (re.search(r'Content-Range: (.+)', headers).group(1), data)
+            )
+
+        return parts
+
+    def test_static_range(self):
+        resp = self.get_range('bytes=2-5')
+        assert resp['status'] == 206, 'status'
+        assert resp['body'] == '2345', 'body'
+        assert resp['headers']['Content-Range'] == 'bytes 2-5/10'
+        assert resp['headers']['Content-Length'] == '4'
+
+        resp = self.get_range('bytes=7-')
+        assert resp['body'] == '789', 'open-ended'
+        assert resp['headers']['Content-Range'] == 'bytes 7-9/10'
+
+        resp = self.get_range('bytes=-3')
+        assert resp['body'] == '789', 'suffix'
+        assert resp['headers']['Content-Range'] == 'bytes 7-9/10'
+
+        assert self.get_range('bytes=-20')['body'] == '0123456789', 'suffix 2'
+        assert self.get_range('bytes=8-100')['body'] == '89', 'last'
+        assert self.get_range('BYTES=0-0')['body'] == '0', 'case'
+
+        resp = self.get()
+        assert resp['status'] == 200, 'no range'
+        assert resp['headers']['Accept-Ranges'] == 'bytes', 'Accept-Ranges'
+
+    def test_static_range_head(self):
+        resp = self.get_range('bytes=2-5', method='HEAD')
+        assert resp['status'] == 206, 'status'
+        assert resp['body'] == '', 'body'
+        assert resp['headers']['Content-Length'] == '4', 'Content-Length'
+
+    def test_static_range_not_satisfiable(self):
+        for byte_range in ['bytes=10-', 'bytes=20-30', 'bytes=-0']:
+            resp = self.get_range(byte_range)
+            assert resp['status'] == 416, f'status {byte_range}'
+            assert resp['headers']['Content-Range'] == 'bytes */10'
+            assert resp['body'] == '', 'body'
+
+        resp = self.get_range('bytes=20-30, 2-3')
+        assert resp['status'] == 206, 'satisfiable part'
+        assert resp['body'] == '23', 'satisfiable part body'
+
+    def test_static_range_invalid(self):
+        for byte_range in [
+            'bytes=5-2',
+            'bytes=a-b',
+            'bytes=-',
+            'bytes=1-2;',
+            'items=1-2',
+            'bytes 1-2',
+            'bytes=99999999999999999999-',
+            'bytes=' + ','.join(['0-0'] * 17),
+            'bytes=0-9,0-9',
+        ]:
+            resp = self.get_range(byte_range)
+            assert resp['status'] == 200, f'ignored {byte_range}'
+            assert resp['body'] == '0123456789', f'ignored body {byte_range}'
+
+    def test_static_range_multipart(self):
+        resp = self.get_range('bytes=0-1, 4-5,-2')
+        assert resp['status'] == 206, 'status'
+        assert 'Content-Range' not in resp['headers'], 'no Content-Range'
+        assert self.multipart(resp) == [
+            ('bytes 0-1/10', '01'),
+            ('bytes 4-5/10', '45'),
+            ('bytes 8-9/10', '89'),
+        ], 'parts'
+
+        resp = self.get_range('bytes=0-1,,3-3')
+        assert len(self.multipart(resp)) == 2, 'empty list element'
+
+    def test_static_range_multipart_large(self, temp_dir):
+        data = os.urandom(1024 * 1024)
+
+        with open(f'{temp_dir}/assets/large', 'wb') as f:
+            f.write(data)
+
+        ranges = [(100, 200000), (300000, 700000), (1000000, 1048575)]
+
+        resp = self.get_range(
+            'bytes=' + ','.join(f'{s}-{e}' for s, e in ranges),
+            url='/large',
+            encoding='latin-1',
+            read_buffer_size=1024 * 1024,
+        )
+        assert resp['status'] == 206, 'status'
+
+        parts = self.multipart(resp)
+        assert len(parts) == 3, 'parts'
+
+        for (s, e), (content_range, body) in zip(ranges, parts):
+            assert content_range == f'bytes {s}-{e}/1048576', 'range'
+            assert body.encode('latin-1') == data[s : e + 1], 'range body'
+
+    def test_static_range_if_range(self):
+        resp = self.get()
+        etag = resp['headers']['ETag']
+        last_modified = resp['headers']['Last-Modified']
+
+        def check_if_range(if_range, status):
+            resp = self.get_range('bytes=2-5', headers={'If-Range': if_range})
+            assert resp['status'] == status, f'If-Range {if_range}'
+
+        check_if_range(etag, 206)
+        check_if_range(last_modified, 206)
+        check_if_range('"blah"', 200)
+        check_if_range(f'W/{etag}', 200)
+        check_if_range('Mon, 28 Sep 1970 06:00:00 GMT', 200)
+        check_if_range('blah', 200)
@@ -89,6 +89,216 @@ Connection: close
 
         sock.close()
 
+    def test_status_listeners_routes(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "routes/main"},
+                    "*:7081": {"pass": "routes/other"},
+                },
+                "routes": {
+                    "main": [
+                        {
+                            "match": {"uri": "/other"},
+                            "action": {"pass": "routes/other"},
+                        },
+                        {"action": {"return": 200}},
+                    ],
+                    "other": [{"action": {"return": 204}}],
+                },
+            },
+        )
+
+        Status.init()
+
+        assert self.get()['status'] == 200
+        assert self.get(port=7081)['status'] == 204
+        assert self.get(url='/other')['status'] == 204
+
+        listeners = Status.get('/listeners')
+        assert listeners['*:7080']['requests'] == {'total': 2}
+        assert listeners['*:7081']['requests'] == {'total': 1}
+
+        routes = Status.get('/routes')
+        assert routes['routes/main']['requests'] == {'total': 1}
+        assert routes['routes/other']['requests'] == {'total': 2}
+
+        # counters survive reconfiguration
+
+        assert 'success' in self.conf(
+            {"pass": "routes/other"}, 'listeners/*:7080'
+        )
+
+        assert self.get()['status'] == 204
+
+        assert Status.get('/listeners/*:7080/requests/total') == 3
+        assert Status.get('/routes')['routes/other']['requests'] == {
+            'total': 3
+        }
+
+    def test_status_responses_latency(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "routes"},
+                    "*:7081": {"pass": "applications/mirror"},
+                    "*:7082": {"pass": "applications/latency"},
+                },
+                "routes": [
+                    {
+                        "match": {"uri": "/missing"},
+                        "action": {"return": 404},
+                    },
+                    {"action": {"return": 200}},
+                ],
+                "applications": {
+                    "mirror": self.app_default("mirror"),
+                    "latency": self.app_default("delayed"),
+                },
+            },
+        )
+
+        Status.init()
+
+        assert self.get()['status'] == 200
+        assert self.get(url='/missing')['status'] == 404
+
+        responses = {'1xx': 0, '2xx': 1, '3xx': 0, '4xx': 1, '5xx': 0}
+        assert Status.get('/listeners/*:7080/responses') == responses
+        assert Status.get('/routes')['routes']['responses'] == responses
+
+        # bytes
+
+        body = '0123456789' * 10
+        assert self.post(port=7081, body=body)['body'] == body
+
+        transferred = {'received': 100, 'sent': 100}
+        assert Status.get('/listeners/*:7081/bytes') == transferred
+        assert Status.get('/applications/mirror/bytes') == transferred
+        assert Status.get('/applications/mirror/requests/total') == 1
+
+        # latency
+
+        assert Status.get('/applications/mirror/latency/sum') > 0
+
+        assert (
+            self.get(
+                headers={
+                    'Host': 'localhost',
+                    'X-Delay': '1',
+                    'Connection': 'close',
+                },
+                port=7082,
+            )['status']
+            == 200
+        )
+
+        assert Status.get('/applications/latency/latency/sum') >= 1000000
+
+        latency = self.conf_get('/status/applications/latency/latency')
+        assert 1000000 <= latency['p999'] < 2000000, 'p999'
+        assert latency['p50'] <= latency['p90'] <= latency['p99'], 'order'
+
+    def test_status_routes_many(self):
+        routes = {f'r{i}': [{"action": {"return": 200}}] for i in range(32)}
+
+        assert 'success' in self.conf(
+            {"listeners": {"*:7080": {"pass": "routes/r31"}}, "routes": routes}
+        )
+
+        Status.init()
+
+        assert self.get()['status'] == 200
+
+        routes = Status.get('/routes')
+        assert len(routes) == 33, 'routes and memo'
+        assert routes['routes/r31']['requests'] == {'total': 1}
+        assert routes['routes/r0']['requests'] == {'total': 0}
+
+        assert 'route="routes/r0"' in self.metrics()['body'], 'metrics'
+
+    def metrics(self, url='/status?format=prometheus'):
+        return self.get(
+            url=url,
+            sock_type='unix',
+            addr=f'{option.temp_dir}/control.unit.sock',
+        )
+
+    def metrics_samples(self):
+        samples = {}
+
+        for line in self.metrics()['body'].splitlines():
+            if not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+
+        return samples
+
+    def test_status_prometheus(self):
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "routes"},
+                    "*:7081": {"pass": "applications/empty"},
+                },
+                "routes": [{"action": {"return": 200}}],
+                "applications": {"empty": self.app_default()},
+            },
+        )
+
+        resp = self.metrics()
+        assert resp['status'] == 200
+        assert resp['headers']['Content-Type'].startswith(
+            'application/openmetrics-text'
+        )
+        assert resp['body'].endswith('# EOF\n'), 'eof'
+
+        before = self.metrics_samples()
+
+        assert self.get()['status'] == 200
+        assert self.get(port=7081)['status'] == 200
+
+        samples = self.metrics_samples()
+        status = self.conf_get('/status')
+
+        def diff(name):
+            return samples[name] - before.get(name, 0)
+
+        assert samples['unit_requests_total'] == status['requests']['total']
+        assert (
+            samples['unit_connections_accepted_total']
+            == status['connections']['accepted']
+        )
+        assert diff('unit_listener_requests_total{listener="*:7080"}') == 1
+        assert diff('unit_listener_requests_total{listener="*:7081"}') == 1
+        assert diff('unit_route_requests_total{route="routes"}') == 1
+        assert (
+            diff('unit_listener_responses_total{listener="*:7080",code="2xx"}')
+            == 1
+        )
+        assert (
+            diff('unit_route_request_duration_seconds_count{route="routes"}')
+            == 1
+        )
+
+        app = 'application="empty"'
+        assert samples[f'unit_application_processes{{{app},state="running"}}'] == 1
+
+        prefix = 'unit_application_timing_seconds'
+        labels = f'{app},phase="app"'
+        assert samples[f'{prefix}_count{{{labels}}}'] == 1
+        assert samples[f'{prefix}_bucket{{{labels},le="+Inf"}}'] == 1
+
+        prefix = 'unit_application_request_duration_seconds'
+        assert diff(f'{prefix}_count{{{app}}}') == 1
+        assert f'{prefix}{{{app},quantile="0.99"}}' in samples
+
+        assert self.metrics('/status?format=xml')['status'] == 400, 'format'
+        assert (
+            self.metrics('/status/requests?format=prometheus')['status'] == 400
+        ), 'subpath'
+        assert 'requests' in self.conf_get('/status?format=json'), 'json'
+
     def test_status_connections(self):
         assert 'success' in self.conf(
             {
@@ -146,7 +356,15 @@ Connection: close
             assert apps == expert.sort()
 
         def check_application(name, running, starting, idle, active):
-            assert Status.get(f'/applications/{name}') == {
+            app = Status.get(f'/applications/{name}')
+            app.pop('ipc')
+            app.pop('timing')
+            app.pop('responses')
+            app.pop('bytes')
+            app.pop('latency')
+            app['requests'].pop('total')
+
+            assert app == {
                 'processes': {
                     'running': running,
                     'starting': starting,
@@ -209,6 +427,80 @@ Connection: close
         check_application('restart', 0, 1, 0, 1)
         check_application('delayed', 0, 0, 0, 0)
 
+    def test_status_applications_ipc(self):
+        self.load('body_generate')
+        Status.init()
+
+        assert Status.get('/applications/body_generate/ipc') == {
+            'plain': {'messages': 0, 'bytes': 0},
+            'shm': {'messages': 0, 'bytes': 0},
+        }
+
+        resp = self.get(
+            headers={
+                'Host': 'localhost',
+                'X-Length': '10',
+                'Connection': 'close',
+            }
+        )
+        assert resp['body'] == 'X' * 10
+
+        ipc = Status.get('/applications/body_generate/ipc')
+        assert ipc['plain']['messages'] > 0, 'small plain'
+        assert ipc['plain']['bytes'] > 10, 'small plain bytes'
+        assert ipc['shm']['messages'] == 0, 'small shm'
+
+        Status.init()
+
+        length = 500000
+
+        resp = self.get(
+            headers={
+                'Host': 'localhost',
+                'X-Length': str(length),
+                'Connection': 'close',
+            },
+            read_buffer_size=length,
+        )
+        assert len(resp['body']) == length
+
+        ipc = Status.get('/applications/body_generate/ipc')
+        assert ipc['shm']['messages'] > 0, 'large shm'
+        assert ipc['shm']['bytes'] >= length, 'large shm bytes'
+
+    def test_status_applications_timing(self):
+        self.load('threads')
+        Status.init()
+
+        assert (
+            self.get(
+                headers={
+                    'Host': 'localhost',
+                    'X-Delay': '1',
+                    'Connection': 'close',
+                }
+            )['status']
+            == 200
+        )
+
+        timing = Status.get('/applications/threads/timing')
+
+        assert timing['queue']['count'] == 1, 'queue count'
+        assert sum(timing['queue']['buckets'].values()) == 1, 'queue buckets'
+
+        assert timing['app']['count'] == 1, 'app count'
+        assert timing['app']['sum'] >= 1000000, 'app sum'
+        buckets = timing['app']['buckets']
+
+        for bound in ['50', '100', '250', '500', '1000', '5000', '10000',
+                      '25000', '50000', '100000', '250000', '500000',
+                      '1000000']:
+            assert buckets[bound] == 0, 'app fast buckets'
+
+        assert buckets['5000000'] == 1, 'app slow bucket'
+
+        assert timing['ipc']['count'] == 1, 'ipc count'
+
     def test_status_proxy(self):
         assert 'success' in self.conf(
             {
@@ -670,6 +670,46 @@ basicConstraints = critical,CA:TRUE"""
         assert res['status'] == 200, 'status ok'
         assert res['body'] == f'{filename}{data}'
 
+    def test_tls_ktls(self, temp_dir):
+        data = '0123456789' * 20000
+
+        with open(f'{temp_dir}/file', 'w') as f:
+            f.write(data)
+
+        self.certificate()
+
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {
+                        "pass": "routes",
+                        "tls": {"certificate": "default", "ktls": True},
+                    }
+                },
+                "routes": [{"action": {"share": f'{temp_dir}$uri'}}],
+                "applications": {},
+            }
+        ), 'ktls configuration'
+
+        resp = self.get_ssl(url='/file')
+        assert resp['status'] == 200, 'status'
+        assert resp['body'] == data, 'body'
+
+        resp = self.get_ssl(
+            url='/file',
+            headers={
+                'Host': 'localhost',
+                'Range': 'bytes=100005-100014',
+                'Connection': 'close',
+            },
+        )
+        assert resp['status'] == 206, 'range status'
+        assert resp['body'] == '5678901234', 'range body'
+
+        assert 'error' in self.conf(
+            '"on"', 'listeners/*:7080/tls/ktls'
+        ), 'ktls invalid'
+
     def test_tls_multi_listener(self):
         self.load('empty')
 
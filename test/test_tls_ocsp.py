@@ -0,0 +1,363 @@
+import base64
+import socket
+import subprocess
+import time
+
+import pytest
+
+pytest.importorskip('OpenSSL.SSL')
+pytest.importorskip('cryptography.x509.ocsp')
+from cryptography import x509
+from cryptography.x509 import ocsp
+from OpenSSL.SSL import TLS_METHOD, Connection, Context
+from unit.applications.tls import TestApplicationTLS
+from unit.option import option
+
+
+class TestTLSOCSP(TestApplicationTLS):
+    prerequisites = {'modules': {'openssl': 'any'}}
+
+    responder = None
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self, temp_dir):
+        self.certificate('root', False)
+        self.generate_ca_conf()
+
+        subprocess.check_output(
+            [
+                'openssl',
+                'req',
+                '-new',
+                '-subj',
+                '/CN=localhost/',
+                '-config',
+                f'{temp_dir}/openssl.conf',
+                '-out',
+                f'{temp_dir}/localhost.csr',
+                '-keyout',
+                f'{temp_dir}/localhost.key',
+            ],
+            stderr=subprocess.STDOUT,
+        )
+
+        subprocess.check_output(
+            [
+                'openssl',
+                'ca',
+                '-batch',
+                '-config',
+                f'{temp_dir}/ca.conf',
+                '-keyfile',
+                f'{temp_dir}/root.key',
+                '-cert',
+                f'{temp_dir}/root.crt',
+                '-in',
+                f'{temp_dir}/localhost.csr',
+                '-out',
+                f'{temp_dir}/localhost.crt',
+            ],
+            stderr=subprocess.STDOUT,
+        )
+
+        assert 'success' in self.bundle_load(), 'certificate upload'
+
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {
+                        "pass": "routes",
+                        "tls": {"certificate": "localhost"},
+                    }
+                },
+                "routes": [{"action": {"return": 200}}],
+                "applications": {},
+            }
+        ), 'load application configuration'
+
+        yield
+
+        if self.responder is not None:
+            self.responder.terminate()
+            self.responder.wait()
+            self.responder = None
+
+    def generate_ca_conf(self):
+        with open(f'{option.temp_dir}/ca.conf', 'w') as f:
+            f.write(
+                f"""[ ca ]
+default_ca = myca
+
+[ myca ]
+new_certs_dir = {option.temp_dir}
+database = {option.temp_dir}/certindex
+default_md = sha256
+policy = myca_policy
+serial = {option.temp_dir}/certserial
+default_days = 1
+x509_extensions = myca_extensions
+
+[ myca_policy ]
+commonName = optional
+
+[ myca_extensions ]
+authorityInfoAccess = OCSP;URI:http://127.0.0.1:7091"""
+            )
+
+        with open(f'{option.temp_dir}/certserial', 'w') as f:
+            f.write('1000')
+
+        with open(f'{option.temp_dir}/certindex', 'w') as f:
+            f.write('')
+
+        with open(f'{option.temp_dir}/certindex.attr', 'w') as f:
+            f.write('unique_subject = no')
+
+    def bundle_load(self, name='localhost', ocsp_response=None):
+        bundle = b''
+
+        for file in ['localhost.key', 'localhost.crt', 'root.crt']:
+            with open(f'{option.temp_dir}/{file}', 'rb') as f:
+                bundle += f.read()
+
+        if ocsp_response is not None:
+            pem = base64.encodebytes(ocsp_response).replace(b'\n', b'')
+            lines = [pem[i : i + 64] for i in range(0, len(pem), 64)]
+
+            bundle += (
+                b'-----BEGIN OCSP RESPONSE-----\n'
+                + b'\n'.join(lines)
+                + b'\n-----END OCSP RESPONSE-----\n'
+            )
+
+        return self.conf(bundle, f'/certificates/{name}')
+
+    def ocsp_args(self):
+        temp_dir = option.temp_dir
+
+        return [
+            'openssl',
+            'ocsp',
+            '-index',
+            f'{temp_dir}/certindex',
+            '-rsigner',
+            f'{temp_dir}/root.crt',
+            '-rkey',
+            f'{temp_dir}/root.key',
+            '-CA',
+            f'{temp_dir}/root.crt',
+            '-ndays',
+            '1',
+        ]
+
+    def start_responder(self):
+        self.responder = subprocess.Popen(
+            self.ocsp_args() + ['-port', '7091'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+
+        for line in self.responder.stdout:
+            if b'waiting for OCSP client connections' in line:
+                return
+
+        pytest.fail('OCSP responder is not started')
+
+    def offline_response(self):
+        temp_dir = option.temp_dir
+
+        subprocess.check_output(
+            [
+                'openssl',
+                'ocsp',
+                '-issuer',
+                f'{temp_dir}/root.crt',
+                '-cert',
+                f'{temp_dir}/localhost.crt',
+                '-no_nonce',
+                '-reqout',
+                f'{temp_dir}/ocsp.req',
+            ],
+            stderr=subprocess.STDOUT,
+        )
+
+        subprocess.check_output(
+            self.ocsp_args()
+            + [
+                '-reqin',
+                f'{temp_dir}/ocsp.req',
+                '-respout',
+                f'{temp_dir}/ocsp.resp',
+            ],
+            stderr=subprocess.STDOUT,
+        )
+
+        with open(f'{temp_dir}/ocsp.resp', 'rb') as f:
+            return f.read()
+
+    def set_ocsp(self, ocsp_conf):
+        return self.conf(ocsp_conf, 'listeners/*:7080/tls/ocsp')
+
+    def staple(self):
+        stapled = []
+
+        def callback(conn, data, _):
+            stapled.append(data)
+            return True
+
+        ctx = Context(TLS_METHOD)
+        ctx.set_ocsp_client_callback(callback)
+
+        sock = socket.create_connection(('127.0.0.1', 7080))
+
+        client = Connection(ctx, sock)
+        client.set_connect_state()
+        client.request_ocsp()
+        client.do_handshake()
+        client.shutdown()
+        sock.close()
+
+        if not stapled or stapled[0] == b'':
+            return None
+
+        return stapled[0]
+
+    def wait_staple(self, previous=None):
+        for _ in range(50):
+            resp = self.staple()
+
+            if resp is not None and resp != previous:
+                return resp
+
+            time.sleep(0.1)
+
+        return None
+
+    def check_response(self, resp):
+        with open(f'{option.temp_dir}/localhost.crt', 'rb') as f:
+            cert = x509.load_pem_x509_certificate(f.read())
+
+        assert resp is not None, 'stapled'
+
+        resp = ocsp.load_der_ocsp_response(resp)
+
+        assert (
+            resp.response_status == ocsp.OCSPResponseStatus.SUCCESSFUL
+        ), 'response status'
+        assert resp.certificate_status == ocsp.OCSPCertStatus.GOOD, 'status'
+        assert resp.serial_number == cert.serial_number, 'serial'
+
+    def test_tls_ocsp(self):
+        assert self.staple() is None, 'no stapling'
+
+        self.start_responder()
+
+        assert 'success' in self.set_ocsp(
+            {"responder": "http://127.0.0.1:7091/"}
+        )
+
+        assert self.staple() is None, 'not fetched yet'
+        self.check_response(self.wait_staple())
+
+    def test_tls_ocsp_certificate_url(self):
+        self.start_responder()
+
+        assert 'success' in self.set_ocsp({})
+
+        self.staple()
+        self.check_response(self.wait_staple())
+
+    def test_tls_ocsp_refresh(self):
+        self.start_responder()
+
+        assert 'success' in self.set_ocsp({"refresh": 1})
+
+        self.staple()
+
+        resp = self.wait_staple()
+        self.check_response(resp)
+
+        time.sleep(2)
+
+        assert self.staple() == resp, 'refresh in background'
+
+        self.check_response(self.wait_staple(resp))
+
+    def test_tls_ocsp_reconfigure(self):
+        self.start_responder()
+
+        assert 'success' in self.set_ocsp({})
+
+        self.staple()
+        resp = self.wait_staple()
+        self.check_response(resp)
+
+        self.responder.terminate()
+        self.responder.wait()
+        self.responder = None
+
+        assert 'success' in self.conf(
+            {"pass": "routes", "tls": {"certificate": "localhost"}},
+            'listeners/*:7080',
+        )
+        assert 'success' in self.set_ocsp({})
+
+        assert self.staple() == resp, 'cached response'
+
+    def test_tls_ocsp_file(self):
+        resp = self.offline_response()
+
+        assert 'success' in self.bundle_load('stapled', resp), 'upload'
+        assert 'success' in self.conf(
+            '"stapled"', 'listeners/*:7080/tls/certificate'
+        )
+
+        self.check_response(self.staple())
+
+    def test_tls_ocsp_revoked(self, temp_dir, wait_for_record):
+        subprocess.check_output(
+            [
+                'openssl',
+                'ca',
+                '-config',
+                f'{temp_dir}/ca.conf',
+                '-keyfile',
+                f'{temp_dir}/root.key',
+                '-cert',
+                f'{temp_dir}/root.crt',
+                '-revoke',
+                f'{temp_dir}/localhost.crt',
+            ],
+            stderr=subprocess.STDOUT,
+        )
+
+        self.start_responder()
+
+        assert 'success' in self.set_ocsp({})
+
+        assert self.staple() is None, 'revoked'
+        assert (
+            wait_for_record(r'certificate status "revoked"') is not None
+        ), 'revoked log'
+        assert self.staple() is None, 'revoked not stapled'
+
+    def test_tls_ocsp_invalid(self, skip_alert):
+        skip_alert(r'unsuccessful OCSP response status')
+
+        def check_ocsp(ocsp_conf):
+            assert 'error' in self.set_ocsp(ocsp_conf), f'invalid {ocsp_conf}'
+
+        check_ocsp('true')
+        check_ocsp({"responder": "https://127.0.0.1:7091"})
+        check_ocsp({"responder": "http://ocsp.example.com"})
+        check_ocsp({"responder": "http:///ocsp"})
+        check_ocsp({"responder": 1})
+        check_ocsp({"refresh": 0})
+        check_ocsp({"refresh": "1"})
+        check_ocsp({"blah": 1})
+
+        assert 'error' in self.conf(
+            b'-----BEGIN OCSP RESPONSE-----\nMAMKAQE=\n'
+            b'-----END OCSP RESPONSE-----\n',
+            '/certificates/invalid',
+        ), 'unsuccessful response upload'
@@ -13,6 +13,7 @@ from OpenSSL.SSL import (
     _lib,
 )
 from unit.applications.tls import TestApplicationTLS
+from unit.status import Status
 
 
 class TestTLSSession(TestApplicationTLS):
@@ -35,13 +36,15 @@ class TestTLSSession(TestApplicationTLS):
             }
         ), 'load application configuration'
 
-    def add_session(self, cache_size=None, timeout=None):
+    def add_session(self, cache_size=None, timeout=None, shared=None):
         session = {}
 
         if cache_size is not None:
             session['cache_size'] = cache_size
         if timeout is not None:
             session['timeout'] = timeout
+        if shared is not None:
+            session['shared'] = shared
 
         return self.conf(session, 'listeners/*:7080/tls/session')
 
@@ -119,8 +122,64 @@ class TestTLSSession(TestApplicationTLS):
         _, _, _, reused = self.connect(ctx, sess)
         assert not reused, 'timeout'
 
+    def test_tls_session_shared(self):
+        def reconfigure(status):
+            assert 'success' in self.conf(
+                {"action": {"return": status}}, 'routes/0'
+            )
+
+        assert 'success' in self.add_session(cache_size=10)
+
+        _, sess, ctx, _ = self.connect()
+
+        reconfigure(204)
+
+        _, _, _, reused = self.connect(ctx, sess)
+        assert not reused, 'not shared reconfiguration'
+
+        assert 'success' in self.add_session(cache_size=10, shared=True)
+
+        Status.init()
+
+        _, sess, ctx, reused = self.connect()
+        assert not reused, 'shared new'
+
+        _, _, _, reused = self.connect(ctx, sess)
+        assert reused, 'shared'
+
+        reconfigure(200)
+
+        _, _, _, reused = self.connect(ctx, sess)
+        assert reused, 'shared reconfiguration'
+
+        assert Status.get('/tls/handshakes') == {'full': 1, 'resumed': 2}
+        assert Status.get('/tls/session_cache/sessions') == 1, 'sessions'
+
+        # sessions of one listener are not resumed on another
+
+        assert 'success' in self.conf(
+            {
+                "pass": "routes",
+                "tls": {
+                    "certificate": "default",
+                    "session": {"cache_size": 10, "shared": True},
+                },
+            },
+            'listeners/*:7081',
+        )
+
+        sock = socket.create_connection(('127.0.0.1', 7081))
+        client = Connection(ctx, sock)
+        client.set_connect_state()
+        client.set_session(sess)
+        client.do_handshake()
+        client.shutdown()
+
+        assert not _lib.SSL_session_reused(client._ssl), 'other listener'
+
     def test_tls_session_invalid(self):
         assert 'error' in self.add_session(cache_size=-1)
         assert 'error' in self.add_session(cache_size={})
         assert 'error' in self.add_session(timeout=-1)
         assert 'error' in self.add_session(timeout={})
+        assert 'error' in self.add_session(shared=1)
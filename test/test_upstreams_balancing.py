@@ -0,0 +1,116 @@
+import re
+
+import pytest
+from unit.applications.lang.python import TestApplicationPython
+from unit.option import option
+
+
+class TestUpstreamsBalancing(TestApplicationPython):
+    prerequisites = {'modules': {'python': 'any'}}
+
+    @pytest.fixture(autouse=True)
+    def setup_method_fixture(self):
+        delayed_dir = f'{option.test_dir}/python/delayed'
+        assert 'success' in self.conf(
+            {
+                "listeners": {
+                    "*:7080": {"pass": "upstreams/one"},
+                    "*:7081": {"pass": "routes"},
+                    "*:7082": {"pass": "routes"},
+                },
+                "upstreams": {
+                    "one": {
+                        "servers": {
+                            "127.0.0.1:7081": {},
+                            "127.0.0.1:7082": {},
+                        },
+                    },
+                },
+                "routes": [
+                    {
+                        "match": {"destination": "*:7081"},
+                        "action": {"pass": "applications/delayed"},
+                    },
+                    {
+                        "match": {"destination": "*:7082"},
+                        "action": {"return": 201},
+                    },
+                ],
+                "applications": {
+                    "delayed": {
+                        "type": self.get_application_type(),
+                        "processes": {"spare": 0},
+                        "path": delayed_dir,
+                        "working_directory": delayed_dir,
+                        "module": "wsgi",
+                    }
+                },
+            },
+        ), 'upstreams initial configuration'
+
+    def get_delayed(self, delay, **kwargs):
+        return self.get(
+            headers={
+                'Host': 'localhost',
+                'Content-Length': '0',
+                'X-Delay': str(delay),
+                'Connection': 'close',
+            },
+            **kwargs,
+        )
+
+    def get_resps(self, req=10):
+        resps = [0, 0]
+
+        for _ in range(req):
+            status = self.get()['status']
+            assert status in [200, 201], 'status'
+            resps[status % 10] += 1
+
+        return resps
+
+    def test_upstreams_least_conn(self):
+        assert 'success' in self.conf('"least_conn"', 'upstreams/one/method')
+
+        sock = self.get_delayed(2, no_recv=True)
+
+        assert self.get_resps() == [0, 10], 'busy server skipped'
+
+        resp = self.recvall(sock).decode()
+        sock.close()
+
+        assert re.search(r'HTTP/1.1 200', resp) is not None, 'busy server'
+
+        resps = self.get_resps()
+        assert abs(resps[0] - resps[1]) <= 1, 'idle servers'
+
+    def test_upstreams_least_conn_weight(self):
+        assert 'success' in self.conf(
+            {
+                "method": "least_conn",
+                "servers": {
+                    "127.0.0.1:7081": {"weight": 0},
+                    "127.0.0.1:7082": {},
+                },
+            },
+            'upstreams/one',
+        )
+
+        assert self.get_resps() == [0, 10], 'zero weight'
+
+    def test_upstreams_peak_ewma(self):
+        assert 'success' in self.conf('"peak_ewma"', 'upstreams/one/method')
+
+        assert self.get_delayed(1)['status'] == 200, 'slow response'
+
+        assert self.get_resps() == [0, 10], 'slow server skipped'
+
+    def test_upstreams_method_round_robin(self):
+        assert 'success' in self.conf('"round_robin"', 'upstreams/one/method')
+
+        assert self.get_resps() == [5, 5], 'round robin'
+
+    def test_upstreams_method_invalid(self):
+        assert 'error' in self.conf('"blah"', 'upstreams/one/method')
+        assert 'error' in self.conf('1', 'upstreams/one/method')
+        assert 'error' in self.conf('""', 'upstreams/one/method')
@@ -1,5 +1,6 @@
 import os
 import re
+import time
 
 import pytest
 from unit.applications.lang.python import TestApplicationPython
@@ -371,9 +372,76 @@ Connection: close
         ), 'configure bad server'
 
         resps = self.get_resps_sc(req=30)
-        assert resps[0] == 10, 'bad server 0'
-        assert resps[1] == 10, 'bad server 1'
-        assert sum(resps) == 20, 'bad server sum'
+        assert sum(resps) == 30, 'bad server sum'
+        assert abs(resps[0] - resps[1]) <= 1, 'bad server'
+
+    def test_upstreams_rr_bad_server_max_fails(self, findall):
+        assert 'success' in self.conf(
+            {"max_fails": 0}, 'upstreams/one/servers/127.0.0.1:7084'
+        ), 'configure bad server'
+
+        resps = self.get_resps(req=30)
+        assert sum(resps) == 30, 'retried'
+        assert abs(resps[0] - resps[1]) <= 1, 'retried servers'
+
+        assert (
+            len(findall(r'connect\(\d+, 127\.0\.0\.1:7084\) failed')) == 10
+        ), 'not disabled'
+
+    def test_upstreams_rr_bad_servers(self, findall, wait_for_record):
+        assert 'success' in self.conf(
+            {
+                "servers": {
+                    "127.0.0.1:7084": {"fail_timeout": 1},
+                    "127.0.0.1:7085": {"max_fails": 2, "fail_timeout": 1},
+                }
+            },
+            'upstreams/one',
+        ), 'configure bad servers'
+
+        def connect_failed():
+            return len(findall(r'connect\(\d+, 127\.0\.0\.1:708[45]\) failed'))
+
+        assert self.get()['status'] == 502, 'bad servers'
+        assert connect_failed() == 2, 'both tried'
+
+        assert self.get()['status'] == 502, 'bad servers 2'
+        assert connect_failed() == 3, 'max_fails 2'
+
+        wait_for_record(r'upstream server 127\.0\.0\.1:7085 is disabled')
+
+        for _ in range(5):
+            assert self.get()['status'] == 502, 'disabled'
+
+        assert connect_failed() == 3, 'no connects'
+
+        time.sleep(1.1)
+
+        assert self.get()['status'] == 502, 'probes'
+        assert connect_failed() == 5, 'probes connects'
+
+        assert 'success' in self.conf(
+            {"pass": "routes/one"}, 'listeners/*:7084'
+        ), 'server recovered'
+
+        time.sleep(1.1)
+
+        assert self.get()['status'] == 200, 'probe success'
+        assert self.get()['status'] == 200, 'server enabled'
+
+    def test_upstreams_rr_many_bad_servers(self, findall):
+        servers = {f'127.0.0.1:{7200 + i}': {"max_fails": 0} for i in range(70)}
+        servers['127.0.0.1:7269']['weight'] = 50
+
+        assert 'success' in self.conf(
+            {"servers": servers}, 'upstreams/one'
+        ), 'configure bad servers'
+
+        assert self.get()['status'] == 502, 'bad servers'
+
+        ports = findall(r'connect\(\d+, 127\.0\.0\.1:(72\d\d)\) failed')
+        assert len(ports) == 70, 'all tried'
+        assert len(set(ports)) == 70, 'each tried once'
 
     def test_upstreams_rr_pipeline(self):
         resps = self.get_resps_sc()
@@ -452,6 +520,16 @@ Connection: close
         assert self.get()['status'] == 502, 'servers empty two'
 
     def test_upstreams_rr_invalid(self):
+        assert 'error' in self.conf(
+            '-1', 'upstreams/one/servers/127.0.0.1:7081/max_fails'
+        ), 'negative max_fails'
+        assert 'error' in self.conf(
+            '0', 'upstreams/one/servers/127.0.0.1:7081/fail_timeout'
+        ), 'zero fail_timeout'
+        assert 'error' in self.conf(
+            '"1"', 'upstreams/one/servers/127.0.0.1:7081/fail_timeout'
+        ), 'fail_timeout string'
+
         assert 'error' in self.conf({}, 'upstreams'), 'upstreams empty'
         assert 'error' in self.conf(
             {}, 'upstreams/one'
@@ -15,6 +15,15 @@ class Status:
             },
             'requests': {'total': 0},
             'applications': {},
+            'proxy': {'keepalive': {'hits': 0, 'misses': 0, 'idle': 0}},
+            'static': {'open_file_cache': {'hits': 0, 'misses': 0, 'open': 0}},
+            'cache': {'hits': 0, 'misses': 0, 'bytes': 0},
+            'routes': {'memo': {'hits': 0, 'misses': 0}},
+            'tls': {
+                'handshakes': {'full': 0, 'resumed': 0},
+                'session_cache': {'sessions': 0},
+            },
+            'listeners': {},
         }
 
     def init(status=None):